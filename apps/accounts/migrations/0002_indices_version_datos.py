@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="loginaudit",
+            index=models.Index(
+                fields=["updated_at"], name="login_audit_updated_4b0234_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="loginaudit",
+            index=models.Index(
+                fields=["deleted_at"], name="login_audit_deleted_6de16e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="role",
+            index=models.Index(fields=["updated_at"], name="rol_updated_9de5bd_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="role",
+            index=models.Index(fields=["deleted_at"], name="rol_deleted_e3cad7_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["updated_at"], name="usuario_updated_041223_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["deleted_at"], name="usuario_deleted_915e80_idx"
+            ),
+        ),
+    ]
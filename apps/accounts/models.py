@@ -42,6 +42,10 @@ class Role(BaseModel):
         db_table = 'rol'
         verbose_name = 'Rol'
         verbose_name_plural = 'Roles'
+        indexes = [
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['deleted_at']),
+        ]
     
     def __str__(self):
         return self.nombre
@@ -93,6 +97,10 @@ class User(AbstractBaseUser, BaseModel):
         db_table = 'usuario'
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
+        indexes = [
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['deleted_at']),
+        ]
     
     def __str__(self):
         return f"{self.nombre} {self.apellido} ({self.email})"
@@ -136,6 +144,8 @@ class LoginAudit(BaseModel):
         indexes = [
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['-created_at']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['deleted_at']),
         ]
     
     def __str__(self):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MLModel, PrediccionVentas
+from .models import MLModel, PrediccionVentas, TrainingJob, VersionFeatures
 
 
 @admin.register(MLModel)
@@ -20,7 +20,8 @@ class MLModelAdmin(admin.ModelAdmin):
             'fields': ('mae', 'mse', 'rmse', 'r2_score')
         }),
         ('Entrenamiento', {
-            'fields': ('registros_entrenamiento', 'features_utilizadas', 'hiperparametros')
+            'fields': ('registros_entrenamiento', 'features_utilizadas', 'hiperparametros',
+                       'version_features', 'features_hasta')
         }),
         ('Metadata', {
             'fields': ('fecha_entrenamiento', 'notas', 'created_at', 'updated_at'),
@@ -66,3 +67,20 @@ class PrediccionVentasAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(VersionFeatures)
+class VersionFeaturesAdmin(admin.ModelAdmin):
+    list_display = ['numero', 'fuente', 'primer_mes', 'ultimo_mes', 'activa', 'created_at']
+    list_filter = ['activa', 'fuente']
+    readonly_fields = ['numero', 'fuente', 'primer_mes', 'ultimo_mes', 'created_at', 'updated_at']
+
+
+@admin.register(TrainingJob)
+class TrainingJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'estado', 'etapa', 'progreso', 'modelo', 'usuario', 'created_at', 'finalizado_en']
+    list_filter = ['estado', 'created_at']
+    readonly_fields = [
+        'usuario', 'estado', 'etapa', 'progreso', 'parametros', 'metricas', 'modelo', 'error',
+        'iniciado_en', 'finalizado_en', 'created_at', 'updated_at'
+    ]
@@ -0,0 +1,65 @@
+"""
+Comando de Django para mantener el almacén de features mensuales de ventas
+
+Uso:
+    python manage.py build_sales_features                  # Agregar los meses cerrados que falten
+    python manage.py build_sales_features --months 48      # Cubrir también meses más antiguos
+    python manage.py build_sales_features --rebuild --notes "Corrección de pedidos de marzo"
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.ai.services.feature_store import FeatureStoreService
+
+
+class Command(BaseCommand):
+    help = 'Agrega los meses cerrados al almacén de features o crea una versión nueva'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=36,
+            help='Meses cerrados que debe cubrir la versión (default: 36)'
+        )
+
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recalcular todos los meses en una versión nueva (la anterior se conserva)'
+        )
+
+        parser.add_argument(
+            '--source',
+            choices=['rollup', 'stream'],
+            default=None,
+            help='Fuente para la versión nueva con --rebuild (default: rollup si cubre el rango)'
+        )
+
+        parser.add_argument(
+            '--notes',
+            type=str,
+            default='',
+            help='Motivo de la versión nueva con --rebuild'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.stdout.write("🔄 Creando una versión nueva de features...")
+            version = FeatureStoreService.crear_version(
+                months_back=options['months'],
+                fuente=options['source'],
+                notas=options['notes']
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Versión v{version.numero} activa: {version.filas.count()} filas "
+                f"({version.primer_mes:%Y-%m} → {version.ultimo_mes:%Y-%m}, {version.fuente})"
+            ))
+            return
+
+        self.stdout.write("🔄 Actualizando el almacén de features...")
+        version, meses = FeatureStoreService.actualizar(months_back=options['months'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Versión v{version.numero}: {meses} meses agregados "
+            f"({version.primer_mes:%Y-%m} → {version.ultimo_mes:%Y-%m})"
+        ))
@@ -0,0 +1,37 @@
+"""
+Comando de Django para regenerar el pronóstico precalculado del dashboard
+
+El snapshot se genera al activar un modelo; conviene programarlo además el
+primer día de cada mes (cron), cuando cambian los períodos a pronosticar:
+
+    python manage.py refresh_forecast_snapshot
+    python manage.py refresh_forecast_snapshot --months 12
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ai.services.prediction import PredictionService
+
+
+class Command(BaseCommand):
+    help = 'Regenera el pronóstico por categoría que sirve el dashboard de IA'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=None,
+            help='Meses a pronosticar (default: AI_FORECAST_SNAPSHOT_MONTHS)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Regenerando pronóstico del dashboard...")
+
+        try:
+            snapshot = PredictionService().generar_snapshot(n_months=options['months'])
+        except Exception as e:
+            raise CommandError(f"No se pudo regenerar el pronóstico: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Pronóstico de {snapshot.meses} meses generado con el modelo {snapshot.modelo.version}"
+        ))
@@ -5,9 +5,15 @@ Uso:
     python manage.py train_model
     python manage.py train_model --months 24  # 2 años de datos
     python manage.py train_model --months 36 --estimators 200 --depth 15  # 3 años con más árboles
+    python manage.py train_model --source stream --chunk-size 2000  # Detalles por lotes (poca RAM)
+    python manage.py train_model --source rollup  # Sin almacén de features (incluye el mes en curso)
+    python manage.py train_model --search --cpu-budget 4  # Búsqueda de hiperparámetros en 4 procesos
+    python manage.py train_model --search --grid-estimators 100,300 --grid-depth 8,16
 """
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.ai.services.model_search import GRILLA_DEFAULT
 from apps.ai.services.model_training import ModelTrainingService
 
 
@@ -42,6 +48,55 @@ class Command(BaseCommand):
             default=0.2,
             help='Proporción de datos para testing (default: 0.2)'
         )
+        
+        parser.add_argument(
+            '--source',
+            choices=['features', 'rollup', 'stream', 'lineas'],
+            default='features',
+            help='Origen de los datos: almacén de features mensuales, agregado diario, '
+                 'detalles por lotes o detalles completos (default: features)'
+        )
+        
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Detalles de pedido por lote con --source stream (default: 5000)'
+        )
+    
+        parser.add_argument(
+            '--search',
+            action='store_true',
+            help='Buscar n_estimators y max_depth con validación temporal (ignora --estimators/--depth)'
+        )
+        
+        parser.add_argument(
+            '--grid-estimators',
+            type=str,
+            default=None,
+            help='Valores de n_estimators para --search, separados por coma (default: 50,100,200)'
+        )
+        
+        parser.add_argument(
+            '--grid-depth',
+            type=str,
+            default=None,
+            help='Valores de max_depth para --search, separados por coma (default: 5,10,20)'
+        )
+        
+        parser.add_argument(
+            '--cv-splits',
+            type=int,
+            default=5,
+            help='Folds de TimeSeriesSplit (default: 5)'
+        )
+        
+        parser.add_argument(
+            '--cpu-budget',
+            type=int,
+            default=None,
+            help='Procesos para la validación y núcleos del modelo final (default: AI_TRAINING_N_JOBS, -1 = todos)'
+        )
     
     def handle(self, *args, **options):
         self.stdout.write(self.style.WARNING('\n' + '='*60))
@@ -59,17 +114,33 @@ class Command(BaseCommand):
         self.stdout.write(f"   - N° de árboles: {n_estimators}")
         self.stdout.write(f"   - Profundidad máxima: {max_depth}")
         self.stdout.write(f"   - Test size: {test_size}")
+        self.stdout.write(f"   - Origen de datos: {options['source']}")
+        
+        param_grid = None
+        if options['search']:
+            param_grid = {
+                'n_estimators': self._parse_lista(options['grid_estimators'], GRILLA_DEFAULT['n_estimators']),
+                'max_depth': self._parse_lista(options['grid_depth'], GRILLA_DEFAULT['max_depth']),
+            }
+            self.stdout.write(f"   - Búsqueda: n_estimators={param_grid['n_estimators']}, max_depth={param_grid['max_depth']}")
+        cpu_budget = options['cpu_budget'] or settings.AI_TRAINING_N_JOBS
+        self.stdout.write(f"   - Presupuesto de CPU: {cpu_budget}")
         self.stdout.write("")
         
         try:
             # Crear servicio y entrenar
             training_service = ModelTrainingService()
+            training_service.data_service.chunk_size = options['chunk_size']
             
             result = training_service.train_model(
                 months_back=months_back,
                 n_estimators=n_estimators,
                 max_depth=max_depth,
-                test_size=test_size
+                test_size=test_size,
+                source=options['source'],
+                param_grid=param_grid,
+                cv_splits=options['cv_splits'],
+                cpu_budget=cpu_budget
             )
             
             # Mostrar resultados
@@ -79,6 +150,17 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(f"📁 Guardado en: {result['model_path']}"))
             self.stdout.write(self.style.SUCCESS(f"📊 Muestras de entrenamiento: {result['num_samples']}"))
             self.stdout.write(self.style.SUCCESS(f"🗓️  Meses de datos: {result['months_back']}"))
+            if result['version_features']:
+                self.stdout.write(self.style.SUCCESS(f"🗃️  Versión de features: v{result['version_features']}"))
+            
+            self.stdout.write(self.style.SUCCESS(
+                f"🌲 Hiperparámetros: n_estimators={result['hiperparametros']['n_estimators']}, "
+                f"max_depth={result['hiperparametros']['max_depth']}"
+            ))
+            self.stdout.write(self.style.SUCCESS(
+                f"🔁 Validación temporal ({result['validacion']['n_splits']} folds): "
+                f"MAE {result['validacion']['cv_mae']:.2f}"
+            ))
             
             test_metrics = result['metrics']['test']
             self.stdout.write(self.style.SUCCESS(f"\n📈 Métricas (Test Set):"))
@@ -93,3 +175,11 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'\n❌ ERROR: {str(e)}\n'))
             raise
+    
+    def _parse_lista(self, valor, default):
+        if not valor:
+            return default
+        try:
+            return [int(v) for v in valor.split(',') if v.strip()]
+        except ValueError:
+            raise CommandError(f"Lista inválida: {valor} (formato esperado 50,100,200)")
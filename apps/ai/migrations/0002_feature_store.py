@@ -0,0 +1,173 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VersionFeatures",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha de creación"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Última actualización"
+                    ),
+                ),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de eliminación"
+                    ),
+                ),
+                (
+                    "numero",
+                    models.PositiveIntegerField(
+                        unique=True, verbose_name="Número de versión"
+                    ),
+                ),
+                (
+                    "fuente",
+                    models.CharField(
+                        choices=[
+                            ("rollup", "Agregado de ventas diarias"),
+                            ("stream", "Detalles de pedido por lotes"),
+                        ],
+                        max_length=20,
+                        verbose_name="Fuente de los datos",
+                    ),
+                ),
+                ("primer_mes", models.DateField(verbose_name="Primer mes incluido")),
+                (
+                    "ultimo_mes",
+                    models.DateField(verbose_name="Último mes cerrado incluido"),
+                ),
+                (
+                    "activa",
+                    models.BooleanField(default=False, verbose_name="Versión activa"),
+                ),
+                ("notas", models.TextField(blank=True, verbose_name="Notas")),
+            ],
+            options={
+                "verbose_name": "Versión de features",
+                "verbose_name_plural": "Versiones de features",
+                "db_table": "version_features",
+                "ordering": ["-numero"],
+            },
+        ),
+        migrations.AddField(
+            model_name="mlmodel",
+            name="features_hasta",
+            field=models.DateField(
+                blank=True, null=True, verbose_name="Último mes de features usado"
+            ),
+        ),
+        migrations.AddField(
+            model_name="mlmodel",
+            name="version_features",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="modelos",
+                to="ai.versionfeatures",
+                verbose_name="Versión de features",
+            ),
+        ),
+        migrations.CreateModel(
+            name="VentaMensualFeature",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha de creación"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Última actualización"
+                    ),
+                ),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de eliminación"
+                    ),
+                ),
+                ("año", models.IntegerField(verbose_name="Año")),
+                ("mes", models.IntegerField(verbose_name="Mes")),
+                (
+                    "categoria",
+                    models.CharField(max_length=100, verbose_name="Categoría"),
+                ),
+                (
+                    "cantidad_vendida",
+                    models.IntegerField(default=0, verbose_name="Unidades vendidas"),
+                ),
+                (
+                    "total_ventas",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="Total de ventas",
+                    ),
+                ),
+                (
+                    "precio_promedio",
+                    models.FloatField(default=0, verbose_name="Precio promedio"),
+                ),
+                (
+                    "num_transacciones",
+                    models.IntegerField(default=0, verbose_name="Líneas de detalle"),
+                ),
+                (
+                    "version",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="filas",
+                        to="ai.versionfeatures",
+                        verbose_name="Versión",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Feature de venta mensual",
+                "verbose_name_plural": "Features de ventas mensuales",
+                "db_table": "venta_mensual_feature",
+                "ordering": ["version", "año", "mes", "categoria"],
+                "unique_together": {("version", "año", "mes", "categoria")},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:45
+
+from django.db import migrations
+
+
+def eliminar_duplicados(apps, schema_editor):
+    """Conservar solo la predicción más reciente por modelo, período y categoría"""
+    PrediccionVentas = apps.get_model("ai", "PrediccionVentas")
+
+    vistos = set()
+    duplicados = []
+    for pk, modelo_id, periodo, categoria in PrediccionVentas.objects.order_by(
+        "modelo_id", "periodo_predicho", "categoria", "-fecha_prediccion"
+    ).values_list("pk", "modelo_id", "periodo_predicho", "categoria").iterator():
+        clave = (modelo_id, periodo, categoria)
+        if clave in vistos:
+            duplicados.append(pk)
+        else:
+            vistos.add(clave)
+
+    for inicio in range(0, len(duplicados), 1000):
+        PrediccionVentas.objects.filter(pk__in=duplicados[inicio:inicio + 1000]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai", "0002_feature_store"),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_duplicados, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="prediccionventas",
+            unique_together={("modelo", "periodo_predicho", "categoria")},
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai", "0003_prediccion_unica"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SnapshotPrediccion",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha de creación"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Última actualización"
+                    ),
+                ),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de eliminación"
+                    ),
+                ),
+                (
+                    "meses",
+                    models.PositiveIntegerField(verbose_name="Meses pronosticados"),
+                ),
+                (
+                    "predicciones",
+                    models.JSONField(
+                        default=list, verbose_name="Predicciones por categoría"
+                    ),
+                ),
+                (
+                    "generado_en",
+                    models.DateTimeField(verbose_name="Fecha de generación"),
+                ),
+                (
+                    "modelo",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshot",
+                        to="ai.mlmodel",
+                        verbose_name="Modelo usado",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Snapshot de predicción",
+                "verbose_name_plural": "Snapshots de predicción",
+                "db_table": "snapshot_prediccion",
+                "ordering": ["-generado_en"],
+            },
+        ),
+    ]
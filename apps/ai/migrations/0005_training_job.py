@@ -0,0 +1,127 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("ai", "0004_snapshot_prediccion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrainingJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha de creación"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Última actualización"
+                    ),
+                ),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de eliminación"
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("pendiente", "Pendiente"),
+                            ("en_proceso", "En proceso"),
+                            ("completado", "Completado"),
+                            ("error", "Error"),
+                        ],
+                        default="pendiente",
+                        max_length=20,
+                        verbose_name="Estado",
+                    ),
+                ),
+                (
+                    "etapa",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="Etapa actual"
+                    ),
+                ),
+                (
+                    "progreso",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Progreso (%)"
+                    ),
+                ),
+                (
+                    "parametros",
+                    models.JSONField(
+                        default=dict, verbose_name="Parámetros de entrenamiento"
+                    ),
+                ),
+                (
+                    "metricas",
+                    models.JSONField(blank=True, default=dict, verbose_name="Métricas"),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="Error")),
+                (
+                    "iniciado_en",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Inicio"),
+                ),
+                (
+                    "finalizado_en",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Fin"),
+                ),
+                (
+                    "modelo",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="training_jobs",
+                        to="ai.mlmodel",
+                        verbose_name="Modelo entrenado",
+                    ),
+                ),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="training_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Solicitado por",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Entrenamiento en segundo plano",
+                "verbose_name_plural": "Entrenamientos en segundo plano",
+                "db_table": "training_job",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["estado", "-created_at"],
+                        name="training_jo_estado_0210e0_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:19
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def cerrar_activos_duplicados(apps, schema_editor):
+    """Dejar solo el job activo más reciente antes de crear el índice"""
+    TrainingJob = apps.get_model('ai', 'TrainingJob')
+    activos = TrainingJob.objects.filter(estado__in=['pendiente', 'en_proceso']).order_by('-created_at')
+    ultimo = activos.first()
+    if ultimo is not None:
+        activos.exclude(pk=ultimo.pk).update(
+            estado='error',
+            error='Cerrado al migrar: había otro entrenamiento activo',
+            finalizado_en=timezone.now()
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai", "0005_training_job"),
+    ]
+
+    operations = [
+        migrations.RunPython(cerrar_activos_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="trainingjob",
+            constraint=models.UniqueConstraint(
+                models.Value(True),
+                condition=models.Q(("estado__in", ["pendiente", "en_proceso"])),
+                name="training_job_un_solo_activo",
+            ),
+        ),
+    ]
@@ -1,6 +1,12 @@
-from django.db import models
+import logging
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
 from apps.core.models import BaseModel
 
+logger = logging.getLogger(__name__)
+
 
 class MLModel(BaseModel):
     """
@@ -27,6 +33,17 @@ class MLModel(BaseModel):
     # Hiperparámetros
     hiperparametros = models.JSONField(default=dict, verbose_name='Hiperparámetros')
     
+    # Datos de entrenamiento (para reproducir el dataset)
+    version_features = models.ForeignKey(
+        'VersionFeatures',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='modelos',
+        verbose_name='Versión de features'
+    )
+    features_hasta = models.DateField(null=True, blank=True, verbose_name='Último mes de features usado')
+    
     # Estado
     activo = models.BooleanField(default=False, verbose_name='Modelo activo')
     notas = models.TextField(blank=True, verbose_name='Notas adicionales')
@@ -45,10 +62,26 @@ class MLModel(BaseModel):
         return f"{self.nombre} v{self.version} - {'Activo' if self.activo else 'Inactivo'}"
     
     def activar(self):
-        """Activa este modelo y desactiva los demás"""
+        """
+        Activa este modelo y desactiva los demás
+        
+        Los procesos que tengan otro modelo en memoria (ModelRegistry) lo
+        notan al consultar el modelo activo y cargan este. Es el único punto
+        que regenera el pronóstico del dashboard (al confirmar la transacción).
+        """
         MLModel.objects.filter(activo=True).update(activo=False)
         self.activo = True
         self.save()
+        transaction.on_commit(self._generar_snapshot)
+    
+    @staticmethod
+    def _generar_snapshot():
+        """Precalcular el pronóstico del dashboard con el modelo recién activado"""
+        from apps.ai.services.prediction import PredictionService
+        try:
+            PredictionService().generar_snapshot()
+        except Exception as e:
+            logger.error(f"No se pudo generar el snapshot de predicción: {e}", exc_info=True)
 
 
 class PrediccionVentas(BaseModel):
@@ -83,6 +116,7 @@ class PrediccionVentas(BaseModel):
         verbose_name = 'Predicción de Ventas'
         verbose_name_plural = 'Predicciones de Ventas'
         ordering = ['-fecha_prediccion']
+        unique_together = [['modelo', 'periodo_predicho', 'categoria']]
         indexes = [
             models.Index(fields=['-fecha_prediccion']),
             models.Index(fields=['periodo_predicho']),
@@ -97,3 +131,168 @@ class PrediccionVentas(BaseModel):
         if self.ventas_reales is not None:
             self.error = abs(self.ventas_predichas - self.ventas_reales)
             self.save()
+
+
+class SnapshotPrediccion(BaseModel):
+    """
+    Pronóstico por categoría precalculado para el dashboard
+    
+    Se genera en `MLModel.activar()`, con `refresh_forecast_snapshot` o desde
+    el endpoint de refresco; el dashboard solo lo lee.
+    """
+    modelo = models.OneToOneField(
+        MLModel,
+        on_delete=models.CASCADE,
+        related_name='snapshot',
+        verbose_name='Modelo usado'
+    )
+    meses = models.PositiveIntegerField(verbose_name='Meses pronosticados')
+    predicciones = models.JSONField(default=list, verbose_name='Predicciones por categoría')
+    generado_en = models.DateTimeField(verbose_name='Fecha de generación')
+    
+    class Meta:
+        db_table = 'snapshot_prediccion'
+        verbose_name = 'Snapshot de predicción'
+        verbose_name_plural = 'Snapshots de predicción'
+        ordering = ['-generado_en']
+    
+    def __str__(self):
+        return f"Snapshot {self.modelo.version} ({self.meses} meses)"
+    
+    def cubre(self, meses):
+        """
+        True si tiene al menos `meses` meses y se generó este mes (los
+        períodos pronosticados se cuentan desde el mes de generación)
+        """
+        generado = timezone.localtime(self.generado_en)
+        hoy = timezone.localdate()
+        return self.meses >= meses and (generado.year, generado.month) == (hoy.year, hoy.month)
+
+
+class VersionFeatures(BaseModel):
+    """
+    Versión del almacén de features mensuales de ventas
+    
+    Una versión cubre los meses cerrados desde `primer_mes` hasta
+    `ultimo_mes` y se extiende agregando solo los meses nuevos; las filas ya
+    guardadas no se modifican. Si hay que recalcular el histórico (cambios
+    tardíos de estado, nuevas categorías) se crea una versión nueva, así un
+    modelo entrenado con (versión, ultimo_mes) se puede reproducir.
+    """
+    FUENTES = [
+        ('rollup', 'Agregado de ventas diarias'),
+        ('stream', 'Detalles de pedido por lotes'),
+    ]
+    
+    numero = models.PositiveIntegerField(unique=True, verbose_name='Número de versión')
+    fuente = models.CharField(max_length=20, choices=FUENTES, verbose_name='Fuente de los datos')
+    primer_mes = models.DateField(verbose_name='Primer mes incluido')
+    ultimo_mes = models.DateField(verbose_name='Último mes cerrado incluido')
+    activa = models.BooleanField(default=False, verbose_name='Versión activa')
+    notas = models.TextField(blank=True, verbose_name='Notas')
+    
+    class Meta:
+        db_table = 'version_features'
+        verbose_name = 'Versión de features'
+        verbose_name_plural = 'Versiones de features'
+        ordering = ['-numero']
+    
+    def __str__(self):
+        return f"Features v{self.numero} ({self.primer_mes:%Y-%m} → {self.ultimo_mes:%Y-%m})"
+
+
+class VentaMensualFeature(BaseModel):
+    """
+    Ventas de un mes cerrado por categoría, dentro de una versión de features
+    """
+    version = models.ForeignKey(
+        VersionFeatures,
+        on_delete=models.CASCADE,
+        related_name='filas',
+        verbose_name='Versión'
+    )
+    año = models.IntegerField(verbose_name='Año')
+    mes = models.IntegerField(verbose_name='Mes')
+    categoria = models.CharField(max_length=100, verbose_name='Categoría')
+    
+    cantidad_vendida = models.IntegerField(default=0, verbose_name='Unidades vendidas')
+    total_ventas = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Total de ventas')
+    precio_promedio = models.FloatField(default=0, verbose_name='Precio promedio')
+    num_transacciones = models.IntegerField(default=0, verbose_name='Líneas de detalle')
+    
+    class Meta:
+        db_table = 'venta_mensual_feature'
+        verbose_name = 'Feature de venta mensual'
+        verbose_name_plural = 'Features de ventas mensuales'
+        ordering = ['version', 'año', 'mes', 'categoria']
+        unique_together = [['version', 'año', 'mes', 'categoria']]
+    
+    def __str__(self):
+        return f"v{self.version.numero} {self.año}-{self.mes:02d} {self.categoria}"
+
+
+class TrainingJob(BaseModel):
+    """
+    Entrenamiento del modelo ejecutado en segundo plano (ver apps/core/jobs.py)
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+    ESTADOS_ACTIVOS = ['pendiente', 'en_proceso']
+    
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='training_jobs',
+        verbose_name='Solicitado por'
+    )
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente', verbose_name='Estado')
+    etapa = models.CharField(max_length=100, blank=True, verbose_name='Etapa actual')
+    progreso = models.PositiveSmallIntegerField(default=0, verbose_name='Progreso (%)')
+    parametros = models.JSONField(default=dict, verbose_name='Parámetros de entrenamiento')
+    metricas = models.JSONField(default=dict, blank=True, verbose_name='Métricas')
+    modelo = models.ForeignKey(
+        MLModel,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='training_jobs',
+        verbose_name='Modelo entrenado'
+    )
+    error = models.TextField(blank=True, verbose_name='Error')
+    iniciado_en = models.DateTimeField(null=True, blank=True, verbose_name='Inicio')
+    finalizado_en = models.DateTimeField(null=True, blank=True, verbose_name='Fin')
+    
+    class Meta:
+        db_table = 'training_job'
+        verbose_name = 'Entrenamiento en segundo plano'
+        verbose_name_plural = 'Entrenamientos en segundo plano'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['estado', '-created_at']),
+        ]
+        constraints = [
+            # Un solo entrenamiento pendiente o en proceso (índice parcial
+            # sobre una constante)
+            models.UniqueConstraint(
+                models.Value(True),
+                condition=models.Q(estado__in=['pendiente', 'en_proceso']),
+                name='training_job_un_solo_activo'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Entrenamiento {self.id} - {self.get_estado_display()} ({self.progreso}%)"
+    
+    def actualizar_progreso(self, etapa, progreso):
+        """Guardar etapa y progreso sin pisar el resto de campos"""
+        self.etapa = etapa
+        self.progreso = progreso
+        TrainingJob.objects.filter(pk=self.pk).update(
+            etapa=etapa, progreso=progreso, updated_at=timezone.now()
+        )
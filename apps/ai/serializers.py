@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import MLModel, PrediccionVentas
+from .models import MLModel, PrediccionVentas, TrainingJob
 
 
 class MLModelSerializer(serializers.ModelSerializer):
@@ -67,6 +67,31 @@ class TrainModelSerializer(serializers.Serializer):
     n_estimators = serializers.IntegerField(default=100, min_value=10, max_value=500)
     max_depth = serializers.IntegerField(default=10, min_value=3, max_value=50)
     test_size = serializers.FloatField(default=0.2, min_value=0.1, max_value=0.4)
+    buscar_hiperparametros = serializers.BooleanField(default=False)
+    cv_splits = serializers.IntegerField(default=5, min_value=2, max_value=10)
+
+
+class TrainingJobSerializer(serializers.ModelSerializer):
+    """Serializer para el estado de un entrenamiento en segundo plano"""
+    modelo_detalle = MLModelListSerializer(source='modelo', read_only=True)
+    
+    class Meta:
+        model = TrainingJob
+        fields = [
+            'id',
+            'estado',
+            'etapa',
+            'progreso',
+            'parametros',
+            'metricas',
+            'modelo',
+            'modelo_detalle',
+            'error',
+            'created_at',
+            'iniciado_en',
+            'finalizado_en'
+        ]
+        read_only_fields = fields
 
 
 class DashboardResponseSerializer(serializers.Serializer):
@@ -76,4 +101,11 @@ class DashboardResponseSerializer(serializers.Serializer):
     predictions_by_category = serializers.ListField()
     top_products = serializers.ListField()
     category_sales = serializers.ListField()
+    forecast_generated_at = serializers.DateTimeField()
+    forecast_stale = serializers.BooleanField()
     model_info = serializers.DictField()
+
+
+class RefreshForecastSerializer(serializers.Serializer):
+    """Serializer para regenerar el pronóstico del dashboard"""
+    n_months = serializers.IntegerField(required=False, min_value=1, max_value=12)
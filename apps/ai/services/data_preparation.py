@@ -10,11 +10,16 @@ Este módulo se encarga de:
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from itertools import islice
 from django.db.models import Sum, Count, Avg, F
 from django.utils import timezone
 
 from apps.orders.models import Pedido, DetallePedido
 from apps.products.models import Prenda, Categoria
+from apps.reports.models import VentaDiaria
+
+# Estados de pedido considerados como venta para el entrenamiento
+ESTADOS_VENTA = ['completado', 'enviado', 'entregado']
 
 
 class DataPreparationService:
@@ -24,61 +29,262 @@ class DataPreparationService:
     
     def __init__(self):
         self.min_records_for_training = 50  # Mínimo de registros para entrenar
+        self.chunk_size = 5000  # Filas por lote al leer detalles de pedido
     
-    def get_historical_sales_data(self, months_back=36):
+    def get_historical_sales_data(self, months_back=36, source='features', incluir_mes_actual=True,
+                                  actualizar_features=False):
         """
         Extrae datos históricos de ventas de los últimos N meses
         
+        Por defecto lee el almacén de features mensuales (ver
+        FeatureStoreService) sin escribir en él: los meses que la versión
+        activa no cubre (y el mes en curso) se calculan al vuelo. Solo con
+        actualizar_features=True (entrenamiento) se le agregan antes los
+        meses cerrados que falten. Con source='rollup' lee
+        el agregado de ventas diarias (una fila por día y categoría); si aún
+        no se ha construido, o con source='stream', agrega los detalles de
+        pedido por lotes en ventas mensuales por categoría (memoria acotada
+        por el tamaño del lote). Con source='lineas' devuelve una fila por
+        detalle de pedido.
+        
         Args:
             months_back (int): Número de meses hacia atrás a considerar (default: 36 = 3 años)
+            source (str): 'features' (almacén mensual), 'rollup' (agregado
+                diario), 'stream' (lotes de detalles agregados por mes) o
+                'lineas' (detalles de pedido)
+            incluir_mes_actual (bool): Con source='features', agregar el mes
+                en curso; sin él la ventana termina en el último mes cerrado
+                y `df.attrs` guarda el último mes usado (y la versión, si
+                la cubre entera)
+            actualizar_features (bool): Con source='features', guardar
+                antes en el almacén los meses cerrados que falten
             
         Returns:
             pd.DataFrame: DataFrame con datos de ventas históricas
         """
         fecha_inicio = timezone.now() - timedelta(days=months_back * 30)
         
-        # Obtener detalles de pedidos completados
-        detalles = DetallePedido.objects.filter(
-            pedido__created_at__gte=fecha_inicio,
-            pedido__estado__in=['completado', 'enviado', 'entregado']
-        ).select_related(
-            'prenda',
-            'prenda__marca',
-            'pedido'
-        ).prefetch_related(
-            'prenda__categorias'
-        )
+        if source == 'features':
+            df = self._get_sales_from_features(months_back, incluir_mes_actual, actualizar_features)
+        elif source == 'rollup' and VentaDiaria.objects.exists():
+            df = self._get_sales_from_rollup(fecha_inicio)
+        elif source == 'lineas':
+            df = self._get_sales_from_lines(fecha_inicio)
+        else:
+            df = self._stream_sales_from_lines(fecha_inicio)
+        
+        # Si no hay suficientes datos, generar sintéticos
+        num_registros = int(df['num_lineas'].sum()) if 'num_lineas' in df else len(df)
+        if num_registros < self.min_records_for_training:
+            print(f"⚠️ Solo {num_registros} registros reales. Generando datos sintéticos...")
+            df = self._generate_synthetic_data(real_data=df)
+        
+        return df
+    
+    def _get_sales_from_features(self, months_back, incluir_mes_actual=True, actualizar=False):
+        """
+        Ventas mensuales por categoría desde el almacén de features
+        
+        Los meses de la ventana que la versión activa no tiene se calculan
+        al vuelo; solo con `actualizar` se guardan antes en el almacén.
+        """
+        from apps.ai.services.feature_store import FeatureStoreService, mes_anterior, siguiente_mes
+        
+        if actualizar:
+            version, _ = FeatureStoreService.actualizar(months_back=months_back)
+        else:
+            version = FeatureStoreService.get_version_activa()
+        
+        if incluir_mes_actual:
+            hasta = timezone.localdate()
+            desde = FeatureStoreService.primer_mes(months_back)
+        else:
+            hasta = FeatureStoreService.ultimo_mes_cerrado()
+            desde = FeatureStoreService.primer_mes(months_back, hasta)
+        
+        if version is None:
+            partes = [FeatureStoreService.calcular_dataframe(desde, hasta)]
+        else:
+            partes = [
+                FeatureStoreService.calcular_dataframe(desde, min(hasta, mes_anterior(version.primer_mes))),
+                FeatureStoreService.get_dataframe(version, max(desde, version.primer_mes), min(hasta, version.ultimo_mes)),
+                FeatureStoreService.calcular_dataframe(max(desde, siguiente_mes(version.ultimo_mes)), hasta),
+            ]
+        partes = [parte for parte in partes if not parte.empty]
+        df = pd.concat(partes, ignore_index=True) if partes else FeatureStoreService.a_dataframe([])
+        
+        if not incluir_mes_actual:
+            df.attrs['features_hasta'] = hasta
+            if version is not None and version.primer_mes <= desde and version.ultimo_mes >= hasta:
+                df.attrs['version_features'] = version.numero
+        return df
+    
+    def _get_sales_from_rollup(self, fecha_inicio):
+        """
+        Ventas diarias por categoría desde el agregado VentaDiaria
+        """
+        filas = VentaDiaria.objects.filter(
+            fecha__gte=timezone.localdate(fecha_inicio),
+            estado__in=ESTADOS_VENTA
+        ).exclude(
+            categoria=VentaDiaria.CATEGORIA_TOTAL
+        ).values('fecha', 'categoria').annotate(
+            cantidad=Sum('cantidad_vendida'),
+            subtotal=Sum('monto_total'),
+            num_lineas=Sum('num_lineas')
+        ).order_by('fecha')
         
-        # Convertir a lista de diccionarios
         data = []
-        for detalle in detalles:
-            categoria_principal = detalle.prenda.categorias.first()
-            
+        for fila in filas:
+            fecha = fila['fecha']
+            cantidad = fila['cantidad'] or 0
+            subtotal = float(fila['subtotal'] or 0)
             data.append({
-                'fecha': detalle.pedido.created_at,
-                'producto_id': detalle.prenda.id,
-                'producto_nombre': detalle.prenda.nombre,
-                'categoria': categoria_principal.nombre if categoria_principal else 'Sin categoría',
-                'marca': detalle.prenda.marca.nombre if detalle.prenda.marca else 'Sin marca',
-                'precio_unitario': float(detalle.precio_unitario),
-                'cantidad': detalle.cantidad,
-                'subtotal': float(detalle.subtotal),
-                'mes': detalle.pedido.created_at.month,
-                'año': detalle.pedido.created_at.year,
-                'dia_semana': detalle.pedido.created_at.weekday(),  # 0=Lunes, 6=Domingo
-                'trimestre': (detalle.pedido.created_at.month - 1) // 3 + 1,
+                'fecha': fecha,
+                'categoria': fila['categoria'],
+                'precio_unitario': subtotal / cantidad if cantidad else 0.0,
+                'cantidad': cantidad,
+                'subtotal': subtotal,
+                'num_lineas': fila['num_lineas'] or 0,
+                'mes': fecha.month,
+                'año': fecha.year,
+                'dia_semana': fecha.weekday(),  # 0=Lunes, 6=Domingo
+                'trimestre': (fecha.month - 1) // 3 + 1,
             })
         
-        df = pd.DataFrame(data)
+        return pd.DataFrame(data)
+    
+    def _get_sales_from_lines(self, fecha_inicio):
+        """
+        Ventas línea por línea desde los detalles de pedido
         
-        # Si no hay suficientes datos, generar sintéticos
-        if len(df) < self.min_records_for_training:
-            print(f"⚠️ Solo {len(df)} registros reales. Generando datos sintéticos...")
-            df = self._generate_synthetic_data(real_data=df)
+        Las líneas se leen como tuplas (values_list) directo a un DataFrame;
+        la categoría se resuelve una vez por prenda y las features de fecha
+        se derivan por columna.
+        """
+        from apps.reports.services.sales_rollup import SalesRollupService
+        
+        campos = {
+            'pedido__created_at': 'fecha',
+            'prenda_id': 'producto_id',
+            'prenda__nombre': 'producto_nombre',
+            'prenda__marca__nombre': 'marca',
+            'precio_unitario': 'precio_unitario',
+            'cantidad': 'cantidad',
+            'subtotal': 'subtotal',
+        }
+        lineas = self._lineas_venta(fecha_inicio).values_list(*campos)
+        
+        df = pd.DataFrame.from_records(
+            lineas.iterator(chunk_size=self.chunk_size),
+            columns=list(campos.values())
+        )
+        if df.empty:
+            return df
+        
+        # Categoría principal: una consulta para todas las prendas del período
+        categorias = SalesRollupService.get_categorias_principales(df['producto_id'].unique().tolist())
+        df['categoria'] = df['producto_id'].map(categorias).fillna('Sin categoría')
+        df['marca'] = df['marca'].fillna('Sin marca')
+        df['precio_unitario'] = df['precio_unitario'].astype(float)
+        df['subtotal'] = df['subtotal'].astype(float)
+        
+        # Features de fecha en la zona horaria local (igual que VentaDiaria)
+        fechas = pd.to_datetime(df['fecha'], utc=True).dt.tz_convert(timezone.get_current_timezone_name())
+        df['fecha'] = fechas
+        df['mes'] = fechas.dt.month
+        df['año'] = fechas.dt.year
+        df['dia_semana'] = fechas.dt.weekday  # 0=Lunes, 6=Domingo
+        df['trimestre'] = fechas.dt.quarter
+        
+        return df[[
+            'fecha', 'producto_id', 'producto_nombre', 'categoria', 'marca',
+            'precio_unitario', 'cantidad', 'subtotal',
+            'mes', 'año', 'dia_semana', 'trimestre',
+        ]]
+    
+    def _stream_sales_from_lines(self, fecha_inicio, chunk_size=None, fecha_fin=None):
+        """
+        Ventas mensuales por categoría leyendo los detalles de pedido por lotes
         
-        return df
+        Cada lote se reduce a sumas parciales por (año, mes, categoría) y se
+        descarta, así la memoria depende del tamaño del lote y del número
+        de meses × categorías, no de la cantidad de líneas del historial.
+        
+        Args:
+            fecha_inicio (datetime): Inicio inclusive
+            chunk_size (int): Líneas por lote (default: self.chunk_size)
+            fecha_fin (datetime): Fin exclusivo (None = sin límite)
+        
+        Returns:
+            pd.DataFrame: Una fila por año, mes y categoría (con num_lineas)
+        """
+        from apps.reports.services.sales_rollup import SalesRollupService
+        
+        chunk_size = chunk_size or self.chunk_size
+        claves = ['año', 'mes', 'categoria']
+        zona = timezone.get_current_timezone_name()
+        filas = self._lineas_venta(fecha_inicio, fecha_fin).values_list(
+            'pedido__created_at', 'prenda_id', 'precio_unitario', 'cantidad', 'subtotal'
+        ).iterator(chunk_size=chunk_size)
+        
+        categorias = {}
+        parciales = None
+        while True:
+            lote = list(islice(filas, chunk_size))
+            if not lote:
+                break
+            df = pd.DataFrame.from_records(
+                lote, columns=['fecha', 'producto_id', 'precio_unitario', 'cantidad', 'subtotal']
+            )
+            
+            # Resolver solo las prendas que no aparecieron en lotes anteriores
+            nuevas = [pid for pid in df['producto_id'].unique() if pid not in categorias]
+            if nuevas:
+                resueltas = SalesRollupService.get_categorias_principales(nuevas)
+                categorias.update({pid: resueltas.get(pid, 'Sin categoría') for pid in nuevas})
+            
+            fechas = pd.to_datetime(df['fecha'], utc=True).dt.tz_convert(zona)
+            parcial = pd.DataFrame({
+                'año': fechas.dt.year,
+                'mes': fechas.dt.month,
+                'categoria': df['producto_id'].map(categorias),
+                'cantidad': df['cantidad'],
+                'subtotal': df['subtotal'].astype(float),
+                'suma_precios': df['precio_unitario'].astype(float),
+                'num_lineas': 1,
+            }).groupby(claves, as_index=False).sum()
+            
+            if parciales is not None:
+                parcial = pd.concat([parciales, parcial]).groupby(claves, as_index=False).sum()
+            parciales = parcial
+        
+        if parciales is None:
+            return pd.DataFrame()
+        
+        # Precio promedio por línea, igual que el promedio sobre las líneas sueltas
+        parciales['precio_unitario'] = parciales['suma_precios'] / parciales['num_lineas']
+        parciales['trimestre'] = (parciales['mes'] - 1) // 3 + 1
+        parciales['fecha'] = pd.to_datetime(
+            pd.DataFrame({'year': parciales['año'], 'month': parciales['mes'], 'day': 1})
+        ).dt.date
+        
+        return parciales[[
+            'fecha', 'categoria', 'precio_unitario', 'cantidad', 'subtotal',
+            'num_lineas', 'mes', 'año', 'trimestre',
+        ]]
     
-    def prepare_features(self, df, months_back=36):
+    def _lineas_venta(self, fecha_inicio, fecha_fin=None):
+        """Detalles de pedidos vendidos desde `fecha_inicio` hasta `fecha_fin` exclusivo (sin orden)"""
+        lineas = DetallePedido.objects.filter(
+            pedido__created_at__gte=fecha_inicio,
+            pedido__estado__in=ESTADOS_VENTA
+        )
+        if fecha_fin is not None:
+            lineas = lineas.filter(pedido__created_at__lt=fecha_fin)
+        return lineas.order_by()
+    
+    def prepare_features(self, df, months_back=36, fecha_fin=None):
         """
         Prepara features para el modelo de Machine Learning
         IMPORTANTE: Incluye TODOS los meses (incluso con 0 ventas) para tener dataset completo
@@ -86,23 +292,30 @@ class DataPreparationService:
         Args:
             df (pd.DataFrame): DataFrame con datos crudos
             months_back (int): Meses hacia atrás para generar el rango completo
+            fecha_fin (date): Último mes del rango (default: mes actual)
             
         Returns:
             tuple: (X, y, feature_columns) Features, target y nombres de columnas
         """
+        # Cada fila de detalle es una transacción; las filas del agregado
+        # diario ya traen su número de líneas
+        df = df.assign(
+            num_lineas=df['num_lineas'].fillna(1) if 'num_lineas' in df else 1
+        )
+        
         # Agregar por mes, año y categoría
         df_agg = df.groupby(['año', 'mes', 'categoria']).agg({
             'cantidad': 'sum',
             'subtotal': 'sum',
             'precio_unitario': 'mean',
-            'producto_id': 'count'  # Número de transacciones
+            'num_lineas': 'sum'  # Número de transacciones
         }).reset_index()
         
         df_agg.columns = ['año', 'mes', 'categoria', 'cantidad_vendida', 'total_ventas', 'precio_promedio', 'num_transacciones']
         
         # ✅ CORRECCIÓN CRÍTICA: Crear un rango completo de todos los meses
         # Esto asegura que tengamos 36 meses × 4 categorías = 144 registros
-        fecha_fin = timezone.now()
+        fecha_fin = fecha_fin or timezone.now()
         fecha_inicio = fecha_fin - timedelta(days=months_back * 30)
         
         # Generar todos los meses en el rango
@@ -262,7 +475,7 @@ class DataPreparationService:
         if period == 'month':
             # Agrupar por mes
             ventas = Pedido.objects.filter(
-                estado__in=['completado', 'enviado', 'entregado']
+                estado__in=ESTADOS_VENTA
             ).annotate(
                 mes=F('created_at__month'),
                 año=F('created_at__year')
@@ -284,7 +497,7 @@ class DataPreparationService:
             list: Top productos con sus ventas
         """
         top_products = DetallePedido.objects.filter(
-            pedido__estado__in=['completado', 'enviado', 'entregado']
+            pedido__estado__in=ESTADOS_VENTA
         ).values(
             'prenda__id',
             'prenda__nombre',
@@ -308,7 +521,7 @@ class DataPreparationService:
         ventas_por_categoria = {}
         
         detalles = DetallePedido.objects.filter(
-            pedido__estado__in=['completado', 'enviado', 'entregado']
+            pedido__estado__in=ESTADOS_VENTA
         ).select_related('prenda').prefetch_related('prenda__categorias')
         
         for detalle in detalles:
@@ -0,0 +1,311 @@
+"""
+Almacén de features mensuales de ventas
+
+Guarda las ventas por (año, mes, categoría) de los meses cerrados en
+`VentaMensualFeature`, agrupadas en versiones (`VersionFeatures`):
+
+1. `actualizar()` agrega a la versión activa solo los meses cerrados que
+   faltan (y los anteriores a `primer_mes` si se piden más meses)
+2. `crear_version()` recalcula todo el rango en una versión nueva y la activa;
+   las versiones anteriores se conservan para los modelos que las usaron
+3. `get_dataframe()` devuelve las filas de una versión con las mismas
+   columnas que `DataPreparationService._stream_sales_from_lines`
+
+Los meses se calculan desde el agregado VentaDiaria si cubre todos los
+pedidos del rango, o desde los detalles de pedido por lotes.
+
+Solo el entrenamiento y el comando `build_sales_features` escriben aquí; las
+lecturas de los dashboards calculan al vuelo los meses que falten.
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+import logging
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS = [
+    'fecha', 'categoria', 'precio_unitario', 'cantidad', 'subtotal',
+    'num_lineas', 'mes', 'año', 'trimestre',
+]
+
+
+def inicio_mes(fecha):
+    """Primer día del mes de `fecha`"""
+    return fecha.replace(day=1)
+
+
+def siguiente_mes(fecha):
+    """Primer día del mes siguiente a `fecha`"""
+    return (fecha.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def mes_anterior(fecha):
+    """Primer día del mes anterior a `fecha`"""
+    return inicio_mes(inicio_mes(fecha) - timedelta(days=1))
+
+
+class FeatureStoreService:
+    """
+    Mantenimiento y lectura del almacén de features mensuales.
+    """
+
+    @staticmethod
+    def ultimo_mes_cerrado():
+        """Primer día del último mes completo (zona horaria local)"""
+        return mes_anterior(timezone.localdate())
+
+    @staticmethod
+    def primer_mes(months_back, hasta=None):
+        """Primer mes de una ventana de `months_back` meses que termina en `hasta`"""
+        hasta = hasta or timezone.localdate()
+        return inicio_mes(hasta - timedelta(days=months_back * 30))
+
+    @staticmethod
+    def get_version_activa():
+        from apps.ai.models import VersionFeatures
+        return VersionFeatures.objects.filter(activa=True).order_by('-numero').first()
+
+    @staticmethod
+    def fuente_disponible(desde, hasta):
+        """
+        'rollup' si el agregado diario cubre todos los pedidos de los meses
+        `desde` a `hasta`, si no 'stream' (un agregado a medio construir
+        congelaría meses incompletos).
+        """
+        from apps.orders.models import Pedido
+        from apps.reports.models import VentaDiaria
+
+        fin = siguiente_mes(hasta)
+        pedidos = Pedido.objects.filter(
+            created_at__date__gte=desde, created_at__date__lt=fin
+        ).count()
+        agregados = VentaDiaria.objects.filter(
+            categoria=VentaDiaria.CATEGORIA_TOTAL, fecha__gte=desde, fecha__lt=fin
+        ).aggregate(total=Sum('num_pedidos'))['total'] or 0
+        return 'rollup' if agregados == pedidos else 'stream'
+
+    @classmethod
+    def actualizar(cls, months_back=36):
+        """
+        Agregar a la versión activa los meses cerrados que aún no tiene.
+
+        Si no hay versión activa se crea la primera. Si `months_back` pide
+        meses anteriores a `primer_mes`, también se agregan.
+
+        Args:
+            months_back (int): Meses que debe cubrir la versión
+
+        Returns:
+            tuple: (VersionFeatures, meses agregados)
+        """
+        from apps.ai.models import VersionFeatures
+
+        hasta = cls.ultimo_mes_cerrado()
+        desde = cls.primer_mes(months_back, hasta)
+
+        with transaction.atomic():
+            version = VersionFeatures.objects.select_for_update().filter(
+                activa=True
+            ).order_by('-numero').first()
+            if version is None:
+                version = cls._crear(desde, hasta, cls.fuente_disponible(desde, hasta), notas='Versión inicial')
+                return version, cls._contar_meses(desde, hasta)
+
+            rangos = []
+            if desde < version.primer_mes:
+                rangos.append((desde, mes_anterior(version.primer_mes)))
+            if version.ultimo_mes < hasta:
+                rangos.append((siguiente_mes(version.ultimo_mes), hasta))
+            if not rangos:
+                return version, 0
+
+            meses = 0
+            for inicio, fin in rangos:
+                cls._guardar(version, cls.calcular_meses(inicio, fin, cls.fuente_disponible(inicio, fin)))
+                meses += cls._contar_meses(inicio, fin)
+
+            version.primer_mes = min(version.primer_mes, desde)
+            version.ultimo_mes = max(version.ultimo_mes, hasta)
+            version.save(update_fields=['primer_mes', 'ultimo_mes', 'updated_at'])
+
+        logger.info(f"Features v{version.numero}: {meses} meses agregados (hasta {hasta:%Y-%m})")
+        return version, meses
+
+    @classmethod
+    def crear_version(cls, months_back=36, fuente=None, notas=''):
+        """
+        Recalcular todos los meses cerrados en una versión nueva y activarla.
+
+        Args:
+            months_back (int): Meses que cubre la versión
+            fuente (str): 'rollup' o 'stream' (None = la disponible)
+            notas (str): Motivo de la nueva versión
+
+        Returns:
+            VersionFeatures: La versión creada
+        """
+        hasta = cls.ultimo_mes_cerrado()
+        desde = cls.primer_mes(months_back, hasta)
+        with transaction.atomic():
+            return cls._crear(desde, hasta, fuente or cls.fuente_disponible(desde, hasta), notas)
+
+    @classmethod
+    def _crear(cls, desde, hasta, fuente, notas=''):
+        from apps.ai.models import VersionFeatures
+
+        numero = (VersionFeatures.objects.aggregate(ultimo=Max('numero'))['ultimo'] or 0) + 1
+        VersionFeatures.objects.filter(activa=True).update(activa=False, updated_at=timezone.now())
+        version = VersionFeatures.objects.create(
+            numero=numero,
+            fuente=fuente,
+            primer_mes=desde,
+            ultimo_mes=hasta,
+            activa=True,
+            notas=notas
+        )
+        filas = cls._guardar(version, cls.calcular_meses(desde, hasta, fuente))
+
+        logger.info(f"Features v{numero} creada: {filas} filas ({desde:%Y-%m} → {hasta:%Y-%m}, {fuente})")
+        return version
+
+    @classmethod
+    def calcular_meses(cls, desde, hasta, fuente):
+        """
+        Ventas por (año, mes, categoría) entre los meses `desde` y `hasta`
+        (inclusive) calculadas desde la fuente indicada.
+
+        Returns:
+            list: [{'año', 'mes', 'categoria', 'cantidad_vendida',
+                'total_ventas', 'num_transacciones'}]
+        """
+        if desde > hasta:
+            return []
+        if fuente == 'rollup':
+            return cls._meses_desde_rollup(desde, hasta)
+        return cls._meses_desde_lineas(desde, hasta)
+
+    @classmethod
+    def calcular_dataframe(cls, desde, hasta):
+        """Meses `desde` a `hasta` calculados al vuelo (sin guardarlos)"""
+        if desde > hasta:
+            return cls.a_dataframe([])
+        return cls.a_dataframe(cls.calcular_meses(desde, hasta, cls.fuente_disponible(desde, hasta)))
+
+    @staticmethod
+    def _meses_desde_rollup(desde, hasta):
+        from apps.ai.services.data_preparation import ESTADOS_VENTA
+        from apps.reports.models import VentaDiaria
+
+        filas = VentaDiaria.objects.filter(
+            fecha__gte=desde,
+            fecha__lt=siguiente_mes(hasta),
+            estado__in=ESTADOS_VENTA
+        ).exclude(
+            categoria=VentaDiaria.CATEGORIA_TOTAL
+        ).annotate(
+            año=ExtractYear('fecha'),
+            mes=ExtractMonth('fecha')
+        ).values('año', 'mes', 'categoria').annotate(
+            cantidad=Sum('cantidad_vendida'),
+            total=Sum('monto_total'),
+            lineas=Sum('num_lineas')
+        ).order_by()
+
+        return [
+            {
+                'año': fila['año'],
+                'mes': fila['mes'],
+                'categoria': fila['categoria'],
+                'cantidad_vendida': fila['cantidad'] or 0,
+                'total_ventas': fila['total'] or Decimal('0'),
+                'num_transacciones': fila['lineas'] or 0,
+            }
+            for fila in filas
+        ]
+
+    @staticmethod
+    def _meses_desde_lineas(desde, hasta):
+        from apps.ai.services.data_preparation import DataPreparationService
+
+        zona = timezone.get_current_timezone()
+        df = DataPreparationService()._stream_sales_from_lines(
+            timezone.make_aware(datetime.combine(desde, time.min), zona),
+            fecha_fin=timezone.make_aware(datetime.combine(siguiente_mes(hasta), time.min), zona)
+        )
+        if df.empty:
+            return []
+
+        return [
+            {
+                'año': int(fila.año),
+                'mes': int(fila.mes),
+                'categoria': fila.categoria,
+                'cantidad_vendida': int(fila.cantidad),
+                'total_ventas': Decimal(str(round(fila.subtotal, 2))),
+                'num_transacciones': int(fila.num_lineas),
+            }
+            for fila in df.itertuples(index=False)
+        ]
+
+    @staticmethod
+    def _guardar(version, filas):
+        from apps.ai.models import VentaMensualFeature
+
+        VentaMensualFeature.objects.bulk_create([
+            VentaMensualFeature(
+                version=version,
+                precio_promedio=float(fila['total_ventas']) / fila['cantidad_vendida'] if fila['cantidad_vendida'] else 0.0,
+                **fila
+            )
+            for fila in filas
+        ], batch_size=1000)
+        return len(filas)
+
+    @staticmethod
+    def _contar_meses(desde, hasta):
+        return max((hasta.year - desde.year) * 12 + hasta.month - desde.month + 1, 0)
+
+    @classmethod
+    def get_dataframe(cls, version, desde, hasta=None):
+        """
+        Filas de una versión entre los meses `desde` y `hasta` (inclusive).
+
+        Returns:
+            pd.DataFrame: Una fila por año, mes y categoría, con las columnas
+                de `_stream_sales_from_lines`
+        """
+        filas = version.filas.filter(Q(año__gt=desde.year) | Q(año=desde.year, mes__gte=desde.month))
+        if hasta is not None:
+            filas = filas.filter(Q(año__lt=hasta.year) | Q(año=hasta.year, mes__lte=hasta.month))
+
+        return cls.a_dataframe(filas.order_by('año', 'mes', 'categoria').values(
+            'año', 'mes', 'categoria', 'cantidad_vendida', 'total_ventas',
+            'precio_promedio', 'num_transacciones'
+        ))
+
+    @staticmethod
+    def a_dataframe(filas):
+        """Filas mensuales (dicts del almacén o de `calcular_meses`) a DataFrame"""
+        df = pd.DataFrame.from_records(list(filas))
+        if df.empty:
+            return pd.DataFrame(columns=COLUMNAS)
+
+        df['cantidad'] = df['cantidad_vendida'].astype(int)
+        df['subtotal'] = df['total_ventas'].astype(float)
+        df['num_lineas'] = df['num_transacciones'].astype(int)
+        if 'precio_promedio' in df:
+            df['precio_unitario'] = df['precio_promedio'].astype(float)
+        else:
+            df['precio_unitario'] = (df['subtotal'] / df['cantidad'].where(df['cantidad'] > 0)).fillna(0.0)
+        df['trimestre'] = (df['mes'] - 1) // 3 + 1
+        df['fecha'] = pd.to_datetime(
+            pd.DataFrame({'year': df['año'], 'month': df['mes'], 'day': 1})
+        ).dt.date
+        return df[COLUMNAS]
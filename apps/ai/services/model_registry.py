@@ -0,0 +1,83 @@
+"""
+Registro en memoria del modelo activo
+
+Cada proceso conserva deserializado el último modelo cargado, así las
+predicciones no vuelven a leer el archivo joblib en cada request. Antes de
+usarlo se consulta qué modelo está activo en la BD: si `MLModel.activar()`
+(en este u otro proceso) cambió el modelo activo, el id no coincide y se
+carga el nuevo. Las señales de MLModel liberan la entrada del proceso
+cuando el modelo se desactiva o se elimina.
+"""
+
+import logging
+import os
+import threading
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Cache por proceso del estimador activo.
+    """
+
+    # (id, archivo) -> (sklearn_model, feature_columns); solo el último cargado
+    _entrada = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_active(cls):
+        """
+        Modelo activo con su estimador deserializado.
+
+        Returns:
+            tuple: (modelo_ml, sklearn_model, feature_columns)
+
+        Raises:
+            MLModel.DoesNotExist: No hay modelo activo
+            FileNotFoundError: Falta el archivo del modelo
+        """
+        from apps.ai.models import MLModel
+
+        ml_model = MLModel.objects.filter(activo=True).latest('fecha_entrenamiento')
+        model, feature_columns = cls.get(ml_model)
+        return ml_model, model, feature_columns
+
+    @classmethod
+    def get(cls, ml_model):
+        """
+        Estimador y columnas de `ml_model`, cargándolos del disco solo si
+        no es el modelo que ya está en memoria.
+
+        Returns:
+            tuple: (sklearn_model, feature_columns)
+        """
+        clave = (ml_model.pk, ml_model.archivo_modelo)
+        entrada = cls._entrada
+        if entrada is not None and entrada[0] == clave:
+            return entrada[1]
+
+        with cls._lock:
+            if cls._entrada is not None and cls._entrada[0] == clave:
+                return cls._entrada[1]
+
+            if not os.path.exists(ml_model.archivo_modelo):
+                raise FileNotFoundError(f"Archivo del modelo no encontrado: {ml_model.archivo_modelo}")
+
+            model_data = joblib.load(ml_model.archivo_modelo)
+            cargado = (model_data['model'], model_data['feature_columns'])
+            cls._entrada = (clave, cargado)
+
+        logger.info(f"Modelo {ml_model.version} cargado en memoria")
+        return cargado
+
+    @classmethod
+    def invalidar(cls, model_id=None):
+        """
+        Olvidar el modelo en memoria (solo si es `model_id`, si se indica).
+        """
+        with cls._lock:
+            if cls._entrada is not None and (model_id is None or cls._entrada[0][0] == model_id):
+                cls._entrada = None
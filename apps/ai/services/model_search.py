@@ -0,0 +1,220 @@
+"""
+Validación temporal y búsqueda de hiperparámetros
+
+Las filas del dataset mensual se dividen por mes (todas las categorías de
+un mes quedan del mismo lado), así ningún fold entrena con meses
+posteriores a los que evalúa:
+
+1. `holdout_temporal()` separa los últimos meses para el test final
+2. `splits_temporales()` genera los folds de TimeSeriesSplit sobre los meses
+3. `ModelSearchService.buscar()` evalúa cada combinación de n_estimators y
+   max_depth en todos los folds, repartiendo (configuración, fold) en un
+   pool de procesos con tantos procesos como permita el presupuesto de CPU
+
+Los folds se serializan una sola vez en un directorio temporal; cada proceso
+los carga (memory-mapped) la primera vez que los necesita y los reutiliza
+para el resto de configuraciones.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import product
+import multiprocessing
+import os
+import tempfile
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import TimeSeriesSplit
+
+# Combinaciones evaluadas por defecto
+GRILLA_DEFAULT = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [5, 10, 20],
+}
+
+# Meses de train necesarios para al menos 2 folds de TimeSeriesSplit
+MIN_MESES_VALIDACION = 3
+
+
+class HistorialInsuficienteError(ValueError):
+    """No hay meses suficientes para separar test y validar en el tiempo"""
+
+
+def periodos(X):
+    """Índice de mes (año * 12 + mes) de cada fila"""
+    return (X['año'] * 12 + X['mes']).to_numpy()
+
+
+def holdout_temporal(X, test_size):
+    """
+    Separar los últimos meses para test.
+
+    Returns:
+        tuple: (índices de train, índices de test)
+    """
+    filas = periodos(X)
+    meses = np.unique(filas)
+    if len(meses) < 2:
+        raise HistorialInsuficienteError(
+            f"Se necesitan al menos 2 meses con ventas para separar el test (hay {len(meses)})"
+        )
+    corte = meses[-_meses_test(len(meses), test_size)]
+    return np.flatnonzero(filas < corte), np.flatnonzero(filas >= corte)
+
+
+def validar_historial(X, y, test_size):
+    """
+    Comprobar antes de entrenar que, tras separar el test, quedan meses
+    con ventas suficientes para la validación temporal.
+
+    prepare_features completa la grilla mes x categoría con ceros, así que
+    se cuentan los meses con alguna venta (`y` > 0), no las filas de la
+    grilla: un mes sin ventas no aporta nada que validar.
+
+    Raises:
+        HistorialInsuficienteError: Con el número de meses disponibles
+    """
+    total = len(np.unique(periodos(X)[np.asarray(y) > 0]))
+    train = total - _meses_test(total, test_size) if total >= 2 else total
+    if train < MIN_MESES_VALIDACION:
+        raise HistorialInsuficienteError(
+            f"Historial insuficiente: {total} meses con ventas dejan {train} para entrenar "
+            f"y la validación temporal necesita al menos {MIN_MESES_VALIDACION}"
+        )
+
+
+def _meses_test(total, test_size):
+    return min(max(1, round(total * test_size)), total - 1)
+
+
+def splits_temporales(X, n_splits=5):
+    """
+    TimeSeriesSplit sobre los meses del dataset.
+
+    Returns:
+        list: [(índices de train, índices de test)] por fold
+
+    Raises:
+        HistorialInsuficienteError: Con menos de MIN_MESES_VALIDACION meses
+    """
+    filas = periodos(X)
+    meses = np.unique(filas)
+    if len(meses) < MIN_MESES_VALIDACION:
+        raise HistorialInsuficienteError(
+            f"La validación temporal necesita al menos {MIN_MESES_VALIDACION} meses (hay {len(meses)})"
+        )
+    n_splits = min(n_splits, len(meses) - 1)
+    return [
+        (np.flatnonzero(np.isin(filas, meses[train])), np.flatnonzero(np.isin(filas, meses[test])))
+        for train, test in TimeSeriesSplit(n_splits=n_splits).split(meses)
+    ]
+
+
+def resolver_cpu(cpu_budget):
+    """Procesos a usar: -1 = todos los núcleos, N = hasta N núcleos"""
+    total = os.cpu_count() or 1
+    if cpu_budget is None or cpu_budget < 1:
+        return total
+    return min(cpu_budget, total)
+
+
+@lru_cache(maxsize=32)
+def _cargar_fold(ruta):
+    return joblib.load(ruta, mmap_mode='r')
+
+
+def _evaluar_fold(ruta, params, random_state):
+    """Entrenar y evaluar una configuración en un fold (corre en el pool)"""
+    X_train, y_train, X_test, y_test = _cargar_fold(ruta)
+    model = RandomForestRegressor(random_state=random_state, n_jobs=1, **params)
+    model.fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+    return {
+        'mae': float(mean_absolute_error(y_test, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        'r2': float(r2_score(y_test, y_pred)) if len(y_test) > 1 else 0.0,
+    }
+
+
+class ModelSearchService:
+    """
+    Búsqueda de hiperparámetros con validación temporal.
+
+    Args:
+        cpu_budget (int): Procesos simultáneos (-1 = todos los núcleos;
+            1 = secuencial en el proceso actual)
+    """
+
+    def __init__(self, cpu_budget=1):
+        self.workers = resolver_cpu(cpu_budget)
+
+    def buscar(self, X, y, grilla=None, n_splits=5, random_state=42):
+        """
+        Evaluar todas las combinaciones de la grilla.
+
+        Args:
+            X (pd.DataFrame): Features en orden cronológico
+            y (pd.Series): Target
+            grilla (dict): {'n_estimators': [...], 'max_depth': [...]}
+            n_splits (int): Folds de TimeSeriesSplit
+
+        Returns:
+            dict: {'mejor': params, 'resultados': [{params, mae, rmse, r2}]
+                ordenados por MAE, 'n_splits'}
+        """
+        grilla = grilla or GRILLA_DEFAULT
+        nombres = list(grilla)
+        configuraciones = [dict(zip(nombres, valores)) for valores in product(*grilla.values())]
+        folds = splits_temporales(X, n_splits)
+
+        X_valores = X.to_numpy(dtype=float)
+        y_valores = y.to_numpy(dtype=float)
+
+        with tempfile.TemporaryDirectory(prefix='model-search-') as directorio:
+            rutas = []
+            for i, (train, test) in enumerate(folds):
+                ruta = os.path.join(directorio, f'fold_{i}.joblib')
+                joblib.dump((X_valores[train], y_valores[train], X_valores[test], y_valores[test]), ruta)
+                rutas.append(ruta)
+
+            tareas = [(ruta, params) for params in configuraciones for ruta in rutas]
+            metricas = self._ejecutar(tareas, random_state)
+            _cargar_fold.cache_clear()
+
+        resultados = []
+        for i, params in enumerate(configuraciones):
+            por_fold = metricas[i * len(rutas):(i + 1) * len(rutas)]
+            resultados.append({
+                **params,
+                **{
+                    metrica: float(np.mean([fold[metrica] for fold in por_fold]))
+                    for metrica in ('mae', 'rmse', 'r2')
+                },
+            })
+        resultados.sort(key=lambda resultado: resultado['mae'])
+
+        return {
+            'mejor': {nombre: resultados[0][nombre] for nombre in nombres},
+            'resultados': resultados,
+            'n_splits': len(folds),
+        }
+
+    def _ejecutar(self, tareas, random_state):
+        if self.workers == 1:
+            return [_evaluar_fold(ruta, params, random_state) for ruta, params in tareas]
+
+        # spawn: el proceso web o el worker pueden tener hilos activos
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(tareas)),
+            mp_context=multiprocessing.get_context('spawn')
+        ) as pool:
+            return list(pool.map(
+                _evaluar_fold,
+                [ruta for ruta, _ in tareas],
+                [params for _, params in tareas],
+                [random_state] * len(tareas),
+                chunksize=max(1, len(tareas) // (self.workers * 4))
+            ))
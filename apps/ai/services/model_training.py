@@ -13,13 +13,14 @@ import joblib
 import numpy as np
 from datetime import datetime
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
 from django.conf import settings
 
-from apps.ai.models import MLModel
+from apps.ai.models import MLModel, VersionFeatures
 from apps.ai.services.data_preparation import DataPreparationService
+from apps.ai.services.model_registry import ModelRegistry
+from apps.ai.services.model_search import ModelSearchService, holdout_temporal, validar_historial
 
 
 class ModelTrainingService:
@@ -34,7 +35,9 @@ class ModelTrainingService:
         # Crear directorio si no existe
         os.makedirs(self.models_dir, exist_ok=True)
     
-    def train_model(self, months_back=36, n_estimators=100, max_depth=10, random_state=42, test_size=0.2):
+    def train_model(self, months_back=36, n_estimators=100, max_depth=10, random_state=42, test_size=0.2,
+                    source='features', on_progress=None, param_grid=None, cv_splits=5,
+                    cpu_budget=None):
         """
         Entrena un nuevo modelo Random Forest
         
@@ -44,39 +47,86 @@ class ModelTrainingService:
             max_depth (int): Profundidad máxima de los árboles
             random_state (int): Semilla para reproducibilidad
             test_size (float): Proporción de datos para testing
+            source (str): Origen de los datos ('features', 'rollup', 'stream' o
+                'lineas', ver DataPreparationService.get_historical_sales_data).
+                Con 'features' se entrena solo con meses cerrados y el modelo
+                registra la versión de features usada
+            on_progress (callable): Recibe (etapa, porcentaje) al empezar cada paso
+            param_grid (dict): Si se indica, busca la mejor combinación de
+                'n_estimators' y 'max_depth' con validación temporal (ignora
+                n_estimators y max_depth)
+            cv_splits (int): Folds de TimeSeriesSplit para la validación
+            cpu_budget (int): Procesos de la validación y n_jobs del modelo
+                final (default: AI_TRAINING_N_JOBS; -1 = todos los núcleos)
             
         Returns:
             dict: Información del modelo entrenado y métricas
+        
+        Raises:
+            HistorialInsuficienteError: Si no hay meses suficientes para el
+                test y la validación temporal
         """
+        cpu_budget = cpu_budget or settings.AI_TRAINING_N_JOBS
+        
         print("=" * 60)
         print("🚀 INICIANDO ENTRENAMIENTO DEL MODELO DE PREDICCIÓN DE VENTAS")
         print("=" * 60)
         
         # 1. Obtener datos históricos
+        self._progreso(on_progress, 'Obteniendo datos históricos', 5)
         print(f"\n📊 Paso 1: Obteniendo datos históricos ({months_back} meses = {months_back/12:.1f} años)...")
-        df = self.data_service.get_historical_sales_data(months_back=months_back)
+        df = self.data_service.get_historical_sales_data(
+            months_back=months_back, source=source, incluir_mes_actual=False, actualizar_features=True
+        )
+        features_hasta = df.attrs.get('features_hasta')
+        version_features = None
+        if 'version_features' in df.attrs:
+            version_features = VersionFeatures.objects.get(numero=df.attrs['version_features'])
+            print(f"   Features v{version_features.numero} hasta {features_hasta:%Y-%m}")
         print(f"✅ {len(df)} registros obtenidos")
         
         # 2. Preparar features
+        self._progreso(on_progress, 'Preparando features', 25)
         print("\n🔧 Paso 2: Preparando features...")
-        X, y, feature_columns = self.data_service.prepare_features(df, months_back=months_back)
+        X, y, feature_columns = self.data_service.prepare_features(
+            df, months_back=months_back, fecha_fin=features_hasta
+        )
         print(f"✅ {len(feature_columns)} features creadas")
         print(f"   Samples: {len(X)}, Features: {X.shape[1]}")
+        validar_historial(X, y, test_size)
         
-        # 3. Dividir en train/test
-        print(f"\n✂️ Paso 3: Dividiendo datos (train: {int((1-test_size)*100)}%, test: {int(test_size*100)}%)...")
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=random_state
-        )
+        # 3. Dividir en train/test (los últimos meses quedan para test)
+        self._progreso(on_progress, 'Dividiendo datos', 30)
+        print(f"\n✂️ Paso 3: Dividiendo datos por mes (train: {int((1-test_size)*100)}%, test: {int(test_size*100)}%)...")
+        train_idx, test_idx = holdout_temporal(X, test_size)
+        X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+        y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
         print(f"✅ Train: {len(X_train)} samples | Test: {len(X_test)} samples")
         
+        # Validación temporal sobre train (y búsqueda si hay grilla)
+        self._progreso(on_progress, 'Validación temporal', 32)
+        grilla = param_grid or {'n_estimators': [n_estimators], 'max_depth': [max_depth]}
+        print(f"\n🔁 Validación temporal ({cv_splits} folds, {len(grilla['n_estimators']) * len(grilla['max_depth'])} configuraciones)...")
+        busqueda = ModelSearchService(cpu_budget=cpu_budget).buscar(
+            X_train, y_train, grilla, n_splits=cv_splits, random_state=random_state
+        )
+        n_estimators = busqueda['mejor']['n_estimators']
+        max_depth = busqueda['mejor']['max_depth']
+        validacion = {
+            'tipo': 'TimeSeriesSplit',
+            'n_splits': busqueda['n_splits'],
+            **{f'cv_{metrica}': busqueda['resultados'][0][metrica] for metrica in ('mae', 'rmse', 'r2')},
+        }
+        print(f"✅ CV MAE: {validacion['cv_mae']:.2f} | CV R²: {validacion['cv_r2']:.4f}")
+        
         # 4. Entrenar modelo
+        self._progreso(on_progress, 'Entrenando modelo', 35)
         print(f"\n🤖 Paso 4: Entrenando Random Forest (n_estimators={n_estimators}, max_depth={max_depth})...")
         model = RandomForestRegressor(
             n_estimators=n_estimators,
             max_depth=max_depth,
             random_state=random_state,
-            n_jobs=-1,  # Usar todos los cores disponibles
+            n_jobs=cpu_budget,  # Núcleos según el presupuesto de CPU
             verbose=0
         )
         
@@ -84,6 +134,7 @@ class ModelTrainingService:
         print("✅ Modelo entrenado exitosamente")
         
         # 5. Evaluar modelo
+        self._progreso(on_progress, 'Evaluando rendimiento', 80)
         print("\n📈 Paso 5: Evaluando rendimiento...")
         y_pred_train = model.predict(X_train)
         y_pred_test = model.predict(X_test)
@@ -126,6 +177,7 @@ class ModelTrainingService:
             print(f"   {row['feature']}: {row['importance']:.4f}")
         
         # 6. Guardar modelo
+        self._progreso(on_progress, 'Guardando modelo', 90)
         print("\n💾 Paso 6: Guardando modelo...")
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         version = f"v1.0_{timestamp}"
@@ -138,12 +190,15 @@ class ModelTrainingService:
             'feature_columns': feature_columns,
             'version': version,
             'trained_at': datetime.now().isoformat(),
-            'months_back': months_back
+            'months_back': months_back,
+            'version_features': version_features.numero if version_features else None,
+            'features_hasta': features_hasta.isoformat() if features_hasta else None
         }, model_path)
         
         print(f"✅ Modelo guardado en: {model_path}")
         
         # 7. Registrar en base de datos
+        self._progreso(on_progress, 'Registrando en base de datos', 95)
         print("\n💿 Paso 7: Registrando en base de datos...")
         ml_model = MLModel.objects.create(
             nombre='Predictor de Ventas',
@@ -161,13 +216,17 @@ class ModelTrainingService:
                 'max_depth': max_depth,
                 'random_state': random_state,
                 'test_size': test_size,
-                'months_back': months_back
+                'months_back': months_back,
+                'source': source,
+                'validacion': validacion,
+                'busqueda': busqueda['resultados'][:5] if param_grid else []
             },
-            activo=True  # Activar automáticamente el nuevo modelo
+            version_features=version_features,
+            features_hasta=features_hasta
         )
         
-        # Desactivar modelos anteriores
-        MLModel.objects.filter(activo=True).exclude(id=ml_model.id).update(activo=False)
+        # Activar automáticamente el nuevo modelo (desactiva los anteriores)
+        ml_model.activar()
         
         print(f"✅ Modelo registrado con ID: {ml_model.id}")
         
@@ -180,6 +239,9 @@ class ModelTrainingService:
             'version': version,
             'model_path': model_path,
             'months_back': months_back,
+            'version_features': version_features.numero if version_features else None,
+            'hiperparametros': {'n_estimators': n_estimators, 'max_depth': max_depth},
+            'validacion': validacion,
             'metrics': {
                 'train': {
                     'mae': mae_train,
@@ -198,24 +260,20 @@ class ModelTrainingService:
             'num_samples': len(X)
         }
     
+    @staticmethod
+    def _progreso(on_progress, etapa, porcentaje):
+        if on_progress is not None:
+            on_progress(etapa, porcentaje)
+    
     def load_active_model(self):
         """
-        Carga el modelo activo desde el archivo
+        Carga el modelo activo (deserializado una vez por proceso, ver ModelRegistry)
         
         Returns:
             tuple: (modelo_ml, sklearn_model, feature_columns)
         """
         try:
-            # Obtener modelo activo de la BD
-            ml_model = MLModel.objects.filter(activo=True).latest('fecha_entrenamiento')
-            
-            # Cargar archivo
-            if not os.path.exists(ml_model.archivo_modelo):
-                raise FileNotFoundError(f"Archivo del modelo no encontrado: {ml_model.archivo_modelo}")
-            
-            model_data = joblib.load(ml_model.archivo_modelo)
-            
-            return ml_model, model_data['model'], model_data['feature_columns']
+            return ModelRegistry.get_active()
         
         except MLModel.DoesNotExist:
             raise Exception("No hay ningún modelo activo. Por favor, entrena un modelo primero.")
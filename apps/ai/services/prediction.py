@@ -7,14 +7,24 @@ Este módulo se encarga de:
 3. Guardar predicciones en la base de datos
 """
 
+import logging
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from django.conf import settings
 from django.utils import timezone
 
-from apps.ai.models import PrediccionVentas
+from apps.ai.models import PrediccionVentas, SnapshotPrediccion
 from apps.ai.services.model_training import ModelTrainingService
 from apps.ai.services.data_preparation import DataPreparationService
+from apps.ai.services.feature_store import siguiente_mes
+from apps.reports.services.analytics_cache import AnalyticsCache
+
+logger = logging.getLogger(__name__)
+
+
+class PronosticoNoDisponibleError(Exception):
+    """El modelo activo no tiene un pronóstico precalculado que servir"""
 
 
 class PredictionService:
@@ -22,6 +32,9 @@ class PredictionService:
     Servicio para generar predicciones de ventas futuras
     """
     
+    CATEGORIAS = ['Vestidos', 'Blusas', 'Jeans', 'Jackets']
+    CATEGORIAS_DISPONIBLES = CATEGORIAS + ['Sin categoría']
+    
     def __init__(self):
         self.training_service = ModelTrainingService()
         self.data_service = DataPreparationService()
@@ -36,33 +49,14 @@ class PredictionService:
         Returns:
             dict: Predicción de ventas
         """
-        # Cargar modelo activo
-        ml_model, model, feature_columns = self.training_service.load_active_model()
-        
-        # Preparar features para el próximo mes
-        next_month_features = self._prepare_next_month_features(categoria, feature_columns)
-        
-        # Hacer predicción
-        prediction = model.predict(next_month_features)[0]
-        
-        # Calcular período
-        next_month = timezone.now() + timedelta(days=30)
-        periodo = next_month.strftime('%Y-%m')
-        
-        # Guardar predicción en BD
-        prediccion = PrediccionVentas.objects.create(
-            modelo=ml_model,
-            periodo_predicho=periodo,
-            ventas_predichas=prediction,
-            categoria=categoria or 'Total',
-            features_input=next_month_features.to_dict('records')[0]
-        )
+        ml_model, predicciones = self._predecir_grilla(1, [categoria])
+        pred = predicciones[0]
         
         return {
-            'periodo': periodo,
-            'ventas_predichas': round(prediction, 2),
-            'categoria': categoria or 'Total',
-            'prediccion_id': prediccion.id,
+            'periodo': pred['periodo'],
+            'ventas_predichas': pred['ventas_predichas'],
+            'categoria': pred['categoria'],
+            'prediccion_id': pred['prediccion_id'],
             'confianza': self._calculate_confidence(ml_model)
         }
     
@@ -77,39 +71,18 @@ class PredictionService:
         Returns:
             list: Lista de predicciones
         """
-        ml_model, model, feature_columns = self.training_service.load_active_model()
-        
-        predictions = []
-        
-        for i in range(n_months):
-            # Calcular fecha del mes a predecir
-            target_date = timezone.now() + timedelta(days=30 * (i + 1))
-            periodo = target_date.strftime('%Y-%m')
-            
-            # Preparar features
-            features = self._prepare_features_for_date(target_date, categoria, feature_columns)
-            
-            # Hacer predicción
-            prediction = model.predict(features)[0]
-            
-            # Guardar en BD
-            prediccion = PrediccionVentas.objects.create(
-                modelo=ml_model,
-                periodo_predicho=periodo,
-                ventas_predichas=prediction,
-                categoria=categoria or 'Total',
-                features_input=features.to_dict('records')[0]
-            )
-            
-            predictions.append({
-                'periodo': periodo,
-                'ventas_predichas': round(prediction, 2),
-                'categoria': categoria or 'Total',
-                'mes': target_date.month,
-                'año': target_date.year
-            })
-        
-        return predictions
+        _, predicciones = self._predecir_grilla(n_months, [categoria])
+        
+        return [
+            {
+                'periodo': pred['periodo'],
+                'ventas_predichas': pred['ventas_predichas'],
+                'categoria': pred['categoria'],
+                'mes': pred['mes'],
+                'año': pred['año']
+            }
+            for pred in predicciones
+        ]
     
     def predict_by_category(self, n_months=3):
         """
@@ -121,66 +94,173 @@ class PredictionService:
         Returns:
             list: Predicciones por categoría y mes
         """
-        categorias = ['Vestidos', 'Blusas', 'Jeans', 'Jackets']
-        ml_model, model, feature_columns = self.training_service.load_active_model()
-        predictions = []
+        ml_model, predicciones = self._predecir_grilla(n_months, self.CATEGORIAS)
+        return self._por_categoria(ml_model, predicciones)
+    
+    def _por_categoria(self, ml_model, predicciones):
+        confianza = self._calculate_confidence(ml_model)
+        return [
+            {
+                'periodo': pred['periodo'],
+                'ventas_predichas': pred['ventas_predichas'],
+                'categoria': pred['categoria'],
+                'prediccion_id': str(pred['prediccion_id']),
+                'confianza': confianza
+            }
+            for pred in predicciones
+        ]
+    
+    def generar_snapshot(self, n_months=None):
+        """
+        Predecir por categoría con el modelo activo y guardar el resultado
+        como el pronóstico que sirve el dashboard
+        
+        Args:
+            n_months (int): Meses a pronosticar (default: AI_FORECAST_SNAPSHOT_MONTHS)
+        
+        Returns:
+            SnapshotPrediccion: El snapshot del modelo activo
+        """
+        n_months = n_months or settings.AI_FORECAST_SNAPSHOT_MONTHS
+        ml_model, predicciones = self._predecir_grilla(n_months, self.CATEGORIAS)
+        
+        snapshot, _ = SnapshotPrediccion.objects.update_or_create(
+            modelo=ml_model,
+            defaults={
+                'meses': n_months,
+                'predicciones': self._por_categoria(ml_model, predicciones),
+                'generado_en': timezone.now()
+            }
+        )
+        logger.info(f"Snapshot de predicción generado: {ml_model.version} ({n_months} meses)")
+        return snapshot
+    
+    def get_snapshot(self):
+        """
+        Snapshot del modelo activo (solo lectura: no se genera aquí, ver
+        `refresh_forecast_snapshot` y POST /api/ai/dashboard/refresh/)
+        
+        Raises:
+            PronosticoNoDisponibleError: Si el modelo activo no tiene snapshot
+        """
+        snapshot = SnapshotPrediccion.objects.select_related('modelo').filter(
+            modelo__activo=True
+        ).order_by('-modelo__fecha_entrenamiento').first()
         
-        for i in range(n_months):
-            # Calcular fecha del mes a predecir
-            target_date = timezone.now() + timedelta(days=30 * (i + 1))
-            periodo = target_date.strftime('%Y-%m')
+        if snapshot is None:
+            raise PronosticoNoDisponibleError(
+                "El modelo activo no tiene pronóstico; ejecutar refresh_forecast_snapshot"
+            )
+        return snapshot
+    
+    def _predecir_grilla(self, n_months, categorias):
+        """
+        Predecir meses × categorías con una sola llamada al modelo y
+        guardar todas las predicciones con un solo upsert.
+        
+        Args:
+            n_months (int): Meses a predecir desde el próximo
+            categorias (list): Categorías (None = total)
             
-            for categoria in categorias:
-                try:
-                    # Preparar features
-                    features = self._prepare_features_for_date(target_date, categoria, feature_columns)
-                    
-                    # Hacer predicción
-                    prediction = model.predict(features)[0]
-                    
-                    # Verificar si ya existe predicción para este período y categoría
-                    # Si existe, actualizar; si no, crear
-                    prediccion, created = PrediccionVentas.objects.update_or_create(
-                        modelo=ml_model,
-                        periodo_predicho=periodo,
-                        categoria=categoria,
-                        defaults={
-                            'ventas_predichas': prediction,
-                            'features_input': features.to_dict('records')[0]
-                        }
-                    )
-                    
-                    predictions.append({
-                        'periodo': periodo,
-                        'ventas_predichas': round(prediction, 2),
-                        'categoria': categoria,
-                        'prediccion_id': str(prediccion.id),
-                        'confianza': self._calculate_confidence(ml_model)
-                    })
-                except Exception as e:
-                    print(f"⚠️ Error prediciendo {categoria} para {periodo}: {str(e)}")
-        
-        return predictions
+        Returns:
+            tuple: (MLModel, lista de dicts por mes y categoría)
+        """
+        ml_model, model, feature_columns = self.training_service.load_active_model()
+        
+        # Meses calendario desde el próximo: cada (periodo, categoría) es
+        # única, como exige el upsert
+        meses = [siguiente_mes(timezone.localdate())]
+        while len(meses) < n_months:
+            meses.append(siguiente_mes(meses[-1]))
+        grilla = [
+            (mes, categoria)
+            for mes in meses
+            for categoria in categorias
+        ]
+        features = self._build_feature_matrix(grilla, feature_columns)
+        valores = model.predict(features)
+        
+        filas = features.to_dict('records')
+        predicciones = [
+            PrediccionVentas(
+                modelo=ml_model,
+                periodo_predicho=target_date.strftime('%Y-%m'),
+                ventas_predichas=float(valor),
+                categoria=categoria or 'Total',
+                features_input=fila
+            )
+            for (target_date, categoria), valor, fila in zip(grilla, valores, filas)
+        ]
+        PrediccionVentas.objects.bulk_create(
+            predicciones,
+            update_conflicts=True,
+            unique_fields=['modelo', 'periodo_predicho', 'categoria'],
+            update_fields=['ventas_predichas', 'features_input', 'fecha_prediccion', 'updated_at']
+        )
+        
+        # Con conflicto la fila conserva su id original
+        ids = {
+            (periodo, categoria): pk
+            for pk, periodo, categoria in PrediccionVentas.objects.filter(
+                modelo=ml_model,
+                periodo_predicho__in={p.periodo_predicho for p in predicciones},
+                categoria__in={p.categoria for p in predicciones}
+            ).values_list('pk', 'periodo_predicho', 'categoria')
+        }
+        
+        return ml_model, [
+            {
+                'periodo': prediccion.periodo_predicho,
+                'ventas_predichas': round(prediccion.ventas_predichas, 2),
+                'categoria': prediccion.categoria,
+                'prediccion_id': ids[(prediccion.periodo_predicho, prediccion.categoria)],
+                'mes': target_date.month,
+                'año': target_date.year
+            }
+            for (target_date, _), prediccion in zip(grilla, predicciones)
+        ]
     
     def get_sales_forecast_dashboard(self, months_back=34, months_forward=3):
         """
         Genera datos completos para el dashboard de predicción
         
+        Solo lee: las predicciones salen del snapshot del modelo activo y el
+        histórico, top productos y ventas por categoría del cache de
+        analytics (se recalculan cuando cambian los pedidos o productos).
+        Si el snapshot es de un mes anterior o cubre menos meses se sirven
+        los períodos futuros que tenga con `forecast_stale=True`.
+        
         Args:
             months_back (int): Meses históricos a mostrar (default: 34 para evitar Nov-Dic 2025)
             months_forward (int): Meses futuros a predecir (default: 3 meses)
             
         Returns:
             dict: Datos para el dashboard
-        """
-        # 1. Datos históricos
-        historical_data = self._get_historical_data_aggregated(months_back)
         
-        # 2. Predicciones por categoría (para TODOS los meses solicitados)
-        category_predictions = self.predict_by_category(n_months=months_forward)
+        Raises:
+            PronosticoNoDisponibleError: Sin snapshot o sin períodos futuros
+        """
+        # 1. Predicciones por categoría desde el snapshot
+        snapshot = self.get_snapshot()
+        ml_model = snapshot.modelo
+        mes_actual = timezone.localdate().strftime('%Y-%m')
+        periodos = sorted({
+            pred['periodo'] for pred in snapshot.predicciones if pred['periodo'] > mes_actual
+        })[:months_forward]
+        if not periodos:
+            raise PronosticoNoDisponibleError(
+                "El pronóstico no tiene meses futuros; ejecutar refresh_forecast_snapshot"
+            )
+        vencido = not snapshot.cubre(months_forward)
+        if vencido:
+            logger.warning(
+                f"Dashboard servido con un pronóstico vencido ({snapshot.generado_en:%Y-%m}, {snapshot.meses} meses)"
+            )
+        category_predictions = [
+            pred for pred in snapshot.predicciones if pred['periodo'] in periodos
+        ]
         
-        # 3. Calcular predicciones totales por mes sumando las categorías
-        future_predictions = []
+        # 2. Calcular predicciones totales por mes sumando las categorías
         predictions_by_month = {}
         
         for pred in category_predictions:
@@ -196,21 +276,26 @@ class PredictionService:
         
         future_predictions = list(predictions_by_month.values())
         
-        # 4. Top productos
-        top_products = self.data_service.get_top_selling_products(limit=10)
-        
-        # 5. Ventas por categoría histórica
-        category_sales = self.data_service.get_sales_by_category()
-        
-        # 6. Modelo activo
-        ml_model, _, _ = self.training_service.load_active_model()
+        # 3. Histórico, top productos y ventas por categoría (cacheados)
+        ventas = AnalyticsCache.get_or_compute(
+            key=f'{AnalyticsCache.KEY_PREFIX}:ai_dashboard:{months_back}',
+            compute=lambda: {
+                'historical': self._get_historical_data_aggregated(months_back),
+                'top_products': self.data_service.get_top_selling_products(limit=10),
+                'category_sales': self.data_service.get_sales_by_category(),
+            },
+            ttl=settings.ANALYTICS_CACHE_TTL,
+            groups=('pedidos', 'productos')
+        )
         
         return {
-            'historical': historical_data,
+            'historical': ventas['historical'],
             'predictions': future_predictions,
             'predictions_by_category': category_predictions,
-            'top_products': top_products,
-            'category_sales': category_sales,
+            'top_products': ventas['top_products'],
+            'category_sales': ventas['category_sales'],
+            'forecast_generated_at': snapshot.generado_en.isoformat(),
+            'forecast_stale': vencido,
             'model_info': {
                 'version': ml_model.version,
                 'trained_at': ml_model.fecha_entrenamiento.isoformat(),
@@ -231,24 +316,32 @@ class PredictionService:
         """
         Prepara features para una fecha específica
         """
-        # Features base
-        features = {
-            'año': target_date.year,
-            'mes': target_date.month,
-            'mes_sin': np.sin(2 * np.pi * target_date.month / 12),
-            'mes_cos': np.cos(2 * np.pi * target_date.month / 12),
-            'trimestre': (target_date.month - 1) // 3 + 1,
-        }
-        
-        # One-hot encoding para categorías
-        categorias_disponibles = ['Vestidos', 'Blusas', 'Jeans', 'Jackets', 'Sin categoría']
-        for cat in categorias_disponibles:
-            col_name = f'cat_{cat}'
-            if col_name in feature_columns:
-                features[col_name] = 1 if categoria == cat else 0
+        return self._build_feature_matrix([(target_date, categoria)], feature_columns)
+    
+    def _build_feature_matrix(self, grilla, feature_columns):
+        """
+        Matriz de features para varias (fecha, categoría), una fila por par
+        y con las columnas en el orden de entrenamiento
+        """
+        filas = []
+        for target_date, categoria in grilla:
+            # Features base
+            features = {
+                'año': target_date.year,
+                'mes': target_date.month,
+                'mes_sin': np.sin(2 * np.pi * target_date.month / 12),
+                'mes_cos': np.cos(2 * np.pi * target_date.month / 12),
+                'trimestre': (target_date.month - 1) // 3 + 1,
+            }
+            
+            # One-hot encoding para categorías
+            for cat in self.CATEGORIAS_DISPONIBLES:
+                col_name = f'cat_{cat}'
+                if col_name in feature_columns:
+                    features[col_name] = 1 if categoria == cat else 0
+            filas.append(features)
         
-        # Crear DataFrame con las columnas en el orden correcto
-        df = pd.DataFrame([features])
+        df = pd.DataFrame(filas)
         
         # Asegurar que tengamos todas las columnas necesarias
         for col in feature_columns:
@@ -256,13 +349,14 @@ class PredictionService:
                 df[col] = 0
         
         # Reordenar columnas según el orden de entrenamiento
-        df = df[feature_columns]
-        
-        return df
+        return df[feature_columns]
     
     def _get_historical_data_aggregated(self, months_back):
         """
         Obtiene datos históricos agregados por mes
+        
+        Los meses cerrados salen del almacén de features; solo el mes en
+        curso se calcula desde las ventas.
         """
         df = self.data_service.get_historical_sales_data(months_back=months_back)
         
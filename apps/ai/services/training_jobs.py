@@ -0,0 +1,153 @@
+"""
+Entrenamiento del modelo en segundo plano
+
+El endpoint de entrenamiento crea un TrainingJob y encola
+`ejecutar_training_job`; el cliente consulta el progreso con el id del job.
+El entrenamiento corre en un worker de Celery o en el pool de hilos según
+JOBS_BACKEND (ver apps/core/jobs.py).
+
+Solo puede haber un job pendiente o en proceso (índice único parcial). Si
+el worker se reinicia a mitad de un entrenamiento el job queda activo sin
+avanzar: `cerrar_vencidos()` marca como error los que no actualizan su
+progreso (`updated_at`) hace más de AI_TRAINING_JOB_TIMEOUT minutos y se
+ejecuta antes de encolar uno nuevo.
+"""
+
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.ai.models import TrainingJob
+from apps.core.jobs import encolar
+
+logger = logging.getLogger(__name__)
+
+
+class EntrenamientoEnCursoError(Exception):
+    """Ya hay un entrenamiento pendiente o en proceso"""
+
+    def __init__(self, job):
+        self.job = job
+        super().__init__(f"Ya hay un entrenamiento en curso ({job.id})")
+
+
+class TrainingJobService:
+    """
+    Envío de entrenamientos a segundo plano.
+    """
+
+    @staticmethod
+    def enviar(usuario=None, **parametros):
+        """
+        Crear un job de entrenamiento y encolarlo.
+
+        Args:
+            usuario: Usuario que lo solicita
+            **parametros: Argumentos de ModelTrainingService.train_model
+
+        Returns:
+            TrainingJob: El job pendiente
+
+        Raises:
+            EntrenamientoEnCursoError: Si ya hay uno pendiente o en proceso
+        """
+        TrainingJobService.cerrar_vencidos()
+
+        en_curso = TrainingJobService.en_curso()
+        if en_curso is not None:
+            raise EntrenamientoEnCursoError(en_curso)
+
+        try:
+            with transaction.atomic():
+                job = TrainingJob.objects.create(
+                    usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+                    parametros=parametros,
+                    etapa='En cola'
+                )
+                encolar('apps.ai.services.training_jobs.ejecutar_training_job', str(job.id))
+        except IntegrityError:
+            # Otro request creó un job entre la consulta y el INSERT
+            en_curso = TrainingJobService.en_curso()
+            if en_curso is None:
+                raise
+            raise EntrenamientoEnCursoError(en_curso)
+
+        return job
+
+    @staticmethod
+    def en_curso():
+        """Job pendiente o en proceso, si hay uno"""
+        return TrainingJob.objects.filter(estado__in=TrainingJob.ESTADOS_ACTIVOS).first()
+
+    @staticmethod
+    def cerrar_vencidos(minutos=None):
+        """
+        Marcar como error los jobs activos sin progreso hace más de
+        `minutos` minutos (worker caído o reiniciado).
+
+        Args:
+            minutos (int): Tiempo sin progreso (por defecto AI_TRAINING_JOB_TIMEOUT)
+
+        Returns:
+            int: Jobs cerrados
+        """
+        minutos = settings.AI_TRAINING_JOB_TIMEOUT if minutos is None else minutos
+        ahora = timezone.now()
+        cerrados = TrainingJob.objects.filter(
+            estado__in=TrainingJob.ESTADOS_ACTIVOS,
+            updated_at__lt=ahora - timedelta(minutes=minutos)
+        ).update(
+            estado='error',
+            error=f'Sin progreso durante más de {minutos} minutos (worker detenido)',
+            finalizado_en=ahora,
+            updated_at=ahora
+        )
+        if cerrados:
+            logger.warning(f"Jobs de entrenamiento vencidos marcados como error: {cerrados}")
+        return cerrados
+
+
+def ejecutar_training_job(job_id):
+    """
+    Ejecutar un job de entrenamiento (en el worker).
+    """
+    from apps.ai.services.model_training import ModelTrainingService
+
+    job = TrainingJob.objects.get(pk=job_id)
+    if job.estado != 'pendiente':
+        logger.warning(f"Job de entrenamiento {job_id} ignorado: estado {job.estado}")
+        return
+
+    job.estado = 'en_proceso'
+    job.iniciado_en = timezone.now()
+    job.save(update_fields=['estado', 'iniciado_en', 'updated_at'])
+
+    try:
+        result = ModelTrainingService().train_model(
+            on_progress=job.actualizar_progreso,
+            **job.parametros
+        )
+    except Exception as e:
+        logger.error(f"Error en el job de entrenamiento {job_id}: {e}", exc_info=True)
+        job.estado = 'error'
+        job.error = str(e)
+        job.finalizado_en = timezone.now()
+        job.save(update_fields=['estado', 'error', 'finalizado_en', 'updated_at'])
+        return
+
+    job.estado = 'completado'
+    job.etapa = 'Completado'
+    job.progreso = 100
+    job.modelo_id = result['model_id']
+    job.metricas = {
+        'train': {metrica: float(valor) for metrica, valor in result['metrics']['train'].items()},
+        'test': {metrica: float(valor) for metrica, valor in result['metrics']['test'].items()},
+        'num_samples': result['num_samples'],
+    }
+    job.finalizado_en = timezone.now()
+    job.save(update_fields=[
+        'estado', 'etapa', 'progreso', 'modelo', 'metricas', 'finalizado_en', 'updated_at'
+    ])
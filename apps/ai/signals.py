@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import MLModel
+from .services.model_registry import ModelRegistry
+
+
+@receiver(post_save, sender=MLModel)
+def modelo_guardado(sender, instance, **kwargs):
+    """
+    Liberar el estimador en memoria si el modelo dejó de estar activo (el
+    pronóstico del dashboard se regenera en `MLModel.activar()`)
+    """
+    if not instance.activo:
+        ModelRegistry.invalidar(instance.pk)
+
+
+@receiver(post_delete, sender=MLModel)
+def modelo_eliminado(sender, instance, **kwargs):
+    """Signal cuando se elimina un modelo"""
+    ModelRegistry.invalidar(instance.pk)
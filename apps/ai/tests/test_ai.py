@@ -2,7 +2,7 @@
 Tests para la app de IA y predicción de ventas
 """
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from apps.ai.services.data_preparation import DataPreparationService
 from apps.ai.services.model_training import ModelTrainingService
@@ -42,6 +42,266 @@ class DataPreparationServiceTest(TestCase):
         self.assertEqual(len(X), len(y))
 
 
+class SalesFromLinesTest(TestCase):
+    """Tests para la extracción de ventas desde los detalles de pedido"""
+    
+    def setUp(self):
+        from decimal import Decimal
+        from apps.accounts.models import Role
+        from apps.customers.models import Direccion
+        from apps.orders.models import Pedido, DetallePedido
+        from apps.products.models import Prenda, Marca, Categoria, Talla
+        
+        self.service = DataPreparationService()
+        cliente = User.objects.create_user(
+            email='lineas@cliente.com', password='Test2024!', nombre='Test', apellido='Lineas',
+            rol=Role.objects.create(nombre='Cliente', es_rol_sistema=True)
+        )
+        direccion = Direccion.objects.create(
+            usuario=cliente, nombre_completo='Test', telefono='+591 70000000',
+            direccion_linea1='Calle Test 123', ciudad='Cochabamba',
+            departamento='Cochabamba', pais='Bolivia'
+        )
+        marca = Marca.objects.create(nombre='Zara')
+        talla = Talla.objects.create(nombre='M', orden=1)
+        self.vestido = Prenda.objects.create(
+            nombre='Vestido', descripcion='Test', precio=Decimal('100.00'), marca=marca, color='Negro'
+        )
+        # La categoría principal es la primera por nombre
+        self.vestido.categorias.add(
+            Categoria.objects.create(nombre='Vestidos'), Categoria.objects.create(nombre='Fiesta')
+        )
+        self.jean = Prenda.objects.create(
+            nombre='Jean', descripcion='Test', precio=Decimal('50.00'), marca=marca, color='Azul'
+        )
+        
+        for estado in ['entregado', 'cancelado']:
+            pedido = Pedido.objects.create(
+                usuario=cliente, direccion_envio=direccion,
+                subtotal=Decimal('250.00'), total=Decimal('250.00'), estado=estado
+            )
+            for prenda, cantidad in [(self.vestido, 2), (self.jean, 1)]:
+                DetallePedido.objects.create(
+                    pedido=pedido, prenda=prenda, talla=talla,
+                    cantidad=cantidad, precio_unitario=prenda.precio
+                )
+        self.pedido = pedido
+    
+    def test_lineas_a_dataframe(self):
+        """Verifica columnas, categoría principal y features de fecha"""
+        from datetime import timedelta
+        from django.utils import timezone
+        
+        df = self.service._get_sales_from_lines(timezone.now() - timedelta(days=30))
+        
+        self.assertEqual(len(df), 2)  # Solo el pedido entregado
+        por_producto = df.set_index('producto_nombre')
+        self.assertEqual(por_producto.loc['Vestido', 'categoria'], 'Fiesta')
+        self.assertEqual(por_producto.loc['Jean', 'categoria'], 'Sin categoría')
+        self.assertEqual(por_producto.loc['Vestido', 'subtotal'], 200.0)
+        self.assertEqual(por_producto.loc['Vestido', 'marca'], 'Zara')
+        
+        local = timezone.localtime(self.pedido.created_at)
+        fila = por_producto.loc['Jean']
+        self.assertEqual(
+            (fila['año'], fila['mes'], fila['dia_semana'], fila['trimestre']),
+            (local.year, local.month, local.weekday(), (local.month - 1) // 3 + 1)
+        )
+    
+    def test_sin_lineas(self):
+        """Verifica que un período sin ventas devuelve un DataFrame vacío"""
+        from datetime import timedelta
+        from django.utils import timezone
+        
+        df = self.service._get_sales_from_lines(timezone.now() + timedelta(days=1))
+        
+        self.assertTrue(df.empty)
+
+    
+    def test_stream_por_lotes(self):
+        """Verifica que la agregación por lotes coincide con agregar las líneas"""
+        from datetime import timedelta
+        from django.utils import timezone
+        
+        fecha_inicio = timezone.now() - timedelta(days=30)
+        lineas = self.service._get_sales_from_lines(fecha_inicio)
+        esperado = lineas.groupby(['año', 'mes', 'categoria']).agg(
+            cantidad=('cantidad', 'sum'),
+            subtotal=('subtotal', 'sum'),
+            precio_unitario=('precio_unitario', 'mean'),
+        ).reset_index()
+        
+        for chunk_size in (1, 1000):
+            df = self.service._stream_sales_from_lines(fecha_inicio, chunk_size=chunk_size)
+            df = df.sort_values('categoria').reset_index(drop=True)
+            self.assertEqual(df['categoria'].tolist(), esperado['categoria'].tolist())
+            self.assertEqual(df['cantidad'].tolist(), esperado['cantidad'].tolist())
+            self.assertEqual(df['subtotal'].tolist(), esperado['subtotal'].tolist())
+            self.assertEqual(df['precio_unitario'].tolist(), esperado['precio_unitario'].tolist())
+            self.assertEqual(df['num_lineas'].tolist(), [1, 1])
+
+
+class FeatureStoreTest(TestCase):
+    """Tests para el almacén de features mensuales"""
+    
+    def setUp(self):
+        from datetime import datetime, time
+        from decimal import Decimal
+        from django.utils import timezone
+        from apps.accounts.models import Role
+        from apps.customers.models import Direccion
+        from apps.orders.models import Pedido, DetallePedido
+        from apps.products.models import Prenda, Marca, Categoria, Talla
+        from apps.ai.services.feature_store import mes_anterior
+        
+        cliente = User.objects.create_user(
+            email='features@cliente.com', password='Test2024!', nombre='Test', apellido='Features',
+            rol=Role.objects.create(nombre='Cliente', es_rol_sistema=True)
+        )
+        direccion = Direccion.objects.create(
+            usuario=cliente, nombre_completo='Test', telefono='+591 70000000',
+            direccion_linea1='Calle Test 123', ciudad='Cochabamba',
+            departamento='Cochabamba', pais='Bolivia'
+        )
+        talla = Talla.objects.create(nombre='M', orden=1)
+        vestido = Prenda.objects.create(
+            nombre='Vestido', descripcion='Test', precio=Decimal('100.00'),
+            marca=Marca.objects.create(nombre='Zara'), color='Negro'
+        )
+        vestido.categorias.add(Categoria.objects.create(nombre='Vestidos'))
+        
+        # Un pedido por mes: hace dos meses, el mes pasado y el mes en curso
+        self.mes_actual = timezone.localdate().replace(day=1)
+        self.mes_pasado = mes_anterior(self.mes_actual)
+        self.hace_dos_meses = mes_anterior(self.mes_pasado)
+        for mes, cantidad in [(self.hace_dos_meses, 1), (self.mes_pasado, 2), (self.mes_actual, 3)]:
+            pedido = Pedido.objects.create(
+                usuario=cliente, direccion_envio=direccion,
+                subtotal=Decimal('100.00') * cantidad, total=Decimal('100.00') * cantidad, estado='entregado'
+            )
+            DetallePedido.objects.create(
+                pedido=pedido, prenda=vestido, talla=talla,
+                cantidad=cantidad, precio_unitario=vestido.precio
+            )
+            Pedido.objects.filter(pk=pedido.pk).update(
+                created_at=timezone.make_aware(datetime.combine(mes.replace(day=2), time(12)))
+            )
+    
+    def _filas(self, version):
+        return {
+            (fila.año, fila.mes, fila.categoria): fila.cantidad_vendida
+            for fila in version.filas.all()
+        }
+    
+    def test_actualizar_crea_version_con_meses_cerrados(self):
+        """Verifica que la primera actualización guarde solo meses cerrados"""
+        from apps.ai.services.feature_store import FeatureStoreService
+        
+        version, meses = FeatureStoreService.actualizar(months_back=3)
+        
+        self.assertEqual(version.numero, 1)
+        self.assertTrue(version.activa)
+        self.assertEqual(version.fuente, 'stream')
+        self.assertEqual(version.ultimo_mes, self.mes_pasado)
+        self.assertEqual(self._filas(version), {
+            (self.hace_dos_meses.year, self.hace_dos_meses.month, 'Vestidos'): 1,
+            (self.mes_pasado.year, self.mes_pasado.month, 'Vestidos'): 2,
+        })
+        fila = version.filas.get(mes=self.mes_pasado.month)
+        self.assertEqual(float(fila.total_ventas), 200.0)
+        self.assertEqual(fila.precio_promedio, 100.0)
+        self.assertEqual(fila.num_transacciones, 1)
+    
+    def test_actualizar_es_incremental(self):
+        """Verifica que solo se calculen los meses que faltan"""
+        from apps.ai.services.feature_store import FeatureStoreService
+        
+        version, _ = FeatureStoreService.actualizar(months_back=3)
+        self.assertEqual(FeatureStoreService.actualizar(months_back=3), (version, 0))
+        
+        # Simular que el mes pasado aún no estaba cerrado en la última actualización
+        anterior = version.filas.get(mes=self.hace_dos_meses.month)
+        version.filas.filter(mes=self.mes_pasado.month).delete()
+        version.ultimo_mes = self.hace_dos_meses
+        version.save()
+        
+        # 7 + 2 para comprobar si el agregado diario cubre el mes
+        with self.assertNumQueries(9):
+            version, meses = FeatureStoreService.actualizar(months_back=3)
+        
+        self.assertEqual(meses, 1)
+        self.assertEqual(version.ultimo_mes, self.mes_pasado)
+        self.assertEqual(version.filas.get(mes=self.mes_pasado.month).cantidad_vendida, 2)
+        self.assertEqual(version.filas.get(mes=self.hace_dos_meses.month).pk, anterior.pk)
+    
+    def test_crear_version_conserva_la_anterior(self):
+        """Verifica que una versión nueva se active sin modificar la anterior"""
+        from apps.ai.models import VersionFeatures
+        from apps.ai.services.feature_store import FeatureStoreService
+        from apps.reports.services.sales_rollup import SalesRollupService
+        
+        v1, _ = FeatureStoreService.actualizar(months_back=3)
+        SalesRollupService.rebuild()
+        v2 = FeatureStoreService.crear_version(months_back=3, notas='Desde el agregado')
+        
+        v1.refresh_from_db()
+        self.assertFalse(v1.activa)
+        self.assertTrue(v2.activa)
+        self.assertEqual(v2.numero, 2)
+        self.assertEqual(v2.fuente, 'rollup')
+        self.assertEqual(FeatureStoreService.get_version_activa(), v2)
+        self.assertEqual(VersionFeatures.objects.count(), 2)
+        self.assertEqual(self._filas(v1), self._filas(v2))
+    
+    def test_lectura_no_escribe_en_el_almacen(self):
+        """Verifica que leer el histórico sin actualizar calcule al vuelo sin crear versiones"""
+        from apps.ai.models import VersionFeatures
+        
+        service = DataPreparationService()
+        service.min_records_for_training = 0
+        
+        df = service.get_historical_sales_data(months_back=3)
+        
+        self.assertEqual(df['cantidad'].tolist(), [1, 2, 3])
+        self.assertFalse(VersionFeatures.objects.exists())
+    
+    def test_agregado_parcial_no_se_congela(self):
+        """Verifica que un agregado diario incompleto no se use para guardar meses"""
+        from apps.ai.services.feature_store import FeatureStoreService
+        from apps.reports.services.sales_rollup import SalesRollupService
+        
+        # Solo el mes en curso está en el agregado
+        SalesRollupService.rebuild(fecha_inicio=self.mes_actual)
+        
+        version, _ = FeatureStoreService.actualizar(months_back=3)
+        
+        self.assertEqual(version.fuente, 'stream')
+        self.assertEqual(self._filas(version), {
+            (self.hace_dos_meses.year, self.hace_dos_meses.month, 'Vestidos'): 1,
+            (self.mes_pasado.year, self.mes_pasado.month, 'Vestidos'): 2,
+        })
+    
+    def test_historico_desde_features(self):
+        """Verifica la lectura con y sin el mes en curso"""
+        service = DataPreparationService()
+        service.min_records_for_training = 0
+        
+        cerrados = service.get_historical_sales_data(
+            months_back=3, incluir_mes_actual=False, actualizar_features=True
+        )
+        self.assertEqual(cerrados['cantidad'].tolist(), [1, 2])
+        self.assertEqual(cerrados.attrs['version_features'], 1)
+        self.assertEqual(cerrados.attrs['features_hasta'], self.mes_pasado)
+        
+        completo = service.get_historical_sales_data(months_back=3)
+        self.assertEqual(completo['cantidad'].tolist(), [1, 2, 3])
+        self.assertEqual(completo['mes'].tolist()[-1], self.mes_actual.month)
+        
+        X, y, _ = service.prepare_features(cerrados, months_back=3, fecha_fin=self.mes_pasado)
+        self.assertEqual(X[['año', 'mes']].drop_duplicates().values.tolist()[-1],
+                         [self.mes_pasado.year, self.mes_pasado.month])
+
+
 class ModelTrainingServiceTest(TestCase):
     """Tests para el servicio de entrenamiento"""
     
@@ -79,6 +339,119 @@ class ModelTrainingServiceTest(TestCase):
         self.assertTrue(ml_model.activo)
 
 
+class ModelSearchTest(TestCase):
+    """Tests para la validación temporal y la búsqueda de hiperparámetros"""
+    
+    def setUp(self):
+        service = DataPreparationService()
+        df = service._generate_synthetic_data(num_months=12, records_per_month=30)
+        self.X, self.y, _ = service.prepare_features(df, months_back=12)
+    
+    def test_splits_sin_fuga_del_futuro(self):
+        """Verifica que cada fold evalúe meses posteriores a los de train, sin partir meses"""
+        from apps.ai.services.model_search import holdout_temporal, periodos, splits_temporales
+        
+        meses = periodos(self.X)
+        folds = splits_temporales(self.X, n_splits=4)
+        
+        self.assertEqual(len(folds), 4)
+        for train, test in folds:
+            self.assertLess(meses[train].max(), meses[test].min())
+            self.assertTrue(set(meses[train]).isdisjoint(meses[test]))
+        
+        train, test = holdout_temporal(self.X, 0.25)
+        self.assertLess(meses[train].max(), meses[test].min())
+        self.assertEqual(len(train) + len(test), len(self.X))
+    
+    def test_historial_insuficiente(self):
+        """Verifica que con pocos meses se avise antes de entrenar en lugar de fallar en TimeSeriesSplit"""
+        from apps.ai.services.model_search import (
+            HistorialInsuficienteError, periodos, splits_temporales, validar_historial
+        )
+        
+        meses = sorted(set(periodos(self.X)))
+        cuatro = periodos(self.X) <= meses[3]
+        tres = periodos(self.X) <= meses[2]
+        
+        validar_historial(self.X[cuatro], self.y[cuatro], 0.25)
+        with self.assertRaises(HistorialInsuficienteError):
+            validar_historial(self.X[tres], self.y[tres], 0.25)
+        
+        # Los meses de la grilla sin ventas no cuentan
+        sin_ventas = self.y.copy()
+        sin_ventas[periodos(self.X) > meses[1]] = 0
+        with self.assertRaises(HistorialInsuficienteError):
+            validar_historial(self.X, sin_ventas, 0.25)
+        with self.assertRaises(HistorialInsuficienteError):
+            splits_temporales(self.X[periodos(self.X) <= meses[1]])
+    
+    def test_busqueda_en_paralelo(self):
+        """Verifica que el pool de procesos dé los mismos resultados que la ejecución secuencial"""
+        from apps.ai.services.model_search import ModelSearchService
+        
+        grilla = {'n_estimators': [5, 10], 'max_depth': [2, 4]}
+        secuencial = ModelSearchService(cpu_budget=1).buscar(self.X, self.y, grilla, n_splits=3)
+        paralelo = ModelSearchService(cpu_budget=2).buscar(self.X, self.y, grilla, n_splits=3)
+        
+        self.assertEqual(len(secuencial['resultados']), 4)
+        self.assertEqual(secuencial['n_splits'], 3)
+        self.assertEqual(secuencial['resultados'], paralelo['resultados'])
+        self.assertEqual(
+            secuencial['mejor'],
+            {'n_estimators': secuencial['resultados'][0]['n_estimators'],
+             'max_depth': secuencial['resultados'][0]['max_depth']}
+        )
+        maes = [resultado['mae'] for resultado in secuencial['resultados']]
+        self.assertEqual(maes, sorted(maes))
+    
+    def test_entrenamiento_con_busqueda(self):
+        """Verifica que el modelo final use la mejor configuración"""
+        result = ModelTrainingService().train_model(
+            param_grid={'n_estimators': [5, 10], 'max_depth': [3]}, cv_splits=3
+        )
+        
+        ml_model = MLModel.objects.get(id=result['model_id'])
+        mejor = ml_model.hiperparametros['busqueda'][0]
+        self.assertEqual(ml_model.hiperparametros['n_estimators'], mejor['n_estimators'])
+        self.assertEqual(ml_model.hiperparametros['validacion']['tipo'], 'TimeSeriesSplit')
+        self.assertEqual(ml_model.hiperparametros['validacion']['cv_mae'], mejor['mae'])
+
+
+class ModelRegistryTest(TestCase):
+    """Tests para el registro en memoria del modelo activo"""
+    
+    def setUp(self):
+        from apps.ai.services.model_registry import ModelRegistry
+        
+        ModelRegistry.invalidar()
+        self.service = ModelTrainingService()
+        self.primero = MLModel.objects.get(id=self.service.train_model(n_estimators=5, max_depth=3)['model_id'])
+        self.segundo = MLModel.objects.get(id=self.service.train_model(n_estimators=5, max_depth=3)['model_id'])
+    
+    def test_carga_una_vez_por_proceso(self):
+        """Verifica que el archivo del modelo se lea una sola vez"""
+        from unittest import mock
+        from apps.ai.services import model_registry
+        
+        with mock.patch.object(model_registry.joblib, 'load', wraps=model_registry.joblib.load) as load:
+            _, modelo_a, _ = self.service.load_active_model()
+            _, modelo_b, _ = ModelTrainingService().load_active_model()
+        
+        self.assertEqual(load.call_count, 1)
+        self.assertIs(modelo_a, modelo_b)
+    
+    def test_activar_cambia_el_modelo_cargado(self):
+        """Verifica que activar otro modelo invalide el de memoria"""
+        ml_model, estimador, _ = self.service.load_active_model()
+        self.assertEqual(ml_model, self.segundo)
+        
+        self.primero.activar()
+        ml_model, otro_estimador, _ = self.service.load_active_model()
+        
+        self.assertEqual(ml_model, self.primero)
+        self.assertIsNot(otro_estimador, estimador)
+
+
 class PredictionServiceTest(TestCase):
     """Tests para el servicio de predicción"""
     
@@ -114,6 +487,289 @@ class PredictionServiceTest(TestCase):
         
         self.assertIsNotNone(predictions)
         self.assertGreater(len(predictions), 0)
+    
+    def test_predict_by_category_en_lote(self):
+        """Verifica una sola llamada al modelo y un solo upsert para toda la grilla"""
+        from unittest import mock
+        
+        _, model, _ = self.service.training_service.load_active_model()
+        with mock.patch.object(model, 'predict', wraps=model.predict) as predict:
+            with self.assertNumQueries(3):  # modelo activo, upsert, ids
+                predictions = self.service.predict_by_category(n_months=3)
+        
+        self.assertEqual(predict.call_count, 1)
+        self.assertEqual(len(predictions), 12)
+        self.assertEqual(PrediccionVentas.objects.count(), 12)
+        
+        # Repetir actualiza las mismas filas
+        repetidas = self.service.predict_by_category(n_months=3)
+        self.assertEqual(PrediccionVentas.objects.count(), 12)
+        self.assertEqual(
+            [p['prediccion_id'] for p in repetidas],
+            [p['prediccion_id'] for p in predictions]
+        )
+        prediccion = PrediccionVentas.objects.get(id=predictions[0]['prediccion_id'])
+        self.assertEqual(prediccion.categoria, predictions[0]['categoria'])
+        self.assertAlmostEqual(prediccion.ventas_predichas, predictions[0]['ventas_predichas'], places=2)
+
+
+    def test_grilla_por_meses_calendario(self):
+        """Verifica que desde fin de mes no se salten ni repitan meses"""
+        from datetime import datetime, timezone as dt_timezone
+        from unittest import mock
+        
+        fin_de_enero = datetime(2026, 1, 31, 12, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=fin_de_enero):
+            predictions = self.service.predict_by_category(n_months=6)
+        
+        self.assertEqual(
+            sorted({p['periodo'] for p in predictions}),
+            ['2026-02', '2026-03', '2026-04', '2026-05', '2026-06', '2026-07']
+        )
+        self.assertEqual(PrediccionVentas.objects.count(), 24)
+
+
+class ForecastDashboardTest(TestCase):
+    """Tests para el dashboard servido desde el snapshot de predicción"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        
+        cache.clear()
+        self.service = PredictionService()
+        ModelTrainingService().train_model(n_estimators=5, max_depth=3)
+    
+    def test_dashboard_no_escribe(self):
+        """Verifica que las lecturas del dashboard no escriban en la BD"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        snapshot = self.service.generar_snapshot(n_months=6)
+        self.assertEqual(len(snapshot.predicciones), 24)
+        predicciones = PrediccionVentas.objects.count()
+        
+        self.service.get_sales_forecast_dashboard(months_back=6, months_forward=3)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.service.get_sales_forecast_dashboard(months_back=6, months_forward=3)
+        
+        escrituras = [
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')
+        ]
+        self.assertEqual(escrituras, [])
+        self.assertEqual(len(queries.captured_queries), 1)  # snapshot + modelo activo
+        self.assertEqual(PrediccionVentas.objects.count(), predicciones)
+        self.assertEqual(len(data['predictions']), 3)
+        self.assertEqual(len(data['predictions_by_category']), 12)
+        self.assertFalse(data['forecast_stale'])
+    
+    def test_sin_snapshot_no_se_genera(self):
+        """Verifica que sin snapshot el dashboard falle sin escribir"""
+        from apps.ai.models import SnapshotPrediccion
+        from apps.ai.services.prediction import PronosticoNoDisponibleError
+        
+        predicciones = PrediccionVentas.objects.count()
+        
+        with self.assertRaises(PronosticoNoDisponibleError):
+            self.service.get_sales_forecast_dashboard(months_back=6, months_forward=3)
+        
+        self.assertFalse(SnapshotPrediccion.objects.exists())
+        self.assertEqual(PrediccionVentas.objects.count(), predicciones)
+    
+    def test_snapshot_vencido_se_sirve_marcado(self):
+        """Verifica que un snapshot del mes anterior se sirva sin regenerarlo"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.ai.models import SnapshotPrediccion
+        
+        snapshot = self.service.generar_snapshot(n_months=6)
+        generado = snapshot.generado_en - timedelta(days=40)
+        SnapshotPrediccion.objects.filter(pk=snapshot.pk).update(generado_en=generado)
+        
+        data = self.service.get_sales_forecast_dashboard(months_back=6, months_forward=3)
+        
+        self.assertTrue(data['forecast_stale'])
+        self.assertTrue(all(
+            pred['periodo'] > timezone.localdate().strftime('%Y-%m') for pred in data['predictions']
+        ))
+        self.assertEqual(SnapshotPrediccion.objects.get().generado_en, generado)
+    
+    def test_dashboard_sin_snapshot_responde_404(self):
+        """Verifica la respuesta del endpoint cuando falta el pronóstico"""
+        from rest_framework.test import APIClient
+        from apps.accounts.models import Role
+        
+        usuario = User.objects.create_user(
+            email='dashboard@test.com', password='Test2024!', nombre='Test', apellido='Dashboard',
+            rol=Role.objects.create(nombre='Administrador', es_rol_sistema=True)
+        )
+        client = APIClient()
+        client.force_authenticate(usuario)
+        
+        response = client.get('/api/ai/dashboard/')
+        
+        self.assertEqual(response.status_code, 404)
+    
+    def test_refresh_endpoint(self):
+        """Verifica el refresco explícito del pronóstico"""
+        from rest_framework.test import APIClient
+        from apps.accounts.models import Role
+        from apps.ai.models import SnapshotPrediccion
+        
+        usuario = User.objects.create_user(
+            email='refresh@test.com', password='Test2024!', nombre='Test', apellido='Refresh',
+            rol=Role.objects.create(nombre='Administrador', es_rol_sistema=True)
+        )
+        client = APIClient()
+        client.force_authenticate(usuario)
+        
+        response = client.post('/api/ai/dashboard/refresh/', {'n_months': 2}, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['meses'], 2)
+        self.assertEqual(SnapshotPrediccion.objects.get().meses, 2)
+
+
+@override_settings(JOBS_BACKEND='sync')
+class TrainingJobTest(TestCase):
+    """Tests para el entrenamiento en segundo plano"""
+    
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from apps.accounts.models import Role
+        
+        self.usuario = User.objects.create_user(
+            email='jobs@test.com', password='Test2024!', nombre='Test', apellido='Jobs',
+            rol=Role.objects.create(nombre='Admin', es_rol_sistema=True)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+    
+    def test_entrenamiento_encolado(self):
+        """Verifica que el endpoint responda con el job y el worker lo complete"""
+        from apps.ai.models import TrainingJob
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/ai/train-model/', {'n_estimators': 10, 'max_depth': 3}, format='json'
+            )
+        
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['job']['estado'], 'pendiente')
+        
+        job = TrainingJob.objects.get(pk=response.data['job']['id'])
+        self.assertEqual(job.estado, 'completado')
+        self.assertEqual(job.progreso, 100)
+        self.assertEqual(job.usuario, self.usuario)
+        self.assertEqual(job.modelo, MLModel.objects.get(activo=True))
+        self.assertEqual(job.modelo.hiperparametros['n_estimators'], 10)
+        self.assertIn('r2', job.metricas['test'])
+        
+        estado = self.client.get(f'/api/ai/training-jobs/{job.id}/')
+        self.assertEqual(estado.status_code, 200)
+        self.assertEqual(estado.data['estado'], 'completado')
+        self.assertEqual(estado.data['modelo_detalle']['id'], str(job.modelo.id))
+    
+    def test_un_entrenamiento_a_la_vez(self):
+        """Verifica que no se encole otro entrenamiento con uno en curso"""
+        from apps.ai.models import TrainingJob
+        
+        en_curso = TrainingJob.objects.create(estado='en_proceso')
+        
+        response = self.client.post('/api/ai/train-model/', {}, format='json')
+        
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['job']['id'], str(en_curso.id))
+        self.assertEqual(TrainingJob.objects.count(), 1)
+    
+    def test_job_vencido_no_bloquea(self):
+        """Verifica que un job sin progreso (worker reiniciado) se cierre y no bloquee"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.ai.models import TrainingJob
+        
+        colgado = TrainingJob.objects.create(estado='en_proceso')
+        TrainingJob.objects.filter(pk=colgado.pk).update(updated_at=timezone.now() - timedelta(hours=3))
+        
+        response = self.client.post('/api/ai/train-model/', {}, format='json')
+        
+        self.assertEqual(response.status_code, 202)
+        colgado.refresh_from_db()
+        self.assertEqual(colgado.estado, 'error')
+        self.assertIsNotNone(colgado.finalizado_en)
+    
+    def test_un_solo_job_activo_en_bd(self):
+        """Verifica que el índice parcial impida dos jobs activos (requests concurrentes)"""
+        from unittest import mock
+        from apps.ai.models import TrainingJob
+        from apps.ai.services.training_jobs import EntrenamientoEnCursoError, TrainingJobService
+        
+        en_curso = TrainingJob.objects.create(estado='pendiente')
+        
+        # Simula que la consulta previa no vio el job del otro request
+        with mock.patch.object(TrainingJobService, 'en_curso', side_effect=[None, en_curso]):
+            with self.assertRaises(EntrenamientoEnCursoError) as error:
+                TrainingJobService.enviar()
+        
+        self.assertEqual(error.exception.job, en_curso)
+        self.assertEqual(TrainingJob.objects.count(), 1)
+    
+    def test_job_id_invalido(self):
+        """Verifica que un id que no es UUID responda 404"""
+        response = self.client.get('/api/ai/training-jobs/abc/')
+        self.assertEqual(response.status_code, 404)
+    
+    def test_solo_empleados_entrenan(self):
+        """Verifica que un cliente no pueda encolar entrenamientos ni consultar jobs"""
+        from rest_framework.test import APIClient
+        from apps.accounts.models import Role
+        from apps.ai.models import TrainingJob
+        
+        cliente = User.objects.create_user(
+            email='cliente-jobs@test.com', password='Test2024!', nombre='Test', apellido='Cliente',
+            rol=Role.objects.create(nombre='Cliente', es_rol_sistema=True)
+        )
+        job = TrainingJob.objects.create(usuario=self.usuario)
+        client = APIClient()
+        client.force_authenticate(cliente)
+        
+        self.assertEqual(client.post('/api/ai/train-model/', {}, format='json').status_code, 403)
+        self.assertEqual(client.get(f'/api/ai/training-jobs/{job.id}/').status_code, 403)
+        self.assertFalse(TrainingJob.objects.exclude(pk=job.pk).exists())
+    
+    def test_job_de_otro_usuario(self):
+        """Verifica que un empleado no vea los jobs de otro usuario (el staff sí)"""
+        from rest_framework.test import APIClient
+        from apps.accounts.models import Role
+        from apps.ai.models import TrainingJob
+        
+        otro = User.objects.create_user(
+            email='otro-jobs@test.com', password='Test2024!', nombre='Test', apellido='Otro',
+            rol=Role.objects.create(nombre='Empleado', es_rol_sistema=True)
+        )
+        job = TrainingJob.objects.create(usuario=self.usuario)
+        client = APIClient()
+        client.force_authenticate(otro)
+        
+        self.assertEqual(client.get(f'/api/ai/training-jobs/{job.id}/').status_code, 404)
+        
+        otro.is_staff = True
+        otro.save()
+        self.assertEqual(client.get(f'/api/ai/training-jobs/{job.id}/').status_code, 200)
+    
+    def test_error_de_entrenamiento(self):
+        """Verifica que un fallo quede registrado en el job"""
+        from unittest import mock
+        from apps.ai.models import TrainingJob
+        
+        with mock.patch.object(ModelTrainingService, 'train_model', side_effect=ValueError('sin datos')):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/ai/train-model/', {}, format='json')
+        
+        job = TrainingJob.objects.get(pk=response.data['job']['id'])
+        self.assertEqual(job.estado, 'error')
+        self.assertEqual(job.error, 'sin datos')
+        self.assertIsNotNone(job.finalizado_en)
 
 
 class MLModelTest(TestCase):
@@ -162,6 +818,23 @@ class MLModelTest(TestCase):
         model1.refresh_from_db()
         self.assertFalse(model1.activo)
         self.assertTrue(model2.activo)
+    
+    def test_entrenamiento_genera_un_solo_snapshot(self):
+        """Verifica que entrenar (crear y activar) regenere el pronóstico una sola vez"""
+        from unittest import mock
+        from apps.ai.services.prediction import PredictionService
+        
+        with mock.patch.object(PredictionService, 'generar_snapshot') as generar:
+            with self.captureOnCommitCallbacks(execute=True):
+                model_id = ModelTrainingService().train_model(n_estimators=5, max_depth=3)['model_id']
+            self.assertEqual(generar.call_count, 1)
+            
+            # Guardar el modelo activo por otro motivo no lo regenera
+            with self.captureOnCommitCallbacks(execute=True):
+                modelo = MLModel.objects.get(pk=model_id)
+                modelo.notas = 'Revisado'
+                modelo.save()
+            self.assertEqual(generar.call_count, 1)
 
 
 class PrediccionVentasTest(TestCase):
@@ -4,17 +4,24 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 
-from .models import MLModel, PrediccionVentas
+from apps.core.constants import UUID_PATTERN
+from apps.core.permissions import IsEmpleadoOrAdmin
+
+from .models import MLModel, PrediccionVentas, TrainingJob
 from .serializers import (
     MLModelSerializer,
     MLModelListSerializer,
     PrediccionVentasSerializer,
     PredictRequestSerializer,
     TrainModelSerializer,
-    DashboardResponseSerializer
+    DashboardResponseSerializer,
+    RefreshForecastSerializer,
+    TrainingJobSerializer
 )
+from .services.model_search import GRILLA_DEFAULT
 from .services.model_training import ModelTrainingService
-from .services.prediction import PredictionService
+from .services.prediction import PredictionService, PronosticoNoDisponibleError
+from .services.training_jobs import EntrenamientoEnCursoError, TrainingJobService
 
 
 class AIViewSet(viewsets.ViewSet):
@@ -31,7 +38,9 @@ class AIViewSet(viewsets.ViewSet):
     @extend_schema(
         summary="Dashboard de predicción de ventas",
         description="""
-        Retorna datos completos para el dashboard de predicción:
+        Retorna datos completos para el dashboard de predicción (solo lectura;
+        las predicciones salen del pronóstico precalculado del modelo activo,
+        404 si no existe; `forecast_stale` indica que es de un mes anterior):
         - Ventas históricas (últimos 6 meses)
         - Predicciones futuras (próximos 3 meses)
         - Predicciones por categoría
@@ -63,12 +72,54 @@ class AIViewSet(viewsets.ViewSet):
             
             return Response(data, status=status.HTTP_200_OK)
         
+        except PronosticoNoDisponibleError as e:
+            return Response({
+                'error': 'Pronóstico no disponible',
+                'detail': str(e)
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         except Exception as e:
             return Response({
                 'error': 'Error al generar dashboard',
                 'detail': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    @extend_schema(
+        summary="Regenerar pronóstico del dashboard",
+        description="""
+        Vuelve a predecir las ventas por categoría con el modelo activo y
+        guarda el resultado que sirve el dashboard.
+        
+        Parámetros opcionales:
+        - n_months: Meses a pronosticar (default: AI_FORECAST_SNAPSHOT_MONTHS, máx: 12)
+        """,
+        request=RefreshForecastSerializer
+    )
+    @action(detail=False, methods=['post'], url_path='dashboard/refresh')
+    def refresh_dashboard(self, request):
+        """
+        POST /api/ai/dashboard/refresh/
+        """
+        serializer = RefreshForecastSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            snapshot = self.prediction_service.generar_snapshot(
+                n_months=serializer.validated_data.get('n_months')
+            )
+            return Response({
+                'message': 'Pronóstico regenerado exitosamente',
+                'model_version': snapshot.modelo.version,
+                'meses': snapshot.meses,
+                'generado_en': snapshot.generado_en
+            }, status=status.HTTP_200_OK)
+        
+        except Exception as e:
+            return Response({
+                'error': 'Error al regenerar pronóstico',
+                'detail': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
     @extend_schema(
         summary="Predecir ventas futuras",
         description="""
@@ -123,7 +174,9 @@ class AIViewSet(viewsets.ViewSet):
     @extend_schema(
         summary="Entrenar o re-entrenar modelo",
         description="""
-        Entrena un nuevo modelo Random Forest con datos históricos de ventas.
+        Encola el entrenamiento de un nuevo modelo Random Forest con datos
+        históricos de ventas y retorna el job (202). El progreso se consulta en
+        `/api/ai/training-jobs/{id}/`.
         
         El proceso incluye:
         1. Extracción de datos históricos (últimos 12 meses)
@@ -133,12 +186,12 @@ class AIViewSet(viewsets.ViewSet):
         5. Serialización y guardado del modelo
         6. Registro en base de datos
         
-        **Nota**: Este proceso puede tardar varios segundos dependiendo de la cantidad de datos.
+        Solo puede haber un entrenamiento en curso (409 si ya existe).
         """,
         request=TrainModelSerializer,
-        responses={200: MLModelSerializer}
+        responses={202: TrainingJobSerializer, 409: TrainingJobSerializer}
     )
-    @action(detail=False, methods=['post'], url_path='train-model')
+    @action(detail=False, methods=['post'], url_path='train-model', permission_classes=[IsEmpleadoOrAdmin])
     def train_model(self, request):
         """
         POST /api/ai/train-model/
@@ -147,37 +200,55 @@ class AIViewSet(viewsets.ViewSet):
         {
             "n_estimators": 100,    // opcional
             "max_depth": 10,        // opcional
-            "test_size": 0.2        // opcional
+            "test_size": 0.2,       // opcional
+            "buscar_hiperparametros": false,  // opcional, grilla por defecto
+            "cv_splits": 5          // opcional
         }
         """
+        serializer = TrainModelSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
         try:
-            serializer = TrainModelSerializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
-            
-            result = self.training_service.train_model(
+            job = TrainingJobService.enviar(
+                usuario=request.user,
                 n_estimators=serializer.validated_data.get('n_estimators', 100),
                 max_depth=serializer.validated_data.get('max_depth', 10),
-                test_size=serializer.validated_data.get('test_size', 0.2)
+                test_size=serializer.validated_data.get('test_size', 0.2),
+                cv_splits=serializer.validated_data.get('cv_splits', 5),
+                param_grid=GRILLA_DEFAULT if serializer.validated_data.get('buscar_hiperparametros') else None
             )
-            
-            # Obtener modelo recién creado
-            ml_model = MLModel.objects.get(id=result['model_id'])
-            model_serializer = MLModelSerializer(ml_model)
-            
+        except EntrenamientoEnCursoError as e:
             return Response({
-                'message': 'Modelo entrenado exitosamente',
-                'model': model_serializer.data,
-                'training_info': {
-                    'num_samples': result['num_samples'],
-                    'test_metrics': result['metrics']['test']
-                }
-            }, status=status.HTTP_200_OK)
+                'error': 'Ya hay un entrenamiento en curso',
+                'job': TrainingJobSerializer(e.job).data
+            }, status=status.HTTP_409_CONFLICT)
         
-        except Exception as e:
-            return Response({
-                'error': 'Error al entrenar modelo',
-                'detail': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            'message': 'Entrenamiento encolado',
+            'job': TrainingJobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @extend_schema(
+        summary="Estado de un entrenamiento",
+        description="Retorna etapa, progreso, métricas y modelo resultante de un job de entrenamiento",
+        responses={200: TrainingJobSerializer}
+    )
+    @action(detail=False, methods=['get'], url_path=rf'training-jobs/(?P<job_id>{UUID_PATTERN})',
+            permission_classes=[IsEmpleadoOrAdmin])
+    def training_job(self, request, job_id=None):
+        """
+        GET /api/ai/training-jobs/{id}/
+        
+        Cada usuario ve sus propios jobs (el staff ve todos).
+        """
+        jobs = TrainingJob.objects.select_related('modelo')
+        if not request.user.is_staff:
+            jobs = jobs.filter(usuario=request.user)
+        job = jobs.filter(pk=job_id).first()
+        if job is None:
+            return Response({'error': 'Job de entrenamiento no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response(TrainingJobSerializer(job).data, status=status.HTTP_200_OK)
     
     @extend_schema(
         summary="Obtener modelo activo",
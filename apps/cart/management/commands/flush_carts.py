@@ -0,0 +1,31 @@
+"""
+Comando de Django para persistir en la BD los carritos guardados en Redis
+
+Con CART_BACKEND='redis' debe programarse periódicamente (cron). Los
+carritos con cambios pendientes no expiran en Redis hasta persistirse, así
+que la frecuencia solo define cuánto puede atrasarse la BD (y cuánta
+memoria ocupan en Redis):
+
+    python manage.py flush_carts
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.cart.store import get_cart_store
+
+
+class Command(BaseCommand):
+    help = 'Persiste en Carrito/ItemCarrito los carritos con cambios pendientes en Redis'
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+        if store is None:
+            raise CommandError("CART_BACKEND no es 'redis': no hay carritos que persistir")
+
+        self.stdout.write("🔄 Persistiendo carritos pendientes...")
+
+        persistidos, errores = store.persistir_pendientes()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Carritos persistidos: {persistidos}"))
+        if errores:
+            self.stdout.write(self.style.ERROR(f"❌ Carritos con error: {errores}"))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cart", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="carrito",
+            index=models.Index(
+                fields=["updated_at"], name="carrito_updated_b9a664_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="carrito",
+            index=models.Index(
+                fields=["deleted_at"], name="carrito_deleted_562b61_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="itemcarrito",
+            index=models.Index(
+                fields=["updated_at"], name="item_carrit_updated_c0b0dd_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="itemcarrito",
+            index=models.Index(
+                fields=["deleted_at"], name="item_carrit_deleted_a909cf_idx"
+            ),
+        ),
+    ]
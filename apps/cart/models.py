@@ -1,5 +1,6 @@
 from django.db import models
-from django.db.models import Sum, F
+from django.db.models import Sum, F, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from apps.core.models import BaseModel
 from apps.accounts.models import User
 from apps.products.models import Prenda, Talla
@@ -18,10 +19,53 @@ class Carrito(BaseModel):
         db_table = 'carrito'
         verbose_name = 'Carrito'
         verbose_name_plural = 'Carritos'
+        indexes = [
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['deleted_at']),
+        ]
     
     def __str__(self):
         return f"Carrito de {self.usuario.nombre_completo}"
     
+    def items_activos(self):
+        """
+        Items activos con todo lo que necesita CarritoSerializer en un
+        número fijo de consultas: prenda (con marca, tallas, stock total e
+        imagen principal), talla y stock disponible de la talla.
+        """
+        from apps.products.models import StockPrenda
+        
+        prendas = Prenda.anotar_resumen(
+            Prenda.objects.select_related('marca').prefetch_related('tallas_disponibles')
+        )
+        stock_talla = StockPrenda.objects.filter(
+            prenda=OuterRef('prenda_id'),
+            talla=OuterRef('talla_id')
+        ).values('cantidad')[:1]
+        
+        return self.items.filter(deleted_at__isnull=True).select_related('talla').prefetch_related(
+            Prefetch('prenda', queryset=prendas)
+        ).annotate(
+            stock_disponible=Coalesce(Subquery(stock_talla), 0)
+        )
+    
+    @staticmethod
+    def calcular_totales(items):
+        """
+        Totales del carrito calculados en memoria sobre items ya cargados.
+        
+        Returns:
+            dict: total_items, cantidad_items, subtotal y total
+        """
+        subtotal = sum((item.subtotal for item in items), Decimal('0.00'))
+        return {
+            'total_items': len(items),
+            'cantidad_items': sum(item.cantidad for item in items),
+            'subtotal': subtotal,
+            # Por ahora es igual al subtotal, luego agregaremos descuentos
+            'total': subtotal,
+        }
+    
     @property
     def total_items(self):
         """Total de items ACTIVOS en el carrito"""
@@ -88,6 +132,8 @@ class ItemCarrito(BaseModel):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['carrito', '-created_at']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['deleted_at']),
         ]
     
     def __str__(self):
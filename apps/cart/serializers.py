@@ -23,6 +23,9 @@ class ItemCarritoSerializer(serializers.ModelSerializer):
         return obj.subtotal
     
     def get_stock_disponible(self, obj):
+        # Anotado por Carrito.items_activos()
+        if hasattr(obj, 'stock_disponible'):
+            return obj.stock_disponible
         stock = StockPrenda.objects.filter(
             prenda=obj.prenda,
             talla=obj.talla
@@ -65,22 +68,31 @@ class CarritoSerializer(serializers.ModelSerializer):
         fields = ['id', 'usuario', 'items', 'total_items', 'cantidad_items', 'subtotal', 'total', 'created_at', 'updated_at']
         read_only_fields = ['id', 'usuario', 'created_at', 'updated_at']
     
+    def to_representation(self, obj):
+        """
+        Carga los items activos una sola vez y calcula los totales en
+        memoria. Se pueden pasar items ya cargados en context['items'].
+        """
+        items = self.context.get('items')
+        self._items = list(items) if items is not None else list(obj.items_activos())
+        self._totales = Carrito.calcular_totales(self._items)
+        return super().to_representation(obj)
+    
     def get_items(self, obj):
         """Obtener solo los items activos (no eliminados) del carrito"""
-        items_activos = obj.items.filter(deleted_at__isnull=True)
-        return ItemCarritoSerializer(items_activos, many=True, context=self.context).data
+        return ItemCarritoSerializer(self._items, many=True, context=self.context).data
     
     def get_total_items(self, obj):
-        return obj.total_items
+        return self._totales['total_items']
     
     def get_cantidad_items(self, obj):
-        return obj.cantidad_total_items
+        return self._totales['cantidad_items']
     
     def get_subtotal(self, obj):
-        return obj.subtotal
+        return self._totales['subtotal']
     
     def get_total(self, obj):
-        return obj.total
+        return self._totales['total']
 
 
 class AgregarItemCarritoSerializer(serializers.Serializer):
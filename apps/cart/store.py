@@ -0,0 +1,393 @@
+"""
+Carrito en Redis con escritura diferida a la base de datos
+
+Con CART_BACKEND='redis' los carritos activos viven en un hash de Redis por
+usuario y las operaciones del carrito no escriben en Carrito/ItemCarrito.
+Cada cambio marca al usuario como pendiente; el contenido se vuelca a la
+base de datos al hacer checkout o con `python manage.py flush_carts`
+(programado periódicamente).
+
+Los cambios leen el hash, lo modifican y lo escriben en una transacción
+WATCH/MULTI que se reintenta si otro request cambió el carrito en el medio
+(doble clic, varias pestañas), así no se pierden cantidades. Un carrito con
+cambios pendientes no expira: el TTL (CART_REDIS_TTL) se aplica recién
+cuando su contenido quedó persistido en la BD.
+
+Formato del hash `carrito:<usuario_id>`:
+    <item_id>  -> JSON {prenda, talla, cantidad, precio_unitario, created_at}
+    _cargado   -> '1' (el hash ya refleja la BD, aunque el carrito esté vacío)
+    _version   -> contador de cambios (para no perder cambios al persistir)
+
+Los items conservan su UUID al persistirse, así que los ids que ve el
+frontend son los mismos antes y después de volcar el carrito.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+import json
+import logging
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CAMPO_CARGADO = '_cargado'
+CAMPO_VERSION = '_version'
+
+
+class RedisCartStore:
+    """
+    Almacén de carritos en Redis.
+
+    Args:
+        client: Cliente de Redis (redis.Redis o compatible)
+    """
+
+    KEY_PREFIX = 'carrito'
+    PENDIENTES_KEY = 'carrito:pendientes'
+
+    def __init__(self, client):
+        self.client = client
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def get_items(self, usuario_id):
+        """
+        Items del carrito, cargándolos desde la BD la primera vez.
+
+        Returns:
+            dict: {item_id: {prenda, talla, cantidad, precio_unitario, created_at}}
+        """
+        items = self._leer(usuario_id)
+        if items is None:
+            items = self._cargar_desde_bd(usuario_id)
+        return items
+
+    def buscar_item(self, usuario_id, prenda_id, talla_id):
+        """Item existente de la misma prenda y talla: (item_id, datos) o (None, None)"""
+        return self._buscar(self.get_items(usuario_id), prenda_id, talla_id)
+
+    @staticmethod
+    def _buscar(items, prenda_id, talla_id):
+        for item_id, item in items.items():
+            if item['prenda'] == str(prenda_id) and item['talla'] == str(talla_id):
+                return item_id, item
+        return None, None
+
+    def construir_items(self, carrito):
+        """
+        ItemCarrito sin guardar para CarritoSerializer (context['items']),
+        con prenda, talla y stock disponible cargados en un número fijo de
+        consultas.
+        """
+        from apps.products.models import Prenda, StockPrenda, Talla
+        from .models import ItemCarrito
+
+        items = self.get_items(carrito.usuario_id)
+        prenda_ids = {item['prenda'] for item in items.values()}
+        talla_ids = {item['talla'] for item in items.values()}
+
+        prendas = Prenda.anotar_resumen(
+            Prenda.objects.select_related('marca').prefetch_related('tallas_disponibles')
+        ).in_bulk(prenda_ids)
+        tallas = Talla.objects.in_bulk(talla_ids)
+        stocks = {
+            (str(prenda_id), str(talla_id)): cantidad
+            for prenda_id, talla_id, cantidad in StockPrenda.objects.filter(
+                prenda_id__in=prenda_ids, talla_id__in=talla_ids
+            ).values_list('prenda_id', 'talla_id', 'cantidad')
+        }
+
+        resultado = []
+        for item_id, item in sorted(items.items(), key=lambda par: par[1]['created_at'], reverse=True):
+            prenda = prendas.get(uuid.UUID(item['prenda']))
+            talla = tallas.get(uuid.UUID(item['talla']))
+            if prenda is None or talla is None:
+                continue
+            item_carrito = ItemCarrito(
+                id=uuid.UUID(item_id),
+                carrito=carrito,
+                prenda=prenda,
+                talla=talla,
+                cantidad=item['cantidad'],
+                precio_unitario=Decimal(item['precio_unitario'])
+            )
+            item_carrito.created_at = datetime.fromisoformat(item['created_at'])
+            item_carrito.stock_disponible = stocks.get((item['prenda'], item['talla']), 0)
+            resultado.append(item_carrito)
+        return resultado
+
+    # ------------------------------------------------------------------
+    # Escritura (solo Redis)
+    # ------------------------------------------------------------------
+
+    def agregar(self, usuario_id, prenda, talla, cantidad):
+        """
+        Agregar `cantidad` de una prenda/talla (suma si ya estaba).
+
+        Returns:
+            str: id del item
+        """
+        def cambio(items):
+            item_id, item = self._buscar(items, prenda.id, talla.id)
+            if item is None:
+                item_id = str(uuid.uuid4())
+                item = {
+                    'prenda': str(prenda.id),
+                    'talla': str(talla.id),
+                    'cantidad': 0,
+                    'precio_unitario': str(prenda.precio),
+                    'created_at': timezone.now().isoformat(),
+                }
+            item['cantidad'] += cantidad
+            return {item_id: item}, (), item_id
+
+        return self._modificar(usuario_id, cambio)
+
+    def actualizar(self, usuario_id, item_id, cantidad):
+        """Cambiar la cantidad de un item. Returns: False si no existe"""
+        def cambio(items):
+            item = items.get(str(item_id))
+            if item is None:
+                return {}, (), False
+            item['cantidad'] = cantidad
+            return {str(item_id): item}, (), True
+
+        return self._modificar(usuario_id, cambio)
+
+    def eliminar(self, usuario_id, item_id):
+        """Quitar un item. Returns: False si no existe"""
+        def cambio(items):
+            if str(item_id) not in items:
+                return {}, (), False
+            return {}, [str(item_id)], True
+
+        return self._modificar(usuario_id, cambio)
+
+    def limpiar(self, usuario_id):
+        """Vaciar el carrito"""
+        self._modificar(usuario_id, lambda items: ({}, list(items), None))
+
+    def descartar(self, usuario_id):
+        """
+        Olvidar el carrito en Redis (la BD pasa a ser la fuente); se usa
+        después del checkout, que ya vació el carrito en la BD.
+        """
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(usuario_id))
+        pipe.srem(self.PENDIENTES_KEY, str(usuario_id))
+        pipe.execute()
+
+    # ------------------------------------------------------------------
+    # Persistencia en la BD
+    # ------------------------------------------------------------------
+
+    def pendientes(self):
+        """Ids de usuarios con cambios sin persistir"""
+        return [self._decode(valor) for valor in self.client.smembers(self.PENDIENTES_KEY)]
+
+    def persistir(self, usuario_id):
+        """
+        Volcar el carrito de Redis en Carrito/ItemCarrito.
+
+        Returns:
+            bool: True si había un carrito en Redis para persistir
+        """
+        from .models import Carrito, ItemCarrito
+
+        raw = self._hgetall(usuario_id)
+        if not raw:
+            if self.client.srem(self.PENDIENTES_KEY, str(usuario_id)):
+                logger.error(f"El carrito de {usuario_id} desapareció de Redis sin persistirse")
+            return False
+
+        version = raw.get(CAMPO_VERSION, '0')
+        items = self._parse(raw)
+        ahora = timezone.now()
+
+        with transaction.atomic():
+            carrito, _ = Carrito.objects.get_or_create(usuario_id=usuario_id)
+            existentes = {
+                str(item.id): item
+                for item in carrito.items.filter(Q(deleted_at__isnull=True) | Q(pk__in=list(items)))
+            }
+
+            ausentes = [item_id for item_id, item in existentes.items()
+                        if item_id not in items and item.deleted_at is None]
+            if ausentes:
+                ItemCarrito.objects.filter(pk__in=ausentes).update(deleted_at=ahora, updated_at=ahora)
+
+            nuevos, cambiados = [], []
+            for item_id, datos in items.items():
+                item = existentes.get(item_id)
+                precio = Decimal(datos['precio_unitario'])
+                if item is None:
+                    nuevos.append(ItemCarrito(
+                        id=uuid.UUID(item_id),
+                        carrito=carrito,
+                        prenda_id=datos['prenda'],
+                        talla_id=datos['talla'],
+                        cantidad=datos['cantidad'],
+                        precio_unitario=precio
+                    ))
+                elif item.deleted_at is not None or item.cantidad != datos['cantidad'] or item.precio_unitario != precio:
+                    item.deleted_at = None
+                    item.cantidad = datos['cantidad']
+                    item.precio_unitario = precio
+                    item.updated_at = ahora
+                    cambiados.append(item)
+
+            ItemCarrito.objects.bulk_create(nuevos)
+            ItemCarrito.objects.bulk_update(
+                cambiados, ['deleted_at', 'cantidad', 'precio_unitario', 'updated_at']
+            )
+
+        # Si el carrito cambió mientras se persistía queda pendiente (y sin
+        # TTL) para la próxima vez
+        key = self._key(usuario_id)
+
+        def confirmar(pipe):
+            actual = pipe.hget(key, CAMPO_VERSION)
+            pipe.multi()
+            if self._decode(actual or '0') == version:
+                pipe.srem(self.PENDIENTES_KEY, str(usuario_id))
+                pipe.expire(key, settings.CART_REDIS_TTL)
+
+        self.client.transaction(confirmar, key)
+        return True
+
+    def persistir_pendientes(self):
+        """
+        Persistir todos los carritos con cambios.
+
+        Returns:
+            tuple: (persistidos, errores)
+        """
+        persistidos, errores = 0, 0
+        for usuario_id in self.pendientes():
+            try:
+                if self.persistir(usuario_id):
+                    persistidos += 1
+            except Exception as e:
+                errores += 1
+                logger.error(f"Error persistiendo el carrito de {usuario_id}: {e}", exc_info=True)
+        return persistidos, errores
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _key(self, usuario_id):
+        return f'{self.KEY_PREFIX}:{usuario_id}'
+
+    def _hgetall(self, usuario_id, client=None):
+        raw = (client or self.client).hgetall(self._key(usuario_id))
+        return {self._decode(campo): self._decode(valor) for campo, valor in raw.items()}
+
+    def _leer(self, usuario_id):
+        raw = self._hgetall(usuario_id)
+        if not raw:
+            return None
+        return self._parse(raw)
+
+    @staticmethod
+    def _parse(raw):
+        return {
+            campo: json.loads(valor)
+            for campo, valor in raw.items()
+            if not campo.startswith('_')
+        }
+
+    def _cargar_desde_bd(self, usuario_id):
+        """Copiar los items activos de la BD al hash (sin marcarlo pendiente)"""
+        items = self._items_desde_bd(usuario_id)
+        key = self._key(usuario_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, CAMPO_CARGADO, '1')
+        for item_id, item in items.items():
+            pipe.hset(key, item_id, json.dumps(item))
+        pipe.expire(key, settings.CART_REDIS_TTL)
+        pipe.execute()
+        return items
+
+    @staticmethod
+    def _items_desde_bd(usuario_id):
+        from .models import ItemCarrito
+
+        return {
+            str(item.id): {
+                'prenda': str(item.prenda_id),
+                'talla': str(item.talla_id),
+                'cantidad': item.cantidad,
+                'precio_unitario': str(item.precio_unitario),
+                'created_at': item.created_at.isoformat(),
+            }
+            for item in ItemCarrito.objects.filter(
+                carrito__usuario_id=usuario_id, deleted_at__isnull=True
+            )
+        }
+
+    def _modificar(self, usuario_id, cambio):
+        """
+        Leer el carrito, aplicar `cambio` y escribir el resultado con
+        WATCH/MULTI. Si otro request modifica el hash entre la lectura y el
+        EXEC, Redis descarta la escritura y se vuelve a aplicar `cambio`
+        sobre los datos nuevos.
+
+        Args:
+            cambio: callable(items) -> (items a guardar, ids a eliminar, resultado)
+
+        Returns:
+            El resultado de `cambio`
+        """
+        key = self._key(usuario_id)
+
+        def aplicar(pipe):
+            raw = self._hgetall(usuario_id, client=pipe)
+            items = self._parse(raw) if raw else self._items_desde_bd(usuario_id)
+            cargados = {} if raw else dict(items)
+            guardar, eliminar, resultado = cambio(items)
+
+            pipe.multi()
+            pipe.hset(key, CAMPO_CARGADO, '1')
+            for item_id, item in {**cargados, **guardar}.items():
+                pipe.hset(key, item_id, json.dumps(item))
+            for item_id in eliminar:
+                pipe.hdel(key, item_id)
+            if guardar or eliminar:
+                # Pendiente de persistir: sin TTL hasta que llegue a la BD
+                pipe.hincrby(key, CAMPO_VERSION, 1)
+                pipe.persist(key)
+                pipe.sadd(self.PENDIENTES_KEY, str(usuario_id))
+            elif not raw:
+                pipe.expire(key, settings.CART_REDIS_TTL)
+            return resultado
+
+        return self.client.transaction(aplicar, key, value_from_callable=True)
+
+    @staticmethod
+    def _decode(valor):
+        return valor.decode() if isinstance(valor, bytes) else str(valor)
+
+
+_store = None
+
+
+def get_cart_store():
+    """
+    Almacén de carritos configurado, o None si los carritos van directo a
+    la base de datos (CART_BACKEND='db').
+    """
+    global _store
+    if settings.CART_BACKEND != 'redis':
+        return None
+    if _store is None:
+        import redis
+        _store = RedisCartStore(redis.Redis.from_url(settings.REDIS_URL))
+    return _store
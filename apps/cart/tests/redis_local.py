@@ -0,0 +1,118 @@
+"""
+Cliente Redis en memoria para los tests del carrito (solo los comandos que
+usa RedisCartStore; devuelve bytes como redis-py)
+
+`transaction()` reproduce WATCH/MULTI: si una clave vigilada cambia antes
+del EXEC se reintenta. `antes_de_exec` permite simular un request
+concurrente que escribe entre la lectura y el EXEC.
+"""
+
+from redis.exceptions import WatchError
+
+
+def _b(valor):
+    return valor if isinstance(valor, bytes) else str(valor).encode()
+
+
+class RedisEnMemoria:
+
+    def __init__(self):
+        self.datos = {}
+        self.ttl = {}
+        # Cambios por clave (para WATCH)
+        self.versiones = {}
+        self.antes_de_exec = None
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    def transaction(self, func, *claves, value_from_callable=False):
+        while True:
+            pipe = _Pipeline(self, claves)
+            try:
+                valor = func(pipe)
+                resultado = pipe.execute()
+            except WatchError:
+                continue
+            return valor if value_from_callable else resultado
+
+    def _modificada(self, key):
+        self.versiones[_b(key)] = self.versiones.get(_b(key), 0) + 1
+
+    def hgetall(self, key):
+        return dict(self.datos.get(_b(key), {}))
+
+    def hget(self, key, campo):
+        return self.datos.get(_b(key), {}).get(_b(campo))
+
+    def hset(self, key, campo, valor):
+        self.datos.setdefault(_b(key), {})[_b(campo)] = _b(valor)
+        self._modificada(key)
+
+    def hdel(self, key, campo):
+        self.datos.get(_b(key), {}).pop(_b(campo), None)
+        self._modificada(key)
+
+    def hincrby(self, key, campo, cantidad):
+        valor = int(self.hget(key, campo) or 0) + cantidad
+        self.hset(key, campo, valor)
+        return valor
+
+    def delete(self, key):
+        self.datos.pop(_b(key), None)
+        self.ttl.pop(_b(key), None)
+        self._modificada(key)
+
+    def expire(self, key, segundos):
+        if _b(key) not in self.datos:
+            return False
+        self.ttl[_b(key)] = segundos
+        return True
+
+    def persist(self, key):
+        return self.ttl.pop(_b(key), None) is not None
+
+    def sadd(self, key, valor):
+        self.datos.setdefault(_b(key), set()).add(_b(valor))
+
+    def srem(self, key, valor):
+        miembros = self.datos.get(_b(key), set())
+        if _b(valor) not in miembros:
+            return 0
+        miembros.discard(_b(valor))
+        return 1
+
+    def smembers(self, key):
+        return set(self.datos.get(_b(key), set()))
+
+
+class _Pipeline:
+
+    def __init__(self, client, vigiladas=()):
+        self.client = client
+        self.comandos = []
+        # Con claves vigiladas los comandos se ejecutan al momento hasta multi()
+        self.inmediato = bool(vigiladas)
+        self.vigiladas = {_b(key): client.versiones.get(_b(key), 0) for key in vigiladas}
+
+    def multi(self):
+        self.inmediato = False
+
+    def __getattr__(self, nombre):
+        if self.inmediato:
+            return getattr(self.client, nombre)
+
+        def encolar(*args):
+            self.comandos.append((nombre, args))
+        return encolar
+
+    def execute(self):
+        if self.client.antes_de_exec is not None:
+            concurrente, self.client.antes_de_exec = self.client.antes_de_exec, None
+            concurrente()
+        if any(self.client.versiones.get(key, 0) != version for key, version in self.vigiladas.items()):
+            self.comandos = []
+            raise WatchError()
+        resultados = [getattr(self.client, nombre)(*args) for nombre, args in self.comandos]
+        self.comandos = []
+        return resultados
@@ -102,4 +102,255 @@ class TestCart:
         
         response = self.client.post(url, data, format='json')
         
-        assert response.status_code == status.HTTP_400_BAD_REQUEST
\ No newline at end of file
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+class TestCarritoSerializer:
+    
+    def setup_method(self):
+        cliente_role = Role.objects.create(nombre='Cliente', es_rol_sistema=True)
+        self.cliente = User.objects.create_user(
+            email='serializer@cliente.com',
+            password='Test2024!',
+            nombre='Test',
+            apellido='Serializer',
+            rol=cliente_role
+        )
+        self.marca = Marca.objects.create(nombre='Test Marca')
+        self.talla = Talla.objects.create(nombre='M', orden=1)
+        self.carrito = Carrito.objects.create(usuario=self.cliente)
+    
+    def agregar_items(self, n):
+        for i in range(n):
+            prenda = Prenda.objects.create(
+                nombre=f'Prenda {i}',
+                descripcion='Test',
+                precio=Decimal('25.50'),
+                marca=self.marca,
+                color='Negro'
+            )
+            prenda.tallas_disponibles.add(self.talla)
+            StockPrenda.objects.create(prenda=prenda, talla=self.talla, cantidad=i + 3)
+            ItemCarrito.objects.create(
+                carrito=self.carrito,
+                prenda=prenda,
+                talla=self.talla,
+                cantidad=2,
+                precio_unitario=prenda.precio
+            )
+    
+    def serializar(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.cart.serializers import CarritoSerializer
+        
+        with CaptureQueriesContext(connection) as ctx:
+            data = CarritoSerializer(self.carrito).data
+        return data, len(ctx.captured_queries)
+    
+    def test_totales_en_memoria(self):
+        """Test: Los totales coinciden con las propiedades del modelo"""
+        self.agregar_items(3)
+        ItemCarrito.objects.filter(carrito=self.carrito).first().soft_delete()
+        
+        data, _ = self.serializar()
+        
+        assert data['total_items'] == self.carrito.total_items == 2
+        assert data['cantidad_items'] == self.carrito.cantidad_total_items == 4
+        assert data['subtotal'] == data['total'] == self.carrito.subtotal == Decimal('102.00')
+        for item in data['items']:
+            stock = StockPrenda.objects.get(prenda_id=item['prenda'], talla=self.talla)
+            assert item['stock_disponible'] == stock.cantidad
+            assert item['prenda_detalle']['stock_total'] == stock.cantidad
+    
+    def test_consultas_constantes(self):
+        """Test: Serializar el carrito cuesta lo mismo con 2 o 10 items"""
+        self.agregar_items(2)
+        _, pocas = self.serializar()
+        
+        self.agregar_items(8)
+        data, muchas = self.serializar()
+        
+        assert len(data['items']) == 10
+        assert muchas == pocas
+    
+    def test_mi_carrito(self):
+        """Test: El endpoint devuelve el carrito serializado"""
+        self.agregar_items(2)
+        client = APIClient()
+        client.force_authenticate(user=self.cliente)
+        
+        response = client.get(reverse('mi-carrito'))
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total_items'] == 2
+        assert response.data['total'] == Decimal('102.00')
+
+
+@pytest.mark.django_db
+class TestRedisCartStore:
+    
+    @pytest.fixture(autouse=True)
+    def redis_store(self, settings, monkeypatch):
+        from apps.cart import store as store_module
+        from apps.cart.store import RedisCartStore
+        from apps.cart.tests.redis_local import RedisEnMemoria
+        
+        settings.CART_BACKEND = 'redis'
+        self.store = RedisCartStore(RedisEnMemoria())
+        monkeypatch.setattr(store_module, '_store', self.store)
+        
+        cliente_role = Role.objects.create(nombre='Cliente', es_rol_sistema=True)
+        self.cliente = User.objects.create_user(
+            email='redis@cliente.com',
+            password='Test2024!',
+            nombre='Test',
+            apellido='Redis',
+            rol=cliente_role
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.cliente)
+        
+        marca = Marca.objects.create(nombre='Test Marca')
+        self.talla = Talla.objects.create(nombre='M', orden=1)
+        self.prendas = []
+        for i in range(2):
+            prenda = Prenda.objects.create(
+                nombre=f'Prenda {i}',
+                descripcion='Test',
+                precio=Decimal('40.00'),
+                marca=marca,
+                color='Negro'
+            )
+            prenda.tallas_disponibles.add(self.talla)
+            StockPrenda.objects.create(prenda=prenda, talla=self.talla, cantidad=5)
+            self.prendas.append(prenda)
+    
+    def agregar(self, prenda, cantidad=1):
+        return self.client.post(reverse('agregar-item'), {
+            'prenda': str(prenda.id),
+            'talla': str(self.talla.id),
+            'cantidad': cantidad
+        }, format='json')
+    
+    def test_operaciones_no_escriben_items_en_bd(self):
+        """Test: Agregar, actualizar y eliminar trabajan solo sobre Redis"""
+        self.agregar(self.prendas[0])
+        response = self.agregar(self.prendas[0], cantidad=2)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['carrito']['cantidad_items'] == 3
+        
+        response = self.agregar(self.prendas[1])
+        items = {item['prenda']: item for item in response.data['carrito']['items']}
+        assert response.data['carrito']['total'] == Decimal('160.00')
+        
+        item_id = items[self.prendas[1].id]['id']
+        response = self.client.put(
+            reverse('actualizar-item', args=[item_id]), {'cantidad': 4}, format='json'
+        )
+        assert response.data['carrito']['cantidad_items'] == 7
+        
+        response = self.client.delete(reverse('eliminar-item', args=[item_id]))
+        assert response.data['carrito']['total_items'] == 1
+        
+        assert ItemCarrito.objects.count() == 0
+        assert self.store.pendientes() == [str(self.cliente.id)]
+    
+    def test_stock_se_valida_contra_lo_que_hay_en_redis(self):
+        """Test: No se puede superar el stock sumando al item existente"""
+        self.agregar(self.prendas[0], cantidad=4)
+        
+        response = self.agregar(self.prendas[0], cantidad=2)
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_persistir_conserva_ids(self):
+        """Test: flush_carts vuelca el carrito a la BD con los mismos ids de item"""
+        from django.core.management import call_command
+        
+        response = self.agregar(self.prendas[0], cantidad=2)
+        item_id = response.data['carrito']['items'][0]['id']
+        
+        call_command('flush_carts')
+        
+        item = ItemCarrito.objects.get(deleted_at__isnull=True)
+        assert str(item.id) == item_id
+        assert item.cantidad == 2
+        assert self.store.pendientes() == []
+        
+        # Quitar el item en Redis y volver a persistir lo borra lógicamente
+        self.client.delete(reverse('eliminar-item', args=[item_id]))
+        self.store.persistir(self.cliente.id)
+        assert not ItemCarrito.objects.filter(deleted_at__isnull=True).exists()
+    
+    def test_agregados_concurrentes_no_se_pierden(self):
+        """Test: Un cambio concurrente entre la lectura y el EXEC se reintenta"""
+        self.store.agregar(self.cliente.id, self.prendas[0], self.talla, 1)
+        
+        # Otro request suma 2 mientras este ya leyó el carrito
+        self.store.client.antes_de_exec = lambda: self.store.agregar(
+            self.cliente.id, self.prendas[0], self.talla, 2
+        )
+        self.store.agregar(self.cliente.id, self.prendas[0], self.talla, 4)
+        
+        items = list(self.store.get_items(self.cliente.id).values())
+        assert [item['cantidad'] for item in items] == [7]
+    
+    def test_carrito_pendiente_no_expira(self):
+        """Test: El TTL se aplica recién cuando el carrito quedó persistido"""
+        from django.conf import settings
+        
+        key = f'carrito:{self.cliente.id}'.encode()
+        
+        self.agregar(self.prendas[0])
+        assert key not in self.store.client.ttl
+        
+        self.store.persistir(self.cliente.id)
+        assert self.store.client.ttl[key] == settings.CART_REDIS_TTL
+        
+        # Un cambio nuevo vuelve a quitar el TTL
+        self.agregar(self.prendas[0])
+        assert key not in self.store.client.ttl
+    
+    def test_carga_inicial_desde_bd(self):
+        """Test: Un carrito que ya estaba en la BD se carga en Redis"""
+        carrito = Carrito.objects.create(usuario=self.cliente)
+        item = ItemCarrito.objects.create(
+            carrito=carrito, prenda=self.prendas[0], talla=self.talla,
+            cantidad=3, precio_unitario=Decimal('40.00')
+        )
+        
+        response = self.client.get(reverse('mi-carrito'))
+        
+        assert [i['id'] for i in response.data['items']] == [str(item.id)]
+        assert response.data['items'][0]['stock_disponible'] == 5
+        assert self.store.pendientes() == []
+    
+    def test_checkout_persiste_y_descarta_redis(self, django_capture_on_commit_callbacks):
+        """Test: El checkout usa el carrito de Redis y luego lo descarta"""
+        from apps.customers.models import Direccion
+        from apps.orders.models import MetodoPago, Pedido
+        
+        MetodoPago.objects.create(codigo='efectivo', nombre='Efectivo', activo=True)
+        direccion = Direccion.objects.create(
+            usuario=self.cliente,
+            nombre_completo='Test Redis',
+            telefono='+591 70000000',
+            direccion_linea1='Calle Test 123',
+            ciudad='Cochabamba',
+            departamento='Cochabamba',
+            pais='Bolivia',
+            es_principal=True
+        )
+        self.agregar(self.prendas[0], cantidad=2)
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self.client.post(reverse('pedido-checkout'), {
+                'direccion_envio_id': str(direccion.id),
+                'metodo_pago': 'efectivo'
+            }, format='json')
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Pedido.objects.get().detalles.get().cantidad == 2
+        assert self.store.pendientes() == []
+        assert self.client.get(reverse('mi-carrito')).data['items'] == []
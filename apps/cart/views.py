@@ -7,6 +7,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 from .models import Carrito, ItemCarrito
+from .store import get_cart_store
 from .serializers import (
     CarritoSerializer, ItemCarritoSerializer,
     AgregarItemCarritoSerializer, ActualizarCantidadSerializer
@@ -18,17 +19,27 @@ class CarritoViewSet(viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = CarritoSerializer
     
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # None = carrito directo en la BD; si no, RedisCartStore
+        self.cart_store = get_cart_store()
+    
     def get_or_create_carrito(self):
         """Obtener o crear carrito del usuario"""
         carrito, created = Carrito.objects.get_or_create(usuario=self.request.user)
         return carrito
     
+    def serializar_carrito(self, carrito):
+        """Carrito serializado desde la BD o desde el almacén de Redis"""
+        context = self.get_serializer_context()
+        if self.cart_store is not None:
+            context['items'] = self.cart_store.construir_items(carrito)
+        return CarritoSerializer(carrito, context=context).data
+    
     def mi_carrito(self, request):
         """Obtener carrito del usuario actual"""
         carrito = self.get_or_create_carrito()
-                
-        serializer = self.get_serializer(carrito)
-        return Response(serializer.data)
+        return Response(self.serializar_carrito(carrito))
     
     def agregar(self, request):
         """Agregar item al carrito"""
@@ -41,6 +52,9 @@ class CarritoViewSet(viewsets.GenericViewSet):
         talla = serializer.validated_data['talla_obj']
         cantidad = serializer.validated_data['cantidad']
         
+        if self.cart_store is not None:
+            return self._agregar_en_store(carrito, prenda, talla, cantidad)
+        
         with transaction.atomic():
             # Buscar item existente (incluyendo los eliminados lógicamente)
             item_existente = ItemCarrito.objects.filter(
@@ -85,11 +99,34 @@ class CarritoViewSet(viewsets.GenericViewSet):
                 )
         
         # Devolver el carrito actualizado
-        carrito_serializer = CarritoSerializer(carrito)
-        logger.info(f"Item agregado - Carrito total: {carrito.total}")
+        carrito_data = self.serializar_carrito(carrito)
+        logger.info(f"Item agregado - Carrito total: {carrito_data['total']}")
         return Response({
             'message': 'Producto agregado al carrito',
-            'carrito': carrito_serializer.data
+            'carrito': carrito_data
+        }, status=status.HTTP_201_CREATED)
+    
+    def _agregar_en_store(self, carrito, prenda, talla, cantidad):
+        """Agregar item en Redis (sin escribir en la BD)"""
+        from apps.products.models import StockPrenda
+        
+        _, item_existente = self.cart_store.buscar_item(carrito.usuario_id, prenda.id, talla.id)
+        if item_existente:
+            nueva_cantidad = item_existente['cantidad'] + cantidad
+            stock = StockPrenda.objects.filter(prenda=prenda, talla=talla).first()
+            if not stock or stock.cantidad < nueva_cantidad:
+                disponible = stock.cantidad if stock else 0
+                return Response({
+                    'error': f'Stock insuficiente. Solo hay {disponible} unidades disponibles y ya tienes {item_existente["cantidad"]} en el carrito'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        self.cart_store.agregar(carrito.usuario_id, prenda, talla, cantidad)
+        
+        carrito_data = self.serializar_carrito(carrito)
+        logger.info(f"Item agregado - Carrito total: {carrito_data['total']}")
+        return Response({
+            'message': 'Producto agregado al carrito',
+            'carrito': carrito_data
         }, status=status.HTTP_201_CREATED)
     
     def actualizar_item(self, request, item_id=None):
@@ -104,6 +141,9 @@ class CarritoViewSet(viewsets.GenericViewSet):
         
         carrito = self.get_or_create_carrito()
         
+        if self.cart_store is not None:
+            return self._actualizar_en_store(carrito, item_id, request.data)
+        
         try:
             item = ItemCarrito.objects.get(
                 id=item_id,
@@ -150,10 +190,41 @@ class CarritoViewSet(viewsets.GenericViewSet):
             message = 'Cantidad actualizada'
         
         # Devolver el carrito actualizado
-        carrito_serializer = CarritoSerializer(carrito)
         return Response({
             'message': message,
-            'carrito': carrito_serializer.data
+            'carrito': self.serializar_carrito(carrito)
+        })
+    
+    def _actualizar_en_store(self, carrito, item_id, data):
+        """Actualizar cantidad de un item en Redis"""
+        from apps.products.models import StockPrenda
+        
+        item = self.cart_store.get_items(carrito.usuario_id).get(str(item_id))
+        if item is None:
+            logger.error(f"Item no encontrado: {item_id} para usuario {carrito.usuario_id}")
+            return Response(
+                {'error': 'Item no encontrado en el carrito'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        serializer = ActualizarCantidadSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        nueva_cantidad = serializer.validated_data['cantidad']
+        
+        stock = StockPrenda.objects.filter(prenda_id=item['prenda'], talla_id=item['talla']).first()
+        if not stock:
+            return Response({
+                'error': 'Producto no disponible'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if stock.cantidad < nueva_cantidad:
+            return Response({
+                'error': f'Stock insuficiente. Solo hay {stock.cantidad} unidades disponibles'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        self.cart_store.actualizar(carrito.usuario_id, item_id, nueva_cantidad)
+        return Response({
+            'message': 'Cantidad actualizada',
+            'carrito': self.serializar_carrito(carrito)
         })
     
     def eliminar_item(self, request, item_id=None):
@@ -167,6 +238,17 @@ class CarritoViewSet(viewsets.GenericViewSet):
         carrito = self.get_or_create_carrito()
         logger.info(f"Buscando item {item_id} en carrito {carrito.id}")
         
+        if self.cart_store is not None:
+            if not self.cart_store.eliminar(carrito.usuario_id, item_id):
+                return Response(
+                    {'error': 'Item no encontrado en el carrito'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return Response({
+                'message': 'Producto eliminado del carrito',
+                'carrito': self.serializar_carrito(carrito)
+            })
+        
         try:
             item = ItemCarrito.objects.get(
                 id=item_id,
@@ -177,11 +259,11 @@ class CarritoViewSet(viewsets.GenericViewSet):
             
             item.soft_delete()
             
-            carrito_serializer = CarritoSerializer(carrito)
-            logger.info(f"✅ Item eliminado - Carrito total: {carrito.total}")
+            carrito_data = self.serializar_carrito(carrito)
+            logger.info(f"✅ Item eliminado - Carrito total: {carrito_data['total']}")
             return Response({
                 'message': 'Producto eliminado del carrito',
-                'carrito': carrito_serializer.data
+                'carrito': carrito_data
             })
             
         except ItemCarrito.DoesNotExist as e:
@@ -196,10 +278,12 @@ class CarritoViewSet(viewsets.GenericViewSet):
     def limpiar(self, request):
         """Vaciar el carrito"""
         carrito = self.get_or_create_carrito()
-        carrito.limpiar()
+        if self.cart_store is not None:
+            self.cart_store.limpiar(carrito.usuario_id)
+        else:
+            carrito.limpiar()
         
-        carrito_serializer = CarritoSerializer(carrito)
         return Response({
             'message': 'Carrito vaciado',
-            'carrito': carrito_serializer.data
+            'carrito': self.serializar_carrito(carrito)
         })
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+Cache con invalidación por generaciones
+
+Los valores se guardan en el cache de Django (Redis en producción) con su
+propio TTL y dependen de grupos de datos ('pedidos', 'stock', 'usuarios',
+'productos'). Cada grupo tiene un contador de generación: las señales de
+los modelos lo incrementan (`invalidate_on_commit`) y las entradas que
+dependen de él pasan a estar vencidas.
+
+Una entrada vencida se sigue sirviendo mientras un hilo en segundo plano la
+recalcula (stale-while-revalidate), así un valor consultado por muchos
+usuarios no dispara el mismo cálculo en paralelo.
+
+Lo usan las métricas de analytics (apps/reports/services/analytics_cache.py)
+y las facetas del catálogo (apps/products/views.py).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationalCache:
+    """
+    Cache con invalidación por eventos y recálculo en segundo plano.
+    """
+
+    # Las entradas vencidas se conservan este múltiplo de su TTL para
+    # poder servirlas mientras se recalculan
+    STALE_FACTOR = 12
+    LOCK_TIMEOUT = 120
+
+    # Compartido por todas las subclases: invalidar un grupo vence todas
+    # las entradas que dependen de él, sin importar quién las guardó
+    GENERATION_PREFIX = 'cache:gen'
+
+    _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='generational-cache')
+
+    @classmethod
+    def get_or_compute(cls, key, compute, ttl, groups=()):
+        """
+        Devolver el valor cacheado de `key`, calculándolo si no existe.
+
+        Si la entrada venció (por TTL o por invalidación de alguno de sus
+        grupos) se devuelve el valor anterior y se agenda el recálculo.
+        """
+        try:
+            entry = cache.get(key)
+            generations = cls._get_generations(groups)
+        except Exception as e:
+            logger.warning(f"Cache no disponible ({e}); calculando '{key}' sin cache")
+            return compute()
+
+        if entry is None:
+            return cls._compute_and_store(key, compute, ttl, generations)
+
+        is_fresh = (
+            time.time() - entry['computed_at'] < ttl
+            and entry['generations'] == generations
+        )
+        if not is_fresh:
+            cls._schedule_refresh(key, compute, ttl, groups)
+
+        return entry['value']
+
+    @classmethod
+    def invalidate(cls, group):
+        """
+        Marcar como vencidas las entradas que dependen de `group`.
+        """
+        key = cls._generation_key(group)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, timeout=None)
+        except Exception as e:
+            logger.warning(f"No se pudo invalidar el grupo de cache '{group}': {e}")
+
+    @classmethod
+    def invalidate_on_commit(cls, group):
+        """Invalidar `group` cuando se confirme la transacción actual"""
+        transaction.on_commit(lambda: cls.invalidate(group))
+
+    @classmethod
+    def _compute_and_store(cls, key, compute, ttl, generations):
+        value = compute()
+        try:
+            cache.set(key, {
+                'value': value,
+                'computed_at': time.time(),
+                'generations': generations,
+            }, timeout=ttl * cls.STALE_FACTOR)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar '{key}' en el cache: {e}")
+        return value
+
+    @classmethod
+    def _schedule_refresh(cls, key, compute, ttl, groups):
+        """
+        Recalcular en segundo plano; un lock en el cache evita que varios
+        procesos recalculen la misma entrada a la vez.
+        """
+        lock_key = f'{key}:lock'
+        try:
+            if not cache.add(lock_key, 1, timeout=cls.LOCK_TIMEOUT):
+                return None
+        except Exception as e:
+            # Sin cache no hay lock: se sigue sirviendo el valor vencido
+            logger.warning(f"No se pudo agendar el recálculo de '{key}': {e}")
+            return None
+
+        def refresh():
+            try:
+                # Leer la generación antes de calcular: si llega una
+                # invalidación durante el cálculo, la entrada nace vencida
+                generations = cls._get_generations(groups)
+                cls._compute_and_store(key, compute, ttl, generations)
+            except Exception as e:
+                logger.error(f"Error recalculando '{key}': {e}", exc_info=True)
+            finally:
+                try:
+                    cache.delete(lock_key)
+                except Exception as e:
+                    logger.warning(f"No se pudo liberar el lock de '{key}': {e}")
+                connection.close()
+
+        return cls._executor.submit(refresh)
+
+    @classmethod
+    def _get_generations(cls, groups):
+        if not groups:
+            return {}
+        keys = {cls._generation_key(group): group for group in groups}
+        values = cache.get_many(list(keys))
+        return {group: values.get(key, 0) for key, group in keys.items()}
+
+    @classmethod
+    def _generation_key(cls, group):
+        return f'{cls.GENERATION_PREFIX}:{group}'
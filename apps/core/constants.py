@@ -1,5 +1,8 @@
 """Constantes globales del sistema"""
 
+# UUID en minúsculas (ids de BaseModel) para url_path de acciones de DRF
+UUID_PATTERN = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+
 # Módulos del sistema para permisos
 PERMISSIONS = {
     'usuarios': ['crear', 'leer', 'actualizar', 'eliminar'],
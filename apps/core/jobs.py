@@ -0,0 +1,81 @@
+"""
+Ejecución de tareas en segundo plano
+
+`encolar('paquete.modulo.funcion', *args)` ejecuta la función indicada fuera
+del request según JOBS_BACKEND:
+
+- 'celery': task `core.ejecutar_job` en un worker (CELERY_BROKER_URL)
+- 'thread': pool de hilos del propio proceso (JOBS_THREAD_WORKERS); para
+  desarrollo o despliegues sin worker
+- 'sync': en el mismo hilo, al confirmar la transacción (tests)
+
+La tarea se envía con `transaction.on_commit`, así el worker ya ve el job
+que la originó. Los argumentos deben ser serializables a JSON (ids, no
+instancias).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('celery', 'thread', 'sync')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def encolar(ruta, *args):
+    """
+    Ejecutar `ruta(*args)` en segundo plano cuando se confirme la transacción.
+
+    Args:
+        ruta (str): Ruta de importación de la función
+        *args: Argumentos JSON-serializables
+    """
+    backend = settings.JOBS_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"JOBS_BACKEND inválido: {backend} (opciones: {', '.join(BACKENDS)})")
+
+    transaction.on_commit(lambda: _enviar(backend, ruta, args))
+
+
+def ejecutar(ruta, *args):
+    """Importar y ejecutar la función de una tarea"""
+    return import_string(ruta)(*args)
+
+
+def _enviar(backend, ruta, args):
+    if backend == 'celery':
+        from .tasks import ejecutar_job
+        ejecutar_job.delay(ruta, *args)
+    elif backend == 'thread':
+        _get_executor().submit(_ejecutar_en_hilo, ruta, args)
+    else:
+        ejecutar(ruta, *args)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.JOBS_THREAD_WORKERS, thread_name_prefix='jobs'
+                )
+    return _executor
+
+
+def _ejecutar_en_hilo(ruta, args):
+    close_old_connections()
+    try:
+        ejecutar(ruta, *args)
+    except Exception as e:
+        logger.error(f"Error en la tarea {ruta}: {e}", exc_info=True)
+    finally:
+        close_old_connections()
@@ -0,0 +1,61 @@
+"""
+Paginación de los listados de la API
+"""
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.settings import api_settings
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) sobre `(-created_at, id)`: cada página
+    filtra por el último `created_at` visto en lugar de usar OFFSET y no
+    calcula COUNT(*), así que recorrer páginas profundas cuesta lo mismo
+    que la primera.
+
+    El cursor guarda la posición del primer campo del orden; `id` se agrega
+    siempre como desempate (también al orden de `?ordering=`) para que las
+    filas con el mismo valor salgan en un orden estable y el OFFSET del
+    cursor solo recorra ese grupo de empatadas.
+    """
+    ordering = ('-created_at', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering += ('id',)
+        return ordering
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """
+    Paginación por número de página (la de siempre) con modo cursor opcional.
+
+    El modo cursor se activa con `?paginacion=cursor`; los enlaces `next` y
+    `previous` que devuelve ya incluyen `?cursor=`, que también lo activa.
+    Con `?search=` se ignora: el cursor reordenaría los resultados y se
+    perdería el orden por relevancia.
+    """
+    cursor_class = CreatedAtCursorPagination
+    mode_query_param = 'paginacion'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = self.cursor_class() if self.use_cursor(request) else None
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def use_cursor(self, request):
+        if request.query_params.get(api_settings.SEARCH_PARAM, '').strip():
+            return False
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_class.cursor_query_param in request.query_params
+        )
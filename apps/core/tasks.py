@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .jobs import ejecutar
+
+
+@shared_task(name='core.ejecutar_job')
+def ejecutar_job(ruta, *args):
+    """Task genérica de Celery para las tareas de `apps.core.jobs.encolar`"""
+    return ejecutar(ruta, *args)
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from apps.reports.services.sales_rollup import SalesRollupService
 from .models import MetodoPago, Pedido, DetallePedido, Pago, HistorialEstadoPedido
 
 
@@ -66,6 +67,11 @@ class PedidoAdmin(admin.ModelAdmin):
     def total_items(self, obj):
         return obj.total_items
     total_items.short_description = 'Total Items'
+    
+    def save_related(self, request, form, formsets, change):
+        """Los cambios del admin (estado, detalles) no pasan por el checkout"""
+        super().save_related(request, form, formsets, change)
+        SalesRollupService.recalcular_dia(form.instance)
 
 
 @admin.register(DetallePedido)
@@ -73,6 +79,19 @@ class DetallePedidoAdmin(admin.ModelAdmin):
     list_display = ['pedido', 'prenda', 'talla', 'cantidad', 'precio_unitario', 'subtotal']
     search_fields = ['pedido__numero_pedido', 'prenda__nombre']
     readonly_fields = ['subtotal', 'producto_snapshot', 'created_at']
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        SalesRollupService.recalcular_dia(obj.pedido)
+    
+    def delete_model(self, request, obj):
+        SalesRollupService.recalcular_dia(obj.pedido)
+        super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        for pedido in {detalle.pedido for detalle in queryset.select_related('pedido')}:
+            SalesRollupService.recalcular_dia(pedido)
+        super().delete_queryset(request, queryset)
 
 
 @admin.register(Pago)
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="detallepedido",
+            index=models.Index(
+                fields=["updated_at"], name="detalle_ped_updated_25b317_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="detallepedido",
+            index=models.Index(
+                fields=["deleted_at"], name="detalle_ped_deleted_50259e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pedido",
+            index=models.Index(fields=["updated_at"], name="pedido_updated_032665_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="pedido",
+            index=models.Index(fields=["deleted_at"], name="pedido_deleted_c61685_idx"),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.fields import NOT_PROVIDED
 from apps.core.models import BaseModel
 from apps.core.constants import ESTADOS_PEDIDO, METODOS_PAGO, ESTADOS_PAGO
 from apps.accounts.models import User
@@ -77,6 +78,8 @@ class Pedido(BaseModel):
             models.Index(fields=['usuario', '-created_at']),
             models.Index(fields=['numero_pedido']),
             models.Index(fields=['estado', '-created_at']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['deleted_at']),
         ]
     
     def __str__(self):
@@ -109,10 +112,15 @@ class Pedido(BaseModel):
     
     def cambiar_estado(self, nuevo_estado, usuario_cambio=None, notas=''):
         """Cambiar estado del pedido y registrar en historial"""
+        from apps.reports.services.sales_rollup import SalesRollupService
+        
         estado_anterior = self.estado
         self.estado = nuevo_estado
         self.save()
         
+        # Mover el pedido en el agregado de ventas diarias
+        SalesRollupService.mover_pedido(self, estado_anterior, nuevo_estado)
+        
         # Registrar en historial
         HistorialEstadoPedido.objects.create(
             pedido=self,
@@ -167,12 +175,25 @@ class DetallePedido(BaseModel):
         verbose_name_plural = 'Detalles de Pedidos'
         indexes = [
             models.Index(fields=['pedido', '-created_at']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['deleted_at']),
         ]
     
     def __str__(self):
         return f"{self.prenda.nombre} x{self.cantidad}"
     
     def save(self, *args, **kwargs):
+        self.preparar()
+        super().save(*args, **kwargs)
+    
+    def preparar(self, imagen=NOT_PROVIDED):
+        """
+        Calcular subtotal y snapshot del producto sin guardar
+        (necesario antes de bulk_create, que no llama a save()).
+        
+        Args:
+            imagen: Imagen principal ya resuelta; si no se pasa se consulta
+        """
         # Calcular subtotal
         self.subtotal = self.precio_unitario * self.cantidad
         
@@ -183,10 +204,8 @@ class DetallePedido(BaseModel):
                 'descripcion': self.prenda.descripcion,
                 'marca': self.prenda.marca.nombre if self.prenda.marca else '',
                 'color': self.prenda.color,
-                'imagen': self.prenda.imagen_principal,
+                'imagen': self.prenda.imagen_principal if imagen is NOT_PROVIDED else imagen,
             }
-        
-        super().save(*args, **kwargs)
 
 
 class Pago(BaseModel):
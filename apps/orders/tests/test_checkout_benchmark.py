@@ -0,0 +1,257 @@
+"""
+Benchmark de concurrencia del checkout
+
+Siembra N productos y usuarios (cada uno con su carrito) y lanza el checkout
+de todos desde varios hilos a la vez contra la base de datos de pruebas
+(SQLite en local, Postgres si DATABASE_URL apunta a uno). Reporta latencia
+p50/p95/p99, consultas por checkout y unidades sobrevendidas.
+
+El tamaño se ajusta con variables de entorno y el reporte se emite por
+logging, por ejemplo:
+
+    CHECKOUT_BENCH_USUARIOS=200 CHECKOUT_BENCH_HILOS=16 \
+        pytest apps/orders/tests/test_checkout_benchmark.py -o log_cli=true --log-cli-level=INFO
+
+SQLite no admite escrituras concurrentes (la base de pruebas en memoria
+responde "database table is locked"), así que con SQLite cada request se
+ejecuta de a uno y el benchmark concurrente se omite; solo corre la prueba
+de un producto, que verifica el conteo exacto de ventas. Los números de
+concurrencia real se obtienen con Postgres.
+"""
+
+from collections import Counter
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import logging
+import os
+import random
+import threading
+import time
+
+import pytest
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User, Role
+from apps.products.models import Prenda, Marca, Categoria, Talla, StockPrenda
+from apps.customers.models import Direccion
+from apps.cart.models import Carrito, ItemCarrito
+from apps.orders.models import MetodoPago, DetallePedido
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(nombre, default):
+    return int(os.environ.get(f'CHECKOUT_BENCH_{nombre}', default))
+
+
+def _percentil(valores, p):
+    """Percentil por rango más cercano"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, int(round(p / 100 * len(ordenados))) - 1)
+    return ordenados[min(indice, len(ordenados) - 1)]
+
+
+class CheckoutBenchmark:
+    """
+    Arnés reproducible para medir el checkout bajo concurrencia.
+    """
+
+    def __init__(self, productos=5, usuarios=20, stock=10, items_por_carrito=2,
+                 cantidad=1, hilos=8, semilla=42, serializar=None):
+        self.num_productos = productos
+        self.num_usuarios = usuarios
+        self.stock_inicial = stock
+        self.items_por_carrito = min(items_por_carrito, productos)
+        self.cantidad = cantidad
+        self.hilos = hilos
+        self.random = random.Random(semilla)
+        if serializar is None:
+            serializar = connection.vendor == 'sqlite'
+        self.lock = threading.Lock() if serializar else None
+        self.usuarios = []
+        self.direcciones = {}
+        self.stocks = []
+        self.resultados = []
+
+    def seed(self):
+        """Crear catálogo, usuarios, direcciones y carritos"""
+        rol = Role.objects.create(nombre='Cliente', es_rol_sistema=True)
+        marca = Marca.objects.create(nombre='Bench Marca')
+        categoria = Categoria.objects.create(nombre='Bench Categoria')
+        talla = Talla.objects.create(nombre='M', orden=1)
+        MetodoPago.objects.create(codigo='efectivo', nombre='Efectivo', activo=True)
+
+        for i in range(self.num_productos):
+            prenda = Prenda.objects.create(
+                nombre=f'Bench Prenda {i}',
+                descripcion='Benchmark',
+                precio=Decimal('50.00'),
+                marca=marca,
+                color='Negro'
+            )
+            prenda.categorias.add(categoria)
+            self.stocks.append(
+                StockPrenda.objects.create(prenda=prenda, talla=talla, cantidad=self.stock_inicial)
+            )
+
+        for i in range(self.num_usuarios):
+            usuario = User.objects.create_user(
+                email=f'bench{i}@cliente.com',
+                password='Test2024!',
+                nombre='Bench',
+                apellido=str(i),
+                rol=rol
+            )
+            self.direcciones[usuario.pk] = Direccion.objects.create(
+                usuario=usuario,
+                nombre_completo=f'Bench {i}',
+                telefono='+591 70000000',
+                direccion_linea1='Calle Bench 1',
+                ciudad='Cochabamba',
+                departamento='Cochabamba',
+                pais='Bolivia',
+                es_principal=True
+            )
+            carrito = Carrito.objects.create(usuario=usuario)
+            for stock in self.random.sample(self.stocks, self.items_por_carrito):
+                ItemCarrito.objects.create(
+                    carrito=carrito,
+                    prenda=stock.prenda,
+                    talla=stock.talla,
+                    cantidad=self.cantidad,
+                    precio_unitario=stock.prenda.precio
+                )
+            self.usuarios.append(usuario)
+
+        return self
+
+    def run(self):
+        """Lanzar el checkout de todos los usuarios a la vez"""
+        barrera = threading.Barrier(min(self.hilos, len(self.usuarios)) or 1)
+
+        def checkout(usuario):
+            client = APIClient()
+            client.force_authenticate(user=usuario)
+            try:
+                barrera.wait(timeout=10)
+            except threading.BrokenBarrierError:
+                pass
+            try:
+                with self.lock or nullcontext(), CaptureQueriesContext(connection) as ctx:
+                    inicio = time.perf_counter()
+                    try:
+                        response = client.post(reverse('pedido-checkout'), {
+                            'direccion_envio_id': str(self.direcciones[usuario.pk].id),
+                            'metodo_pago': 'efectivo'
+                        }, format='json')
+                        resultado = response.status_code
+                    except Exception as e:
+                        resultado = type(e).__name__
+                    duracion = time.perf_counter() - inicio
+                return {'resultado': resultado, 'segundos': duracion, 'consultas': len(ctx.captured_queries)}
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.hilos) as executor:
+            self.resultados = list(executor.map(checkout, self.usuarios))
+
+        return self.report()
+
+    def oversell(self):
+        """Unidades vendidas por encima del stock inicial y stock negativo"""
+        vendido = {
+            (fila['prenda_id'], fila['talla_id']): fila['total']
+            for fila in DetallePedido.objects.values('prenda_id', 'talla_id').annotate(total=Sum('cantidad'))
+        }
+        sobreventa = 0
+        inconsistencias = 0
+        for stock in self.stocks:
+            stock.refresh_from_db()
+            cantidad_vendida = vendido.get((stock.prenda_id, stock.talla_id), 0)
+            sobreventa += max(0, cantidad_vendida - self.stock_inicial) + max(0, -stock.cantidad)
+            if stock.cantidad != self.stock_inicial - cantidad_vendida:
+                inconsistencias += 1
+        return sobreventa, inconsistencias
+
+    def vendidas(self):
+        """Unidades vendidas en total"""
+        return DetallePedido.objects.aggregate(total=Sum('cantidad'))['total'] or 0
+
+    def report(self):
+        latencias = [r['segundos'] * 1000 for r in self.resultados]
+        exitosos = [r for r in self.resultados if r['resultado'] == 201]
+        consultas = [r['consultas'] for r in exitosos]
+        sobreventa, inconsistencias = self.oversell()
+
+        return {
+            'checkouts': len(self.resultados),
+            'hilos': self.hilos,
+            'serializado': self.lock is not None,
+            'resultados': dict(Counter(str(r['resultado']) for r in self.resultados)),
+            'latencia_ms': {
+                'p50': round(_percentil(latencias, 50), 2),
+                'p95': round(_percentil(latencias, 95), 2),
+                'p99': round(_percentil(latencias, 99), 2),
+            },
+            'consultas_por_checkout': {
+                'promedio': round(sum(consultas) / len(consultas), 1) if consultas else 0,
+                'max': max(consultas, default=0),
+            },
+            'sobreventa': sobreventa,
+            'stock_inconsistente': inconsistencias,
+        }
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCheckoutBenchmark:
+
+    def test_checkout_concurrente_sin_sobreventa(self):
+        """Test: Con más demanda que stock, los checkouts concurrentes no sobrevenden"""
+        if connection.vendor == 'sqlite':
+            pytest.skip('SQLite serializa los checkouts: la concurrencia solo se prueba con Postgres')
+
+        benchmark = CheckoutBenchmark(
+            productos=_env_int('PRODUCTOS', 3),
+            usuarios=_env_int('USUARIOS', 24),
+            stock=_env_int('STOCK', 5),
+            items_por_carrito=_env_int('ITEMS', 2),
+            hilos=_env_int('HILOS', 8),
+        ).seed()
+
+        reporte = benchmark.run()
+        logger.info(f'Checkout benchmark: {reporte}')
+
+        assert reporte['checkouts'] == benchmark.num_usuarios
+        assert reporte['serializado'] is False
+        assert set(reporte['resultados']) <= {'201', '400'}
+        assert reporte['sobreventa'] == 0
+        assert reporte['stock_inconsistente'] == 0
+
+    def test_un_producto_se_venden_todas_las_unidades(self):
+        """Test: Con un solo producto y más carritos que stock se vende exactamente el stock"""
+        benchmark = CheckoutBenchmark(
+            productos=1, usuarios=12, stock=5, items_por_carrito=1, hilos=4
+        ).seed()
+
+        reporte = benchmark.run()
+        logger.info(f'Checkout benchmark (un producto): {reporte}')
+
+        assert reporte['resultados'] == {'201': 5, '400': 7}
+        assert benchmark.vendidas() == 5
+        benchmark.stocks[0].refresh_from_db()
+        assert benchmark.stocks[0].cantidad == 0
+        assert reporte['sobreventa'] == 0
+
+    def test_percentil(self):
+        """Test: Percentil por rango más cercano"""
+        valores = list(range(1, 101))
+        assert _percentil(valores, 50) == 50
+        assert _percentil(valores, 99) == 99
+        assert _percentil([], 95) == 0.0
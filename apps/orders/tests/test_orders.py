@@ -182,4 +182,156 @@ class TestOrders:
         
         # Verificar que se canceló
         pedido.refresh_from_db()
-        assert pedido.estado == 'cancelado'
\ No newline at end of file
+        assert pedido.estado == 'cancelado'
+
+@pytest.mark.django_db
+class TestCheckoutStock:
+    
+    def setup_method(self):
+        self.client = APIClient()
+        
+        cliente_role = Role.objects.create(nombre='Cliente', es_rol_sistema=True)
+        self.cliente = User.objects.create_user(
+            email='stock@cliente.com',
+            password='Test2024!',
+            nombre='Test',
+            apellido='Stock',
+            rol=cliente_role
+        )
+        self.client.force_authenticate(user=self.cliente)
+        
+        self.marca = Marca.objects.create(nombre='Test Marca')
+        self.categoria = Categoria.objects.create(nombre='Test Categoria')
+        self.talla = Talla.objects.create(nombre='M', orden=1)
+        self.direccion = Direccion.objects.create(
+            usuario=self.cliente,
+            nombre_completo='Test Stock',
+            telefono='+591 70000000',
+            direccion_linea1='Calle Test 123',
+            ciudad='Cochabamba',
+            departamento='Cochabamba',
+            pais='Bolivia',
+            es_principal=True
+        )
+        MetodoPago.objects.create(codigo='efectivo', nombre='Efectivo', activo=True)
+        self.carrito = Carrito.objects.create(usuario=self.cliente)
+    
+    def agregar_items(self, n, cantidad=2, stock=10):
+        stocks = []
+        for i in range(n):
+            prenda = Prenda.objects.create(
+                nombre=f'Prenda {i}',
+                descripcion='Test',
+                precio=Decimal('50.00'),
+                marca=self.marca,
+                color='Negro'
+            )
+            prenda.categorias.add(self.categoria)
+            stocks.append(StockPrenda.objects.create(prenda=prenda, talla=self.talla, cantidad=stock))
+            ItemCarrito.objects.create(
+                carrito=self.carrito,
+                prenda=prenda,
+                talla=self.talla,
+                cantidad=cantidad,
+                precio_unitario=prenda.precio
+            )
+        return stocks
+    
+    def checkout(self):
+        return self.client.post(reverse('pedido-checkout'), {
+            'direccion_envio_id': str(self.direccion.id),
+            'metodo_pago': 'efectivo'
+        }, format='json')
+    
+    def test_checkout_reduce_stock_en_lote(self):
+        """Test: El checkout crea los detalles y descuenta el stock de cada item"""
+        stocks = self.agregar_items(3)
+        
+        response = self.checkout()
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        pedido = Pedido.objects.get(id=response.data['pedido']['id'])
+        assert pedido.detalles.count() == 3
+        assert pedido.total == Decimal('310.00')
+        detalle = pedido.detalles.first()
+        assert detalle.subtotal == Decimal('100.00')
+        assert detalle.producto_snapshot['nombre'].startswith('Prenda')
+        for stock in stocks:
+            stock.refresh_from_db()
+            assert stock.cantidad == 8
+    
+    def test_checkout_stock_insuficiente_no_modifica_nada(self):
+        """Test: Si un item no tiene stock no se crea el pedido ni se toca el stock"""
+        stocks = self.agregar_items(2)
+        StockPrenda.objects.filter(pk=stocks[1].pk).update(cantidad=1)
+        
+        response = self.checkout()
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert len(response.data['items_invalidos']) == 1
+        assert Pedido.objects.count() == 0
+        stocks[0].refresh_from_db()
+        assert stocks[0].cantidad == 10
+    
+    def test_consultas_no_crecen_con_los_items(self):
+        """Test: El costo en consultas del checkout no depende del tamaño del carrito"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        def consultas_checkout(n):
+            Pedido.objects.all().delete()
+            ItemCarrito.objects.all().delete()
+            self.agregar_items(n)
+            with CaptureQueriesContext(connection) as ctx:
+                assert self.checkout().status_code == status.HTTP_201_CREATED
+            # Solo la reserva: el stock_total que calcula el serializer de la
+            # respuesta y los UPDATE condicionales (uno por item) se excluyen
+            return [
+                q['sql'] for q in ctx.captured_queries
+                if ('stock_prenda' in q['sql'] or 'detalle_pedido' in q['sql'])
+                and not q['sql'].startswith('UPDATE') and 'SUM(' not in q['sql']
+            ]
+        
+        pocas = consultas_checkout(2)
+        muchas = consultas_checkout(10)
+        
+        assert len(muchas) == len(pocas)
+    
+    def test_reducir_stock_no_vende_de_mas(self):
+        """Test: reducir_stock no descuenta si el stock de la BD ya no alcanza"""
+        stock = self.agregar_items(1, stock=5)[0]
+        copia = StockPrenda.objects.get(pk=stock.pk)
+        
+        assert stock.reducir_stock(4) is True
+        assert copia.reducir_stock(4) is False
+        
+        copia.refresh_from_db()
+        assert copia.cantidad == 1
+    
+    def test_listado_paginacion_cursor(self):
+        """Test: El modo cursor recorre todos los pedidos aunque compartan created_at"""
+        from django.utils import timezone
+        
+        for _ in range(12):
+            Pedido.objects.create(
+                usuario=self.cliente,
+                direccion_envio=self.direccion,
+                subtotal=Decimal('50.00'),
+                total=Decimal('50.00')
+            )
+        # Empates en created_at: el cursor desempata por id
+        Pedido.objects.filter(
+            pk__in=list(Pedido.objects.values_list('pk', flat=True)[:8])
+        ).update(created_at=timezone.now())
+        url = reverse('pedido-list')
+        
+        response = self.client.get(url, {'paginacion': 'cursor', 'page_size': 5})
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+        
+        ids = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids.extend(item['id'] for item in response.data['results'])
+        
+        assert len(ids) == len(set(ids)) == 12
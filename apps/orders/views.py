@@ -6,8 +6,10 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
 from django.db import transaction
+from django.db.models import Q
 from django.conf import settings
 from decimal import Decimal
+from collections import defaultdict
 from django.http import HttpResponse
 from django.views import View
 
@@ -17,9 +19,26 @@ from .serializers import (
     CheckoutSerializer, CambiarEstadoPedidoSerializer, EnvioListSerializer,
     EnvioDetailSerializer
 )
+from apps.core.pagination import OptionalCursorPagination
 from apps.core.permissions import IsAdminUser, IsEmpleadoOrAdmin
 from apps.cart.models import Carrito
-from apps.products.models import StockPrenda
+from apps.cart.store import get_cart_store
+from apps.products.models import Prenda, StockPrenda
+from apps.products.signals import stock_actualizado
+from apps.reports.services.sales_rollup import SalesRollupService
+
+
+class StockInsuficienteError(Exception):
+    """El stock de un item se agotó mientras se procesaba el checkout"""
+    
+    def __init__(self, item):
+        self.detalle = {
+            'prenda': item.prenda.nombre,
+            'talla': item.talla.nombre,
+            'solicitado': item.cantidad,
+            'disponible': 0
+        }
+        super().__init__(f"Stock insuficiente para {item.prenda.nombre} ({item.talla.nombre})")
 
 
 class MetodoPagoViewSet(viewsets.ReadOnlyModelViewSet):
@@ -33,6 +52,7 @@ class PedidoViewSet(viewsets.ModelViewSet):
     """CRUD de pedidos"""
     serializer_class = PedidoListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
     
     def get_queryset(self):
         user = self.request.user
@@ -63,6 +83,11 @@ class PedidoViewSet(viewsets.ModelViewSet):
         metodo_pago_codigo = serializer.validated_data['metodo_pago']
         notas_cliente = serializer.validated_data.get('notas_cliente', '')
         
+        # Con el carrito en Redis, volcarlo a la BD antes de leerlo
+        cart_store = get_cart_store()
+        if cart_store is not None:
+            cart_store.persistir(usuario.id)
+        
         # Obtener carrito del usuario
         try:
             carrito = Carrito.objects.get(usuario=usuario)
@@ -73,41 +98,17 @@ class PedidoViewSet(viewsets.ModelViewSet):
             )
         
         # Verificar que el carrito tenga items
-        items = carrito.items.filter(deleted_at__isnull=True)
-        if not items.exists():
+        items = list(
+            carrito.items.filter(deleted_at__isnull=True).select_related('prenda', 'prenda__marca', 'talla')
+        )
+        if not items:
             return Response(
                 {'error': 'El carrito está vacío'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Verificar stock y calcular totales
-        subtotal = Decimal('0.00')
-        items_invalidos = []
-        
-        for item in items:
-            # Verificar stock
-            stock = StockPrenda.objects.filter(
-                prenda=item.prenda,
-                talla=item.talla
-            ).first()
-            
-            if not stock or stock.cantidad < item.cantidad:
-                items_invalidos.append({
-                    'prenda': item.prenda.nombre,
-                    'talla': item.talla.nombre,
-                    'solicitado': item.cantidad,
-                    'disponible': stock.cantidad if stock else 0
-                })
-            
-            subtotal += item.subtotal
-        
-        if items_invalidos:
-            return Response({
-                'error': 'Stock insuficiente para algunos productos',
-                'items_invalidos': items_invalidos
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
         # Calcular totales
+        subtotal = sum((item.subtotal for item in items), Decimal('0.00'))
         descuento = Decimal('0.00')  # TODO: Aplicar descuentos
         costo_envio = Decimal('10.00')  # TODO: Calcular costo de envío
         total = subtotal - descuento + costo_envio
@@ -122,104 +123,133 @@ class PedidoViewSet(viewsets.ModelViewSet):
             )
         
         # Crear pedido en una transacción
-        with transaction.atomic():
-            # Crear pedido
-            pedido = Pedido.objects.create(
-                usuario=usuario,
-                direccion_envio=direccion_envio,
-                subtotal=subtotal,
-                descuento=descuento,
-                costo_envio=costo_envio,
-                total=total,
-                estado='pendiente',
-                notas_cliente=notas_cliente
-            )
-            
-            # Crear detalles del pedido y reducir stock
-            for item in items:
-                DetallePedido.objects.create(
-                    pedido=pedido,
-                    prenda=item.prenda,
-                    talla=item.talla,
-                    cantidad=item.cantidad,
-                    precio_unitario=item.precio_unitario
-                )
+        try:
+            with transaction.atomic():
+                # Bloquear todas las filas de stock del carrito en una sola consulta
+                stocks = self._bloquear_stocks(items)
                 
-                # Reducir stock
-                stock = StockPrenda.objects.get(
-                    prenda=item.prenda,
-                    talla=item.talla
-                )
-                stock.reducir_stock(item.cantidad)
-            
-            # Procesar pago según el método
-            pago = Pago.objects.create(
-                pedido=pedido,
-                metodo_pago=metodo_pago,
-                monto=total,
-                estado='pendiente'
-            )
-            
-            if metodo_pago_codigo == 'efectivo':
-                # Efectivo: pedido queda pendiente de pago
-                pass
-            
-            elif metodo_pago_codigo == 'billetera':
-                # Descontar de billetera
-                usuario.saldo_billetera -= total
-                usuario.save()
+                items_invalidos = self._validar_stock(items, stocks)
+                if items_invalidos:
+                    return Response({
+                        'error': 'Stock insuficiente para algunos productos',
+                        'items_invalidos': items_invalidos
+                    }, status=status.HTTP_400_BAD_REQUEST)
                 
-                pago.estado = 'completado'
-                pago.transaction_id = f'WALLET-{pedido.numero_pedido}'
-                pago.save()
+                # Crear pedido
+                pedido = Pedido.objects.create(
+                    usuario=usuario,
+                    direccion_envio=direccion_envio,
+                    subtotal=subtotal,
+                    descuento=descuento,
+                    costo_envio=costo_envio,
+                    total=total,
+                    estado='pendiente',
+                    notas_cliente=notas_cliente
+                )
                 
-                pedido.cambiar_estado('pago_recibido', usuario, 'Pago con billetera virtual')
-            
-            elif metodo_pago_codigo == 'tarjeta':
-                # Stripe
-                from .services.stripe_service import StripeService
+                # Crear detalles del pedido en lote
+                imagenes = Prenda.get_imagenes_principales({item.prenda_id for item in items})
+                detalles = []
+                for item in items:
+                    detalle = DetallePedido(
+                        pedido=pedido,
+                        prenda=item.prenda,
+                        talla=item.talla,
+                        cantidad=item.cantidad,
+                        precio_unitario=item.precio_unitario
+                    )
+                    detalle.preparar(imagen=imagenes.get(item.prenda_id))
+                    detalles.append(detalle)
+                DetallePedido.objects.bulk_create(detalles)
                 
-                payment_method_id = serializer.validated_data.get('payment_method_id')
+                # Reducir stock con UPDATE condicional (nunca queda negativo)
+                for item in items:
+                    stock = stocks[(item.prenda_id, item.talla_id)]
+                    if not StockPrenda.reducir(stock.pk, item.cantidad):
+                        raise StockInsuficienteError(item)
+                stock_actualizado.send(
+                    sender=StockPrenda,
+                    prenda_ids=[item.prenda_id for item in items]
+                )
                 
-                stripe_result = StripeService.crear_payment_intent(
+                # Registrar en el agregado de ventas diarias
+                SalesRollupService.registrar_pedido(pedido)
+                            
+                # Procesar pago según el método
+                pago = Pago.objects.create(
+                    pedido=pedido,
+                    metodo_pago=metodo_pago,
                     monto=total,
-                    moneda='usd',
-                    metadata={
-                        'pedido_id': str(pedido.id),
-                        'numero_pedido': pedido.numero_pedido
-                    }
+                    estado='pendiente'
                 )
-                
-                if stripe_result['success']:
-                    pago.stripe_payment_intent_id = stripe_result['payment_intent']['id']
-                    pago.estado = 'procesando'
-                    pago.response_data = {'payment_intent': stripe_result['payment_intent']}
-                    pago.save()
-                else:
-                    raise Exception(f"Error procesando pago: {stripe_result.get('error')}")
-            
-            elif metodo_pago_codigo == 'paypal':
-                # PayPal
-                from .services.paypal_service import PayPalService
-                
-                paypal_order_id = serializer.validated_data.get('paypal_order_id')
-                
-                paypal_service = PayPalService()
-                capture_result = paypal_service.capturar_orden(paypal_order_id)
-                
-                if capture_result['success'] and capture_result['status'] == 'COMPLETED':
-                    pago.paypal_order_id = paypal_order_id
-                    pago.transaction_id = paypal_order_id
+                            
+                if metodo_pago_codigo == 'efectivo':
+                    # Efectivo: pedido queda pendiente de pago
+                    pass
+                            
+                elif metodo_pago_codigo == 'billetera':
+                    # Descontar de billetera
+                    usuario.saldo_billetera -= total
+                    usuario.save()
+                                
                     pago.estado = 'completado'
-                    pago.response_data = capture_result
+                    pago.transaction_id = f'WALLET-{pedido.numero_pedido}'
                     pago.save()
-                    
-                    pedido.cambiar_estado('pago_recibido', usuario, 'Pago con PayPal')
-                else:
-                    raise Exception(f"Error procesando pago PayPal: {capture_result.get('error')}")
-            
-            # Limpiar carrito
-            carrito.limpiar()
+                                
+                    pedido.cambiar_estado('pago_recibido', usuario, 'Pago con billetera virtual')
+                            
+                elif metodo_pago_codigo == 'tarjeta':
+                    # Stripe
+                    from .services.stripe_service import StripeService
+                                
+                    payment_method_id = serializer.validated_data.get('payment_method_id')
+                                
+                    stripe_result = StripeService.crear_payment_intent(
+                        monto=total,
+                        moneda='usd',
+                        metadata={
+                            'pedido_id': str(pedido.id),
+                            'numero_pedido': pedido.numero_pedido
+                        }
+                    )
+                                
+                    if stripe_result['success']:
+                        pago.stripe_payment_intent_id = stripe_result['payment_intent']['id']
+                        pago.estado = 'procesando'
+                        pago.response_data = {'payment_intent': stripe_result['payment_intent']}
+                        pago.save()
+                    else:
+                        raise Exception(f"Error procesando pago: {stripe_result.get('error')}")
+                            
+                elif metodo_pago_codigo == 'paypal':
+                    # PayPal
+                    from .services.paypal_service import PayPalService
+                                
+                    paypal_order_id = serializer.validated_data.get('paypal_order_id')
+                                
+                    paypal_service = PayPalService()
+                    capture_result = paypal_service.capturar_orden(paypal_order_id)
+                                
+                    if capture_result['success'] and capture_result['status'] == 'COMPLETED':
+                        pago.paypal_order_id = paypal_order_id
+                        pago.transaction_id = paypal_order_id
+                        pago.estado = 'completado'
+                        pago.response_data = capture_result
+                        pago.save()
+                                    
+                        pedido.cambiar_estado('pago_recibido', usuario, 'Pago con PayPal')
+                    else:
+                        raise Exception(f"Error procesando pago PayPal: {capture_result.get('error')}")
+                            
+                # Limpiar carrito
+                carrito.limpiar()
+                if cart_store is not None:
+                    transaction.on_commit(lambda: cart_store.descartar(usuario.id))
+        except StockInsuficienteError as e:
+            return Response({
+                'error': 'Stock insuficiente para algunos productos',
+                'items_invalidos': [e.detalle]
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         # Retornar pedido creado
         pedido_serializer = PedidoDetailSerializer(pedido)
@@ -228,6 +258,37 @@ class PedidoViewSet(viewsets.ModelViewSet):
             'pedido': pedido_serializer.data
         }, status=status.HTTP_201_CREATED)
     
+    def _bloquear_stocks(self, items):
+        """
+        Obtener y bloquear (SELECT ... FOR UPDATE) las filas de stock de todos
+        los items en una sola consulta. Se ordenan por id para que checkouts
+        concurrentes tomen los locks en el mismo orden y no haya deadlocks.
+        """
+        filtro = Q()
+        for item in items:
+            filtro |= Q(prenda_id=item.prenda_id, talla_id=item.talla_id)
+        
+        stocks = StockPrenda.objects.select_for_update().filter(filtro).order_by('id')
+        return {(stock.prenda_id, stock.talla_id): stock for stock in stocks}
+    
+    def _validar_stock(self, items, stocks):
+        """Items cuyo stock (ya bloqueado) no alcanza"""
+        solicitado = defaultdict(int)
+        for item in items:
+            solicitado[(item.prenda_id, item.talla_id)] += item.cantidad
+        
+        items_invalidos = []
+        for item in items:
+            stock = stocks.get((item.prenda_id, item.talla_id))
+            if not stock or stock.cantidad < solicitado[(item.prenda_id, item.talla_id)]:
+                items_invalidos.append({
+                    'prenda': item.prenda.nombre,
+                    'talla': item.talla.nombre,
+                    'solicitado': item.cantidad,
+                    'disponible': stock.cantidad if stock else 0
+                })
+        return items_invalidos
+    
     @action(detail=True, methods=['post'])
     def cancelar(self, request, pk=None):
         """Cancelar un pedido"""
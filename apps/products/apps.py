@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.products'
-    verbose_name = 'Catálogo de Productos'
\ No newline at end of file
+    verbose_name = 'Catálogo de Productos'
+
+    def ready(self):
+        import apps.products.receivers
@@ -0,0 +1,140 @@
+"""
+Facetas del catálogo
+
+Cuenta las prendas de un queryset ya filtrado por marca, color, rango de
+precio, disponibilidad, categoría y talla con dos consultas: una agrupada
+sobre las columnas de la prenda y una UNION sobre las tablas M2M.
+"""
+
+from collections import defaultdict
+import hashlib
+import json
+
+from django.db.models import Case, CharField, Count, Exists, OuterRef, Q, Value, When
+
+# Rangos de precio: (etiqueta, mínimo incluido, máximo excluido)
+RANGOS_PRECIO = [
+    ('0-100', 0, 100),
+    ('100-200', 100, 200),
+    ('200-500', 200, 500),
+    ('500+', 500, None),
+]
+
+# Parámetros que no cambian el conjunto de prendas
+PARAMETROS_IGNORADOS = {'page', 'page_size', 'cursor', 'paginacion', 'ordering', 'format'}
+
+
+class PrendaFacets:
+    """
+    Conteo de facetas para un queryset de Prenda.
+    """
+
+    @classmethod
+    def calcular(cls, queryset):
+        """
+        Args:
+            queryset: QuerySet de Prenda con los filtros del listado
+
+        Returns:
+            dict: {'total', 'marcas', 'colores', 'precios', 'disponibilidad',
+                'categorias', 'tallas'}; cada faceta es una lista de
+                {'id'/'valor', 'nombre', 'cantidad'}
+        """
+        from .models import Prenda, StockPrenda
+
+        ids = queryset.order_by().values('pk')
+        rango = Case(
+            *[
+                When(Q(precio__gte=minimo) & (Q(precio__lt=maximo) if maximo else Q()), then=Value(etiqueta))
+                for etiqueta, minimo, maximo in RANGOS_PRECIO
+            ],
+            output_field=CharField()
+        )
+        filas = Prenda.objects.filter(pk__in=ids).annotate(
+            rango_precio=rango,
+            en_stock=Exists(StockPrenda.objects.filter(prenda=OuterRef('pk'), cantidad__gt=0))
+        ).values(
+            'marca_id', 'marca__nombre', 'color', 'rango_precio', 'en_stock'
+        ).annotate(cantidad=Count('id')).order_by()
+
+        total = 0
+        marcas = defaultdict(int)
+        nombres_marca = {}
+        colores = defaultdict(int)
+        precios = defaultdict(int)
+        disponibilidad = defaultdict(int)
+        for fila in filas:
+            total += fila['cantidad']
+            marcas[fila['marca_id']] += fila['cantidad']
+            nombres_marca[fila['marca_id']] = fila['marca__nombre']
+            colores[fila['color']] += fila['cantidad']
+            precios[fila['rango_precio']] += fila['cantidad']
+            disponibilidad[bool(fila['en_stock'])] += fila['cantidad']
+
+        return {
+            'total': total,
+            'marcas': cls._ordenar([
+                {'id': str(marca_id), 'nombre': nombres_marca[marca_id], 'cantidad': cantidad}
+                for marca_id, cantidad in marcas.items()
+            ]),
+            'colores': cls._ordenar([
+                {'valor': color, 'nombre': color, 'cantidad': cantidad}
+                for color, cantidad in colores.items()
+            ]),
+            'precios': [
+                {'valor': etiqueta, 'min': minimo, 'max': maximo, 'cantidad': precios.get(etiqueta, 0)}
+                for etiqueta, minimo, maximo in RANGOS_PRECIO
+            ],
+            'disponibilidad': {
+                'con_stock': disponibilidad.get(True, 0),
+                'sin_stock': disponibilidad.get(False, 0),
+            },
+            **cls._facetas_m2m(ids),
+        }
+
+    @classmethod
+    def _facetas_m2m(cls, ids):
+        """Categorías y tallas en una sola consulta (UNION ALL)"""
+        from .models import Prenda
+
+        categorias = Prenda.categorias.through.objects.filter(
+            prenda_id__in=ids, categoria__deleted_at__isnull=True
+        ).values(
+            'categoria_id', 'categoria__nombre'
+        ).annotate(faceta=Value('categorias'), cantidad=Count('prenda_id')).order_by()
+        tallas = Prenda.tallas_disponibles.through.objects.filter(
+            prenda_id__in=ids, talla__deleted_at__isnull=True
+        ).values(
+            'talla_id', 'talla__nombre'
+        ).annotate(faceta=Value('tallas'), cantidad=Count('prenda_id')).order_by()
+
+        facetas = {'categorias': [], 'tallas': []}
+        for faceta_id, nombre, faceta, cantidad in categorias.union(tallas, all=True).values_list(
+            'categoria_id', 'categoria__nombre', 'faceta', 'cantidad'
+        ):
+            facetas[faceta].append({'id': str(faceta_id), 'nombre': nombre, 'cantidad': cantidad})
+
+        return {faceta: cls._ordenar(valores) for faceta, valores in facetas.items()}
+
+    @staticmethod
+    def _ordenar(valores):
+        return sorted(valores, key=lambda valor: (-valor['cantidad'], valor['nombre']))
+
+    @staticmethod
+    def cache_key(query_params, alcance=''):
+        """
+        Clave de cache por hash de los filtros (sin paginación ni orden).
+
+        Args:
+            query_params: QueryDict del request
+            alcance: Distingue conjuntos visibles distintos (p. ej. staff)
+        """
+        filtros = {
+            clave: sorted(query_params.getlist(clave))
+            for clave in query_params
+            if clave not in PARAMETROS_IGNORADOS
+        }
+        digest = hashlib.md5(
+            json.dumps([alcance, filtros], sort_keys=True).encode()
+        ).hexdigest()[:16]
+        return f'catalogo:facets:{digest}'
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:30
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    """Índice GIN y carga inicial del tsvector (solo Postgres)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS prenda_search_vector_gin ON prenda USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        "UPDATE prenda SET search_vector = "
+        "setweight(to_tsvector('spanish', coalesce(nombre, '')), 'A') || "
+        "setweight(to_tsvector('spanish', coalesce(descripcion, '')), 'B') || "
+        "setweight(to_tsvector('spanish', coalesce(color, '')), 'C')"
+    )
+
+
+def eliminar_indice_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS prenda_search_vector_gin")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="prenda",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name="Índice de búsqueda"
+            ),
+        ),
+        migrations.RunPython(crear_indice_busqueda, eliminar_indice_busqueda),
+    ]
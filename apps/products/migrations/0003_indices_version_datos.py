@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0002_prenda_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="categoria",
+            index=models.Index(
+                fields=["updated_at"], name="categoria_updated_0a82f3_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="categoria",
+            index=models.Index(
+                fields=["deleted_at"], name="categoria_deleted_515765_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="marca",
+            index=models.Index(fields=["updated_at"], name="marca_updated_d3911d_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="marca",
+            index=models.Index(fields=["deleted_at"], name="marca_deleted_1dd591_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="prenda",
+            index=models.Index(fields=["updated_at"], name="prenda_updated_1b31b4_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="prenda",
+            index=models.Index(fields=["deleted_at"], name="prenda_deleted_86fb77_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="stockprenda",
+            index=models.Index(
+                fields=["updated_at"], name="stock_prend_updated_64bf99_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stockprenda",
+            index=models.Index(
+                fields=["deleted_at"], name="stock_prend_deleted_5b76d6_idx"
+            ),
+        ),
+    ]
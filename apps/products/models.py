@@ -1,6 +1,10 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from apps.core.models import BaseModel
 from apps.core.constants import TALLAS, COLORES
+from .signals import stock_actualizado
 
 
 class Categoria(BaseModel):
@@ -15,6 +19,10 @@ class Categoria(BaseModel):
         verbose_name = 'Categoría'
         verbose_name_plural = 'Categorías'
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['deleted_at']),
+        ]
     
     def __str__(self):
         return self.nombre
@@ -31,6 +39,10 @@ class Marca(BaseModel):
         verbose_name = 'Marca'
         verbose_name_plural = 'Marcas'
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['deleted_at']),
+        ]
     
     def __str__(self):
         return self.nombre
@@ -75,6 +87,9 @@ class Prenda(BaseModel):
     slug = models.SlugField(max_length=250, unique=True, blank=True, verbose_name='Slug')
     metadata = models.JSONField(default=dict, blank=True, verbose_name='Metadata')
     
+    # Búsqueda de texto completo (tsvector en Postgres, ver products.search)
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name='Índice de búsqueda')
+    
     class Meta:
         db_table = 'prenda'
         verbose_name = 'Prenda'
@@ -84,6 +99,8 @@ class Prenda(BaseModel):
             models.Index(fields=['slug']),
             models.Index(fields=['activa', '-created_at']),
             models.Index(fields=['destacada', '-created_at']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['deleted_at']),
         ]
     
     def __str__(self):
@@ -100,6 +117,11 @@ class Prenda(BaseModel):
                 counter += 1
             self.slug = slug
         super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'nombre', 'descripcion', 'color'} & set(update_fields):
+            from .search import PrendaSearch
+            PrendaSearch.actualizar([self.pk], using=kwargs.get('using') or self._state.db)
     
     @property
     def imagen_principal(self):
@@ -112,6 +134,43 @@ class Prenda(BaseModel):
             return primera_disponible.imagen_url
         return None
     
+    @staticmethod
+    def get_imagenes_principales(prenda_ids):
+        """
+        Imagen principal de varias prendas en una sola consulta
+        (misma regla que `imagen_principal`).
+        
+        Returns:
+            dict: {prenda_id: imagen_url}
+        """
+        imagenes = {}
+        for prenda_id, imagen_url in ImagenPrendaURL.objects.filter(
+            prenda_id__in=prenda_ids
+        ).order_by('prenda_id', '-es_principal', 'orden').values_list('prenda_id', 'imagen_url'):
+            imagenes.setdefault(prenda_id, imagen_url)
+        return imagenes
+    
+    @staticmethod
+    def anotar_resumen(queryset):
+        """
+        Anota en el queryset el stock total (`stock_cantidad`) y la imagen
+        principal (`imagen_principal_url`) con subconsultas, para que los
+        serializers no consulten stock e imágenes prenda por prenda.
+        """
+        stock = StockPrenda.objects.filter(
+            prenda=models.OuterRef('pk')
+        ).order_by().values('prenda').annotate(
+            total=models.Sum('cantidad')
+        ).values('total')
+        imagen = ImagenPrendaURL.objects.filter(
+            prenda=models.OuterRef('pk')
+        ).order_by('-es_principal', 'orden').values('imagen_url')[:1]
+        
+        return queryset.annotate(
+            stock_cantidad=Coalesce(models.Subquery(stock), 0),
+            imagen_principal_url=models.Subquery(imagen)
+        )
+    
     @property
     def stock_total(self):
         """Calcula el stock total sumando todos los stocks por talla"""
@@ -137,6 +196,8 @@ class StockPrenda(BaseModel):
         unique_together = [['prenda', 'talla']]
         indexes = [
             models.Index(fields=['prenda', 'talla']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['deleted_at']),
         ]
     
     def __str__(self):
@@ -148,17 +209,41 @@ class StockPrenda(BaseModel):
         return self.cantidad <= self.stock_minimo
     
     def reducir_stock(self, cantidad):
-        """Reduce el stock de manera segura"""
-        if self.cantidad >= cantidad:
-            self.cantidad -= cantidad
-            self.save()
-            return True
-        return False
+        """
+        Reduce el stock de manera atómica: el UPDATE solo se aplica si
+        la cantidad disponible en la BD alcanza (no hay sobreventa aunque
+        otro proceso haya modificado el stock).
+        """
+        if not StockPrenda.reducir(self.pk, cantidad):
+            return False
+        self.refresh_from_db(fields=['cantidad', 'updated_at'])
+        stock_actualizado.send(sender=StockPrenda, prenda_ids=[self.prenda_id])
+        return True
     
     def aumentar_stock(self, cantidad):
-        """Aumenta el stock"""
-        self.cantidad += cantidad
-        self.save()
+        """Aumenta el stock de manera atómica"""
+        StockPrenda.objects.filter(pk=self.pk).update(
+            cantidad=models.F('cantidad') + cantidad,
+            updated_at=timezone.now()
+        )
+        self.refresh_from_db(fields=['cantidad', 'updated_at'])
+        stock_actualizado.send(sender=StockPrenda, prenda_ids=[self.prenda_id])
+    
+    @staticmethod
+    def reducir(stock_id, cantidad):
+        """
+        Descuenta `cantidad` con un UPDATE condicional.
+        
+        Returns:
+            bool: False si el stock no alcanzaba (no se modifica nada)
+        """
+        return StockPrenda.objects.filter(
+            pk=stock_id,
+            cantidad__gte=cantidad
+        ).update(
+            cantidad=models.F('cantidad') - cantidad,
+            updated_at=timezone.now()
+        ) == 1
 
 class ImagenPrendaURL(BaseModel):
     """Imágenes de prendas almacenadas como URLs (para S3)"""
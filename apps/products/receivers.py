@@ -0,0 +1,46 @@
+"""
+Receivers del catálogo
+
+Invalidan los grupos 'productos' y 'stock' del cache de generaciones
+(apps/core/cache.py), del que dependen las facetas del catálogo y las
+métricas de analytics. Viven aparte de signals.py porque models.py importa
+ese módulo para enviar `stock_actualizado`.
+"""
+
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from apps.core.cache import GenerationalCache
+from .models import Categoria, Marca, Prenda, StockPrenda, Talla
+from .signals import stock_actualizado
+
+invalidar = GenerationalCache.invalidate_on_commit
+
+
+@receiver(post_save, sender=Prenda)
+@receiver(post_save, sender=Categoria)
+@receiver(post_save, sender=Marca)
+@receiver(post_save, sender=Talla)
+def catalogo_guardado(sender, instance, **kwargs):
+    """Signal cuando se crea o actualiza una prenda, categoría, marca o talla"""
+    invalidar('productos')
+
+
+@receiver(m2m_changed, sender=Prenda.categorias.through)
+@receiver(m2m_changed, sender=Prenda.tallas_disponibles.through)
+def relaciones_prenda_cambiadas(sender, action, **kwargs):
+    """Signal cuando cambian las categorías o tallas de una prenda"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidar('productos')
+
+
+@receiver(post_save, sender=StockPrenda)
+def stock_guardado(sender, instance, **kwargs):
+    """Signal cuando cambia el stock de una prenda"""
+    invalidar('stock')
+
+
+@receiver(stock_actualizado)
+def stock_actualizado_en_lote(sender, prenda_ids=None, **kwargs):
+    """Signal cuando el stock cambia con updates directos (checkout, cancelaciones)"""
+    invalidar('stock')
@@ -0,0 +1,190 @@
+"""
+Búsqueda de texto completo de prendas
+
+En Postgres la búsqueda usa la columna `search_vector` (tsvector con
+configuración 'spanish' e índice GIN), que se actualiza en `Prenda.save`.
+Pondera nombre (A) sobre descripción (B) y color (C) y ordena por
+`SearchRank`.
+
+En otras bases de datos (SQLite en tests) se usa un índice invertido en
+memoria con la misma ponderación y un stemming simple en español. El índice
+se reconstruye la primera vez que se busca después de modificar una prenda.
+"""
+
+import re
+import threading
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Case, F, FloatField, Value, When
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+# Configuración de texto completo de Postgres
+SEARCH_CONFIG = 'spanish'
+
+# Campo -> (peso de Postgres, valor del peso; los mismos que usa SearchRank)
+CAMPOS_BUSQUEDA = {
+    'nombre': ('A', 1.0),
+    'descripcion': ('B', 0.4),
+    'color': ('C', 0.2),
+}
+
+STOPWORDS = {
+    'a', 'al', 'con', 'de', 'del', 'e', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'o', 'para', 'por', 'sin', 'su', 'sus', 'u', 'un', 'una', 'unos', 'unas', 'y',
+}
+
+SUFIJOS = (
+    'amientos', 'imientos', 'amiento', 'imiento', 'aciones', 'uciones',
+    'idades', 'mente', 'acion', 'ucion', 'idad', 'ables', 'ibles', 'able', 'ible',
+    'istas', 'ista', 'osos', 'osas', 'oso', 'osa', 'es', 's',
+)
+
+
+def normalizar_termino(palabra):
+    """Minúsculas, sin acentos y con stemming simple de sufijos en español"""
+    palabra = unicodedata.normalize('NFKD', palabra.lower())
+    palabra = ''.join(c for c in palabra if not unicodedata.combining(c))
+    for sufijo in SUFIJOS:
+        if palabra.endswith(sufijo) and len(palabra) - len(sufijo) >= 3:
+            palabra = palabra[:-len(sufijo)]
+            break
+    if len(palabra) > 3 and palabra[-1] in 'aeo':
+        palabra = palabra[:-1]
+    return palabra
+
+
+def tokenizar(texto):
+    return [
+        normalizar_termino(palabra)
+        for palabra in re.findall(r'\w+', texto or '')
+        if palabra.lower() not in STOPWORDS
+    ]
+
+
+class PrendaSearch:
+    """
+    Búsqueda rankeada de prendas (Postgres o índice local).
+    """
+
+    _indice = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def usa_postgres(using='default'):
+        return connections[using].vendor == 'postgresql'
+
+    @staticmethod
+    def search_vector():
+        """Expresión tsvector ponderada de una prenda"""
+        vector = None
+        for campo, (peso, _) in CAMPOS_BUSQUEDA.items():
+            parte = SearchVector(campo, weight=peso, config=SEARCH_CONFIG)
+            vector = parte if vector is None else vector + parte
+        return vector
+
+    @classmethod
+    def actualizar(cls, prenda_ids, using='default'):
+        """
+        Recalcular el índice de búsqueda de las prendas indicadas.
+        """
+        if cls.usa_postgres(using):
+            from .models import Prenda
+            Prenda.objects.using(using).filter(pk__in=prenda_ids).update(
+                search_vector=cls.search_vector()
+            )
+        else:
+            cls._indice = None
+
+    @classmethod
+    def buscar(cls, queryset, termino):
+        """
+        Filtrar `queryset` por `termino` y anotar `search_rank`.
+
+        Args:
+            queryset: QuerySet de Prenda
+            termino: Texto buscado (en Postgres admite la sintaxis websearch:
+                "frase exacta", -excluir, or)
+
+        Returns:
+            QuerySet filtrado y anotado (sin ordenar por rank)
+        """
+        if cls.usa_postgres(queryset.db):
+            query = SearchQuery(termino, config=SEARCH_CONFIG, search_type='websearch')
+            return queryset.filter(search_vector=query).annotate(
+                search_rank=SearchRank(F('search_vector'), query)
+            )
+
+        ranking = cls._buscar_local(termino)
+        if not ranking:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+        return queryset.filter(pk__in=list(ranking)).annotate(
+            search_rank=Case(
+                *[When(pk=pk, then=Value(rank)) for pk, rank in ranking.items()],
+                default=Value(0.0),
+                output_field=FloatField()
+            )
+        )
+
+    @classmethod
+    def _buscar_local(cls, termino):
+        """
+        Buscar en el índice en memoria: todas las palabras deben aparecer.
+
+        Returns:
+            dict: {prenda_id: rank}
+        """
+        tokens = set(tokenizar(termino))
+        if not tokens:
+            return {}
+
+        indice = cls._get_indice()
+        ranking = None
+        for token in tokens:
+            postings = indice.get(token, {})
+            if ranking is None:
+                ranking = dict(postings)
+            else:
+                ranking = {pk: rank + postings[pk] for pk, rank in ranking.items() if pk in postings}
+            if not ranking:
+                return {}
+        return ranking
+
+    @classmethod
+    def _get_indice(cls):
+        indice = cls._indice
+        if indice is not None:
+            return indice
+
+        from .models import Prenda
+
+        with cls._lock:
+            if cls._indice is None:
+                indice = {}
+                for fila in Prenda.objects.values('pk', *CAMPOS_BUSQUEDA).iterator():
+                    for campo, (_, peso) in CAMPOS_BUSQUEDA.items():
+                        for token in tokenizar(fila[campo]):
+                            postings = indice.setdefault(token, {})
+                            postings[fila['pk']] = postings.get(fila['pk'], 0.0) + peso
+                cls._indice = indice
+            return cls._indice
+
+
+class PrendaSearchFilter(filters.SearchFilter):
+    """
+    `?search=` con búsqueda de texto completo. Sin `?ordering=` explícito los
+    resultados se ordenan por relevancia, por eso debe ir después de
+    OrderingFilter en `filter_backends`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        termino = request.query_params.get(self.search_param, '').strip()
+        if not termino:
+            return queryset
+
+        queryset = PrendaSearch.buscar(queryset, termino)
+        if api_settings.ORDERING_PARAM in request.query_params:
+            return queryset
+        return queryset.order_by('-search_rank', *queryset.query.order_by)
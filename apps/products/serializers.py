@@ -57,12 +57,31 @@ class StockPrendaSerializer(serializers.ModelSerializer):
         return ret
 
 
-class PrendaListSerializer(serializers.ModelSerializer):
+class ResumenPrendaMixin:
+    """
+    Stock e imagen principal desde las anotaciones de `Prenda.anotar_resumen`;
+    si la prenda no viene anotada se usan las propiedades del modelo.
+    """
+    
+    def get_imagen_principal(self, obj):
+        if hasattr(obj, 'imagen_principal_url'):
+            return obj.imagen_principal_url
+        return obj.imagen_principal
+    
+    def get_stock_total(self, obj):
+        stock = getattr(obj, 'stock_cantidad', None)
+        return obj.stock_total if stock is None else stock
+    
+    def get_tiene_stock(self, obj):
+        return self.get_stock_total(obj) > 0
+
+
+class PrendaListSerializer(ResumenPrendaMixin, serializers.ModelSerializer):
     """Serializer ligero para listados"""
     marca_nombre = serializers.CharField(source='marca.nombre', read_only=True)
-    imagen_principal = serializers.ReadOnlyField()
-    stock_total = serializers.ReadOnlyField()
-    tiene_stock = serializers.ReadOnlyField()
+    imagen_principal = serializers.SerializerMethodField()
+    stock_total = serializers.SerializerMethodField()
+    tiene_stock = serializers.SerializerMethodField()
     tallas_disponibles_detalle = TallaSerializer(source='tallas_disponibles', many=True, read_only=True)
     
     class Meta:
@@ -75,15 +94,15 @@ class PrendaListSerializer(serializers.ModelSerializer):
         ]
 
 
-class PrendaDetailSerializer(serializers.ModelSerializer):
+class PrendaDetailSerializer(ResumenPrendaMixin, serializers.ModelSerializer):
     """Serializer completo para detalles"""
     marca_detalle = MarcaSerializer(source='marca', read_only=True)
     categorias_detalle = CategoriaSerializer(source='categorias', many=True, read_only=True)
     tallas_disponibles_detalle = TallaSerializer(source='tallas_disponibles', many=True, read_only=True)
     imagenes_url = ImagenPrendaURLSerializer(many=True, read_only=True)
     stocks = StockPrendaSerializer(many=True, read_only=True)
-    stock_total = serializers.ReadOnlyField()
-    tiene_stock = serializers.ReadOnlyField()
+    stock_total = serializers.SerializerMethodField()
+    tiene_stock = serializers.SerializerMethodField()
     
     class Meta:
         model = Prenda
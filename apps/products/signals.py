@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Señal enviada cuando el stock cambia con updates directos (F()),
+# que no disparan post_save. Argumentos: prenda_ids
+stock_actualizado = Signal()
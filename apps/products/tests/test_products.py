@@ -2,7 +2,7 @@ import pytest
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from apps.products.models import Categoria, Marca, Talla, Prenda
+from apps.products.models import Categoria, Marca, Talla, Prenda, StockPrenda, ImagenPrendaURL
 from decimal import Decimal
 
 
@@ -83,4 +83,192 @@ class TestProducts:
         response = self.client.get(url, {'search': 'Vestido'})
         
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data['results']) > 0
\ No newline at end of file
+        assert len(response.data['results']) > 0
+    
+    def crear_prendas(self, n):
+        for i in range(n):
+            prenda = Prenda.objects.create(
+                nombre=f'Prenda {i}',
+                descripcion='Test',
+                precio=Decimal('100.00'),
+                marca=self.marca,
+                color='Negro',
+                activa=True
+            )
+            prenda.tallas_disponibles.add(self.talla)
+            StockPrenda.objects.create(prenda=prenda, talla=self.talla, cantidad=i)
+            ImagenPrendaURL.objects.create(prenda=prenda, imagen_url=f'https://img/{i}-a.jpg', orden=0)
+            ImagenPrendaURL.objects.create(prenda=prenda, imagen_url=f'https://img/{i}-p.jpg', orden=1, es_principal=True)
+    
+    def test_listado_usa_anotaciones(self):
+        """Test: Stock e imagen anotados coinciden con las propiedades del modelo"""
+        self.crear_prendas(3)
+        
+        response = self.client.get(reverse('prenda-list'))
+        
+        assert response.status_code == status.HTTP_200_OK
+        for item in response.data['results']:
+            prenda = Prenda.objects.get(id=item['id'])
+            assert item['stock_total'] == prenda.stock_total
+            assert item['tiene_stock'] == prenda.tiene_stock
+            assert item['imagen_principal'] == prenda.imagen_principal
+    
+    def test_listado_consultas_constantes(self):
+        """Test: El número de consultas del listado no depende del tamaño de la página"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        self.crear_prendas(2)
+        with CaptureQueriesContext(connection) as pocas:
+            self.client.get(reverse('prenda-list'))
+        
+        self.crear_prendas(10)
+        with CaptureQueriesContext(connection) as muchas:
+            response = self.client.get(reverse('prenda-list'))
+        
+        assert len(response.data['results']) == 13
+        assert len(muchas.captured_queries) == len(pocas.captured_queries)
+    
+    def test_listado_paginacion_cursor(self):
+        """Test: El modo cursor recorre todas las prendas sin repetir ni COUNT"""
+        self.crear_prendas(24)
+        url = reverse('prenda-list')
+        
+        response = self.client.get(url, {'paginacion': 'cursor', 'page_size': 10})
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+        
+        ids = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids.extend(item['id'] for item in response.data['results'])
+        
+        assert len(ids) == len(set(ids)) == 25
+        
+        # Sin el parámetro se mantiene la paginación por número de página
+        assert 'count' in self.client.get(url).data
+    
+    def test_busqueda_ignora_el_cursor(self):
+        """Test: Con ?search= se pagina por número y se conserva el orden por relevancia"""
+        Prenda.objects.create(
+            nombre='Blusa Casual',
+            descripcion='Combina con cualquier vestido',
+            precio=Decimal('80.00'),
+            marca=self.marca,
+            color='Blanco'
+        )
+        
+        response = self.client.get(reverse('prenda-list'), {'search': 'vestidos', 'paginacion': 'cursor'})
+        
+        assert 'count' in response.data
+        assert [item['nombre'] for item in response.data['results']] == ['Vestido Elegante', 'Blusa Casual']
+    
+    def test_filtrar_con_stock(self):
+        """Test: con_stock=true devuelve una vez cada prenda con stock"""
+        self.crear_prendas(3)
+        
+        response = self.client.get(reverse('prenda-list'), {'con_stock': 'true'})
+        
+        nombres = sorted(item['nombre'] for item in response.data['results'])
+        assert nombres == ['Prenda 1', 'Prenda 2']
+    
+    def test_busqueda_texto_completo(self):
+        """Test: La búsqueda aplica stemming, exige todas las palabras y ordena por relevancia"""
+        Prenda.objects.create(
+            nombre='Blusa Casual',
+            descripcion='Combina con cualquier vestido',
+            precio=Decimal('80.00'),
+            marca=self.marca,
+            color='Blanco'
+        )
+        url = reverse('prenda-list')
+        
+        response = self.client.get(url, {'search': 'vestidos'})
+        nombres = [item['nombre'] for item in response.data['results']]
+        # Coincidencia en el nombre antes que en la descripción
+        assert nombres == ['Vestido Elegante', 'Blusa Casual']
+        
+        response = self.client.get(url, {'search': 'vestido negro'})
+        assert [item['nombre'] for item in response.data['results']] == ['Vestido Elegante']
+        
+        response = self.client.get(url, {'search': 'pantalón'})
+        assert response.data['results'] == []
+    
+    def test_busqueda_se_actualiza_al_guardar(self):
+        """Test: El índice de búsqueda refleja los cambios de Prenda.save"""
+        url = reverse('prenda-list')
+        assert self.client.get(url, {'search': 'enterizo'}).data['results'] == []
+        
+        self.prenda.nombre = 'Enterizo Elegante'
+        self.prenda.save()
+        
+        response = self.client.get(url, {'search': 'enterizos'})
+        assert [item['id'] for item in response.data['results']] == [str(self.prenda.id)]
+    
+    def test_facets_catalogo(self):
+        """Test: Facetas con los filtros actuales en un número fijo de consultas"""
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        cache.clear()
+        self.crear_prendas(3)
+        otra_marca = Marca.objects.create(nombre='Mango')
+        Prenda.objects.create(
+            nombre='Falda', descripcion='Test', precio=Decimal('600.00'),
+            marca=otra_marca, color='Rojo', activa=True
+        ).categorias.add(self.categoria)
+        url = reverse('prenda-facets')
+        
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        
+        assert response.status_code == status.HTTP_200_OK
+        data = response.data
+        assert data['total'] == 5
+        assert data['marcas'][0] == {'id': str(self.marca.id), 'nombre': 'Zara', 'cantidad': 4}
+        assert {c['valor']: c['cantidad'] for c in data['colores']} == {'Negro': 4, 'Rojo': 1}
+        assert {p['valor']: p['cantidad'] for p in data['precios']} == {
+            '0-100': 0, '100-200': 3, '200-500': 1, '500+': 1
+        }
+        # crear_prendas deja la primera prenda con stock 0
+        assert data['disponibilidad'] == {'con_stock': 2, 'sin_stock': 3}
+        assert data['categorias'] == [{'id': str(self.categoria.id), 'nombre': 'Vestidos', 'cantidad': 2}]
+        assert data['tallas'] == [{'id': str(self.talla.id), 'nombre': 'M', 'cantidad': 4}]
+        assert len(ctx.captured_queries) <= 4
+        
+        # Con filtros se cuenta solo el subconjunto
+        response = self.client.get(url, {'marca': str(otra_marca.id)})
+        assert response.data['total'] == 1
+        assert response.data['precios'][3]['cantidad'] == 1
+        
+        # La misma combinación de filtros se sirve desde el cache
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, {'marca': str(otra_marca.id), 'page': 2})
+        # Solo la validación del filtro marca llega a la BD
+        assert not [q for q in ctx.captured_queries if 'prenda' in q['sql']]
+    
+    def test_facets_invalidadas_por_catalogo(self, django_capture_on_commit_callbacks):
+        """Test: Editar categorías/marcas o las relaciones M2M invalida las facetas"""
+        from django.core.cache import cache
+        from apps.core.cache import GenerationalCache
+        
+        cache.clear()
+        generacion = lambda: GenerationalCache._get_generations(('productos',))['productos']
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            self.categoria.nombre = 'Vestidos largos'
+            self.categoria.save()
+        assert generacion() == 1
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            self.marca.save()
+            Talla.objects.create(nombre='L', orden=2)
+        assert generacion() == 3
+        
+        otra = Categoria.objects.create(nombre='Fiesta')
+        with django_capture_on_commit_callbacks(execute=True):
+            self.prenda.categorias.add(otra)
+            self.prenda.tallas_disponibles.clear()
+        assert generacion() == 5
+
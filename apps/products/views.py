@@ -3,15 +3,20 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.conf import settings
+from django.db.models import Q, Exists, OuterRef
 
 from .models import Categoria, Marca, Talla, Prenda, StockPrenda, ImagenPrendaURL
+from .facets import PrendaFacets
+from .search import PrendaSearchFilter
 from .serializers import (
     CategoriaSerializer, MarcaSerializer, TallaSerializer,
     PrendaListSerializer, PrendaDetailSerializer, PrendaCreateUpdateSerializer,
     StockPrendaSerializer, ImagenPrendaURLSerializer
 )
+from apps.core.pagination import OptionalCursorPagination
 from apps.core.permissions import IsAdminUser, IsEmpleadoOrAdmin
+from apps.core.cache import GenerationalCache
 
 
 class CategoriaViewSet(viewsets.ModelViewSet):
@@ -61,11 +66,15 @@ class PrendaViewSet(viewsets.ModelViewSet):
     queryset = Prenda.objects.filter(deleted_at__isnull=True).prefetch_related(
         'marca', 'categorias', 'tallas_disponibles', 'imagenes_url', 'stocks'
     )
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # Acciones serializadas con PrendaListSerializer
+    acciones_listado = ['list', 'destacadas', 'novedades']
+    # PrendaSearchFilter va después de OrderingFilter para ordenar por relevancia
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, PrendaSearchFilter]
     filterset_fields = ['marca', 'categorias', 'color', 'destacada', 'es_novedad', 'activa']
     search_fields = ['nombre', 'descripcion', 'color']
     ordering_fields = ['precio', 'created_at', 'nombre']
-    ordering = ['-created_at']
+    ordering = ['-created_at', 'id']
+    pagination_class = OptionalCursorPagination
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -75,7 +84,7 @@ class PrendaViewSet(viewsets.ModelViewSet):
         return PrendaDetailSerializer
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'search']:
+        if self.action in ['list', 'retrieve', 'search', 'facets']:
             return [AllowAny()]
         return [IsEmpleadoOrAdmin()]
 
@@ -112,6 +121,18 @@ class PrendaViewSet(viewsets.ModelViewSet):
         self.check_object_permissions(self.request, obj)
         return obj
     
+    def ve_inactivas(self):
+        """Empleados/admin pueden ver también los productos inactivos"""
+        user = self.request.user
+        if not user.is_authenticated:
+            return False
+        user_perms = getattr(user, 'permisos_usuario', [])
+        return (
+            user.is_staff or
+            'products.view_prenda' in user_perms or
+            hasattr(user, 'codigo_empleado')
+        )
+    
     def get_queryset(self):
         """
         Personaliza el queryset: empleados/admin ven todos los productos,
@@ -120,18 +141,8 @@ class PrendaViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset()
 
         # Si el usuario es empleado/admin, puede ver todos los productos (activos e inactivos)
-        if self.request.user.is_authenticated:
-            user_perms = getattr(self.request.user, 'permisos_usuario', [])
-            is_staff_or_admin = (
-                self.request.user.is_staff or
-                'products.view_prenda' in user_perms or
-                hasattr(self.request.user, 'codigo_empleado')
-            )
-            if not is_staff_or_admin:
-                # Usuario autenticado sin permisos, solo productos activos
-                queryset = queryset.filter(activa=True)
-        else:
-            # Usuarios no autenticados solo ven productos activos
+        if not self.ve_inactivas():
+            # Usuarios públicos o sin permisos, solo productos activos
             queryset = queryset.filter(activa=True)
 
         # Filtro por rango de precio
@@ -150,10 +161,41 @@ class PrendaViewSet(viewsets.ModelViewSet):
         # Filtro por disponibilidad
         solo_con_stock = self.request.query_params.get('con_stock')
         if solo_con_stock == 'true':
-            queryset = queryset.filter(stocks__cantidad__gt=0).distinct()
+            # EXISTS en lugar de JOIN + DISTINCT
+            queryset = queryset.filter(Exists(
+                StockPrenda.objects.filter(prenda=OuterRef('pk'), cantidad__gt=0)
+            ))
+
+        if self.action == 'facets':
+            return queryset
+
+        # Stock total e imagen principal como subconsultas (sin N+1)
+        queryset = Prenda.anotar_resumen(queryset)
+        if self.action in self.acciones_listado:
+            # El listado no usa las imágenes ni los stocks por talla
+            queryset = queryset.prefetch_related(None).select_related('marca').prefetch_related(
+                'tallas_disponibles'
+            )
 
         return queryset
     
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Conteos por marca, color, rango de precio, disponibilidad, categoría
+        y talla para los filtros actuales (mismos parámetros que el listado).
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        alcance = 'todas' if self.ve_inactivas() else 'activas'
+        
+        data = GenerationalCache.get_or_compute(
+            key=PrendaFacets.cache_key(request.query_params, alcance=alcance),
+            compute=lambda: PrendaFacets.calcular(queryset),
+            ttl=settings.CATALOG_FACETS_CACHE_TTL,
+            groups=('productos', 'stock')
+        )
+        return Response(data)
+    
     @action(detail=False, methods=['get'])
     def destacadas(self, request):
         """Obtener prendas destacadas"""
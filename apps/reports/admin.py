@@ -1,9 +1,32 @@
 """
 Admin para la app de reportes
-
-No hay modelos para mostrar en el admin por ahora.
 """
 
 from django.contrib import admin
+from .models import CachedReport, ReportJob, VentaDiaria
+
+
+@admin.register(VentaDiaria)
+class VentaDiariaAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'categoria', 'estado', 'num_pedidos', 'cantidad_vendida', 'monto_total']
+    list_filter = ['estado', 'categoria']
+    date_hierarchy = 'fecha'
+    readonly_fields = ['fecha', 'categoria', 'estado', 'num_pedidos', 'num_lineas',
+                       'cantidad_vendida', 'monto_total', 'created_at', 'updated_at']
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'origen', 'estado', 'nombre_archivo', 'tamaño', 'usuario', 'created_at', 'finalizado_en']
+    list_filter = ['estado', 'origen', 'created_at']
+    readonly_fields = [
+        'usuario', 'origen', 'parametros', 'estado', 'archivo', 'nombre_archivo', 'mime_type', 'tamaño',
+        'error', 'iniciado_en', 'finalizado_en', 'created_at', 'updated_at'
+    ]
+
 
-# No hay modelos para registrar
+@admin.register(CachedReport)
+class CachedReportAdmin(admin.ModelAdmin):
+    list_display = ['nombre_archivo', 'tamaño', 'usos', 'usado_en', 'created_at']
+    readonly_fields = ['clave', 'archivo', 'nombre_archivo', 'mime_type', 'tamaño', 'usos', 'usado_en',
+                       'created_at', 'updated_at']
@@ -242,13 +242,14 @@ class ReportGeneratorFactory:
         cls._generators[format_type.lower()] = generator_class
 
     @classmethod
-    def create(cls, format_type: str, title: str = "Reporte") -> BaseReportGenerator:
+    def create(cls, format_type: str, title: str = "Reporte", **options) -> BaseReportGenerator:
         """
         Crear un generador del tipo especificado.
 
         Args:
             format_type: Tipo de formato
             title: Título del reporte
+            **options: Opciones propias del generador (p. ej. write_only en Excel)
 
         Returns:
             BaseReportGenerator: Instancia del generador
@@ -263,7 +264,7 @@ class ReportGeneratorFactory:
                 f"Disponibles: {list(cls._generators.keys())}"
             )
 
-        return cls._generators[format_type](title=title, format_type=format_type)
+        return cls._generators[format_type](title=title, format_type=format_type, **options)
 
     @classmethod
     def get_supported_formats(cls) -> List[str]:
@@ -1,13 +1,16 @@
 """
 Generador de Reportes en CSV
 
-Genera archivos CSV simples con datos tabulares.
+Genera archivos CSV simples con datos tabulares. `stream()` escribe las filas
+por bloques a medida que se leen de un iterador, para respuestas
+StreamingHttpResponse sin cargar el reporte completo en memoria.
 """
 
 import csv
 from io import StringIO
+from itertools import chain
 from .base import BaseReportGenerator
-from typing import List, Dict, Any, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,6 +19,9 @@ logger = logging.getLogger(__name__)
 class CSVReportGenerator(BaseReportGenerator):
     """Generador de reportes en CSV"""
 
+    # Filas por bloque en stream()
+    CHUNK_ROWS = 1000
+
     def __init__(self, title="Reporte", format_type="csv", user=None):
         super().__init__(title, format_type)
         self.rows = []
@@ -63,20 +69,59 @@ class CSVReportGenerator(BaseReportGenerator):
         Returns:
             bytes: Contenido del CSV en formato correcto
         """
+        return b''.join(self.stream())
+
+    def stream(self, data: Iterable[Dict[str, Any]] = (), headers: Optional[List[str]] = None) -> Iterator[bytes]:
+        """
+        Generar el CSV por bloques de CHUNK_ROWS filas.
+
+        Escribe primero los encabezados y filas agregados con add_table/
+        add_section y luego `data` con enumeración, consumiéndolo a medida
+        que se escribe.
+
+        Args:
+            data: Iterador de diccionarios (p. ej. QueryBuilder.stream())
+            headers: Columnas de `data` (si no, las claves de la primera fila)
+
+        Yields:
+            bytes: Bloques del CSV en UTF-8, el primero con BOM
+        """
+        filas = iter(data)
+        if headers is None:
+            primera = next(filas, None)
+            if primera is not None:
+                headers = list(primera.keys())
+                filas = chain([primera], filas)
+
         output = StringIO()
         writer = csv.writer(output, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
 
+        # UTF-8 BOM para mejor compatibilidad con Excel
+        output.write('\ufeff')
+
         # Escribir encabezados
-        if self.headers:
-            writer.writerow(self.headers)
+        encabezados = ['#'] + headers if headers else self.headers
+        if encabezados:
+            writer.writerow(encabezados)
 
-        # Escribir filas
+        # Escribir filas agregadas con add_table/add_section
         for row in self.rows:
             writer.writerow(row)
 
-        # Convertir a bytes con UTF-8 BOM para mejor compatibilidad con Excel
-        csv_content = output.getvalue()
-        return '\ufeff'.encode('utf-8') + csv_content.encode('utf-8')
+        # Escribir filas del iterador
+        for idx, row in enumerate(filas, start=1):
+            writer.writerow([str(idx)] + [str(row.get(col, '')) for col in headers])
+            if idx % self.CHUNK_ROWS == 0:
+                yield self._vaciar(output)
+
+        yield self._vaciar(output)
+
+    @staticmethod
+    def _vaciar(output: StringIO) -> bytes:
+        contenido = output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+        return contenido.encode('utf-8')
 
     def save(self, filename: str):
         """Guardar el CSV en un archivo"""
@@ -2,29 +2,79 @@
 Generador de Reportes en Excel
 
 Utiliza openpyxl para generar archivos Excel (.xlsx) con formato.
+
+Con `write_only=True` usa el workbook de solo escritura de openpyxl: las
+filas se escriben a disco a medida que se agregan y la memoria no depende
+del tamaño del reporte. En ese modo las filas de cada hoja solo pueden
+escribirse en orden y `add_table` acepta cualquier iterador de filas.
+Los formatos son estilos con nombre registrados una vez por workbook.
 """
 
+from decimal import Decimal
 from io import BytesIO
+from itertools import chain, islice
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
 from datetime import datetime
 from .base import BaseReportGenerator
-from typing import List, Dict, Any, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+_BORDE = Border(
+    left=Side(style='thin', color='A59383'),
+    right=Side(style='thin', color='A59383'),
+    top=Side(style='thin', color='A59383'),
+    bottom=Side(style='thin', color='A59383')
+)
+_FUENTE_DATOS = Font(name='Arial', size=9)
+_FONDO_ALTERNO = PatternFill(start_color="E2B8AD", end_color="E2B8AD", fill_type="solid")  # cream
+_CENTRADO = Alignment(horizontal="center", vertical="center")
+_IZQUIERDA = Alignment(horizontal="left", vertical="center")
+
+# Estilos con nombre del reporte (se registran en cada workbook)
+ESTILOS = {
+    'reporte_titulo': {
+        'font': Font(size=16, bold=True, color="FFFFFF"),
+        'fill': PatternFill(start_color="3B82F6", end_color="3B82F6", fill_type="solid"),
+        'alignment': _CENTRADO,
+    },
+    'reporte_seccion': {'font': Font(size=12, bold=True)},
+    'reporte_texto': {'alignment': Alignment(wrap_text=True)},
+    'reporte_encabezado': {
+        'font': Font(name='Arial', size=10, bold=True, color="FFFFFF"),
+        'fill': PatternFill(start_color="CFA195", end_color="CFA195", fill_type="solid"),  # color-accent-rose
+        'alignment': _CENTRADO,
+        'border': _BORDE,
+    },
+    'reporte_numero': {'font': _FUENTE_DATOS, 'alignment': _CENTRADO, 'border': _BORDE},
+    'reporte_numero_alterno': {'font': _FUENTE_DATOS, 'alignment': _CENTRADO, 'border': _BORDE, 'fill': _FONDO_ALTERNO},
+    'reporte_dato': {'font': _FUENTE_DATOS, 'alignment': _IZQUIERDA, 'border': _BORDE},
+    'reporte_dato_alterno': {'font': _FUENTE_DATOS, 'alignment': _IZQUIERDA, 'border': _BORDE, 'fill': _FONDO_ALTERNO},
+}
+
 
 class ExcelReportGenerator(BaseReportGenerator):
     """Generador de reportes en Excel usando openpyxl"""
 
-    def __init__(self, title="Reporte", format_type="excel", user=None):
+    # Filas que se miran para estimar el ancho de las columnas
+    WIDTH_SAMPLE_ROWS = 500
+
+    def __init__(self, title="Reporte", format_type="excel", user=None, write_only=False):
         super().__init__(title, format_type)
-        self.workbook = Workbook()
-        self.workbook.remove(self.workbook.active)  # Remover hoja por defecto
+        self.write_only = write_only
+        self.workbook = Workbook(write_only=write_only)
+        if not write_only:
+            self.workbook.remove(self.workbook.active)  # Remover hoja por defecto
+        for nombre, atributos in ESTILOS.items():
+            self.workbook.add_named_style(NamedStyle(name=nombre, **atributos))
         self.current_sheet = None
         self.user = user
+        # Última fila escrita por hoja (solo write_only)
+        self._ultima_fila = {}
 
     def create_sheet(self, sheet_name: str):
         """
@@ -48,13 +98,26 @@ class ExcelReportGenerator(BaseReportGenerator):
             title: Título a agregar
             row: Número de fila
         """
-        cell = sheet.cell(row=row, column=1, value=title)
-        cell.font = Font(size=16, bold=True, color="FFFFFF")
-        cell.fill = PatternFill(start_color="3B82F6", end_color="3B82F6", fill_type="solid")
-        cell.alignment = Alignment(horizontal="center", vertical="center")
+        self._write_row(sheet, row, [(title, 'reporte_titulo')])
 
         # Merge cells para el título (asumiendo 5 columnas)
-        sheet.merge_cells(start_row=row, start_column=1, end_row=row, end_column=5)
+        rango = f'A{row}:{get_column_letter(5)}{row}'
+        if self.write_only:
+            sheet.merged_cells.add(rango)
+        else:
+            sheet.merge_cells(rango)
+
+    def add_key_value_rows(self, sheet, rows: Sequence[Tuple[str, Any]], start_row: int) -> None:
+        """
+        Agregar filas de etiqueta y valor (columnas A y B)
+
+        Args:
+            sheet: Hoja de Excel
+            rows: Pares (etiqueta, valor)
+            start_row: Fila de la primera etiqueta
+        """
+        for row, (label, value) in enumerate(rows, start=start_row):
+            self._write_row(sheet, row, [(label, None), (value, None)])
 
     def add_section(self, title: str, content: str) -> None:
         """
@@ -68,95 +131,105 @@ class ExcelReportGenerator(BaseReportGenerator):
             self.create_sheet("Reporte")
 
         # Encontrar la siguiente fila vacía
-        next_row = self.current_sheet.max_row + 1
-
-        # Agregar título de sección
-        title_cell = self.current_sheet.cell(row=next_row, column=1, value=title)
-        title_cell.font = Font(size=12, bold=True)
-        next_row += 1
+        next_row = self._next_row(self.current_sheet)
 
-        # Agregar contenido
-        content_cell = self.current_sheet.cell(row=next_row, column=1, value=content)
-        content_cell.alignment = Alignment(wrap_text=True)
+        # Agregar título y contenido de sección
+        self._write_row(self.current_sheet, next_row, [(title, 'reporte_seccion')])
+        self._write_row(self.current_sheet, next_row + 1, [(content, 'reporte_texto')])
 
-    def add_table(self, data: List[Dict[str, Any]], headers: Optional[List[str]] = None, start_row: int = 1) -> None:
+    def add_table(self, data: Iterable[Dict[str, Any]], headers: Optional[List[str]] = None, start_row: int = 1) -> int:
         """
         Implementar método abstracto: Agregar una tabla con datos y enumeración.
 
+        El ancho de las columnas se estima con las primeras
+        WIDTH_SAMPLE_ROWS filas, así `data` puede ser un iterador que se
+        consume una sola vez. En modo write_only los anchos solo se aplican
+        si la tabla es lo primero que se escribe en la hoja.
+
         Args:
-            data: Lista de diccionarios con los datos
+            data: Lista o iterador de diccionarios con los datos
             headers: Lista de encabezados (opcional)
             start_row: Fila donde empezar la tabla
+
+        Returns:
+            int: Filas de datos escritas
         """
         if not self.current_sheet:
             self.create_sheet("Datos")
+        sheet = self.current_sheet
 
-        if not data:
-            return
+        filas = iter(data)
+        muestra = list(islice(filas, self.WIDTH_SAMPLE_ROWS))
+        if not muestra:
+            return 0
 
         # Usar headers si están provided, si no extraer del primer diccionario
         if headers is None:
-            headers = list(data[0].keys()) if data else []
-
-        # Agregar columna de enumeración
-        headers_with_enum = ['#'] + headers
-
-        # Estilos para encabezados con colores rose/cream
-        header_font = Font(name='Arial', size=10, bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="CFA195", end_color="CFA195", fill_type="solid")  # color-accent-rose
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        border = Border(
-            left=Side(style='thin', color='A59383'),
-            right=Side(style='thin', color='A59383'),
-            top=Side(style='thin', color='A59383'),
-            bottom=Side(style='thin', color='A59383')
-        )
-
-        # Escribir encabezados
-        for col_idx, header in enumerate(headers_with_enum, start=1):
-            cell = self.current_sheet.cell(row=start_row, column=col_idx, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = border
-
-        # Escribir datos con enumeración
-        data_font = Font(name='Arial', size=9)
-        data_alignment = Alignment(horizontal="left", vertical="center")
-        enum_alignment = Alignment(horizontal="center", vertical="center")
-        
-        for row_idx, row_data in enumerate(data, start=start_row + 1):
-            # Columna de enumeración
-            enum_cell = self.current_sheet.cell(row=row_idx, column=1, value=row_idx - start_row)
-            enum_cell.font = data_font
-            enum_cell.alignment = enum_alignment
-            enum_cell.border = border
-            
-            # Datos
-            for col_idx, header in enumerate(headers, start=2):
-                value = row_data.get(header, '')
-                cell = self.current_sheet.cell(row=row_idx, column=col_idx, value=str(value))
-                cell.font = data_font
-                cell.alignment = data_alignment
-                cell.border = border
-
-                # Alternar colores: blanco y cream (#E2B8AD)
-                if row_idx % 2 == 0:
-                    cell.fill = PatternFill(start_color="E2B8AD", end_color="E2B8AD", fill_type="solid")
-                    enum_cell.fill = PatternFill(start_color="E2B8AD", end_color="E2B8AD", fill_type="solid")
-
-        # Ajustar ancho de columnas
-        self.current_sheet.column_dimensions[get_column_letter(1)].width = 6  # Columna #
-        
+            headers = list(muestra[0].keys())
+
+        # Ajustar ancho de columnas (antes de escribir: requisito de write_only)
+        sheet.column_dimensions[get_column_letter(1)].width = 6  # Columna #
         for col_idx, header in enumerate(headers, start=2):
-            column_letter = get_column_letter(col_idx)
-            max_length = len(str(header))
-            for row_data in data:
-                val_length = len(str(row_data.get(header, '')))
-                if val_length > max_length:
-                    max_length = val_length
-            adjusted_width = min(max_length + 2, 50)  # Máximo 50 caracteres
-            self.current_sheet.column_dimensions[column_letter].width = adjusted_width
+            max_length = max(
+                [len(str(header))] + [len(str(row_data.get(header, ''))) for row_data in muestra]
+            )
+            sheet.column_dimensions[get_column_letter(col_idx)].width = min(max_length + 2, 50)  # Máximo 50 caracteres
+
+        # Escribir encabezados con columna de enumeración
+        self._write_row(sheet, start_row, [(header, 'reporte_encabezado') for header in ['#'] + headers])
+
+        # Escribir datos con enumeración, alternando blanco y cream
+        total = 0
+        for row_idx, row_data in enumerate(chain(muestra, filas), start=start_row + 1):
+            alterno = '_alterno' if row_idx % 2 == 0 else ''
+            self._write_row(sheet, row_idx, [(row_idx - start_row, 'reporte_numero' + alterno)] + [
+                (self._cell_value(row_data.get(header, '')), 'reporte_dato' + alterno)
+                for header in headers
+            ])
+            total += 1
+
+        return total
+
+    @staticmethod
+    def _cell_value(value):
+        """Los números se escriben como números; el resto como texto"""
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            return value
+        return str(value)
+
+    def _next_row(self, sheet) -> int:
+        if self.write_only:
+            return self._ultima_fila.get(sheet.title, 0) + 1
+        return sheet.max_row + 1
+
+    def _write_row(self, sheet, row: int, cells: List[Tuple[Any, Optional[str]]]) -> None:
+        """
+        Escribir (valor, estilo con nombre) desde la columna A de `row`.
+
+        En modo write_only se agregan filas vacías hasta `row`; no se puede
+        volver a una fila ya escrita.
+        """
+        if not self.write_only:
+            for col_idx, (value, style) in enumerate(cells, start=1):
+                cell = sheet.cell(row=row, column=col_idx, value=value)
+                if style:
+                    cell.style = style
+            return
+
+        siguiente = self._next_row(sheet)
+        if row < siguiente:
+            raise ValueError(f"La fila {row} de '{sheet.title}' ya fue escrita (write_only)")
+        for _ in range(row - siguiente):
+            sheet.append([])
+
+        fila = []
+        for value, style in cells:
+            cell = WriteOnlyCell(sheet, value=value)
+            if style:
+                cell.style = style
+            fila.append(cell)
+        sheet.append(fila)
+        self._ultima_fila[sheet.title] = row
 
     def generate(self) -> bytes:
         """
@@ -2,33 +2,75 @@
 Generador de Reportes en PDF
 
 Utiliza ReportLab para generar PDFs con tablas, texto y estilos personalizados.
+
+Las tablas se dividen en bloques `LongTable` de ROWS_PER_CHUNK filas (una
+página aprox.) con el encabezado repetido y anchos de columna calculados
+una sola vez, así el tiempo de maquetado crece linealmente con las filas.
+Se dibujan como máximo `max_rows` filas y se lee una más para saber si el
+listado sigue; el recorte se indica en una nota al pie de la tabla con el
+total que informe quien llama (p. ej. el COUNT de QueryBuilder.stream).
 """
 
 from io import BytesIO
+from itertools import chain, islice
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle, Paragraph, Spacer, PageBreak, Image
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime
 from .base import BaseReportGenerator
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional, Sized
 import logging
 import os
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Estilo de las tablas con colores rose/cream (compartido por todos los bloques)
+ESTILO_TABLA = TableStyle([
+    # Header con color rose (#cfa195)
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#cfa195')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (0, -1), 'CENTER'),  # Columna # centrada
+    ('ALIGN', (1, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+    ('TOPPADDING', (0, 0), (-1, 0), 6),
+    # Datos con fuente Helvetica 9pt
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('TOPPADDING', (0, 1), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 3),
+    # Alternar colores: blanco y cream (#e2b8ad)
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#e2b8ad')]),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#a59383')),
+])
+
 
 class PDFReportGenerator(BaseReportGenerator):
     """Generador de reportes en PDF usando ReportLab"""
 
-    def __init__(self, title="Reporte", format_type="pdf", user=None):
+    # Filas de datos por bloque de tabla (par, para que el alternado de
+    # colores continúe entre bloques)
+    ROWS_PER_CHUNK = 40
+    # Filas usadas para calcular el ancho de las columnas
+    WIDTH_SAMPLE_ROWS = 500
+    # Ancho máximo de una columna (puntos) y relleno horizontal de la celda
+    MAX_COLUMN_WIDTH = 2.5 * inch
+    CELL_PADDING = 12
+    # Filas dibujadas por tabla si no se indica max_rows
+    MAX_ROWS = 5000
+
+    def __init__(self, title="Reporte", format_type="pdf", user=None, max_rows=None):
         super().__init__(title, format_type)
         self.buffer = BytesIO()
         self.page_number = 1
         self.user = user  # Usuario que genera el reporte
+        self.max_rows = max_rows or self.MAX_ROWS
         
         self.doc = SimpleDocTemplate(
             self.buffer,
@@ -146,55 +188,106 @@ class PDFReportGenerator(BaseReportGenerator):
         self.story.append(Paragraph(text, style))
         self.story.append(Spacer(1, 0.05*inch))
 
-    def add_table(self, data: List[Dict[str, Any]], headers: Optional[List[str]] = None) -> None:
+    def add_table(self, data: Iterable[Dict[str, Any]], headers: Optional[List[str]] = None,
+                  total: Optional[int] = None) -> int:
         """
         Implementar método abstracto: Agregar una tabla al reporte con enumeración.
 
+        `data` puede ser un iterador que se consume una sola vez. Se leen
+        como máximo `max_rows` + 1 filas; si hay más de `max_rows` se agrega
+        una nota al pie con `total`, o "más de N filas" si no se conoce.
+
         Args:
-            data: Lista de diccionarios con los datos
+            data: Lista o iterador de diccionarios con los datos
             headers: Lista de encabezados (opcional)
+            total: Filas totales del listado (por defecto len(data) si es una lista)
+
+        Returns:
+            int: Filas totales (`total`), o las dibujadas si no se conoce
         """
-        if not data:
-            return
+        if total is None and isinstance(data, Sized):
+            total = len(data)
+        filas = iter(data)
+        muestra = list(islice(filas, min(self.WIDTH_SAMPLE_ROWS, self.max_rows)))
+        if not muestra:
+            return 0
 
         # Usar headers si están provided, si no extraer del primer diccionario
         if headers is None:
-            headers = list(data[0].keys()) if data else []
+            headers = list(muestra[0].keys())
 
         # Agregar columna de enumeración
-        enum_header = '#'
-        headers_with_enum = [enum_header] + headers
-
-        # Convertir datos a tabla (lista de listas) con enumeración
-        table_data = [headers_with_enum]
-        for idx, row in enumerate(data, start=1):
-            row_data = [str(idx)] + [str(row.get(col, '')) for col in headers]
-            table_data.append(row_data)
-
-        # Crear y estilar la tabla con colores rose/cream
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            # Header con color rose (#cfa195)
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#cfa195')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (0, -1), 'CENTER'),  # Columna # centrada
-            ('ALIGN', (1, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-            ('TOPPADDING', (0, 0), (-1, 0), 6),
-            # Datos con fuente Helvetica 9pt
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('TOPPADDING', (0, 1), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 3),
-            # Alternar colores: blanco y cream (#e2b8ad)
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#e2b8ad')]),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#a59383')),
-        ]))
-
-        self.story.append(table)
-        self.story.append(Spacer(1, 0.15*inch))
+        encabezado = ['#'] + headers
+        anchos = self._column_widths(encabezado, muestra)
+        # Textos que podrían no caber en su columna (ancho máximo por carácter 1 em)
+        seguros = [int((ancho - self.CELL_PADDING) / 9) for ancho in anchos[1:]]
+
+        # Bloques de ROWS_PER_CHUNK filas, cada uno con su encabezado
+        visibles = islice(chain(muestra, filas), self.max_rows)
+        dibujadas = 0
+        while True:
+            bloque = [
+                [str(idx)] + [
+                    self._fit_text(texto, ancho) if len(texto) > seguro else texto
+                    for texto, ancho, seguro in zip(
+                        (str(row.get(col, '')) for col in headers), anchos[1:], seguros
+                    )
+                ]
+                for idx, row in enumerate(islice(visibles, self.ROWS_PER_CHUNK), start=dibujadas + 1)
+            ]
+            if not bloque:
+                break
+            dibujadas += len(bloque)
+            self.story.append(LongTable([encabezado] + bloque, colWidths=anchos, repeatRows=1, style=ESTILO_TABLA))
+
+        # Una fila más que el límite alcanza para saber si hubo recorte
+        recortada = next(filas, None) is not None
+        if recortada:
+            de_total = f"de {total:,}" if total is not None else f"de más de {dibujadas:,}"
+            logger.warning(f"Tabla PDF recortada: {dibujadas} {de_total} filas")
+            self.story.append(Spacer(1, 0.05*inch))
+            self.add_paragraph(
+                f"<i>Se muestran las primeras {dibujadas:,} {de_total} filas. "
+                f"Exporte el reporte en Excel o CSV para ver todas.</i>"
+            )
+        else:
+            self.story.append(Spacer(1, 0.15*inch))
+
+        return total if total is not None else dibujadas
+
+    def _column_widths(self, encabezado: List[str], muestra: List[Dict[str, Any]]) -> List[float]:
+        """
+        Anchos de columna (puntos) según el texto más ancho de la muestra,
+        reducidos proporcionalmente si no caben en el ancho de la página.
+        """
+        columnas = [[encabezado[0], str(self.max_rows)]] + [
+            [header] + [str(row.get(header, '')) for row in muestra] for header in encabezado[1:]
+        ]
+        anchos = [
+            min(
+                max(
+                    stringWidth(textos[0], 'Helvetica-Bold', 10),
+                    max(stringWidth(texto, 'Helvetica', 9) for texto in textos[1:])
+                ) + self.CELL_PADDING,
+                self.MAX_COLUMN_WIDTH
+            )
+            for textos in columnas
+        ]
+
+        total = sum(anchos)
+        if total > self.doc.width:
+            anchos = [ancho * self.doc.width / total for ancho in anchos]
+        return anchos
+
+    def _fit_text(self, texto: str, ancho: float) -> str:
+        """Recortar `texto` con '…' para que quepa en una columna de `ancho` puntos"""
+        disponible = ancho - self.CELL_PADDING
+        if stringWidth(texto, 'Helvetica', 9) <= disponible:
+            return texto
+        disponible -= stringWidth('…', 'Helvetica', 9)
+        while texto and stringWidth(texto, 'Helvetica', 9) > disponible:
+            texto = texto[:int(len(texto) * disponible / stringWidth(texto, 'Helvetica', 9)) or len(texto) - 1]
+        return texto + '…'
 
     def add_spacer(self, height=0.1):
         """Agregar espacio vertical (reducido)"""
@@ -0,0 +1,33 @@
+"""
+Comando de Django para eliminar los reportes generados en segundo plano
+que superan el período de retención (REPORTS_JOB_RETENTION_DAYS). Antes
+marca como error los que quedaron activos pasado REPORTS_JOB_TIMEOUT.
+
+Debe programarse periódicamente (cron):
+
+    python manage.py purge_report_jobs
+    python manage.py purge_report_jobs --days 1
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.reports.services.report_jobs import ReportJobService
+
+
+class Command(BaseCommand):
+    help = 'Elimina los ReportJob terminados y sus archivos pasado el período de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Días de retención (por defecto REPORTS_JOB_RETENTION_DAYS)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Eliminando reportes vencidos...")
+
+        eliminados = ReportJobService.purgar(dias=options['days'])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Reportes eliminados: {eliminados}"))
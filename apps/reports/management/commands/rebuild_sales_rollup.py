@@ -0,0 +1,67 @@
+"""
+Comando de Django para reconstruir el agregado de ventas diarias (VentaDiaria)
+
+Uso:
+    python manage.py rebuild_sales_rollup                     # Todo el histórico
+    python manage.py rebuild_sales_rollup --days 7            # Últimos 7 días
+    python manage.py rebuild_sales_rollup --start 2024-01-01 --end 2024-12-31
+"""
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.reports.services.sales_rollup import SalesRollupService
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el agregado de ventas diarias para un rango de fechas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=str,
+            default=None,
+            help='Fecha inicial inclusive (YYYY-MM-DD)'
+        )
+
+        parser.add_argument(
+            '--end',
+            type=str,
+            default=None,
+            help='Fecha final inclusive (YYYY-MM-DD)'
+        )
+
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Reconstruir solo los últimos N días (ignora --start/--end)'
+        )
+
+    def handle(self, *args, **options):
+        if options['days']:
+            fecha_fin = timezone.localdate()
+            fecha_inicio = fecha_fin - timedelta(days=options['days'] - 1)
+        else:
+            fecha_inicio = self._parse_fecha(options['start'])
+            fecha_fin = self._parse_fecha(options['end'])
+
+        if fecha_inicio and fecha_fin and fecha_inicio > fecha_fin:
+            raise CommandError('--start no puede ser posterior a --end')
+
+        rango = f"{fecha_inicio or 'inicio'} → {fecha_fin or 'hoy'}"
+        self.stdout.write(f"🔄 Reconstruyendo ventas diarias ({rango})...")
+
+        filas = SalesRollupService.rebuild(fecha_inicio, fecha_fin)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Agregado reconstruido: {filas} filas"))
+
+    def _parse_fecha(self, valor):
+        if not valor:
+            return None
+        try:
+            return date.fromisoformat(valor)
+        except ValueError:
+            raise CommandError(f"Fecha inválida: {valor} (formato esperado YYYY-MM-DD)")
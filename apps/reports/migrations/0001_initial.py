@@ -0,0 +1,103 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:19
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="VentaDiaria",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha de creación"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Última actualización"
+                    ),
+                ),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de eliminación"
+                    ),
+                ),
+                ("fecha", models.DateField(verbose_name="Fecha")),
+                (
+                    "categoria",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="Categoría"
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("pendiente", "Pendiente de pago"),
+                            ("pago_recibido", "Pago recibido"),
+                            ("confirmado", "Confirmado"),
+                            ("preparando", "Preparando"),
+                            ("enviado", "Enviado"),
+                            ("entregado", "Entregado"),
+                            ("cancelado", "Cancelado"),
+                            ("reembolsado", "Reembolsado"),
+                        ],
+                        max_length=50,
+                        verbose_name="Estado del pedido",
+                    ),
+                ),
+                (
+                    "num_pedidos",
+                    models.IntegerField(default=0, verbose_name="Número de pedidos"),
+                ),
+                (
+                    "num_lineas",
+                    models.IntegerField(default=0, verbose_name="Líneas de detalle"),
+                ),
+                (
+                    "cantidad_vendida",
+                    models.IntegerField(default=0, verbose_name="Unidades vendidas"),
+                ),
+                (
+                    "monto_total",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="Monto total",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Venta diaria",
+                "verbose_name_plural": "Ventas diarias",
+                "db_table": "venta_diaria",
+                "ordering": ["-fecha", "categoria"],
+                "indexes": [
+                    models.Index(
+                        fields=["categoria", "estado", "fecha"],
+                        name="venta_diari_categor_d23030_idx",
+                    )
+                ],
+                "unique_together": {("fecha", "categoria", "estado")},
+            },
+        ),
+    ]
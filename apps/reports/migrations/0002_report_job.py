@@ -0,0 +1,136 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("reports", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha de creación"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Última actualización"
+                    ),
+                ),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de eliminación"
+                    ),
+                ),
+                (
+                    "origen",
+                    models.CharField(
+                        choices=[("prompt", "Prompt"), ("predefinido", "Predefinido")],
+                        max_length=20,
+                        verbose_name="Origen",
+                    ),
+                ),
+                (
+                    "parametros",
+                    models.JSONField(
+                        default=dict, verbose_name="Parámetros del reporte"
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("pendiente", "Pendiente"),
+                            ("en_proceso", "En proceso"),
+                            ("completado", "Completado"),
+                            ("error", "Error"),
+                        ],
+                        default="pendiente",
+                        max_length=20,
+                        verbose_name="Estado",
+                    ),
+                ),
+                (
+                    "archivo",
+                    models.FileField(
+                        blank=True, upload_to="reports/%Y/%m/", verbose_name="Archivo"
+                    ),
+                ),
+                (
+                    "nombre_archivo",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Nombre del archivo"
+                    ),
+                ),
+                (
+                    "mime_type",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="Tipo MIME"
+                    ),
+                ),
+                (
+                    "tamaño",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Tamaño (bytes)"
+                    ),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="Error")),
+                (
+                    "iniciado_en",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Inicio"),
+                ),
+                (
+                    "finalizado_en",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Fin"),
+                ),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="report_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Solicitado por",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Reporte en segundo plano",
+                "verbose_name_plural": "Reportes en segundo plano",
+                "db_table": "report_job",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["usuario", "-created_at"],
+                        name="report_job_usuario_860ee2_idx",
+                    ),
+                    models.Index(
+                        fields=["estado", "-created_at"],
+                        name="report_job_estado_d2731a_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
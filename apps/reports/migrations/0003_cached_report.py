@@ -0,0 +1,87 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:05
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reports", "0002_report_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CachedReport",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha de creación"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Última actualización"
+                    ),
+                ),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de eliminación"
+                    ),
+                ),
+                (
+                    "clave",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="Clave (SHA-256)"
+                    ),
+                ),
+                (
+                    "archivo",
+                    models.FileField(
+                        upload_to="reports/cache/", verbose_name="Archivo"
+                    ),
+                ),
+                (
+                    "nombre_archivo",
+                    models.CharField(max_length=255, verbose_name="Nombre del archivo"),
+                ),
+                (
+                    "mime_type",
+                    models.CharField(max_length=100, verbose_name="Tipo MIME"),
+                ),
+                (
+                    "tamaño",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Tamaño (bytes)"
+                    ),
+                ),
+                (
+                    "usos",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Usos desde el cache"
+                    ),
+                ),
+                (
+                    "usado_en",
+                    models.DateTimeField(db_index=True, verbose_name="Último uso"),
+                ),
+            ],
+            options={
+                "verbose_name": "Reporte en cache",
+                "verbose_name_plural": "Reportes en cache",
+                "db_table": "cached_report",
+                "ordering": ["-usado_en"],
+            },
+        ),
+    ]
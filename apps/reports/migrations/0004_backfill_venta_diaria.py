@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def reconstruir_agregado(apps, schema_editor):
+    """Poblar venta_diaria con los pedidos existentes al desplegar"""
+    Pedido = apps.get_model('orders', 'Pedido')
+    if not Pedido.objects.exists():
+        return
+
+    # Usa los modelos actuales: el agregado se calcula igual que en
+    # `rebuild_sales_rollup`
+    from apps.reports.services.sales_rollup import SalesRollupService
+    SalesRollupService.rebuild()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reports", "0003_cached_report"),
+        ("orders", "0001_initial"),
+        ("products", "0002_prenda_search_vector"),
+    ]
+
+    operations = [
+        migrations.RunPython(reconstruir_agregado, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reports", "0004_backfill_venta_diaria"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ventadiaria",
+            index=models.Index(
+                fields=["updated_at"], name="venta_diari_updated_5c3df1_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ventadiaria",
+            index=models.Index(
+                fields=["deleted_at"], name="venta_diari_deleted_0a2470_idx"
+            ),
+        ),
+    ]
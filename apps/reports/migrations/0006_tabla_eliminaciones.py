@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:47
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reports", "0005_indices_version_datos"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TablaEliminaciones",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Fecha de creación"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Última actualización"
+                    ),
+                ),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fecha de eliminación"
+                    ),
+                ),
+                (
+                    "tabla",
+                    models.CharField(
+                        max_length=100,
+                        unique=True,
+                        verbose_name="Tabla (app_label.Modelo)",
+                    ),
+                ),
+                (
+                    "eliminaciones",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Filas eliminadas"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Eliminaciones por tabla",
+                "verbose_name_plural": "Eliminaciones por tabla",
+                "db_table": "tabla_eliminaciones",
+            },
+        ),
+    ]
@@ -1,10 +1,148 @@
 """
 Modelos para la app de reportes
 
-Por ahora no necesitamos modelos propios, solo usamos los existentes.
+Los reportes se generan dinámicamente a partir de los datos existentes;
+aquí viven tablas de apoyo (agregados precalculados) y los reportes
+generados en segundo plano.
 """
 
+from django.conf import settings
 from django.db import models
+from apps.core.models import BaseModel
+from apps.core.constants import ESTADOS_PEDIDO
 
-# No hay modelos específicos de reportes por ahora
-# Los reportes se generan dinámicamente a partir de los datos existentes
+
+class VentaDiaria(BaseModel):
+    """
+    Agregado diario de ventas por (fecha, categoría, estado del pedido).
+
+    Las filas con `categoria = CATEGORIA_TOTAL` guardan los totales del pedido
+    completo (monto = Pedido.total, incluye envío y descuentos). Las filas por
+    categoría suman las líneas de detalle cuya prenda tiene esa categoría
+    principal (monto = suma de subtotales).
+
+    Se mantiene de forma incremental desde el checkout y
+    `Pedido.cambiar_estado`; `rebuild_sales_rollup` lo recalcula por rango.
+    """
+    CATEGORIA_TOTAL = ''
+    SIN_CATEGORIA = 'Sin categoría'
+
+    fecha = models.DateField(verbose_name='Fecha')
+    categoria = models.CharField(max_length=100, blank=True, verbose_name='Categoría')
+    estado = models.CharField(max_length=50, choices=ESTADOS_PEDIDO, verbose_name='Estado del pedido')
+
+    num_pedidos = models.IntegerField(default=0, verbose_name='Número de pedidos')
+    num_lineas = models.IntegerField(default=0, verbose_name='Líneas de detalle')
+    cantidad_vendida = models.IntegerField(default=0, verbose_name='Unidades vendidas')
+    monto_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Monto total')
+
+    class Meta:
+        db_table = 'venta_diaria'
+        verbose_name = 'Venta diaria'
+        verbose_name_plural = 'Ventas diarias'
+        ordering = ['-fecha', 'categoria']
+        unique_together = [['fecha', 'categoria', 'estado']]
+        indexes = [
+            models.Index(fields=['categoria', 'estado', 'fecha']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.categoria or 'Total'} ({self.estado})"
+
+
+class ReportJob(BaseModel):
+    """
+    Reporte generado en segundo plano (ver apps/core/jobs.py).
+
+    El archivo se guarda en el storage por defecto (S3 con USE_S3, disco
+    local si no) y se descarga por la API con el id del job.
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+    ESTADOS_ACTIVOS = ['pendiente', 'en_proceso']
+
+    ORIGENES = [
+        ('prompt', 'Prompt'),
+        ('predefinido', 'Predefinido'),
+    ]
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='report_jobs',
+        verbose_name='Solicitado por'
+    )
+    origen = models.CharField(max_length=20, choices=ORIGENES, verbose_name='Origen')
+    parametros = models.JSONField(default=dict, verbose_name='Parámetros del reporte')
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente', verbose_name='Estado')
+    archivo = models.FileField(upload_to='reports/%Y/%m/', blank=True, verbose_name='Archivo')
+    nombre_archivo = models.CharField(max_length=255, blank=True, verbose_name='Nombre del archivo')
+    mime_type = models.CharField(max_length=100, blank=True, verbose_name='Tipo MIME')
+    tamaño = models.PositiveBigIntegerField(default=0, verbose_name='Tamaño (bytes)')
+    error = models.TextField(blank=True, verbose_name='Error')
+    iniciado_en = models.DateTimeField(null=True, blank=True, verbose_name='Inicio')
+    finalizado_en = models.DateTimeField(null=True, blank=True, verbose_name='Fin')
+
+    class Meta:
+        db_table = 'report_job'
+        verbose_name = 'Reporte en segundo plano'
+        verbose_name_plural = 'Reportes en segundo plano'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['usuario', '-created_at']),
+            models.Index(fields=['estado', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"Reporte {self.id} - {self.get_estado_display()}"
+
+
+class CachedReport(BaseModel):
+    """
+    Archivo de reporte ya generado, direccionado por el hash de su
+    configuración, período y versión de los datos (ver
+    services/report_cache.py). Se desalojan los menos usados recientemente
+    cuando el total supera REPORTS_RESULT_CACHE_MAX_BYTES.
+    """
+    clave = models.CharField(max_length=64, unique=True, verbose_name='Clave (SHA-256)')
+    archivo = models.FileField(upload_to='reports/cache/', verbose_name='Archivo')
+    nombre_archivo = models.CharField(max_length=255, verbose_name='Nombre del archivo')
+    mime_type = models.CharField(max_length=100, verbose_name='Tipo MIME')
+    tamaño = models.PositiveBigIntegerField(default=0, verbose_name='Tamaño (bytes)')
+    usos = models.PositiveIntegerField(default=0, verbose_name='Usos desde el cache')
+    usado_en = models.DateTimeField(db_index=True, verbose_name='Último uso')
+
+    class Meta:
+        db_table = 'cached_report'
+        verbose_name = 'Reporte en cache'
+        verbose_name_plural = 'Reportes en cache'
+        ordering = ['-usado_en']
+
+    def __str__(self):
+        return f"{self.nombre_archivo} ({self.clave[:12]})"
+
+
+class TablaEliminaciones(BaseModel):
+    """
+    Contador de borrados físicos por tabla. Forma parte del sello de datos
+    de ReportResultCache: los máximos de updated_at/deleted_at no cambian
+    cuando se borra una fila, este contador sí (ver signals.py).
+    """
+    tabla = models.CharField(max_length=100, unique=True, verbose_name='Tabla (app_label.Modelo)')
+    eliminaciones = models.PositiveBigIntegerField(default=0, verbose_name='Filas eliminadas')
+
+    class Meta:
+        db_table = 'tabla_eliminaciones'
+        verbose_name = 'Eliminaciones por tabla'
+        verbose_name_plural = 'Eliminaciones por tabla'
+
+    def __str__(self):
+        return f"{self.tabla}: {self.eliminaciones}"
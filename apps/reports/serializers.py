@@ -2,8 +2,11 @@
 Serializers para la API de Reportes
 """
 
+from django.urls import reverse
 from rest_framework import serializers
 
+from .models import ReportJob
+
 
 class GenerateReportSerializer(serializers.Serializer):
     """Serializer para generar reportes desde prompts"""
@@ -59,3 +62,65 @@ class AnalyticsSerializer(serializers.Serializer):
         max_value=90,
         help_text="Número de días para actividad reciente"
     )
+
+
+class ReportJobRequestSerializer(serializers.Serializer):
+    """Serializer para encolar un reporte desde un prompt o predefinido"""
+    prompt = serializers.CharField(
+        required=False,
+        help_text="Comando en lenguaje natural (como en /generate/)"
+    )
+    report_type = serializers.ChoiceField(
+        choices=['ventas', 'productos', 'clientes', 'analytics'],
+        required=False,
+        help_text="Tipo de reporte predefinido (como en /predefined/)"
+    )
+    format = serializers.ChoiceField(
+        choices=['pdf', 'excel', 'csv'],
+        required=False,
+        allow_null=True,
+        help_text="Formato del reporte"
+    )
+    filters = serializers.JSONField(
+        required=False,
+        default=dict,
+        help_text="Filtros adicionales del reporte predefinido"
+    )
+
+    def validate(self, attrs):
+        prompt = (attrs.get('prompt') or '').strip()
+        if bool(prompt) == bool(attrs.get('report_type')):
+            raise serializers.ValidationError("Indique un prompt o un report_type (solo uno)")
+        if prompt:
+            attrs['prompt'] = prompt
+        return attrs
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """Serializer para el estado de un reporte en segundo plano"""
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id',
+            'origen',
+            'parametros',
+            'estado',
+            'nombre_archivo',
+            'mime_type',
+            'tamaño',
+            'download_url',
+            'error',
+            'created_at',
+            'iniciado_en',
+            'finalizado_en'
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.estado != 'completado':
+            return None
+        url = reverse('reports-download-job', kwargs={'job_id': obj.id})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
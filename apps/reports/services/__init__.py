@@ -1,13 +1,23 @@
 from .analytics_service import AnalyticsService
+from .analytics_cache import AnalyticsCache
+from .metric_runner import MetricRunner
 from .prompt_parser import PromptParser
 from .query_builder import QueryBuilder
+from .report_cache import ReportResultCache
 from .report_generator_service import ReportGeneratorService
 from .report_generator_service import ReportGeneratorServiceError
+from .report_jobs import ReportJobService
+from .sales_rollup import SalesRollupService
 
 __all__ = [
+    'AnalyticsCache',
     'AnalyticsService',
+    'MetricRunner',
     'PromptParser',
     'QueryBuilder',
     'ReportGeneratorService',
     'ReportGeneratorServiceError',
+    'ReportJobService',
+    'ReportResultCache',
+    'SalesRollupService',
 ]
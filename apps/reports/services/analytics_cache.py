@@ -0,0 +1,66 @@
+"""
+Cache de métricas de Analytics
+
+Cada métrica de AnalyticsService se guarda en el cache de generaciones de
+apps/core/cache.py con su propio TTL y los grupos de datos de los que
+depende; las señales de los modelos invalidan esos grupos y las métricas se
+recalculan en segundo plano mientras se sirve el valor anterior.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+
+from apps.core.cache import GenerationalCache
+from .analytics_service import AnalyticsService
+
+
+class AnalyticsCache(GenerationalCache):
+    """
+    Cache por métrica de AnalyticsService.
+    """
+
+    # Métrica -> (multiplicador del TTL base, grupos de datos de los que depende)
+    METRICS = {
+        'sales_by_month': (1, ('pedidos',)),
+        'products_by_category': (3, ('productos',)),
+        'activity_by_day': (1, ('pedidos',)),
+        'top_selling_products': (2, ('pedidos',)),
+        'sales_by_status': (1, ('pedidos',)),
+        'summary': (1, ('pedidos', 'productos', 'stock', 'usuarios')),
+        'inventory_summary': (1, ('productos', 'stock')),
+        'customer_analytics': (2, ('pedidos', 'usuarios')),
+        'yearly_comparison': (6, ('pedidos', 'productos', 'usuarios')),
+    }
+
+    KEY_PREFIX = 'analytics'
+
+    @classmethod
+    def get_metric(cls, name, **params):
+        """
+        Obtener una métrica de AnalyticsService desde el cache.
+
+        Args:
+            name: Nombre de la métrica (ver METRICS)
+            **params: Argumentos del método get_<name> de AnalyticsService
+
+        Returns:
+            Resultado de la métrica
+        """
+        multiplier, groups = cls.METRICS[name]
+        method = getattr(AnalyticsService, f'get_{name}')
+
+        return cls.get_or_compute(
+            key=cls._make_key(name, params),
+            compute=lambda: method(**params),
+            ttl=settings.ANALYTICS_CACHE_TTL * multiplier,
+            groups=groups
+        )
+
+    @classmethod
+    def _make_key(cls, name, params):
+        digest = hashlib.md5(
+            json.dumps(params, sort_keys=True, default=str).encode()
+        ).hexdigest()[:12]
+        return f'{cls.KEY_PREFIX}:{name}:{digest}'
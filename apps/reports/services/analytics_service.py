@@ -5,13 +5,17 @@ Proporciona métricas y estadísticas del sistema de ventas.
 """
 
 from django.db.models import Count, Sum, Avg, F, Q
+from django.db.models.functions import ExtractMonth, ExtractYear, TruncMonth
 from django.utils import timezone
 from datetime import datetime, timedelta
-from calendar import monthrange
+from decimal import Decimal
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Estados que cuentan como venta efectiva en las series de ventas
+ESTADOS_VENTA = ['pago_recibido', 'confirmado', 'preparando', 'enviado', 'entregado']
+
 
 class AnalyticsService:
     """
@@ -23,39 +27,43 @@ class AnalyticsService:
         """
         Obtener ventas agrupadas por mes.
 
+        Se resuelve con una sola consulta agrupada por mes (TruncMonth) sobre
+        el agregado de ventas diarias; los meses sin pedidos se completan en
+        Python con ceros.
+
         Args:
-            months: Número de meses hacia atrás
+            months: Número de meses hacia atrás (incluye el mes actual)
 
         Returns:
             list: Lista de diccionarios con {month, total_sales, order_count}
         """
-        from apps.orders.models import Pedido
-
-        today = timezone.now()
-        data = []
+        from apps.reports.models import VentaDiaria
 
-        for i in range(months - 1, -1, -1):
-            # Calcular el mes
-            month_date = today - timedelta(days=30*i)
-            month_start = month_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            _, last_day = monthrange(month_date.year, month_date.month)
-            month_end = month_date.replace(day=last_day, hour=23, minute=59, second=59, microsecond=999999)
+        month_starts = AnalyticsService._month_starts(months)
+        if not month_starts:
+            return []
 
-            # Obtener pedidos del mes (solo confirmados y completados)
-            pedidos = Pedido.objects.filter(
-                created_at__gte=month_start,
-                created_at__lte=month_end,
-                estado__in=['pago_recibido', 'confirmado', 'preparando', 'enviado', 'entregado']
-            )
+        rows = VentaDiaria.objects.filter(
+            categoria=VentaDiaria.CATEGORIA_TOTAL,
+            fecha__gte=month_starts[0].date(),
+            estado__in=ESTADOS_VENTA
+        ).annotate(
+            periodo=TruncMonth('fecha')
+        ).values('periodo').annotate(
+            total=Sum('monto_total'),
+            count=Sum('num_pedidos')
+        ).order_by()
 
-            total_sales = pedidos.aggregate(total=Sum('total'))['total'] or 0
-            order_count = pedidos.count()
+        totals = {(row['periodo'].year, row['periodo'].month): row for row in rows}
 
+        data = []
+        for month_start in month_starts:
+            row = totals.get((month_start.year, month_start.month), {})
             data.append({
-                'month': month_date.strftime('%b %Y'),
-                'total_sales': float(total_sales),
-                'order_count': order_count,
-                'date': month_date.isoformat()
+                'month': month_start.strftime('%b %Y'),
+                'total_sales': float(row.get('total') or 0),
+                'order_count': row.get('count', 0),
+                'date': month_start.isoformat()
             })
 
         return data
@@ -122,11 +130,13 @@ class AnalyticsService:
         Returns:
             list: Lista con {status, count, total_amount}
         """
-        from apps.orders.models import Pedido
+        from apps.reports.models import VentaDiaria
 
-        estados = Pedido.objects.values('estado').annotate(
-            count=Count('id'),
-            total_amount=Sum('total')
+        estados = VentaDiaria.objects.filter(
+            categoria=VentaDiaria.CATEGORIA_TOTAL
+        ).values('estado').annotate(
+            count=Sum('num_pedidos'),
+            total_amount=Sum('monto_total')
         ).order_by('-count')
 
         return [{
@@ -140,35 +150,40 @@ class AnalyticsService:
         """
         Obtener actividad del sistema por día (basado en creación de pedidos).
 
+        Una sola consulta sobre el agregado de ventas diarias; los días sin
+        pedidos se completan en Python.
+
         Args:
-            days: Número de días hacia atrás
+            days: Número de días hacia atrás (incluye el día actual)
 
         Returns:
             list: Lista de diccionarios con {day, orders, total_sales}
         """
-        from apps.orders.models import Pedido
+        from apps.reports.models import VentaDiaria
 
-        today = timezone.now()
-        data = []
+        today_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        day_starts = [today_start - timedelta(days=i) for i in range(days - 1, -1, -1)]
+        if not day_starts:
+            return []
 
-        for i in range(days - 1, -1, -1):
-            day = today - timedelta(days=i)
-            day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day.replace(hour=23, minute=59, second=59, microsecond=999999)
+        rows = VentaDiaria.objects.filter(
+            categoria=VentaDiaria.CATEGORIA_TOTAL,
+            fecha__gte=day_starts[0].date()
+        ).values('fecha').annotate(
+            total=Sum('monto_total'),
+            count=Sum('num_pedidos')
+        ).order_by()
 
-            pedidos = Pedido.objects.filter(
-                created_at__gte=day_start,
-                created_at__lte=day_end
-            )
-
-            order_count = pedidos.count()
-            total_sales = pedidos.aggregate(total=Sum('total'))['total'] or 0
+        totals = {row['fecha']: row for row in rows}
 
+        data = []
+        for day_start in day_starts:
+            row = totals.get(day_start.date(), {})
             data.append({
-                'day': day.strftime('%a %d'),
-                'orders': order_count,
-                'total_sales': float(total_sales),
-                'date': day.isoformat()
+                'day': day_start.strftime('%a %d'),
+                'orders': row.get('count', 0),
+                'total_sales': float(row.get('total') or 0),
+                'date': day_start.isoformat()
             })
 
         return data
@@ -181,24 +196,29 @@ class AnalyticsService:
         Returns:
             dict: Diccionario con estadísticas generales
         """
-        from apps.orders.models import Pedido
         from apps.products.models import Prenda
         from apps.accounts.models import User
+        from apps.reports.models import VentaDiaria
 
         today = timezone.now()
         month_ago = today - timedelta(days=30)
         week_ago = today - timedelta(days=7)
 
-        # Pedidos
-        total_orders = Pedido.objects.count()
-        orders_this_month = Pedido.objects.filter(created_at__gte=month_ago).count()
-        orders_this_week = Pedido.objects.filter(created_at__gte=week_ago).count()
-
-        # Ventas
-        total_sales = Pedido.objects.aggregate(total=Sum('total'))['total'] or 0
-        sales_this_month = Pedido.objects.filter(
-            created_at__gte=month_ago
-        ).aggregate(total=Sum('total'))['total'] or 0
+        # Pedidos y ventas (agregado diario, en una sola consulta)
+        pedidos = VentaDiaria.objects.filter(
+            categoria=VentaDiaria.CATEGORIA_TOTAL
+        ).aggregate(
+            total_orders=Sum('num_pedidos'),
+            orders_this_month=Sum('num_pedidos', filter=Q(fecha__gte=timezone.localdate(month_ago))),
+            orders_this_week=Sum('num_pedidos', filter=Q(fecha__gte=timezone.localdate(week_ago))),
+            total_sales=Sum('monto_total'),
+            sales_this_month=Sum('monto_total', filter=Q(fecha__gte=timezone.localdate(month_ago))),
+        )
+        total_orders = pedidos['total_orders'] or 0
+        orders_this_month = pedidos['orders_this_month'] or 0
+        orders_this_week = pedidos['orders_this_week'] or 0
+        total_sales = pedidos['total_sales'] or 0
+        sales_this_month = pedidos['sales_this_month'] or 0
 
         # Productos
         total_products = Prenda.objects.filter(activa=True).count()
@@ -260,7 +280,7 @@ class AnalyticsService:
             dict: Estadísticas de clientes
         """
         from apps.accounts.models import User
-        from apps.orders.models import Pedido
+        from apps.reports.models import VentaDiaria
 
         total_customers = User.objects.filter(rol__nombre='Cliente').count()
 
@@ -278,7 +298,10 @@ class AnalyticsService:
         ).order_by('-order_count').first()
 
         # Valor promedio de pedido
-        avg_order_value = Pedido.objects.aggregate(avg=Avg('total'))['avg'] or 0
+        pedidos = VentaDiaria.objects.filter(
+            categoria=VentaDiaria.CATEGORIA_TOTAL
+        ).aggregate(total=Sum('monto_total'), count=Sum('num_pedidos'))
+        avg_order_value = (pedidos['total'] / pedidos['count']) if pedidos['count'] else 0
 
         return {
             'total_customers': total_customers,
@@ -299,9 +322,9 @@ class AnalyticsService:
         Returns:
             dict: Diccionario con comparativas por año
         """
-        from apps.orders.models import Pedido
         from apps.accounts.models import User
         from apps.products.models import Prenda
+        from apps.reports.models import VentaDiaria
 
         # Fechas de cada año
         year_2024_start = datetime(2024, 1, 1, tzinfo=timezone.utc)
@@ -309,20 +332,37 @@ class AnalyticsService:
         year_2025_start = datetime(2025, 1, 1, tzinfo=timezone.utc)
         year_2025_end = datetime(2025, 12, 31, 23, 59, 59, tzinfo=timezone.utc)
 
-        # VENTAS 2024 vs 2025
-        ventas_2024 = Pedido.objects.filter(
-            created_at__gte=year_2024_start,
-            created_at__lte=year_2024_end
-        )
-        ventas_2025 = Pedido.objects.filter(
-            created_at__gte=year_2025_start,
-            created_at__lte=year_2025_end
-        )
+        # VENTAS 2024 vs 2025 (agregado diario, una sola consulta agrupada por año y mes)
+        meses_nombres = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+        ventas_mensuales = {
+            (row['anio'], row['mes']): row
+            for row in VentaDiaria.objects.filter(
+                categoria=VentaDiaria.CATEGORIA_TOTAL,
+                fecha__year__in=[2024, 2025]
+            ).annotate(
+                anio=ExtractYear('fecha'),
+                mes=ExtractMonth('fecha')
+            ).values('anio', 'mes').annotate(
+                total=Sum('monto_total'),
+                pedidos=Sum('num_pedidos')
+            ).order_by()
+        }
 
-        total_ventas_2024 = ventas_2024.aggregate(total=Sum('total'))['total'] or 0
-        total_ventas_2025 = ventas_2025.aggregate(total=Sum('total'))['total'] or 0
-        pedidos_2024 = ventas_2024.count()
-        pedidos_2025 = ventas_2025.count()
+        ventas_por_mes_2024 = []
+        ventas_por_mes_2025 = []
+        for mes in range(1, 13):
+            for anio, serie in ((2024, ventas_por_mes_2024), (2025, ventas_por_mes_2025)):
+                row = ventas_mensuales.get((anio, mes), {})
+                serie.append({
+                    'mes': meses_nombres[mes - 1],
+                    'total': float(row.get('total') or 0),
+                    'pedidos': row.get('pedidos') or 0
+                })
+
+        total_ventas_2024 = sum((row['total'] or 0 for (anio, _), row in ventas_mensuales.items() if anio == 2024), Decimal('0'))
+        total_ventas_2025 = sum((row['total'] or 0 for (anio, _), row in ventas_mensuales.items() if anio == 2025), Decimal('0'))
+        pedidos_2024 = sum(m['pedidos'] for m in ventas_por_mes_2024)
+        pedidos_2025 = sum(m['pedidos'] for m in ventas_por_mes_2025)
 
         # Calcular cambio porcentual en ventas
         if total_ventas_2024 > 0:
@@ -369,58 +409,14 @@ class AnalyticsService:
             cambio_productos = 100 if productos_2025 > 0 else 0
 
         # TICKET PROMEDIO 2024 vs 2025
-        ticket_promedio_2024 = ventas_2024.aggregate(avg=Avg('total'))['avg'] or 0
-        ticket_promedio_2025 = ventas_2025.aggregate(avg=Avg('total'))['avg'] or 0
+        ticket_promedio_2024 = (total_ventas_2024 / pedidos_2024) if pedidos_2024 else 0
+        ticket_promedio_2025 = (total_ventas_2025 / pedidos_2025) if pedidos_2025 else 0
 
         if ticket_promedio_2024 > 0:
             cambio_ticket = ((ticket_promedio_2025 - ticket_promedio_2024) / ticket_promedio_2024) * 100
         else:
             cambio_ticket = 100 if ticket_promedio_2025 > 0 else 0
 
-        # VENTAS POR MES en ambos años
-        ventas_por_mes_2024 = []
-        ventas_por_mes_2025 = []
-        meses_nombres = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
-
-        for mes in range(1, 13):
-            # 2024
-            mes_start_2024 = datetime(2024, mes, 1, tzinfo=timezone.utc)
-            _, last_day = monthrange(2024, mes)
-            mes_end_2024 = datetime(2024, mes, last_day, 23, 59, 59, tzinfo=timezone.utc)
-
-            ventas_mes_2024 = Pedido.objects.filter(
-                created_at__gte=mes_start_2024,
-                created_at__lte=mes_end_2024
-            ).aggregate(total=Sum('total'))['total'] or 0
-
-            ventas_por_mes_2024.append({
-                'mes': meses_nombres[mes - 1],
-                'total': float(ventas_mes_2024),
-                'pedidos': Pedido.objects.filter(
-                    created_at__gte=mes_start_2024,
-                    created_at__lte=mes_end_2024
-                ).count()
-            })
-
-            # 2025
-            mes_start_2025 = datetime(2025, mes, 1, tzinfo=timezone.utc)
-            _, last_day_2025 = monthrange(2025, mes)
-            mes_end_2025 = datetime(2025, mes, last_day_2025, 23, 59, 59, tzinfo=timezone.utc)
-
-            ventas_mes_2025 = Pedido.objects.filter(
-                created_at__gte=mes_start_2025,
-                created_at__lte=mes_end_2025
-            ).aggregate(total=Sum('total'))['total'] or 0
-
-            ventas_por_mes_2025.append({
-                'mes': meses_nombres[mes - 1],
-                'total': float(ventas_mes_2025),
-                'pedidos': Pedido.objects.filter(
-                    created_at__gte=mes_start_2025,
-                    created_at__lte=mes_end_2025
-                ).count()
-            })
-
         return {
             'year_2024': {
                 'total_ventas': float(total_ventas_2024),
@@ -452,3 +448,18 @@ class AnalyticsService:
             }
         }
 
+    @staticmethod
+    def _month_starts(months):
+        """
+        Inicio (hora local) de los últimos `months` meses calendario,
+        del más antiguo al actual.
+        """
+        current = timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        year, month = current.year, current.month
+        starts = []
+        for _ in range(months):
+            starts.append(current.replace(year=year, month=month))
+            month -= 1
+            if month == 0:
+                year, month = year - 1, 12
+        return list(reversed(starts))
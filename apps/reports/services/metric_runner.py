@@ -0,0 +1,131 @@
+"""
+Ejecución de métricas de Analytics en paralelo
+
+Permite calcular varias métricas independientes a la vez en un pool de
+hilos. Cada hilo usa su propia conexión a la base de datos (Django las
+mantiene por hilo) y la cierra al terminar. Una métrica que falla o excede
+su timeout no invalida al resto: se devuelve como error parcial. El timeout
+es por métrica y corre desde que la métrica arranca, no desde el envío del
+lote.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import logging
+import time
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class MetricRunner:
+    """
+    Ejecutor de métricas independientes con resultados parciales.
+    """
+
+    @classmethod
+    def run(cls, tasks, max_workers=0, timeout=None):
+        """
+        Ejecutar un conjunto de métricas.
+
+        Args:
+            tasks: dict {nombre: callable sin argumentos}
+            max_workers: Hilos a usar (0 = secuencial en el hilo actual)
+            timeout: Segundos máximos por métrica, contados desde que la
+                métrica arranca en un hilo (solo en modo paralelo). Con más
+                métricas que hilos, las que esperan turno no consumen su plazo
+
+        Returns:
+            tuple: (resultados, errores) ambos dict por nombre de métrica;
+                las métricas con error tienen resultado None
+        """
+        if not max_workers:
+            return cls._run_sequential(tasks)
+
+        results = {name: None for name in tasks}
+        errors = {}
+        workers = min(max_workers, len(tasks)) or 1
+        # Nombre -> momento en que la métrica arrancó en su hilo
+        started = {}
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analytics-metric')
+        try:
+            futures = {
+                executor.submit(cls._run_isolated, task, name, started): name
+                for name, task in tasks.items()
+            }
+            pending = set(futures)
+            # Hilos ocupados por métricas abandonadas (no se pueden interrumpir)
+            abandoned = 0
+
+            while pending:
+                done, pending = wait(
+                    pending, timeout=cls._next_deadline(pending, futures, started, timeout),
+                    return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    name = futures[future]
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Error calculando métrica '{name}': {e}", exc_info=e)
+                        errors[name] = str(e)
+
+                if timeout is None:
+                    continue
+
+                now = time.monotonic()
+                for future in list(pending):
+                    name = futures[future]
+                    if name in started and now - started[name] >= timeout and not future.done():
+                        pending.discard(future)
+                        abandoned += 1
+                        logger.warning(f"Métrica '{name}' excedió el timeout de {timeout}s")
+                        errors[name] = f'Tiempo de espera agotado ({timeout}s)'
+
+                if pending and abandoned >= workers:
+                    # Todos los hilos siguen con métricas vencidas: las que
+                    # esperan turno no van a arrancar
+                    for future in pending:
+                        name = futures[future]
+                        future.cancel()
+                        logger.warning(f"Métrica '{name}' sin hilo libre: las anteriores excedieron el timeout")
+                        errors[name] = f'Tiempo de espera agotado ({timeout}s)'
+                    pending = set()
+        finally:
+            # No esperar a las métricas que excedieron el timeout
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results, errors
+
+    @staticmethod
+    def _next_deadline(pending, futures, started, timeout):
+        """Segundos hasta que venza la primera métrica en curso (None = sin límite)"""
+        if timeout is None:
+            return None
+        deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+        if not deadlines:
+            # Ninguna arrancó todavía: revisar de nuevo en un plazo completo
+            return timeout
+        return max(0, min(deadlines) - time.monotonic())
+
+    @classmethod
+    def _run_sequential(cls, tasks):
+        results, errors = {}, {}
+        for name, task in tasks.items():
+            try:
+                results[name] = task()
+            except Exception as e:
+                logger.error(f"Error calculando métrica '{name}': {e}", exc_info=True)
+                results[name] = None
+                errors[name] = str(e)
+        return results, errors
+
+    @staticmethod
+    def _run_isolated(task, name, started):
+        """Ejecutar la métrica (registrando cuándo arranca) y liberar la conexión a BD del hilo"""
+        started[name] = time.monotonic()
+        try:
+            return task()
+        finally:
+            connections.close_all()
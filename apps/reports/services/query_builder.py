@@ -4,13 +4,17 @@ Query Builder Dinámico
 Construye queries de Django ORM basados en la configuración del reporte.
 """
 
-from django.db.models import Q, Count, Sum, Avg, F
+from django.db.models import Q, Count, Sum, Avg, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Filas por lote del cursor al recorrer listados con stream()
+STREAM_CHUNK_SIZE = 2000
+
 
 class QueryBuilderError(Exception):
     """Excepción para errores en construcción de queries"""
@@ -60,35 +64,116 @@ class QueryBuilder:
             raise QueryBuilderError(f"Tipo de reporte no soportado: {report_type}")
 
     @classmethod
-    def _build_sales_report(cls, config: Dict[str, Any]) -> Dict[str, Any]:
-        """Construir reporte de ventas/pedidos"""
-        from apps.orders.models import Pedido, DetallePedido
+    def stream(cls, config: Dict[str, Any], count: bool = False) -> Dict[str, Any]:
+        """
+        Como build(), pero 'data' es un iterador de filas.
+
+        Los listados fila a fila (ventas sin agrupar, logins) se recorren con
+        un cursor por lotes sin cargar el resultado completo en memoria; el
+        resto de reportes son agregados pequeños y se construyen con build().
+
+        Args:
+            config: Configuración del reporte (del PromptParser)
+            count: Contar las filas de los listados por cursor con un COUNT
+                (para quien no las va a leer todas, p. ej. el PDF recortado)
+
+        Returns:
+            dict: {'data': iterador de dicts, 'metadata': dict} (los listados
+                por cursor solo traen 'total_records' con `count`)
+        """
+        report_type = config.get('type')
+        group_by = config.get('group_by', [])
+
+        if report_type == 'ventas' and not {'categoria', 'producto', 'mes', 'cliente'} & set(group_by):
+            queryset = cls._sales_queryset(config)
+            if config.get('limit'):
+                queryset = queryset[:config['limit']]
+            rows = cls._sales_rows(queryset, chunk_size=STREAM_CHUNK_SIZE)
+        elif report_type == 'logins':
+            queryset = cls._logins_queryset(config)
+            rows = cls._login_rows(queryset, chunk_size=STREAM_CHUNK_SIZE)
+        else:
+            result = cls.build(config)
+            return {'data': iter(result['data']), 'metadata': result['metadata']}
+
+        metadata = {
+            'period': cls._period_label(config),
+            'filters_applied': config.get('filters', {}),
+            'grouped_by': group_by
+        }
+        if count:
+            metadata['total_records'] = queryset.count()
+        return {'data': rows, 'metadata': metadata}
+
+    @staticmethod
+    def _period_label(config: Dict[str, Any]) -> str:
+        if config.get('period'):
+            return config['period'].get('label', 'Todo el tiempo')
+        return 'Todo el tiempo'
+
+    @classmethod
+    def _sales_queryset(cls, config: Dict[str, Any]):
+        """Pedidos con período y estado aplicados"""
+        from apps.orders.models import Pedido
 
-        # Iniciar queryset
         queryset = Pedido.objects.all()
 
-        # Aplicar filtros de período
         if config.get('period'):
-            start_date = config['period']['start_date']
-            end_date = config['period']['end_date']
-            # Usar __lt para end_date para excluir el día siguiente
             queryset = queryset.filter(
-                created_at__date__gte=start_date,
-                created_at__date__lte=end_date
+                created_at__date__gte=config['period']['start_date'],
+                created_at__date__lte=config['period']['end_date']
             )
 
-        # Aplicar filtros adicionales
         filters = config.get('filters', {})
         if 'estado' in filters:
             queryset = queryset.filter(estado=filters['estado'])
 
+        return queryset
+
+    @classmethod
+    def _sales_rows(cls, queryset, chunk_size=None) -> Iterator[Dict[str, Any]]:
+        """
+        Filas del listado de pedidos en una sola consulta (cliente por JOIN
+        y cantidad de items por subconsulta). Con `chunk_size` se recorre
+        con .iterator() sin cachear el queryset.
+        """
+        from apps.orders.models import DetallePedido
+
+        items = DetallePedido.objects.filter(
+            pedido=OuterRef('pk')
+        ).order_by().values('pedido').annotate(total=Count('id')).values('total')
+        queryset = queryset.select_related('usuario').annotate(
+            num_items=Coalesce(Subquery(items), 0)
+        )
+        pedidos = queryset.iterator(chunk_size=chunk_size) if chunk_size else queryset
+
+        for pedido in pedidos:
+            yield {
+                'numero_pedido': pedido.numero_pedido,
+                'fecha': pedido.created_at.strftime('%d/%m/%Y %H:%M'),
+                'cliente': pedido.usuario.nombre_completo,
+                'estado': pedido.estado,
+                'total': float(pedido.total),
+                'items': pedido.num_items
+            }
+
+    @classmethod
+    def _build_sales_report(cls, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Construir reporte de ventas/pedidos"""
+        from apps.orders.models import DetallePedido
+
+        # Pedidos con filtros de período y estado
+        queryset = cls._sales_queryset(config)
+
         # Agrupación
         group_by = config.get('group_by', [])
 
         if 'categoria' in group_by:
-            # Agrupar ventas por categoría de productos
+            # Agrupar ventas por categoría de productos (una prenda con varias
+            # categorías suma en todas; por eso no se lee del agregado diario,
+            # que solo guarda la categoría principal)
             from apps.products.models import Categoria
-            
+
             # Obtener ventas por categoría usando los detalles de pedidos
             categorias_ventas = Categoria.objects.filter(activa=True).annotate(
                 total_vendido=Sum(
@@ -108,10 +193,10 @@ class QueryBuilder:
                     filter=Q(prendas__detalles_pedido__pedido__in=queryset)
                 )
             ).filter(total_vendido__isnull=False).order_by('-total_vendido')
-            
+
             if config.get('limit'):
                 categorias_ventas = categorias_ventas[:config['limit']]
-            
+
             data = [{
                 'categoria': cat.nombre,
                 'total_ventas': float(cat.total_vendido or 0),
@@ -142,13 +227,17 @@ class QueryBuilder:
             } for item in detalles_qs]
 
         elif 'mes' in group_by:
-            # Agrupar por mes
-            ventas_por_mes = queryset.extra({
-                'mes': "EXTRACT(month FROM created_at)",
-                'anio': "EXTRACT(year FROM created_at)"
-            }).values('mes', 'anio').annotate(
-                cantidad_pedidos=Count('id'),
-                total_ventas=Sum('total')
+            # Agrupar por mes desde el agregado diario
+            from apps.reports.models import VentaDiaria
+
+            ventas_por_mes = cls._sales_rollup_queryset(config).filter(
+                categoria=VentaDiaria.CATEGORIA_TOTAL
+            ).annotate(
+                anio=ExtractYear('fecha'),
+                mes=ExtractMonth('fecha')
+            ).values('mes', 'anio').annotate(
+                cantidad_pedidos=Sum('num_pedidos'),
+                total_ventas=Sum('monto_total')
             ).order_by('anio', 'mes')
 
             data = [{
@@ -184,14 +273,7 @@ class QueryBuilder:
             if config.get('limit'):
                 queryset = queryset[:config['limit']]
 
-            data = [{
-                'numero_pedido': pedido.numero_pedido,
-                'fecha': pedido.created_at.strftime('%d/%m/%Y %H:%M'),
-                'cliente': pedido.usuario.nombre_completo,
-                'estado': pedido.estado,
-                'total': float(pedido.total),
-                'items': pedido.detalles.count()
-            } for pedido in queryset.select_related('usuario')]
+            data = list(cls._sales_rows(queryset))
 
         # Manejar period None correctamente
         period_label = 'Todo el tiempo'
@@ -210,6 +292,25 @@ class QueryBuilder:
             'metadata': metadata
         }
 
+    @classmethod
+    def _sales_rollup_queryset(cls, config: Dict[str, Any]):
+        """Queryset del agregado de ventas diarias con período y estado aplicados"""
+        from apps.reports.models import VentaDiaria
+
+        queryset = VentaDiaria.objects.all()
+
+        if config.get('period'):
+            queryset = queryset.filter(
+                fecha__gte=config['period']['start_date'],
+                fecha__lte=config['period']['end_date']
+            )
+
+        filters = config.get('filters', {})
+        if 'estado' in filters:
+            queryset = queryset.filter(estado=filters['estado'])
+
+        return queryset
+
     @classmethod
     def _build_products_report(cls, config: Dict[str, Any]) -> Dict[str, Any]:
         """Construir reporte de productos"""
@@ -345,6 +446,21 @@ class QueryBuilder:
     @classmethod
     def _build_logins_report(cls, config: Dict[str, Any]) -> Dict[str, Any]:
         """Construir reporte de logins"""
+        data = list(cls._login_rows(cls._logins_queryset(config)))
+
+        metadata = {
+            'total_records': len(data),
+            'period': config.get('period', {}).get('label', 'Todo el tiempo') if config.get('period') else 'Todo el tiempo',
+        }
+
+        return {
+            'data': data,
+            'metadata': metadata
+        }
+
+    @classmethod
+    def _logins_queryset(cls, config: Dict[str, Any]):
+        """Logins del período, más recientes primero y con el límite aplicado"""
         from apps.accounts.models import LoginAudit
 
         queryset = LoginAudit.objects.all()
@@ -365,23 +481,19 @@ class QueryBuilder:
         if config.get('limit'):
             queryset = queryset[:config['limit']]
 
-        data = [{
-            'usuario': login.user.nombre_completo,
-            'email': login.user.email,
-            'fecha_hora': login.created_at.strftime('%d/%m/%Y %H:%M:%S'),
-            'ip': login.ip_address,
-            'exitoso': 'Sí' if login.success else 'No'
-        } for login in queryset]
-
-        metadata = {
-            'total_records': len(data),
-            'period': config.get('period', {}).get('label', 'Todo el tiempo') if config.get('period') else 'Todo el tiempo',
-        }
-
-        return {
-            'data': data,
-            'metadata': metadata
-        }
+        return queryset
+
+    @staticmethod
+    def _login_rows(queryset, chunk_size=None) -> Iterator[Dict[str, Any]]:
+        logins = queryset.iterator(chunk_size=chunk_size) if chunk_size else queryset
+        for login in logins:
+            yield {
+                'usuario': login.user.nombre_completo,
+                'email': login.user.email,
+                'fecha_hora': login.created_at.strftime('%d/%m/%Y %H:%M:%S'),
+                'ip': login.ip_address,
+                'exitoso': 'Sí' if login.success else 'No'
+            }
 
     @classmethod
     def _build_carts_report(cls, config: Dict[str, Any]) -> Dict[str, Any]:
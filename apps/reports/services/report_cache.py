@@ -0,0 +1,228 @@
+"""
+Cache de archivos de reportes
+
+Un mismo reporte ("ventas del último mes en PDF") se pide muchas veces al
+día. El archivo generado se guarda en el storage por defecto bajo una clave
+SHA-256 de:
+
+1. La configuración normalizada (tipo, formato, filtros, agrupación, límite)
+2. El período resuelto a fechas absolutas (el "último mes" de hoy y el de
+   dentro de un mes dan claves distintas)
+3. El usuario y la organización que se imprimen en el archivo
+4. La versión de los datos: por cada tabla que lee el reporte, máximo de
+   updated_at y de deleted_at (columnas indexadas; cada máximo va en su
+   propia consulta para que sea una lectura del extremo del índice) y la
+   cantidad de borrados físicos registrados en TablaEliminaciones
+
+Si cambia cualquier dato leído cambia la clave, así que una entrada nunca
+se sirve desactualizada; las entradas viejas simplemente dejan de usarse y
+se desalojan por LRU cuando el total supera REPORTS_RESULT_CACHE_MAX_BYTES.
+"""
+
+from datetime import date
+import hashlib
+import json
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class ReportResultCache:
+    """
+    Cache direccionado por contenido de los archivos de reportes.
+    """
+
+    # Cambiar al modificar la salida de los generadores
+    VERSION = 2
+
+    # Tipo de reporte -> tablas que lee (QueryBuilder y AnalyticsService).
+    # Cada tabla debe tener índices en updated_at y deleted_at (data_version)
+    # y sus borrados se cuentan en TablaEliminaciones (signals.py)
+    TABLES = {
+        'ventas': (
+            'orders.Pedido', 'orders.DetallePedido', 'accounts.User', 'reports.VentaDiaria',
+            'products.Prenda', 'products.Categoria',
+        ),
+        'productos': ('products.Prenda', 'products.StockPrenda', 'products.Categoria', 'products.Marca'),
+        'clientes': ('accounts.User', 'accounts.Role', 'orders.Pedido'),
+        'analytics': (
+            'orders.Pedido', 'orders.DetallePedido', 'accounts.User', 'accounts.Role', 'reports.VentaDiaria',
+            'products.Prenda', 'products.StockPrenda', 'products.Categoria',
+        ),
+        'logins': ('accounts.LoginAudit', 'accounts.User'),
+        'carritos': ('cart.Carrito', 'cart.ItemCarrito', 'accounts.User'),
+        'top_productos': ('orders.Pedido', 'orders.DetallePedido', 'products.Prenda', 'products.Categoria'),
+        'top_clientes': ('accounts.User', 'accounts.Role', 'orders.Pedido'),
+        'ingresos': ('orders.Pedido',),
+    }
+
+    # Reportes que dependen de la fecha actual aunque no tengan período
+    RELATIVE_TO_TODAY = {'analytics'}
+
+    @classmethod
+    def enabled(cls):
+        return settings.REPORTS_RESULT_CACHE_MAX_BYTES > 0
+
+    @classmethod
+    def make_key(cls, config, user_name, organization_name):
+        """
+        Clave SHA-256 del archivo que generaría `config`.
+
+        Returns:
+            str: Clave, o None si el tipo de reporte no se cachea
+        """
+        report_type = config.get('type')
+        if report_type not in cls.TABLES:
+            return None
+
+        period = config.get('period')
+        material = {
+            'version': cls.VERSION,
+            'type': report_type,
+            'format': config.get('format'),
+            'filters': config.get('filters') or {},
+            'group_by': sorted(config.get('group_by') or []),
+            'limit': config.get('limit'),
+            'period': {
+                'start_date': period['start_date'].isoformat(),
+                'end_date': period['end_date'].isoformat(),
+                'label': period.get('label', ''),
+            } if period else None,
+            'today': date.today().isoformat() if report_type in cls.RELATIVE_TO_TODAY else None,
+            'pdf_max_rows': settings.REPORTS_PDF_MAX_ROWS if config.get('format') == 'pdf' else None,
+            'user_name': user_name,
+            'organization_name': organization_name,
+            'data': cls.data_version(report_type),
+        }
+        return hashlib.sha256(
+            json.dumps(material, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    @classmethod
+    def data_version(cls, report_type):
+        """
+        Sello de los datos que lee un reporte: (borrados, máx. updated_at,
+        máx. deleted_at) por tabla. Las altas, ediciones y bajas lógicas
+        cambian los máximos; los borrados físicos, el contador.
+
+        Cada máximo se pide por separado: un MAX solo sobre una columna
+        indexada se resuelve leyendo el extremo del índice, mientras que
+        combinado con otros agregados obliga a recorrer la tabla.
+        """
+        from apps.reports.models import TablaEliminaciones
+
+        labels = cls.TABLES[report_type]
+        borrados = dict(
+            TablaEliminaciones.objects.filter(tabla__in=labels).values_list('tabla', 'eliminaciones')
+        )
+        version = {}
+        for label in labels:
+            model = apps.get_model(label)
+            actualizado = model.objects.order_by().aggregate(valor=Max('updated_at'))['valor']
+            eliminado = model.objects.order_by().aggregate(valor=Max('deleted_at'))['valor']
+            version[label] = [borrados.get(label, 0), str(actualizado), str(eliminado)]
+        return version
+
+    @classmethod
+    def tablas(cls):
+        """Todas las tablas que forman parte de algún sello de datos"""
+        return sorted({label for labels in cls.TABLES.values() for label in labels})
+
+    @staticmethod
+    def registrar_eliminacion(label):
+        """
+        Sumar un borrado físico al contador de `label`. Corre dentro de la
+        transacción del borrado, así el sello cambia junto con los datos.
+        """
+        from apps.reports.models import TablaEliminaciones
+
+        actualizadas = TablaEliminaciones.objects.filter(tabla=label).update(
+            eliminaciones=F('eliminaciones') + 1, updated_at=timezone.now()
+        )
+        if not actualizadas:
+            try:
+                with transaction.atomic():
+                    TablaEliminaciones.objects.create(tabla=label, eliminaciones=1)
+            except IntegrityError:
+                TablaEliminaciones.objects.filter(tabla=label).update(
+                    eliminaciones=F('eliminaciones') + 1, updated_at=timezone.now()
+                )
+
+    @classmethod
+    def get(cls, key):
+        """
+        Archivo cacheado de `key`.
+
+        Returns:
+            tuple: (contenido, nombre_archivo, mime_type) o None
+        """
+        from apps.reports.models import CachedReport
+
+        entry = CachedReport.objects.filter(clave=key).first()
+        if entry is None:
+            return None
+
+        try:
+            with entry.archivo.open('rb') as archivo:
+                content = archivo.read()
+        except (FileNotFoundError, OSError) as e:
+            logger.warning(f"Archivo del reporte cacheado {key[:12]} no disponible: {e}")
+            entry.delete()
+            return None
+
+        CachedReport.objects.filter(pk=entry.pk).update(
+            usos=F('usos') + 1, usado_en=timezone.now(), updated_at=timezone.now()
+        )
+        return content, entry.nombre_archivo, entry.mime_type
+
+    @classmethod
+    def put(cls, key, content, filename, mime_type):
+        """
+        Guardar un archivo generado y desalojar los menos usados si el total
+        supera REPORTS_RESULT_CACHE_MAX_BYTES.
+        """
+        from apps.reports.models import CachedReport
+
+        if len(content) > settings.REPORTS_RESULT_CACHE_MAX_BYTES:
+            return
+
+        entry = CachedReport(
+            clave=key,
+            nombre_archivo=filename,
+            mime_type=mime_type,
+            tamaño=len(content),
+            usado_en=timezone.now()
+        )
+        entry.archivo.save(filename, ContentFile(content), save=False)
+        try:
+            entry.save()
+        except IntegrityError:
+            # Otro proceso guardó la misma clave
+            entry.archivo.delete(save=False)
+            return
+
+        cls._evict()
+
+    @classmethod
+    def _evict(cls):
+        from apps.reports.models import CachedReport
+
+        exceso = (CachedReport.objects.aggregate(total=Sum('tamaño'))['total'] or 0) \
+            - settings.REPORTS_RESULT_CACHE_MAX_BYTES
+        if exceso <= 0:
+            return
+
+        for entry in CachedReport.objects.order_by('usado_en').iterator():
+            if exceso <= 0:
+                break
+            entry.archivo.delete(save=False)
+            entry.delete()
+            exceso -= entry.tamaño
+            logger.info(f"Reporte cacheado desalojado: {entry.nombre_archivo} ({entry.tamaño} bytes)")
@@ -6,14 +6,20 @@ Este servicio coordina todo el proceso de generación de reportes:
 2. Construir el query
 3. Obtener los datos
 4. Generar el reporte en el formato deseado
+
+Los archivos generados se reutilizan mientras no cambien los datos que leen
+(ver ReportResultCache).
 """
 
 from io import BytesIO
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Iterator, Tuple
 import logging
 
+from django.conf import settings
+
 from .prompt_parser import PromptParser, PromptParseError
 from .query_builder import QueryBuilder, QueryBuilderError
+from .report_cache import ReportResultCache
 from ..generators import ReportGeneratorFactory
 
 logger = logging.getLogger(__name__)
@@ -35,7 +41,8 @@ class ReportGeneratorService:
         prompt: str,
         user_name: str = "Sistema",
         organization_name: str = "SmartSales365",
-        format_override: str = None
+        format_override: str = None,
+        stream: bool = False
     ) -> Tuple[bytes, str, str]:
         """
         Generar un reporte a partir de un prompt en lenguaje natural.
@@ -45,9 +52,11 @@ class ReportGeneratorService:
             user_name: Nombre del usuario que genera el reporte
             organization_name: Nombre de la organización
             format_override: Formato explícito del select (tiene prioridad sobre el prompt)
+            stream: Devolver los reportes CSV tabulares como iterador de bytes
 
         Returns:
-            tuple: (contenido_archivo, nombre_archivo, mime_type)
+            tuple: (contenido_archivo, nombre_archivo, mime_type); con
+                stream=True el contenido de un CSV tabular es un iterador
 
         Raises:
             ReportGeneratorServiceError: Si hay un error en la generación
@@ -64,37 +73,8 @@ class ReportGeneratorService:
             else:
                 logger.info(f"Formato detectado en el prompt: {config['format']}")
 
-            # 2. Construir query y obtener datos
-            result = QueryBuilder.build(config)
-            data = result['data']
-            metadata = result['metadata']
-
-            # 3. Generar reporte en el formato especificado
-            format_type = config['format']
-            report_title = cls._generate_title(config)
-
-            if config['type'] == 'analytics' and isinstance(data, dict):
-                # Para analytics, generar reporte especial
-                file_content, filename, mime_type = cls._generate_analytics_report(
-                    data,
-                    metadata,
-                    format_type,
-                    user_name,
-                    organization_name
-                )
-            else:
-                # Para otros reportes, generar tabla estándar
-                file_content, filename, mime_type = cls._generate_standard_report(
-                    data,
-                    metadata,
-                    report_title,
-                    format_type,
-                    user_name,
-                    organization_name
-                )
-
-            logger.info(f"Reporte generado exitosamente: {filename}")
-            return file_content, filename, mime_type
+            # 2-3. Obtener datos y generar el archivo (o tomarlo del cache)
+            return cls._generate_from_config(config, user_name, organization_name, stream)
 
         except PromptParseError as e:
             logger.error(f"Error al parsear prompt: {e}")
@@ -106,6 +86,107 @@ class ReportGeneratorService:
             logger.error(f"Error inesperado al generar reporte: {e}", exc_info=True)
             raise ReportGeneratorServiceError(f"Error al generar reporte: {e}")
 
+    @classmethod
+    def _generate_from_config(
+        cls,
+        config: Dict[str, Any],
+        user_name: str,
+        organization_name: str,
+        stream: bool = False
+    ) -> Tuple[bytes, str, str]:
+        """
+        Obtener los datos de `config` y generar el archivo.
+
+        Si ReportResultCache tiene el archivo para la misma configuración,
+        período y versión de los datos se devuelve sin consultar ni generar.
+        Los CSV en streaming no se guardan en el cache.
+        """
+        key = None
+        if ReportResultCache.enabled():
+            key = ReportResultCache.make_key(config, user_name, organization_name)
+            cached = ReportResultCache.get(key) if key else None
+            if cached is not None:
+                logger.info(f"Reporte servido desde el cache: {cached[1]}")
+                return cached
+
+        if stream and cls.can_stream(config):
+            return cls._generate_csv_stream(config)
+
+        # Construir query y obtener datos (Excel y PDF tabulares: filas por cursor;
+        # el PDF no lee más de REPORTS_PDF_MAX_ROWS, así que el total es un COUNT)
+        if cls.reads_by_cursor(config):
+            result = QueryBuilder.stream(config, count=config['format'] == 'pdf')
+        else:
+            result = QueryBuilder.build(config)
+        data = result['data']
+        metadata = result['metadata']
+
+        # Generar reporte en el formato especificado
+        format_type = config['format']
+
+        if config['type'] == 'analytics' and isinstance(data, dict):
+            # Para analytics, generar reporte especial
+            file_content, filename, mime_type = cls._generate_analytics_report(
+                data,
+                metadata,
+                format_type,
+                user_name,
+                organization_name
+            )
+        else:
+            # Para otros reportes, generar tabla estándar
+            file_content, filename, mime_type = cls._generate_standard_report(
+                data,
+                metadata,
+                cls._generate_title(config),
+                format_type,
+                user_name,
+                organization_name
+            )
+
+        logger.info(f"Reporte generado exitosamente: {filename}")
+
+        if key:
+            try:
+                ReportResultCache.put(key, file_content, filename, mime_type)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar el reporte en el cache: {e}")
+
+        return file_content, filename, mime_type
+
+    @staticmethod
+    def can_stream(config: Dict[str, Any]) -> bool:
+        """Los reportes CSV tabulares (todos salvo analytics) se pueden generar por bloques"""
+        return config['format'] == 'csv' and config['type'] != 'analytics'
+
+    @staticmethod
+    def reads_by_cursor(config: Dict[str, Any]) -> bool:
+        """
+        Los reportes Excel (workbook de solo escritura) y PDF (tablas por
+        bloques) tabulares consumen las filas a medida que se leen
+        """
+        return config['format'] in ('excel', 'pdf') and config['type'] != 'analytics'
+
+    @classmethod
+    def _generate_csv_stream(cls, config: Dict[str, Any]) -> Tuple[Iterator[bytes], str, str]:
+        """
+        CSV como iterador de bloques: las filas se leen de la base de datos
+        por lotes mientras se envía la respuesta.
+        """
+        result = QueryBuilder.stream(config)
+        generator = ReportGeneratorFactory.create('csv', title=cls._generate_title(config))
+        filename = generator.get_filename()
+
+        def chunks():
+            try:
+                yield from generator.stream(result['data'])
+            except Exception as e:
+                generator.log_generation(success=False, message=str(e))
+                raise
+            generator.log_generation(message=filename)
+
+        return chunks(), filename, generator.get_mime_type()
+
     @classmethod
     def _generate_title(cls, config: Dict[str, Any]) -> str:
         """Generar título del reporte basado en configuración"""
@@ -135,9 +216,19 @@ class ReportGeneratorService:
         user_name: str,
         organization_name: str
     ) -> Tuple[bytes, str, str]:
-        """Generar reporte estándar con tabla de datos"""
+        """
+        Generar reporte estándar con tabla de datos.
+
+        En Excel y PDF `data` puede ser un iterador (QueryBuilder.stream):
+        el workbook de solo escritura escribe las filas a disco a medida que
+        llegan y el PDF dibuja como máximo REPORTS_PDF_MAX_ROWS filas.
+        """
         # Crear generador del tipo especificado
-        generator = ReportGeneratorFactory.create(format_type, title=title)
+        options = {
+            'excel': {'write_only': True},
+            'pdf': {'max_rows': settings.REPORTS_PDF_MAX_ROWS},
+        }.get(format_type, {})
+        generator = ReportGeneratorFactory.create(format_type, title=title, **options)
 
         if format_type == 'pdf':
             # Agregar título y metadata
@@ -150,30 +241,27 @@ class ReportGeneratorService:
                 generator.add_section("Filtros Aplicados", filters_text)
 
             # Agregar tabla de datos
-            if data:
-                generator.add_table(data)
-            else:
+            total_records = generator.add_table(data, total=metadata.get('total_records'))
+            if not total_records:
                 generator.add_paragraph("No se encontraron datos para los criterios especificados.")
 
             # Agregar resumen
-            generator.add_section("Resumen", f"Total de registros: {metadata.get('total_records', 0)}")
+            generator.add_section("Resumen", f"Total de registros: {total_records}")
 
         elif format_type == 'excel':
             # Crear hoja de resumen
             sheet = generator.create_sheet("Resumen")
             generator.add_title_row(sheet, title)
-
-            sheet['A3'] = 'Generado por:'
-            sheet['B3'] = user_name
-            sheet['A4'] = 'Organización:'
-            sheet['B4'] = organization_name
-            sheet['A5'] = 'Total de registros:'
-            sheet['B5'] = metadata.get('total_records', 0)
+            generator.add_key_value_rows(sheet, [
+                ('Generado por:', user_name),
+                ('Organización:', organization_name),
+            ], start_row=3)
 
             # Crear hoja de datos
-            data_sheet = generator.create_sheet("Datos")
-            if data:
-                generator.add_table(data, start_row=1)
+            generator.create_sheet("Datos")
+            total_records = generator.add_table(data, start_row=1)
+
+            generator.add_key_value_rows(sheet, [('Total de registros:', total_records)], start_row=5)
 
         elif format_type == 'csv':
             # CSV simple con datos
@@ -289,7 +377,8 @@ class ReportGeneratorService:
         format_type: str = 'pdf',
         filters: dict = None,
         user_name: str = "Sistema",
-        organization_name: str = "SmartSales365"
+        organization_name: str = "SmartSales365",
+        stream: bool = False
     ) -> Tuple[bytes, str, str]:
         """
         Generar un reporte predefinido sin usar prompts.
@@ -300,6 +389,7 @@ class ReportGeneratorService:
             filters: Filtros adicionales
             user_name: Nombre del usuario
             organization_name: Nombre de la organización
+            stream: Devolver los reportes CSV tabulares como iterador de bytes
 
         Returns:
             tuple: (contenido_archivo, nombre_archivo, mime_type)
@@ -313,28 +403,4 @@ class ReportGeneratorService:
             'limit': None
         }
 
-        # Construir query y obtener datos
-        result = QueryBuilder.build(config)
-        data = result['data']
-        metadata = result['metadata']
-
-        # Generar reporte
-        title = cls._generate_title(config)
-
-        if report_type == 'analytics' and isinstance(data, dict):
-            return cls._generate_analytics_report(
-                data,
-                metadata,
-                format_type,
-                user_name,
-                organization_name
-            )
-        else:
-            return cls._generate_standard_report(
-                data,
-                metadata,
-                title,
-                format_type,
-                user_name,
-                organization_name
-            )
+        return cls._generate_from_config(config, user_name, organization_name, stream)
@@ -0,0 +1,180 @@
+"""
+Generación de reportes en segundo plano
+
+`POST /api/reports/jobs/` crea un ReportJob y encola `ejecutar_report_job`;
+el worker genera el archivo con ReportGeneratorService, lo guarda en el
+storage por defecto y el cliente lo descarga con el id del job. La
+generación corre en un worker de Celery o en el pool de hilos según
+JOBS_BACKEND (ver apps/core/jobs.py).
+
+Un job que ningún worker toma (cola perdida) o cuyo worker se reinicia a
+mitad de la generación quedaría activo para siempre: `cerrar_vencidos()`
+marca como error los que no cambian hace más de REPORTS_JOB_TIMEOUT
+minutos. Se ejecuta al consultar un job activo y antes de purgar, así
+esos jobs también se eliminan al vencer la retención.
+"""
+
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.jobs import encolar
+from apps.reports.models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+ORGANIZACION = "SmartSales365"
+
+
+class ReportJobService:
+    """
+    Envío y limpieza de reportes en segundo plano.
+    """
+
+    @staticmethod
+    def enviar(usuario=None, origen='prompt', **parametros):
+        """
+        Crear un job de reporte y encolarlo.
+
+        Args:
+            usuario: Usuario que lo solicita
+            origen: 'prompt' (parametros: prompt, format) o 'predefinido'
+                (parametros: report_type, format, filters)
+
+        Returns:
+            ReportJob: El job pendiente
+        """
+        with transaction.atomic():
+            job = ReportJob.objects.create(
+                usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+                origen=origen,
+                parametros=parametros
+            )
+            encolar('apps.reports.services.report_jobs.ejecutar_report_job', str(job.id))
+
+        return job
+
+    @staticmethod
+    def purgar(dias=None):
+        """
+        Eliminar los jobs terminados hace más de `dias` días y sus archivos.
+
+        Args:
+            dias (int): Días de retención (por defecto REPORTS_JOB_RETENTION_DAYS)
+
+        Returns:
+            int: Jobs eliminados
+        """
+        dias = settings.REPORTS_JOB_RETENTION_DAYS if dias is None else dias
+        ReportJobService.cerrar_vencidos()
+        vencidos = ReportJob.objects.exclude(
+            estado__in=ReportJob.ESTADOS_ACTIVOS
+        ).filter(created_at__lt=timezone.now() - timedelta(days=dias))
+
+        eliminados = 0
+        for job in vencidos.iterator():
+            if job.archivo:
+                job.archivo.delete(save=False)
+            job.delete()
+            eliminados += 1
+        return eliminados
+
+    @staticmethod
+    def cerrar_vencidos(minutos=None):
+        """
+        Marcar como error los jobs activos sin cambios hace más de
+        `minutos` minutos (nunca encolados o worker caído).
+
+        Args:
+            minutos (int): Tiempo sin cambios (por defecto REPORTS_JOB_TIMEOUT)
+
+        Returns:
+            int: Jobs cerrados
+        """
+        minutos = settings.REPORTS_JOB_TIMEOUT if minutos is None else minutos
+        ahora = timezone.now()
+        cerrados = ReportJob.objects.filter(
+            estado__in=ReportJob.ESTADOS_ACTIVOS,
+            updated_at__lt=ahora - timedelta(minutes=minutos)
+        ).update(
+            estado='error',
+            error=f'Sin cambios durante más de {minutos} minutos (worker detenido)',
+            finalizado_en=ahora,
+            updated_at=ahora
+        )
+        if cerrados:
+            logger.warning(f"Jobs de reporte vencidos marcados como error: {cerrados}")
+        return cerrados
+
+    @staticmethod
+    def actualizar_vencido(job):
+        """
+        Cerrar `job` si sigue activo pasado REPORTS_JOB_TIMEOUT, para que
+        quien consulta su estado no espere indefinidamente.
+
+        Returns:
+            ReportJob: El mismo job, recargado si se cerró
+        """
+        limite = timezone.now() - timedelta(minutes=settings.REPORTS_JOB_TIMEOUT)
+        if job.estado in ReportJob.ESTADOS_ACTIVOS and job.updated_at < limite:
+            ReportJobService.cerrar_vencidos()
+            job.refresh_from_db()
+        return job
+
+
+def ejecutar_report_job(job_id):
+    """
+    Generar el archivo de un job de reporte (en el worker).
+    """
+    from apps.reports.services.report_generator_service import ReportGeneratorService
+
+    job = ReportJob.objects.select_related('usuario').get(pk=job_id)
+    if job.estado != 'pendiente':
+        logger.warning(f"Job de reporte {job_id} ignorado: estado {job.estado}")
+        return
+
+    job.estado = 'en_proceso'
+    job.iniciado_en = timezone.now()
+    job.save(update_fields=['estado', 'iniciado_en', 'updated_at'])
+
+    user_name = job.usuario.nombre_completo if job.usuario else "Sistema"
+    parametros = job.parametros
+
+    try:
+        if job.origen == 'predefinido':
+            file_content, filename, mime_type = ReportGeneratorService.generate_predefined_report(
+                report_type=parametros['report_type'],
+                format_type=parametros.get('format', 'pdf'),
+                filters=parametros.get('filters') or {},
+                user_name=user_name,
+                organization_name=ORGANIZACION
+            )
+        else:
+            file_content, filename, mime_type = ReportGeneratorService.generate_from_prompt(
+                prompt=parametros['prompt'],
+                user_name=user_name,
+                organization_name=ORGANIZACION,
+                format_override=parametros.get('format')
+            )
+        job.archivo.save(filename, ContentFile(file_content), save=False)
+    except Exception as e:
+        logger.error(f"Error en el job de reporte {job_id}: {e}", exc_info=True)
+        job.estado = 'error'
+        job.error = str(e)
+        job.finalizado_en = timezone.now()
+        job.save(update_fields=['estado', 'error', 'finalizado_en', 'updated_at'])
+        return
+
+    job.estado = 'completado'
+    job.nombre_archivo = filename
+    job.mime_type = mime_type
+    job.tamaño = len(file_content)
+    job.finalizado_en = timezone.now()
+    job.save(update_fields=[
+        'estado', 'archivo', 'nombre_archivo', 'mime_type', 'tamaño', 'finalizado_en', 'updated_at'
+    ])
+    logger.info(f"Job de reporte {job_id} completado: {filename} ({job.tamaño} bytes)")
@@ -0,0 +1,226 @@
+"""
+Servicio del agregado diario de ventas (VentaDiaria)
+
+Mantiene la tabla `venta_diaria` de forma incremental a medida que se crean
+pedidos y cambian de estado, y permite reconstruirla para un rango de fechas.
+Los dashboards, reportes y el entrenamiento del modelo leen de aquí en lugar
+de recorrer `pedido` y `detalle_pedido` completos.
+
+El checkout (`registrar_pedido`) y `Pedido.cambiar_estado` (`mover_pedido`)
+la actualizan al momento. Las bajas de pedidos y las ediciones desde el
+admin recalculan el día afectado al confirmar la transacción
+(`recalcular_dia`). Lo que se cargue por otros caminos (seeders,
+importaciones, updates directos) requiere `rebuild_sales_rollup`.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SalesRollupService:
+    """
+    Operaciones de mantenimiento del agregado de ventas diarias.
+    """
+
+    @staticmethod
+    def get_categorias_principales(prenda_ids=None):
+        """
+        Resolver la categoría principal (primera por nombre) de cada prenda.
+
+        Args:
+            prenda_ids: Prendas a resolver (None = todas)
+
+        Returns:
+            dict: {prenda_id: nombre_categoria}
+        """
+        from apps.products.models import Prenda
+
+        relaciones = Prenda.categorias.through.objects.order_by('prenda_id', 'categoria__nombre')
+        if prenda_ids is not None:
+            relaciones = relaciones.filter(prenda_id__in=prenda_ids)
+
+        categorias = {}
+        for prenda_id, nombre in relaciones.values_list('prenda_id', 'categoria__nombre'):
+            categorias.setdefault(prenda_id, nombre)
+        return categorias
+
+    @classmethod
+    def registrar_pedido(cls, pedido):
+        """
+        Sumar un pedido recién creado (con sus detalles) al agregado,
+        bajo su estado actual.
+        """
+        fecha, contribuciones = cls._get_contribuciones(pedido)
+        cls._aplicar(fecha, pedido.estado, contribuciones, signo=1)
+
+    @classmethod
+    def mover_pedido(cls, pedido, estado_anterior, estado_nuevo):
+        """
+        Mover la contribución de un pedido de un estado a otro.
+        """
+        if estado_anterior == estado_nuevo:
+            return
+
+        fecha, contribuciones = cls._get_contribuciones(pedido)
+        cls._aplicar(fecha, estado_anterior, contribuciones, signo=-1)
+        cls._aplicar(fecha, estado_nuevo, contribuciones, signo=1)
+
+    @classmethod
+    def recalcular_dia(cls, pedido):
+        """
+        Recalcular desde los pedidos el día de `pedido` cuando se confirme
+        la transacción actual (bajas y ediciones fuera del checkout).
+        """
+        fecha = timezone.localtime(pedido.created_at).date()
+        transaction.on_commit(lambda: cls.rebuild(fecha, fecha))
+
+    @classmethod
+    def rebuild(cls, fecha_inicio=None, fecha_fin=None):
+        """
+        Recalcular el agregado desde los pedidos para un rango de fechas.
+
+        Args:
+            fecha_inicio: Fecha inicial inclusive (None = sin límite)
+            fecha_fin: Fecha final inclusive (None = sin límite)
+
+        Returns:
+            int: Número de filas generadas
+        """
+        from apps.orders.models import Pedido, DetallePedido
+        from apps.reports.models import VentaDiaria
+
+        pedidos = Pedido.objects.all()
+        rollup = VentaDiaria.objects.all()
+        if fecha_inicio:
+            pedidos = pedidos.filter(created_at__date__gte=fecha_inicio)
+            rollup = rollup.filter(fecha__gte=fecha_inicio)
+        if fecha_fin:
+            pedidos = pedidos.filter(created_at__date__lte=fecha_fin)
+            rollup = rollup.filter(fecha__lte=fecha_fin)
+
+        filas = defaultdict(cls._fila_vacia)
+
+        # Totales por pedido completo
+        totales = pedidos.annotate(
+            fecha=TruncDate('created_at')
+        ).values('fecha', 'estado').annotate(
+            num_pedidos=Count('id'),
+            monto=Sum('total')
+        ).order_by()
+
+        for row in totales:
+            fila = filas[(row['fecha'], VentaDiaria.CATEGORIA_TOTAL, row['estado'])]
+            fila['num_pedidos'] = row['num_pedidos']
+            fila['monto_total'] = row['monto'] or Decimal('0')
+
+        # Líneas agrupadas por pedido y prenda; ordenadas por pedido para
+        # contar pedidos distintos por categoría sin guardar conjuntos.
+        lineas = DetallePedido.objects.filter(
+            pedido__in=pedidos
+        ).annotate(
+            fecha=TruncDate('pedido__created_at')
+        ).values('fecha', 'pedido__estado', 'pedido_id', 'prenda_id').annotate(
+            lineas=Count('id'),
+            cantidad=Sum('cantidad'),
+            monto=Sum('subtotal')
+        ).order_by('pedido_id')
+
+        categorias = cls.get_categorias_principales()
+        pedido_actual, categorias_pedido = None, set()
+
+        for row in lineas.iterator(chunk_size=2000):
+            if row['pedido_id'] != pedido_actual:
+                pedido_actual, categorias_pedido = row['pedido_id'], set()
+
+            fecha, estado = row['fecha'], row['pedido__estado']
+            categoria = categorias.get(row['prenda_id'], VentaDiaria.SIN_CATEGORIA)
+
+            total = filas[(fecha, VentaDiaria.CATEGORIA_TOTAL, estado)]
+            total['num_lineas'] += row['lineas']
+            total['cantidad_vendida'] += row['cantidad'] or 0
+
+            fila = filas[(fecha, categoria, estado)]
+            fila['num_lineas'] += row['lineas']
+            fila['cantidad_vendida'] += row['cantidad'] or 0
+            fila['monto_total'] += row['monto'] or Decimal('0')
+            if categoria not in categorias_pedido:
+                categorias_pedido.add(categoria)
+                fila['num_pedidos'] += 1
+
+        with transaction.atomic():
+            rollup.delete()
+            VentaDiaria.objects.bulk_create([
+                VentaDiaria(fecha=fecha, categoria=categoria, estado=estado, **valores)
+                for (fecha, categoria, estado), valores in filas.items()
+            ], batch_size=1000)
+
+        logger.info(f"Agregado de ventas reconstruido: {len(filas)} filas ({fecha_inicio} - {fecha_fin})")
+        return len(filas)
+
+    @classmethod
+    def _get_contribuciones(cls, pedido):
+        """
+        Calcular lo que aporta un pedido a cada fila del agregado.
+
+        Returns:
+            tuple: (fecha, {categoria: valores})
+        """
+        from apps.reports.models import VentaDiaria
+
+        lineas = list(pedido.detalles.values_list('prenda_id', 'cantidad', 'subtotal'))
+        categorias = cls.get_categorias_principales({prenda_id for prenda_id, _, _ in lineas})
+
+        contribuciones = defaultdict(cls._fila_vacia)
+        total = contribuciones[VentaDiaria.CATEGORIA_TOTAL]
+        total['num_pedidos'] = 1
+        total['monto_total'] = pedido.total
+
+        for prenda_id, cantidad, subtotal in lineas:
+            categoria = categorias.get(prenda_id, VentaDiaria.SIN_CATEGORIA)
+            fila = contribuciones[categoria]
+            fila['num_pedidos'] = 1
+            fila['num_lineas'] += 1
+            fila['cantidad_vendida'] += cantidad
+            fila['monto_total'] += subtotal
+            total['num_lineas'] += 1
+            total['cantidad_vendida'] += cantidad
+
+        return timezone.localtime(pedido.created_at).date(), contribuciones
+
+    @staticmethod
+    def _aplicar(fecha, estado, contribuciones, signo):
+        """
+        Sumar (signo=1) o restar (signo=-1) contribuciones con updates atómicos.
+        """
+        from apps.reports.models import VentaDiaria
+
+        for categoria, valores in contribuciones.items():
+            delta = {campo: valor * signo for campo, valor in valores.items()}
+            fila, created = VentaDiaria.objects.get_or_create(
+                fecha=fecha,
+                categoria=categoria,
+                estado=estado,
+                defaults=delta
+            )
+            if not created:
+                VentaDiaria.objects.filter(pk=fila.pk).update(
+                    updated_at=timezone.now(),
+                    **{campo: F(campo) + valor for campo, valor in delta.items()}
+                )
+
+    @staticmethod
+    def _fila_vacia():
+        return {
+            'num_pedidos': 0,
+            'num_lineas': 0,
+            'cantidad_vendida': 0,
+            'monto_total': Decimal('0'),
+        }
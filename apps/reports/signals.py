@@ -0,0 +1,41 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from apps.accounts.models import User
+from apps.core.cache import GenerationalCache
+from apps.orders.models import Pedido
+from .services.report_cache import ReportResultCache
+from .services.sales_rollup import SalesRollupService
+
+# Los grupos 'productos' y 'stock' los invalida apps/products/receivers.py
+invalidar_analytics = GenerationalCache.invalidate_on_commit
+
+
+@receiver(post_save, sender=Pedido)
+def pedido_guardado(sender, instance, **kwargs):
+    """Signal cuando se crea o actualiza un pedido"""
+    invalidar_analytics('pedidos')
+
+
+@receiver(pre_delete, sender=Pedido)
+def pedido_eliminado(sender, instance, **kwargs):
+    """Signal cuando se elimina un pedido: recalcular su día en el agregado"""
+    SalesRollupService.recalcular_dia(instance)
+    invalidar_analytics('pedidos')
+
+
+@receiver(post_save, sender=User)
+def usuario_guardado(sender, instance, update_fields=None, **kwargs):
+    """Signal cuando se crea o actualiza un usuario (ignora el registro de último login)"""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidar_analytics('usuarios')
+
+
+def fila_eliminada(sender, **kwargs):
+    """Signal cuando se borra una fila de una tabla del sello de datos de reportes"""
+    ReportResultCache.registrar_eliminacion(sender._meta.label)
+
+
+for label in ReportResultCache.tablas():
+    post_delete.connect(fila_eliminada, sender=apps.get_model(label), dispatch_uid=f'reportes_eliminacion_{label}')
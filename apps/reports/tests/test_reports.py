@@ -0,0 +1,903 @@
+import threading
+import time
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+from apps.accounts.models import User, Role
+from apps.customers.models import Direccion
+from apps.orders.models import Pedido, DetallePedido
+from apps.products.models import Prenda, Marca, Categoria, Talla
+from apps.reports.models import VentaDiaria
+from apps.reports.services import (
+    AnalyticsCache, AnalyticsService, MetricRunner, QueryBuilder, SalesRollupService
+)
+
+
+@pytest.mark.django_db
+class TestAnalyticsService:
+
+    def setup_method(self):
+        cliente_role = Role.objects.create(nombre='Cliente', es_rol_sistema=True)
+        self.cliente = User.objects.create_user(
+            email='analytics@cliente.com',
+            password='Test2024!',
+            nombre='Test',
+            apellido='Analytics',
+            rol=cliente_role
+        )
+        self.direccion = Direccion.objects.create(
+            usuario=self.cliente,
+            nombre_completo='Test Analytics',
+            telefono='+591 70000000',
+            direccion_linea1='Calle Test 123',
+            ciudad='Cochabamba',
+            departamento='Cochabamba',
+            pais='Bolivia',
+            es_principal=True
+        )
+
+    def crear_pedido(self, total, estado='confirmado', hace_dias=0):
+        pedido = Pedido.objects.create(
+            usuario=self.cliente,
+            direccion_envio=self.direccion,
+            subtotal=Decimal(total),
+            total=Decimal(total),
+            estado=estado
+        )
+        if hace_dias:
+            Pedido.objects.filter(pk=pedido.pk).update(
+                created_at=timezone.now() - timedelta(days=hace_dias)
+            )
+            pedido.refresh_from_db()
+        SalesRollupService.registrar_pedido(pedido)
+        return pedido
+
+    def test_ventas_por_mes_completa_meses_vacios(self):
+        """Test: La serie mensual incluye meses sin ventas con ceros"""
+        self.crear_pedido('100.00')
+        self.crear_pedido('50.00')
+        self.crear_pedido('999.00', estado='pendiente')
+
+        data = AnalyticsService.get_sales_by_month(months=6)
+
+        assert len(data) == 6
+        assert data[-1]['total_sales'] == 150.0
+        assert data[-1]['order_count'] == 2
+        assert all(m['order_count'] == 0 for m in data[:-1])
+
+    def test_ventas_por_mes_en_una_consulta(self, django_assert_num_queries):
+        """Test: El costo en consultas no depende de la ventana de meses"""
+        self.crear_pedido('100.00', hace_dias=70)
+
+        with django_assert_num_queries(1):
+            data = AnalyticsService.get_sales_by_month(months=36)
+
+        assert len(data) == 36
+        assert sum(m['order_count'] for m in data) == 1
+
+    def test_actividad_por_dia(self, django_assert_num_queries):
+        """Test: Actividad diaria en una sola consulta con días vacíos"""
+        self.crear_pedido('80.00')
+        self.crear_pedido('20.00', estado='pendiente', hace_dias=3)
+
+        with django_assert_num_queries(1):
+            data = AnalyticsService.get_activity_by_day(days=30)
+
+        assert len(data) == 30
+        assert data[-1]['orders'] == 1
+        assert data[-1]['total_sales'] == 80.0
+        assert data[-4]['orders'] == 1
+        assert sum(d['orders'] for d in data) == 2
+
+    def test_rango_vacio(self):
+        """Test: Sin meses o días se devuelve una serie vacía"""
+        assert AnalyticsService.get_sales_by_month(months=0) == []
+        assert AnalyticsService.get_activity_by_day(days=0) == []
+
+
+@pytest.mark.django_db
+class TestVentaDiaria:
+
+    def setup_method(self):
+        cliente_role = Role.objects.create(nombre='Cliente', es_rol_sistema=True)
+        self.cliente = User.objects.create_user(
+            email='rollup@cliente.com',
+            password='Test2024!',
+            nombre='Test',
+            apellido='Rollup',
+            rol=cliente_role
+        )
+        self.direccion = Direccion.objects.create(
+            usuario=self.cliente,
+            nombre_completo='Test Rollup',
+            telefono='+591 70000000',
+            direccion_linea1='Calle Test 123',
+            ciudad='Cochabamba',
+            departamento='Cochabamba',
+            pais='Bolivia',
+            es_principal=True
+        )
+        self.marca = Marca.objects.create(nombre='Test Marca')
+        self.talla = Talla.objects.create(nombre='M', orden=1)
+        self.vestidos = Categoria.objects.create(nombre='Vestidos')
+        self.jeans = Categoria.objects.create(nombre='Jeans')
+
+        self.vestido = Prenda.objects.create(
+            nombre='Vestido', descripcion='Test', precio=Decimal('100.00'),
+            marca=self.marca, color='Negro'
+        )
+        self.vestido.categorias.add(self.vestidos)
+        self.jean = Prenda.objects.create(
+            nombre='Jean', descripcion='Test', precio=Decimal('50.00'),
+            marca=self.marca, color='Azul'
+        )
+        self.jean.categorias.add(self.jeans)
+
+    def crear_pedido(self, lineas):
+        subtotal = sum(prenda.precio * cantidad for prenda, cantidad in lineas)
+        pedido = Pedido.objects.create(
+            usuario=self.cliente,
+            direccion_envio=self.direccion,
+            subtotal=subtotal,
+            costo_envio=Decimal('10.00'),
+            total=subtotal + Decimal('10.00')
+        )
+        for prenda, cantidad in lineas:
+            DetallePedido.objects.create(
+                pedido=pedido,
+                prenda=prenda,
+                talla=self.talla,
+                cantidad=cantidad,
+                precio_unitario=prenda.precio
+            )
+        SalesRollupService.registrar_pedido(pedido)
+        return pedido
+
+    def snapshot(self):
+        return sorted(VentaDiaria.objects.values_list(
+            'fecha', 'categoria', 'estado', 'num_pedidos', 'num_lineas',
+            'cantidad_vendida', 'monto_total'
+        ))
+
+    def test_registrar_pedido(self):
+        """Test: Un pedido suma una fila total y una por categoría"""
+        self.crear_pedido([(self.vestido, 2), (self.jean, 1)])
+
+        total = VentaDiaria.objects.get(categoria=VentaDiaria.CATEGORIA_TOTAL)
+        assert total.num_pedidos == 1
+        assert total.cantidad_vendida == 3
+        assert total.monto_total == Decimal('260.00')
+
+        vestidos = VentaDiaria.objects.get(categoria='Vestidos')
+        assert vestidos.cantidad_vendida == 2
+        assert vestidos.monto_total == Decimal('200.00')
+
+    def test_cambiar_estado_mueve_el_pedido(self):
+        """Test: cambiar_estado mueve el pedido al nuevo estado"""
+        pedido = self.crear_pedido([(self.vestido, 1)])
+        pedido.cambiar_estado('confirmado')
+
+        pendientes = VentaDiaria.objects.filter(estado='pendiente')
+        confirmados = VentaDiaria.objects.filter(estado='confirmado')
+        assert all(fila.num_pedidos == 0 for fila in pendientes)
+        assert confirmados.get(categoria=VentaDiaria.CATEGORIA_TOTAL).num_pedidos == 1
+
+    def test_rebuild_coincide_con_incremental(self):
+        """Test: La reconstrucción produce el mismo agregado que el incremental"""
+        self.crear_pedido([(self.vestido, 2), (self.jean, 1)])
+        self.crear_pedido([(self.jean, 3)]).cambiar_estado('enviado')
+
+        incremental = [fila for fila in self.snapshot() if fila[3] or fila[6]]
+        SalesRollupService.rebuild()
+
+        assert self.snapshot() == incremental
+
+    def test_eliminar_pedido_lo_quita(self, django_capture_on_commit_callbacks):
+        """Test: Eliminar un pedido recalcula su día en el agregado"""
+        self.crear_pedido([(self.vestido, 1)])
+        pedido = self.crear_pedido([(self.jean, 2)])
+
+        with django_capture_on_commit_callbacks(execute=True):
+            pedido.delete()
+
+        total = VentaDiaria.objects.get(categoria=VentaDiaria.CATEGORIA_TOTAL)
+        assert total.num_pedidos == 1
+        assert total.cantidad_vendida == 1
+        assert not VentaDiaria.objects.filter(categoria='Jeans').exists()
+
+    def test_edicion_desde_admin_recalcula_el_dia(self, django_capture_on_commit_callbacks):
+        """Test: Guardar un pedido desde el admin recalcula su día"""
+        from unittest.mock import MagicMock
+        from django.contrib.admin.sites import site
+
+        pedido = self.crear_pedido([(self.jean, 1)])
+        DetallePedido.objects.filter(pedido=pedido).update(cantidad=3, subtotal=Decimal('150.00'))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            site._registry[Pedido].save_related(None, MagicMock(instance=pedido), [], True)
+
+        jeans = VentaDiaria.objects.get(categoria='Jeans')
+        assert jeans.cantidad_vendida == 3
+        assert jeans.monto_total == Decimal('150.00')
+
+    def test_reporte_ventas_por_categoria(self):
+        """Test: El reporte agrupado por categoría suma cada pedido en sus categorías"""
+        self.crear_pedido([(self.vestido, 2), (self.jean, 1)])
+        self.crear_pedido([(self.jean, 4)])
+
+        result = QueryBuilder.build({'type': 'ventas', 'group_by': ['categoria']})
+        data = {fila['categoria']: fila for fila in result['data']}
+
+        assert data['Jeans']['cantidad_pedidos'] == 2
+        assert data['Jeans']['productos_vendidos'] == 5
+        assert data['Vestidos']['total_ventas'] == 200.0
+
+    def test_reporte_por_categoria_cuenta_todas_las_categorias(self):
+        """Test: Una prenda con varias categorías suma en todas (no solo en la principal)"""
+        self.jean.categorias.add(self.vestidos)
+        self.crear_pedido([(self.vestido, 2), (self.jean, 1)])
+
+        result = QueryBuilder.build({'type': 'ventas', 'group_by': ['categoria']})
+        data = {fila['categoria']: fila for fila in result['data']}
+
+        assert data['Jeans']['total_ventas'] == 50.0
+        assert data['Vestidos']['total_ventas'] == 250.0
+        assert data['Vestidos']['productos_vendidos'] == 3
+
+
+@pytest.mark.django_db
+class TestAnalyticsCache:
+
+    def setup_method(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_cachea_el_valor(self):
+        """Test: La segunda lectura no recalcula la métrica"""
+        llamadas = []
+
+        def calcular():
+            llamadas.append(1)
+            return len(llamadas)
+
+        assert AnalyticsCache.get_or_compute('test:valor', calcular, ttl=60) == 1
+        assert AnalyticsCache.get_or_compute('test:valor', calcular, ttl=60) == 1
+        assert len(llamadas) == 1
+
+    def test_sirve_valor_vencido_mientras_recalcula(self):
+        """Test: Tras invalidar se devuelve el valor anterior y se recalcula en segundo plano"""
+        recalculado = threading.Event()
+        valores = iter(['viejo', 'nuevo'])
+
+        def calcular():
+            valor = next(valores)
+            if valor == 'nuevo':
+                recalculado.set()
+            return valor
+
+        assert AnalyticsCache.get_or_compute('test:swr', calcular, ttl=60, groups=('pedidos',)) == 'viejo'
+
+        AnalyticsCache.invalidate('pedidos')
+
+        assert AnalyticsCache.get_or_compute('test:swr', calcular, ttl=60, groups=('pedidos',)) == 'viejo'
+        assert recalculado.wait(timeout=5)
+
+        valor = None
+        for _ in range(50):
+            valor = AnalyticsCache.get_or_compute('test:swr', calcular, ttl=60, groups=('pedidos',))
+            if valor == 'nuevo':
+                break
+            time.sleep(0.05)
+        assert valor == 'nuevo'
+
+    def test_lock_sin_cache_sirve_valor_vencido(self):
+        """Test: Si el cache falla al tomar el lock se devuelve el valor anterior sin error"""
+        from unittest.mock import patch
+        from django.core.cache import cache
+
+        assert AnalyticsCache.get_or_compute('test:lock', lambda: 'viejo', ttl=60, groups=('pedidos',)) == 'viejo'
+        AnalyticsCache.invalidate('pedidos')
+
+        with patch.object(cache, 'add', side_effect=ConnectionError('Redis caído')):
+            valor = AnalyticsCache.get_or_compute('test:lock', lambda: 'nuevo', ttl=60, groups=('pedidos',))
+
+        assert valor == 'viejo'
+
+    def test_post_save_de_usuario_invalida(self, django_capture_on_commit_callbacks):
+        """Test: Guardar un usuario invalida solo las métricas que dependen de usuarios"""
+        antes = AnalyticsCache._get_generations(('pedidos',))['pedidos']
+
+        role = Role.objects.create(nombre='Cliente', es_rol_sistema=True)
+        with django_capture_on_commit_callbacks(execute=True):
+            User.objects.create_user(
+                email='cache@cliente.com', password='Test2024!',
+                nombre='Test', apellido='Cache', rol=role
+            )
+        assert AnalyticsCache._get_generations(('usuarios',))['usuarios'] >= 1
+        assert AnalyticsCache._get_generations(('pedidos',))['pedidos'] == antes
+
+
+class TestMetricRunner:
+
+    def test_paralelo_con_resultados_parciales(self):
+        """Test: Una métrica que falla o excede el timeout no bloquea al resto"""
+        def falla():
+            raise ValueError('sin datos')
+
+        def lenta():
+            time.sleep(1)
+            return 'tarde'
+
+        inicio = time.monotonic()
+        results, errors = MetricRunner.run(
+            {'ok': lambda: 42, 'falla': falla, 'lenta': lenta},
+            max_workers=3,
+            timeout=0.3
+        )
+
+        assert time.monotonic() - inicio < 1
+        assert results == {'ok': 42, 'falla': None, 'lenta': None}
+        assert set(errors) == {'falla', 'lenta'}
+
+    def test_timeout_por_metrica(self):
+        """Test: El timeout corre desde que arranca cada métrica, no desde el envío del lote"""
+        def media():
+            time.sleep(0.2)
+            return 'ok'
+
+        results, errors = MetricRunner.run({'a': media, 'b': media}, max_workers=1, timeout=0.3)
+
+        assert results == {'a': 'ok', 'b': 'ok'}
+        assert errors == {}
+
+    def test_sin_hilos_libres(self):
+        """Test: Si todos los hilos quedan con métricas vencidas, las que esperan turno fallan"""
+        def lenta():
+            time.sleep(1)
+
+        inicio = time.monotonic()
+        results, errors = MetricRunner.run({'lenta': lenta, 'rapida': lambda: 1}, max_workers=1, timeout=0.2)
+
+        assert time.monotonic() - inicio < 1
+        assert set(errors) == {'lenta', 'rapida'}
+
+    def test_secuencial(self):
+        """Test: Sin workers las métricas se calculan en el hilo actual"""
+        hilos = set()
+
+        def registrar():
+            hilos.add(threading.get_ident())
+            return True
+
+        results, errors = MetricRunner.run({'a': registrar, 'b': registrar}, max_workers=0)
+
+        assert results == {'a': True, 'b': True}
+        assert errors == {}
+        assert hilos == {threading.get_ident()}
+
+
+@pytest.mark.django_db
+class TestAnalyticsOverview:
+
+    def test_overview(self):
+        """Test: El overview devuelve todas las métricas"""
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        role = Role.objects.create(nombre='Administrador', es_rol_sistema=True)
+        admin = User.objects.create_user(
+            email='overview@admin.com', password='Test2024!',
+            nombre='Admin', apellido='Overview', rol=role
+        )
+        client = APIClient()
+        client.force_authenticate(user=admin)
+
+        response = client.get('/api/analytics/overview/?months=6&days=7')
+
+        assert response.status_code == 200
+        assert len(response.data['sales_by_month']) == 6
+        assert len(response.data['activity_by_day']) == 7
+        assert 'yearly_comparison' in response.data
+        assert 'errors' not in response.data
+
+    def test_ventas_valida_meses(self):
+        """Test: /sales/ responde 400 con meses inválidos"""
+        from rest_framework.test import APIClient
+
+        role = Role.objects.create(nombre='Administrador', es_rol_sistema=True)
+        admin = User.objects.create_user(
+            email='ventas@admin.com', password='Test2024!',
+            nombre='Admin', apellido='Ventas', rol=role
+        )
+        client = APIClient()
+        client.force_authenticate(user=admin)
+
+        assert client.get('/api/analytics/sales/?months=0').status_code == 400
+        assert client.get('/api/analytics/sales/?months=abc').status_code == 400
+        assert client.get('/api/analytics/sales/?months=3').status_code == 200
+
+
+@pytest.mark.django_db
+class TestReportStreaming:
+
+    @pytest.fixture(autouse=True)
+    def storage(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+
+    def setup_method(self):
+        cliente_role = Role.objects.create(nombre='Cliente', es_rol_sistema=True)
+        self.cliente = User.objects.create_user(
+            email='stream@cliente.com',
+            password='Test2024!',
+            nombre='Test',
+            apellido='Stream',
+            rol=cliente_role
+        )
+        self.direccion = Direccion.objects.create(
+            usuario=self.cliente,
+            nombre_completo='Test Stream',
+            telefono='+591 70000000',
+            direccion_linea1='Calle Test 123',
+            ciudad='Cochabamba',
+            departamento='Cochabamba',
+            pais='Bolivia',
+            es_principal=True
+        )
+        marca = Marca.objects.create(nombre='Test Marca')
+        talla = Talla.objects.create(nombre='M', orden=1)
+        prenda = Prenda.objects.create(
+            nombre='Vestido', descripcion='Test', precio=Decimal('100.00'),
+            marca=marca, color='Negro'
+        )
+        for lineas in (1, 3, 2):
+            pedido = Pedido.objects.create(
+                usuario=self.cliente,
+                direccion_envio=self.direccion,
+                subtotal=Decimal('100.00'),
+                total=Decimal('100.00')
+            )
+            for _ in range(lineas):
+                DetallePedido.objects.create(
+                    pedido=pedido, prenda=prenda, talla=talla,
+                    cantidad=1, precio_unitario=prenda.precio
+                )
+
+    def test_stream_coincide_con_build(self, django_assert_num_queries):
+        """Test: El listado por cursor devuelve las mismas filas en una consulta"""
+        config = {'type': 'ventas', 'group_by': []}
+        esperado = QueryBuilder.build(config)['data']
+
+        result = QueryBuilder.stream(config)
+        with django_assert_num_queries(1):
+            filas = list(result['data'])
+
+        assert filas == esperado
+        assert sorted(fila['items'] for fila in filas) == [1, 2, 3]
+
+    def test_csv_por_bloques(self):
+        """Test: El CSV por bloques es idéntico al generado en memoria"""
+        from apps.reports.generators import CSVReportGenerator
+
+        data = [{'a': i, 'b': None if i % 2 else f'x,{i}'} for i in range(25)]
+
+        en_memoria = CSVReportGenerator(title='Test')
+        en_memoria.add_table(data)
+
+        por_bloques = CSVReportGenerator(title='Test')
+        por_bloques.CHUNK_ROWS = 10
+        bloques = list(por_bloques.stream(iter(data)))
+
+        assert len(bloques) == 3
+        assert b''.join(bloques) == en_memoria.generate()
+        assert bloques[0].startswith(b'\xef\xbb\xbf')
+
+    def test_endpoint_csv_en_streaming(self):
+        """Test: El reporte CSV de ventas se envía como StreamingHttpResponse"""
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(user=self.cliente)
+
+        response = client.post(
+            '/api/reports/predefined/', {'report_type': 'ventas', 'format': 'csv'}, format='json'
+        )
+
+        assert response.status_code == 200
+        assert response.streaming
+        lineas = b''.join(response.streaming_content).decode('utf-8-sig').strip().splitlines()
+        assert lineas[0] == '#,numero_pedido,fecha,cliente,estado,total,items'
+        assert len(lineas) == 4
+
+    def test_excel_write_only_desde_iterador(self):
+        """Test: El workbook de solo escritura produce la misma tabla que el normal"""
+        from io import BytesIO
+        from openpyxl import load_workbook
+        from apps.reports.generators import ExcelReportGenerator
+
+        data = [{'producto': f'Prenda {i}', 'total': i * 1.5} for i in range(30)]
+
+        def tabla(generator, filas):
+            generator.WIDTH_SAMPLE_ROWS = 10
+            generator.create_sheet('Datos')
+            assert generator.add_table(filas) == 30
+            return load_workbook(BytesIO(generator.generate()))['Datos']
+
+        normal = tabla(ExcelReportGenerator(title='Test'), data)
+        solo_escritura = tabla(ExcelReportGenerator(title='Test', write_only=True), iter(data))
+
+        valores = [[celda.value for celda in fila] for fila in normal.iter_rows()]
+        assert [[celda.value for celda in fila] for fila in solo_escritura.iter_rows()] == valores
+        assert valores[1] == [1, 'Prenda 0', 0]
+        assert solo_escritura['A1'].style == 'reporte_encabezado'
+        assert solo_escritura['B2'].style == 'reporte_dato_alterno'
+        assert solo_escritura['B3'].style == 'reporte_dato'
+        assert solo_escritura.column_dimensions['B'].width == normal.column_dimensions['B'].width == 10
+
+    def test_excel_write_only_no_reescribe_filas(self):
+        """Test: En modo solo escritura no se puede volver a una fila escrita"""
+        from apps.reports.generators import ExcelReportGenerator
+
+        generator = ExcelReportGenerator(title='Test', write_only=True)
+        sheet = generator.create_sheet('Resumen')
+        generator.add_title_row(sheet, 'Test')
+
+        with pytest.raises(ValueError):
+            generator.add_key_value_rows(sheet, [('Total:', 1)], start_row=1)
+        generator.add_key_value_rows(sheet, [('Total:', 1)], start_row=3)
+        assert generator.generate()
+
+    def test_endpoint_excel(self):
+        """Test: El reporte Excel de ventas se arma con las filas del cursor"""
+        from io import BytesIO
+        from openpyxl import load_workbook
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(user=self.cliente)
+
+        response = client.post(
+            '/api/reports/predefined/', {'report_type': 'ventas', 'format': 'excel'}, format='json'
+        )
+
+        assert response.status_code == 200
+        workbook = load_workbook(BytesIO(response.content))
+        assert workbook['Resumen']['B5'].value == 3
+        assert workbook['Resumen'].merged_cells.ranges
+        assert workbook['Datos'].max_row == 4
+
+    def test_pdf_tabla_por_bloques(self):
+        """Test: La tabla PDF se divide en bloques con encabezado y se recorta en max_rows"""
+        from reportlab.platypus import LongTable, Paragraph
+        from apps.reports.generators import PDFReportGenerator
+
+        generator = PDFReportGenerator(title='Test', max_rows=25)
+        generator.ROWS_PER_CHUNK = 10
+        data = iter([{'producto': f'Prenda {i}', 'total': i * 1.5} for i in range(30)])
+
+        consumidas = []
+        data = (consumidas.append(fila) or fila for fila in data)
+
+        assert generator.add_table(data, total=30) == 30
+        assert len(consumidas) == 26
+
+        bloques = [flowable for flowable in generator.story if isinstance(flowable, LongTable)]
+        assert [len(bloque._cellvalues) for bloque in bloques] == [11, 11, 6]
+        assert all(bloque.repeatRows == 1 for bloque in bloques)
+        assert all(bloque._cellvalues[0] == ['#', 'producto', 'total'] for bloque in bloques)
+        assert bloques[1]._cellvalues[1][0] == '11'
+        assert bloques[0]._colWidths == bloques[2]._colWidths
+        nota = [flowable for flowable in generator.story if isinstance(flowable, Paragraph)][-1]
+        assert '25 de 30' in nota.text
+        assert generator.generate().startswith(b'%PDF')
+
+    def test_pdf_recorte_sin_total(self):
+        """Test: Sin total conocido la nota indica que hay más filas"""
+        from reportlab.platypus import Paragraph
+        from apps.reports.generators import PDFReportGenerator
+
+        generator = PDFReportGenerator(title='Test', max_rows=5)
+        assert generator.add_table(iter([{'n': i} for i in range(8)])) == 5
+
+        nota = [flowable for flowable in generator.story if isinstance(flowable, Paragraph)][-1]
+        assert 'de más de 5 filas' in nota.text
+
+        generator = PDFReportGenerator(title='Test', max_rows=5)
+        assert generator.add_table([{'n': i} for i in range(8)]) == 8
+
+    def test_pdf_total_por_count(self):
+        """Test: El listado por cursor del PDF trae el total por COUNT"""
+        from apps.reports.services import QueryBuilder
+
+        config = {'type': 'ventas', 'format': 'pdf', 'filters': {}, 'group_by': [], 'limit': None}
+        result = QueryBuilder.stream(config, count=True)
+
+        assert result['metadata']['total_records'] == Pedido.objects.count()
+        assert 'total_records' not in QueryBuilder.stream(config)['metadata']
+
+    def test_pdf_recorta_textos_largos(self):
+        """Test: Los textos más anchos que su columna se recortan con '…'"""
+        from apps.reports.generators import PDFReportGenerator
+
+        generator = PDFReportGenerator(title='Test')
+        recortado = generator._fit_text('x' * 500, generator.MAX_COLUMN_WIDTH)
+
+        assert recortado.endswith('…')
+        assert len(recortado) < 500
+        assert generator._fit_text('corto', generator.MAX_COLUMN_WIDTH) == 'corto'
+
+    def test_endpoint_pdf(self):
+        """Test: El reporte PDF de ventas se arma con las filas del cursor"""
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(user=self.cliente)
+
+        response = client.post(
+            '/api/reports/predefined/', {'report_type': 'ventas', 'format': 'pdf'}, format='json'
+        )
+
+        assert response.status_code == 200
+        assert response.content.startswith(b'%PDF')
+
+
+@pytest.mark.django_db
+class TestReportJobs:
+
+    @pytest.fixture(autouse=True)
+    def entorno(self, settings, tmp_path):
+        from rest_framework.test import APIClient
+
+        settings.JOBS_BACKEND = 'sync'
+        settings.MEDIA_ROOT = str(tmp_path)
+
+        role = Role.objects.create(nombre='Cliente', es_rol_sistema=True)
+        self.usuario = User.objects.create_user(
+            email='jobs@cliente.com', password='Test2024!',
+            nombre='Test', apellido='Jobs', rol=role
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario)
+
+    def encolar(self, django_capture_on_commit_callbacks, **datos):
+        with django_capture_on_commit_callbacks(execute=True):
+            return self.client.post('/api/reports/jobs/', datos, format='json')
+
+    def test_job_id_invalido(self):
+        """Test: Un id que no es UUID responde 404"""
+        assert self.client.get('/api/reports/jobs/abc/').status_code == 404
+        assert self.client.get('/api/reports/jobs/abc/download/').status_code == 404
+
+    def test_reporte_en_segundo_plano(self, django_capture_on_commit_callbacks):
+        """Test: El job genera el archivo en el storage y se descarga por la API"""
+        from apps.reports.models import ReportJob
+
+        response = self.encolar(
+            django_capture_on_commit_callbacks, report_type='productos', format='csv'
+        )
+
+        assert response.status_code == 202
+        assert response.data['job']['estado'] == 'pendiente'
+        assert response.data['job']['download_url'] is None
+
+        job = ReportJob.objects.get(pk=response.data['job']['id'])
+        assert job.estado == 'completado'
+        assert job.usuario == self.usuario
+        assert job.nombre_archivo.endswith('.csv')
+        assert job.tamaño == job.archivo.size > 0
+
+        estado = self.client.get(f'/api/reports/jobs/{job.id}/')
+        assert estado.status_code == 200
+        assert estado.data['download_url'].endswith(f'/api/reports/jobs/{job.id}/download/')
+
+        descarga = self.client.get(f'/api/reports/jobs/{job.id}/download/')
+        assert descarga.status_code == 200
+        assert job.nombre_archivo in descarga['Content-Disposition']
+        with job.archivo.open('rb') as archivo:
+            assert b''.join(descarga.streaming_content) == archivo.read()
+
+    def test_job_de_otro_usuario(self, django_capture_on_commit_callbacks):
+        """Test: Un usuario no ve los reportes de otro"""
+        from apps.reports.models import ReportJob
+
+        job = ReportJob.objects.create(origen='prompt', parametros={'prompt': 'ventas'})
+
+        assert self.client.get(f'/api/reports/jobs/{job.id}/').status_code == 404
+        assert self.client.get(f'/api/reports/jobs/{job.id}/download/').status_code == 404
+
+    def test_descarga_pendiente(self):
+        """Test: Un reporte sin terminar no se puede descargar"""
+        from apps.reports.models import ReportJob
+
+        job = ReportJob.objects.create(usuario=self.usuario, origen='prompt', parametros={'prompt': 'ventas'})
+
+        response = self.client.get(f'/api/reports/jobs/{job.id}/download/')
+        assert response.status_code == 409
+        assert response.data['estado'] == 'pendiente'
+
+    def test_error_de_generacion(self, django_capture_on_commit_callbacks):
+        """Test: Un fallo del generador queda registrado en el job"""
+        from unittest import mock
+        from apps.reports.models import ReportJob
+        from apps.reports.services import ReportGeneratorService, ReportGeneratorServiceError
+
+        with mock.patch.object(
+            ReportGeneratorService, 'generate_from_prompt', side_effect=ReportGeneratorServiceError('sin datos')
+        ):
+            response = self.encolar(django_capture_on_commit_callbacks, prompt='Ventas del mes en PDF')
+
+        job = ReportJob.objects.get(pk=response.data['job']['id'])
+        assert job.estado == 'error'
+        assert job.error == 'sin datos'
+        assert not job.archivo
+
+    def test_prompt_o_tipo(self):
+        """Test: Se exige un prompt o un tipo de reporte, no ambos"""
+        assert self.client.post('/api/reports/jobs/', {}, format='json').status_code == 400
+        assert self.client.post(
+            '/api/reports/jobs/', {'prompt': 'ventas', 'report_type': 'ventas'}, format='json'
+        ).status_code == 400
+
+    def test_jobs_colgados(self, settings):
+        """Test: Un job activo sin cambios pasado el timeout se marca como error y se purga"""
+        from apps.reports.models import ReportJob
+        from apps.reports.services import ReportJobService
+
+        settings.REPORTS_JOB_TIMEOUT = 30
+        # Encolado sin que se ejecute (sin on_commit): queda pendiente
+        response = self.client.post('/api/reports/jobs/', {'report_type': 'productos', 'format': 'csv'}, format='json')
+        job = ReportJob.objects.get(pk=response.data['job']['id'])
+        assert self.client.get(f'/api/reports/jobs/{job.id}/').data['estado'] == 'pendiente'
+
+        ReportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(minutes=31))
+        estado = self.client.get(f'/api/reports/jobs/{job.id}/').data
+        assert estado['estado'] == 'error'
+        assert '30 minutos' in ReportJob.objects.get(pk=job.pk).error
+
+        ReportJob.objects.filter(pk=job.pk).update(
+            estado='en_proceso', created_at=timezone.now() - timedelta(days=10),
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        assert ReportJobService.purgar(dias=7) == 1
+        assert not ReportJob.objects.exists()
+
+    def test_purgar_reportes_vencidos(self, django_capture_on_commit_callbacks):
+        """Test: La purga elimina los jobs viejos y sus archivos"""
+        from django.core.files.storage import default_storage
+        from apps.reports.models import ReportJob
+        from apps.reports.services import ReportJobService
+
+        response = self.encolar(
+            django_capture_on_commit_callbacks, report_type='productos', format='csv'
+        )
+        job = ReportJob.objects.get(pk=response.data['job']['id'])
+        ruta = job.archivo.name
+
+        assert ReportJobService.purgar(dias=1) == 0
+        ReportJob.objects.filter(pk=job.pk).update(created_at=timezone.now() - timedelta(days=2))
+
+        assert ReportJobService.purgar(dias=1) == 1
+        assert not ReportJob.objects.exists()
+        assert not default_storage.exists(ruta)
+
+
+@pytest.mark.django_db
+class TestReportResultCache:
+
+    @pytest.fixture(autouse=True)
+    def storage(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+        settings.REPORTS_RESULT_CACHE_MAX_BYTES = 10 * 1024 * 1024
+
+    def generar(self, **kwargs):
+        from apps.reports.services import ReportGeneratorService
+        return ReportGeneratorService.generate_predefined_report(
+            report_type='productos', format_type='pdf', user_name='Test', **kwargs
+        )
+
+    def test_reporte_repetido_desde_cache(self):
+        """Test: El mismo reporte sobre los mismos datos no se vuelve a generar"""
+        from unittest import mock
+        from apps.reports.models import CachedReport
+        from apps.reports.services import ReportGeneratorService
+
+        primero = self.generar()
+        with mock.patch.object(ReportGeneratorService, '_generate_standard_report') as generar:
+            segundo = self.generar()
+
+        generar.assert_not_called()
+        assert segundo == primero
+        assert CachedReport.objects.get().usos == 1
+
+    def test_cambio_de_datos_invalida(self):
+        """Test: Un cambio en las tablas leídas cambia la clave"""
+        from apps.reports.models import CachedReport
+
+        self.generar()
+        marca = Marca.objects.create(nombre='Nueva')
+        self.generar()
+        assert CachedReport.objects.count() == 2
+
+        clave = CachedReport.objects.order_by('-created_at').first().clave
+        marca.soft_delete()
+        self.generar()
+        assert CachedReport.objects.count() == 3
+        assert CachedReport.objects.order_by('-created_at').first().clave != clave
+
+    def test_clave_por_periodo_absoluto(self):
+        """Test: El mismo período relativo en otra fecha es otra entrada"""
+        from datetime import date
+        from apps.reports.services import ReportResultCache
+
+        def config(inicio, fin):
+            return {
+                'type': 'ventas', 'format': 'pdf', 'filters': {}, 'group_by': [], 'limit': None,
+                'period': {'start_date': inicio, 'end_date': fin, 'label': 'Último mes'},
+            }
+
+        septiembre = ReportResultCache.make_key(config(date(2025, 9, 1), date(2025, 9, 30)), 'Test', 'Org')
+        octubre = ReportResultCache.make_key(config(date(2025, 10, 1), date(2025, 10, 31)), 'Test', 'Org')
+
+        assert septiembre != octubre
+        assert septiembre == ReportResultCache.make_key(config(date(2025, 9, 1), date(2025, 9, 30)), 'Test', 'Org')
+        assert septiembre != ReportResultCache.make_key(config(date(2025, 9, 1), date(2025, 9, 30)), 'Otro', 'Org')
+
+    def test_tablas_versionadas_indexadas(self):
+        """Test: Las tablas del sello de datos tienen índices en updated_at y deleted_at"""
+        from django.apps import apps
+        from apps.reports.services import ReportResultCache
+
+        tablas = {label for labels in ReportResultCache.TABLES.values() for label in labels}
+        for label in tablas:
+            indexados = {tuple(index.fields) for index in apps.get_model(label)._meta.indexes}
+            assert {('updated_at',), ('deleted_at',)} <= indexados, label
+
+    def test_borrado_fisico_invalida(self):
+        """Test: Borrar una fila cambia la clave aunque no cambien los máximos"""
+        from apps.reports.models import CachedReport, TablaEliminaciones
+        from apps.reports.services import ReportResultCache
+
+        marca = Marca.objects.create(nombre='Temporal')
+        self.generar()
+        version = ReportResultCache.data_version('productos')
+
+        marca.delete()
+        assert TablaEliminaciones.objects.get(tabla='products.Marca').eliminaciones == 1
+        assert ReportResultCache.data_version('productos') != version
+
+        self.generar()
+        assert CachedReport.objects.count() == 2
+
+    def test_sello_sin_conteos(self):
+        """Test: El sello lee los máximos por separado y no cuenta filas"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.reports.services import ReportResultCache
+
+        tablas = ReportResultCache.TABLES['productos']
+        with CaptureQueriesContext(connection) as consultas:
+            ReportResultCache.data_version('productos')
+
+        sql = [q['sql'].upper() for q in consultas.captured_queries]
+        assert len(sql) == 1 + 2 * len(tablas)
+        assert not any('COUNT(' in q for q in sql)
+        assert all(q.count('MAX(') <= 1 for q in sql)
+
+    def test_desalojo_lru(self, settings):
+        """Test: Al superar el tamaño máximo se desalojan los menos usados"""
+        from django.core.files.storage import default_storage
+        from apps.reports.models import CachedReport
+        from apps.reports.services import ReportResultCache
+
+        settings.REPORTS_RESULT_CACHE_MAX_BYTES = 250
+        ReportResultCache.put('a' * 64, b'a' * 100, 'a.csv', 'text/csv')
+        ReportResultCache.put('b' * 64, b'b' * 100, 'b.csv', 'text/csv')
+        ruta_b = CachedReport.objects.get(clave='b' * 64).archivo.name
+
+        assert ReportResultCache.get('a' * 64)[0] == b'a' * 100
+        ReportResultCache.put('c' * 64, b'c' * 100, 'c.csv', 'text/csv')
+
+        assert set(CachedReport.objects.values_list('clave', flat=True)) == {'a' * 64, 'c' * 64}
+        assert not default_storage.exists(ruta_b)
+        assert ReportResultCache.get('b' * 64) is None
@@ -5,29 +5,48 @@ Proporciona endpoints para:
 - Generar reportes desde prompts de texto
 - Obtener analytics y estadísticas
 - Generar reportes predefinidos
+- Generar reportes en segundo plano y descargarlos
 """
 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 import logging
 
+from apps.core.constants import UUID_PATTERN
+
+from .models import ReportJob
 from .serializers import (
     GenerateReportSerializer,
     PredefinedReportSerializer,
-    AnalyticsSerializer
+    AnalyticsSerializer,
+    ReportJobRequestSerializer,
+    ReportJobSerializer
 )
 from .services import (
-    AnalyticsService,
+    AnalyticsCache,
+    MetricRunner,
     ReportGeneratorService,
-    ReportGeneratorServiceError
+    ReportGeneratorServiceError,
+    ReportJobService
 )
 
 logger = logging.getLogger(__name__)
 
 
+def _file_response(file_content, filename, mime_type):
+    """Respuesta de descarga; los reportes generados por bloques se envían en streaming"""
+    if isinstance(file_content, bytes):
+        response = HttpResponse(file_content, content_type=mime_type)
+    else:
+        response = StreamingHttpResponse(file_content, content_type=mime_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 class ReportsViewSet(viewsets.ViewSet):
     """
     ViewSet para generación de reportes dinámicos y analytics.
@@ -46,7 +65,8 @@ class ReportsViewSet(viewsets.ViewSet):
         }
 
         Returns:
-            Archivo del reporte en el formato especificado
+            Archivo del reporte en el formato especificado (los CSV tabulares
+            se envían en streaming)
         """
         serializer = GenerateReportSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -63,12 +83,12 @@ class ReportsViewSet(viewsets.ViewSet):
                 prompt=prompt,
                 user_name=user_name,
                 organization_name="SmartSales365",
-                format_override=format_override  # Prioridad al formato del select
+                format_override=format_override,  # Prioridad al formato del select
+                stream=True
             )
 
             # Retornar archivo
-            response = HttpResponse(file_content, content_type=mime_type)
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            response = _file_response(file_content, filename, mime_type)
 
             logger.info(f"Reporte generado exitosamente: {filename} para {user_name}")
             return response
@@ -116,13 +136,11 @@ class ReportsViewSet(viewsets.ViewSet):
                 format_type=format_type,
                 filters=filters,
                 user_name=user_name,
-                organization_name="SmartSales365"
+                organization_name="SmartSales365",
+                stream=True
             )
 
-            response = HttpResponse(file_content, content_type=mime_type)
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-            return response
+            return _file_response(file_content, filename, mime_type)
 
         except Exception as e:
             logger.error(f"Error al generar reporte predefinido: {e}", exc_info=True)
@@ -131,6 +149,89 @@ class ReportsViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], url_path='jobs')
+    def submit_job(self, request):
+        """
+        Encolar un reporte para generarlo en segundo plano.
+
+        POST /api/reports/jobs/
+        Body: {"prompt": "Ventas del año 2025 en PDF", "format": "pdf"}
+          o   {"report_type": "ventas", "format": "excel", "filters": {...}}
+
+        Returns:
+            202 con el job; el estado se consulta en /api/reports/jobs/{id}/
+            y el archivo se descarga en /api/reports/jobs/{id}/download/
+        """
+        serializer = ReportJobRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+
+        if datos.get('prompt'):
+            job = ReportJobService.enviar(
+                usuario=request.user,
+                origen='prompt',
+                prompt=datos['prompt'],
+                format=datos.get('format')
+            )
+        else:
+            job = ReportJobService.enviar(
+                usuario=request.user,
+                origen='predefinido',
+                report_type=datos['report_type'],
+                format=datos.get('format') or 'pdf',
+                filters=datos.get('filters', {})
+            )
+
+        return Response({
+            'message': 'Reporte encolado',
+            'job': ReportJobSerializer(job, context={'request': request}).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=rf'jobs/(?P<job_id>{UUID_PATTERN})')
+    def job_status(self, request, job_id=None):
+        """
+        Estado de un reporte en segundo plano.
+
+        GET /api/reports/jobs/{id}/
+        """
+        job = self._get_job(request, job_id)
+        if job is None:
+            return Response({'error': 'Reporte no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(ReportJobSerializer(job, context={'request': request}).data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path=rf'jobs/(?P<job_id>{UUID_PATTERN})/download')
+    def download_job(self, request, job_id=None):
+        """
+        Descargar el archivo de un reporte terminado.
+
+        GET /api/reports/jobs/{id}/download/
+        """
+        job = self._get_job(request, job_id)
+        if job is None:
+            return Response({'error': 'Reporte no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        if job.estado != 'completado':
+            return Response(
+                {'error': 'El reporte aún no está disponible', 'estado': job.estado},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        return FileResponse(
+            job.archivo.open('rb'),
+            as_attachment=True,
+            filename=job.nombre_archivo,
+            content_type=job.mime_type
+        )
+
+    @staticmethod
+    def _get_job(request, job_id):
+        """Job del usuario (el staff ve todos), cerrado si quedó colgado"""
+        jobs = ReportJob.objects.all()
+        if not request.user.is_staff:
+            jobs = jobs.filter(usuario=request.user)
+        job = jobs.filter(pk=job_id).first()
+        return ReportJobService.actualizar_vencido(job) if job is not None else None
+
     @action(detail=False, methods=['post'])
     def preview(self, request):
         """
@@ -369,6 +470,11 @@ class AnalyticsViewSet(viewsets.ViewSet):
         """
         Obtener resumen analítico completo.
 
+        Cada métrica se sirve desde el cache de analytics (ver AnalyticsCache).
+        Con ANALYTICS_OVERVIEW_WORKERS > 0 las métricas se calculan en paralelo;
+        si alguna falla o excede ANALYTICS_METRIC_TIMEOUT se devuelve en null
+        y su error en "errors".
+
         GET /api/analytics/overview/?months=12&days=30
 
         Returns:
@@ -386,28 +492,36 @@ class AnalyticsViewSet(viewsets.ViewSet):
         months = serializer.validated_data['months']
         days = serializer.validated_data['days']
 
-        try:
-            data = {
-                'sales_by_month': AnalyticsService.get_sales_by_month(months),
-                'products_by_category': AnalyticsService.get_products_by_category(),
-                'activity_by_day': AnalyticsService.get_activity_by_day(days),
-                'top_selling_products': AnalyticsService.get_top_selling_products(limit=10),
-                'sales_by_status': AnalyticsService.get_sales_by_status(),
-                'summary': AnalyticsService.get_summary(),
-                'inventory_summary': AnalyticsService.get_inventory_summary(),
-                'customer_analytics': AnalyticsService.get_customer_analytics(),
-                'yearly_comparison': AnalyticsService.get_yearly_comparison(),  # NUEVO
-            }
+        tasks = {
+            'sales_by_month': lambda: AnalyticsCache.get_metric('sales_by_month', months=months),
+            'products_by_category': lambda: AnalyticsCache.get_metric('products_by_category'),
+            'activity_by_day': lambda: AnalyticsCache.get_metric('activity_by_day', days=days),
+            'top_selling_products': lambda: AnalyticsCache.get_metric('top_selling_products', limit=10),
+            'sales_by_status': lambda: AnalyticsCache.get_metric('sales_by_status'),
+            'summary': lambda: AnalyticsCache.get_metric('summary'),
+            'inventory_summary': lambda: AnalyticsCache.get_metric('inventory_summary'),
+            'customer_analytics': lambda: AnalyticsCache.get_metric('customer_analytics'),
+            'yearly_comparison': lambda: AnalyticsCache.get_metric('yearly_comparison'),  # NUEVO
+        }
 
-            return Response(data, status=status.HTTP_200_OK)
+        data, errors = MetricRunner.run(
+            tasks,
+            max_workers=settings.ANALYTICS_OVERVIEW_WORKERS,
+            timeout=settings.ANALYTICS_METRIC_TIMEOUT
+        )
 
-        except Exception as e:
-            logger.error(f"Error en analytics overview: {e}", exc_info=True)
+        if len(errors) == len(tasks):
             return Response(
-                {'error': f'Error al obtener analytics: {str(e)}'},
+                {'error': 'Error al obtener analytics', 'errors': errors},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        if errors:
+            # Resultados parciales: las métricas fallidas vienen en null
+            data['errors'] = errors
+
+        return Response(data, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """
@@ -424,7 +538,7 @@ class AnalyticsViewSet(viewsets.ViewSet):
             }
         """
         try:
-            summary = AnalyticsService.get_summary()
+            summary = AnalyticsCache.get_metric('summary')
             return Response(summary, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error al obtener resumen: {e}", exc_info=True)
@@ -446,10 +560,12 @@ class AnalyticsViewSet(viewsets.ViewSet):
                 ...
             ]
         """
-        months = int(request.query_params.get('months', 12))
+        serializer = AnalyticsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        months = serializer.validated_data['months']
 
         try:
-            data = AnalyticsService.get_sales_by_month(months)
+            data = AnalyticsCache.get_metric('sales_by_month', months=months)
             return Response(data, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error al obtener ventas: {e}", exc_info=True)
@@ -473,8 +589,8 @@ class AnalyticsViewSet(viewsets.ViewSet):
         """
         try:
             data = {
-                'by_category': AnalyticsService.get_products_by_category(),
-                'top_selling': AnalyticsService.get_top_selling_products(limit=10),
+                'by_category': AnalyticsCache.get_metric('products_by_category'),
+                'top_selling': AnalyticsCache.get_metric('top_selling_products', limit=10),
             }
             return Response(data, status=status.HTTP_200_OK)
         except Exception as e:
@@ -500,7 +616,7 @@ class AnalyticsViewSet(viewsets.ViewSet):
             }
         """
         try:
-            data = AnalyticsService.get_inventory_summary()
+            data = AnalyticsCache.get_metric('inventory_summary')
             return Response(data, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error al obtener resumen de inventario: {e}", exc_info=True)
@@ -525,7 +641,7 @@ class AnalyticsViewSet(viewsets.ViewSet):
             }
         """
         try:
-            data = AnalyticsService.get_customer_analytics()
+            data = AnalyticsCache.get_metric('customer_analytics')
             return Response(data, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error al obtener analytics de clientes: {e}", exc_info=True)
@@ -560,7 +676,7 @@ class AnalyticsViewSet(viewsets.ViewSet):
             }
         """
         try:
-            data = AnalyticsService.get_yearly_comparison()
+            data = AnalyticsCache.get_metric('yearly_comparison')
             return Response(data, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error al obtener comparativa anual: {e}", exc_info=True)
@@ -0,0 +1,17 @@
+"""
+Aplicación de Celery
+
+Worker (con JOBS_BACKEND='celery'):
+
+    celery -A config worker -l info
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
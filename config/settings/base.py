@@ -156,6 +156,79 @@ SPECTACULAR_SETTINGS = {
     ]
 }
 
+# Cache (Redis si hay REDIS_URL; memoria local en desarrollo/tests)
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'smartsales',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Analytics: segundos que una métrica se considera fresca antes de recalcularse
+ANALYTICS_CACHE_TTL = config('ANALYTICS_CACHE_TTL', default=300, cast=int)
+
+# Analytics overview: hilos para calcular las métricas en paralelo (0 = secuencial)
+# y timeout por métrica en segundos (desde que cada métrica arranca)
+ANALYTICS_OVERVIEW_WORKERS = config('ANALYTICS_OVERVIEW_WORKERS', default=0, cast=int)
+ANALYTICS_METRIC_TIMEOUT = config('ANALYTICS_METRIC_TIMEOUT', default=15, cast=float)
+
+# Carrito: 'db' (Carrito/ItemCarrito directo) o 'redis' (hash en REDIS_URL con
+# escritura diferida a la BD, ver apps/cart/store.py); TTL en segundos del hash
+# ya persistido (los carritos con cambios pendientes no expiran)
+CART_BACKEND = config('CART_BACKEND', default='db')
+CART_REDIS_TTL = config('CART_REDIS_TTL', default=7 * 24 * 3600, cast=int)
+
+# Catálogo: segundos que se cachean las facetas de cada combinación de filtros
+CATALOG_FACETS_CACHE_TTL = config('CATALOG_FACETS_CACHE_TTL', default=120, cast=int)
+
+# IA: meses que cubre el pronóstico precalculado del dashboard
+AI_FORECAST_SNAPSHOT_MONTHS = config('AI_FORECAST_SNAPSHOT_MONTHS', default=6, cast=int)
+
+# IA: núcleos que usa el entrenamiento (n_jobs de scikit-learn; -1 = todos).
+# Con JOBS_BACKEND='thread' el entrenamiento corre en el nodo web
+AI_TRAINING_N_JOBS = config('AI_TRAINING_N_JOBS', default=1, cast=int)
+
+# Tareas en segundo plano (ver apps/core/jobs.py): 'celery' (worker con
+# CELERY_BROKER_URL), 'thread' (hilos del proceso web: el entrenamiento y
+# los reportes compiten con los requests) o 'sync' (tests). En producción
+# el default es 'celery' (ver production.py)
+JOBS_BACKEND = config('JOBS_BACKEND', default='thread')
+JOBS_THREAD_WORKERS = config('JOBS_THREAD_WORKERS', default=1, cast=int)
+
+# IA: minutos sin progreso tras los que un entrenamiento activo se da por
+# perdido (worker reiniciado) y deja de bloquear nuevos entrenamientos
+AI_TRAINING_JOB_TIMEOUT = config('AI_TRAINING_JOB_TIMEOUT', default=120, cast=int)
+
+# Reportes en segundo plano: días que se conservan los archivos generados
+# (`manage.py purge_report_jobs`)
+REPORTS_JOB_RETENTION_DAYS = config('REPORTS_JOB_RETENTION_DAYS', default=7, cast=int)
+
+# Reportes en segundo plano: minutos sin cambios tras los que un job
+# pendiente o en proceso se da por perdido y se marca como error
+REPORTS_JOB_TIMEOUT = config('REPORTS_JOB_TIMEOUT', default=30, cast=int)
+
+# Reportes: tamaño máximo total de los archivos en cache (LRU); 0 = sin cache
+REPORTS_RESULT_CACHE_MAX_BYTES = config('REPORTS_RESULT_CACHE_MAX_BYTES', default=200 * 1024 * 1024, cast=int)
+
+# Reportes: filas dibujadas en las tablas PDF (el resto se indica en una nota)
+REPORTS_PDF_MAX_ROWS = config('REPORTS_PDF_MAX_ROWS', default=5000, cast=int)
+
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default=REDIS_URL or 'memory://')
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
 # AWS S3 Configuration
 USE_S3 = config('USE_S3', default=False, cast=bool)
 
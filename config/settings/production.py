@@ -9,6 +9,9 @@ SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
+# Entrenamiento y reportes en el worker de Celery, fuera de los procesos web
+JOBS_BACKEND = config('JOBS_BACKEND', default='celery')
+
 # AWS S3 Configuration
 USE_S3 = config('USE_S3', default=False, cast=bool)
 
@@ -52,6 +52,7 @@ from apps.core.constants import PERMISSIONS, ROLES
 from apps.customers.models import Direccion, Favoritos
 from apps.cart.models import Carrito, ItemCarrito
 from apps.orders.models import MetodoPago, Pedido, DetallePedido, Pago
+from apps.reports.services.sales_rollup import SalesRollupService
 
 # ============= CONFIGURACIÓN =============
 S3_BUCKET = config('AWS_STORAGE_BUCKET_NAME', default='smart-sales-2025-media')
@@ -1044,6 +1045,9 @@ def run():
     pedidos_2025 = seed_pedidos_por_año(2025, clientes, todas_las_prendas, metodos_pago)
     stats['pedidos_2025'] = len(pedidos_2025)
     
+    # Los pedidos se crean fuera del checkout: reconstruir el agregado de ventas
+    SalesRollupService.rebuild()
+    
     # 8. Carritos
     carritos = seed_carritos(clientes, todas_las_prendas)
     stats['carritos'] = len(carritos)